@@ -5,93 +5,56 @@ import uuid
 import re
 import time
 import sqlalchemy.exc
+from sqlalchemy.orm import selectinload
 from datetime import datetime
 from flask import Flask, render_template, jsonify, request, session, make_response
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 # Importar o blueprint de rotas da API
 from app_routes import api_blueprint
 
 # Importação dos serviços e modelos
-from services.travelpayouts_service import TravelPayoutsService
-from services.travelpayouts_connector import TravelPayoutsConnector
-from services.chat_processor import ChatProcessor
-from services.openai_service import OpenAIService
-from services.pdf_service import PDFService
+from services.travelpayouts_service import travelpayouts_service
+from services.travelpayouts_connector import travelpayouts_connector
+from services.chat_processor import chat_processor
+from services.openai_service import openai_service
 from services.response_analyzer import ResponseAnalyzer
+from services.request_profiler import request_profiler
+from services.json_provider import AviJSONProvider
+from services.chat_persistence import chat_persistence
+from services.cache_warmer import cache_warmer
+from services.admission_control import admission_control, Overloaded
+from services.db_schema import ensure_schema
+from services.db_resilience import db_resilience, engine_pool_options, DatabaseUnavailable
+from services.pagination import InvalidCursor, keyset_page, page_info, parse_page_args
+from services.roteiro_patch import days_json
+from services.intent_classifier import intent_classifier, templated_reply
+from services.search_prefetcher import search_prefetcher, PENDING as PREFETCH_PENDING
+from services.static_assets import static_assets
 from models import db, User, Conversation, Message, TravelPlan, FlightBooking, Accommodation, PriceMonitor, PriceHistory, PriceAlert
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Funções auxiliares para lidar com erros de banco de dados
-def db_operation_with_retry(operation_func, max_retries=3, retry_delay=0.5):
-    """
-    Executa uma operação de banco de dados com tentativas de reconexão
-    em caso de erros de conexão SSL ou outros problemas de conexão.
-
-    Args:
-        operation_func: Função que executa a operação de banco de dados
-        max_retries: Número máximo de tentativas
-        retry_delay: Tempo de espera entre tentativas (em segundos)
-
-    Returns:
-        O resultado da operação ou None se falhar em todas as tentativas
-    """
-    import time
-    from sqlalchemy.exc import OperationalError, SQLAlchemyError
-    import psycopg2
-
-    retries = 0
-    last_error = None
-
-    while retries < max_retries:
-        try:
-            return operation_func()
-        except (OperationalError, psycopg2.OperationalError) as e:
-            # Identificar erros específicos de conexão SSL
-            error_msg = str(e)
-            if "SSL connection has been closed unexpectedly" in error_msg or "connection already closed" in error_msg:
-                retries += 1
-                last_error = e
-                logger.warning(f"Erro de conexão SSL ({retries}/{max_retries}): {error_msg}")
-
-                # Pequena pausa antes de tentar novamente
-                time.sleep(retry_delay)
-
-                # Tentar limpar a sessão atual
-                try:
-                    db.session.remove()
-                    logger.info("Sessão de banco de dados removida para reconexão")
-                except Exception as session_error:
-                    logger.error(f"Erro ao remover sessão: {str(session_error)}")
-            else:
-                # Outros erros operacionais
-                logger.error(f"Erro operacional do banco de dados: {error_msg}")
-                raise
-        except SQLAlchemyError as e:
-            # Outros erros do SQLAlchemy
-            logger.error(f"Erro do SQLAlchemy: {str(e)}")
-            raise
-        except Exception as e:
-            # Capturar erros genéricos
-            logger.error(f"Erro inesperado no banco de dados: {str(e)}")
-            raise
-
-    # Se chegou aqui, todas as tentativas falharam
-    logger.error(f"Todas as {max_retries} tentativas de conexão falharam. Último erro: {str(last_error)}")
-    return None
-
 # Create Flask app
 app = Flask(__name__)
+# Serializa os modelos de oferta de voo (FlightOffer) em jsonify
+app.json = AviJSONProvider(app)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key")
 app.config["DEBUG"] = True
 
 # Registrar o blueprint da API
 app.register_blueprint(api_blueprint)
 
+# Profiling opt-in das requisições (cabeçalho de administrador ou taxa de amostragem)
+request_profiler.init_app(app)
+
+# Pacotes e arquivos estáticos versionados (static/dist, gerado por build_assets.py)
+static_assets.init_app(app)
+
 # Configure database
 # Ajustar a URI do banco de dados para incluir parâmetros SSL e reconexão
 database_url = os.environ.get("DATABASE_URL", "sqlite:///flai.db")
@@ -131,12 +94,30 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_recycle": 300,    # Recicla conexões após 5 minutos
     "pool_timeout": 30,     # Timeout para obter uma conexão do pool
     "pool_size": 10,        # Tamanho máximo do pool
-    "max_overflow": 15      # Conexões adicionais permitidas além do pool_size
+    "max_overflow": 15,     # Conexões adicionais permitidas além do pool_size
+    # Pool instrumentado: tempo de espera por conexão nas estatísticas de /admin/db
+    **engine_pool_options(database_url)
 }
 
 # Inicializar o banco de dados com as novas configurações
 db.init_app(app)
 
+# Circuit breaker, sonda de saúde e novas tentativas das leituras do banco
+db_resilience.init_app(app, db)
+
+# O Replit atende atrás de um proxy: request.remote_addr passa a ser o IP do cliente
+# (X-Forwarded-For do proxy), e não o do proxy, para as cotas por IP
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+
+# Cotas por sessão/IP nas rotas de chat e busca (429 com Retry-After em excesso)
+admission_control.init_app(app)
+
+# Gravação em lote (write-behind) dos turnos do chat nas tabelas Conversation/Message
+chat_persistence.init_app(app)
+
+# Aquecimento periódico do cache de preços das rotas mais buscadas
+cache_warmer.init_app(app)
+
 # Configure login manager
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -144,13 +125,12 @@ login_manager.login_view = 'login'
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Executado em toda requisição autenticada: falhar rápido com o banco fora do ar
+    return db_resilience.run(lambda: db.session.get(User, int(user_id)), idempotent=True)
 
-# Inicializa os serviços
-travelpayouts_service = TravelPayoutsService()
-travelpayouts_connector = TravelPayoutsConnector()
-chat_processor = ChatProcessor()
-openai_service = OpenAIService()
+# Os serviços (travelpayouts_service, travelpayouts_connector, chat_processor e
+# openai_service) são instâncias globais construídas no primeiro uso pelo
+# services.service_registry
 
 # Dicionário para armazenar histórico de conversas temporárias
 # Estrutura: { 'session_id': { 'history': [], 'travel_info': {} } }
@@ -161,8 +141,13 @@ conversation_store = {}
 def index():
     return render_template('index.html', title='Avi - Assistente de Viagens Inteligente')
 
+def _chat_user_id():
+    """ID do usuário autenticado, ou None para conversas anônimas"""
+    return current_user.id if current_user.is_authenticated else None
+
 # API para chat
 @app.route('/api/chat', methods=['POST'])
+@admission_control.limit('chat')
 def chat():
     """Processa mensagens do chat"""
     try:
@@ -225,7 +210,11 @@ def chat():
             # Extrair informações da mensagem antes para enriquecer o contexto
             travel_info = chat_processor.extract_travel_info(message)
             if travel_info:
-                current_travel_info.update(travel_info)
+                # Campos não encontrados nesta mensagem (None) não apagam os já conhecidos
+                current_travel_info.update({key: value for key, value in travel_info.items() if value is not None})
+
+            # Classificar a intenção da mensagem (confirmação, saudação...) uma única vez
+            intent_result = intent_classifier.classify(message)
 
             # Determinar se já temos informações suficientes para busca
             has_sufficient_info = False
@@ -295,9 +284,7 @@ def chat():
 
             elif step == 1:  # Etapa de confirmação
                 # Verificar se o usuário confirmou
-                confirmation = False
-                if "sim" in message.lower() or "confirmo" in message.lower() or "pode buscar" in message.lower() or "ok" in message.lower():
-                    confirmation = True
+                confirmation = intent_classifier.is_confirmation(intent_result)
 
                 if confirmation:
                     # Usuário confirmou, vamos buscar os voos
@@ -338,6 +325,13 @@ def chat():
                     logger.warning("🚫 ETAPA 2 DETECTADA: PULANDO GPT COMPLETAMENTE")
                     skip_gpt_call = True
 
+            # Busca antecipada: começa assim que as informações estão completas, antes da
+            # confirmação; alterações nos dados cancelam e reiniciam a busca
+            if has_sufficient_info and step >= 1 and not current_travel_info.get('search_results'):
+                search_prefetcher.start(session_id, current_travel_info)
+            elif not has_sufficient_info:
+                search_prefetcher.discard(session_id)
+
             # INTERCEPÇÃO CRÍTICA: VERIFICAR QUALQUER ESTÁGIO DE BUSCA
             # Aqui detectamos qualquer condição que indique que devemos realizar uma busca real
             # Isso impede COMPLETAMENTE que o GPT seja chamado para simulações
@@ -349,8 +343,7 @@ def chat():
                 skip_gpt_call = True
 
             # Caso 2: Se a mensagem contém alguma confirmação clara
-            confirmation_phrases = ["sim", "confirmo", "pode buscar", "ok", "busque", "procure", "encontre"]
-            if any(phrase in message.lower() for phrase in confirmation_phrases) and step == 1:
+            if intent_classifier.is_confirmation(intent_result) and step == 1:
                 logger.warning("⚠️ INTERCEPÇÃO DO FLUXO: Confirmação detectada na mensagem, pulando ChatGPT")
                 skip_gpt_call = True
                 # Forçar o avanço para etapa 2
@@ -376,9 +369,25 @@ def chat():
                 }
                 logger.warning("✅ Fluxo desviado com sucesso para API TravelPayouts direta")
             else:
-                # Apenas para casos onde não estamos fazendo busca real
-                logger.info(f"Chamando OpenAI normalmente para etapa {step} com session_id {session_id}")
-                gpt_result = openai_service.travel_assistant(message, openai_history, system_context, session_id=session_id)
+                # Saudações, agradecimentos e negativas sem dados de viagem: resposta de template
+                fast_reply = None
+                has_travel_data = travel_info and any(
+                    travel_info.get(key) for key in ('origin', 'destination', 'departure_date', 'return_date'))
+                if not has_travel_data and step in (0, 1):
+                    fast_reply = templated_reply(
+                        intent_result, step,
+                        summary=chat_processor.format_travel_info_summary(current_travel_info) if step == 1 else "",
+                        missing=list(errors.values()) if errors else None
+                    )
+
+                if fast_reply:
+                    logger.info(f"Resposta local para intenção '{intent_result['intent']}' "
+                                f"(confiança {intent_result['confidence']}, etapa {step}), OpenAI não chamada")
+                    gpt_result = {"response": fast_reply}
+                else:
+                    # Apenas para casos onde não estamos fazendo busca real
+                    logger.info(f"Chamando OpenAI normalmente para etapa {step} com session_id {session_id}")
+                    gpt_result = openai_service.travel_assistant(message, openai_history, system_context, session_id=session_id)
 
             if 'error' in gpt_result:
                 logging.error(f"Erro ao processar com GPT: {gpt_result['error']}")
@@ -422,14 +431,23 @@ def chat():
                                       f"Data volta: {current_travel_info.get('return_date', 'N/A')}, " +
                                       f"Adultos: {current_travel_info.get('adults', 1)}")
 
+                        # Aproveitar a busca antecipada iniciada na confirmação, se ainda válida
+                        search_results = search_prefetcher.take(session_id, current_travel_info)
+
                         # ÚNICO PONTO DE BUSCA REAL: using travelpayouts_connector
-                        search_results = travelpayouts_connector.search_flights_from_chat(
-                            travel_info=current_travel_info,
-                            session_id=session_id
-                        )
+                        # (sem busca duplicada enquanto a antecipada estiver em andamento)
+                        if search_results is None:
+                            search_results = travelpayouts_connector.search_flights_from_chat(
+                                travel_info=current_travel_info,
+                                session_id=session_id
+                            )
 
                         # Log detalhado sobre os resultados obtidos ou erros
-                        if not search_results:
+                        if search_results is PREFETCH_PENDING:
+                            # O painel (/api/flight_results) aguarda a mesma busca e mostra os resultados
+                            response_text = "Estou buscando os melhores voos para você! ✈️ Os resultados aparecem no painel em instantes."
+                            show_flight_results = True
+                        elif not search_results:
                             logger.error("❌ Busca direta retornou resultados vazios")
                             response_text = "Desculpe, não consegui encontrar voos para a sua busca. Poderia verificar as informações fornecidas?"
                             show_flight_results = False
@@ -461,6 +479,8 @@ def chat():
                         current_travel_info['show_flight_results'] = show_flight_results
                         if show_flight_results:
                             current_travel_info['flight_session_id'] = session_id
+                    except Overloaded:
+                        raise
                     except Exception as e:
                         logging.error(f"❌ Erro grave na busca de voos: {str(e)}")
                         # Mostrar rastreamento completo para depuração
@@ -548,6 +568,7 @@ def chat():
             
             # Armazena a resposta no histórico
             history.append({'assistant': response_text})
+            chat_persistence.record_turn(session_id, message, response_text, user_id=_chat_user_id())
 
             # Atualizar travel_info com o contexto atualizado
             current_travel_info['step'] = updated_context['step']
@@ -601,6 +622,7 @@ def chat():
             # Implementar lógica para planejamento completo
             response = {"response": "Modo de planejamento completo em desenvolvimento."}
             history.append({'assistant': response['response']})
+            chat_persistence.record_turn(session_id, message, response['response'], user_id=_chat_user_id())
             conversation_store[session_id]['history'] = history
             response['session_id'] = session_id
 
@@ -621,6 +643,9 @@ def chat():
             
             return resp
 
+    except Overloaded:
+        # Fornecedor saturado: 429 com Retry-After (errorhandler do admission_control)
+        raise
     except Exception as e:
         print(f"Erro na API de chat: {str(e)}")
         import traceback
@@ -726,42 +751,37 @@ def search():
 def setup():
     try:
         db.create_all()
+        # Colunas e índices adicionados depois da criação das tabelas
+        ensure_schema(db)
         return jsonify({"message": "Banco de dados inicializado com sucesso"})
     except Exception as e:
         return jsonify({"error": f"Erro ao inicializar banco de dados: {str(e)}"}), 500
 
-# Rotas para API de conversas
-@app.route('/api/conversations', methods=['GET'])
-def get_conversations():
-    try:
-        # Para testes, usar ID fixo de usuário
-        user_id = 1
-        conversations = Conversation.query.filter_by(user_id=user_id).order_by(Conversation.created_at.desc()).all()
-
-        result = []
-        for conv in conversations:
-            result.append({
-                "id": conv.id,
-                "title": conv.title,
-                "created_at": conv.created_at.isoformat()
-            })
-
-        return jsonify({"conversations": result})
-    except Exception as e:
-        logging.error(f"Erro ao buscar conversas: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+@app.route('/health/db', methods=['GET'])
+def database_health():
+    """
+    Estado do banco para balanceadores de carga: retorna 503 enquanto o circuito
+    estiver aberto. Os detalhes (circuito, sonda e pool) ficam em /admin/db.
+    """
+    status = db_resilience.health()['status']
+    return jsonify({"status": status}), 503 if status == 'unavailable' else 200
 
 # Rota para obter uma conversa específica
 @app.route('/api/conversations/<int:conversation_id>', methods=['GET'])
 def get_conversation(conversation_id):
+    def fetch_conversation():
+        """Função interna para buscar a conversa e as mensagens (leitura idempotente)"""
+        conversation = db.session.get(Conversation, conversation_id)
+        if not conversation:
+            return None, []
+        return conversation, Message.query.filter_by(conversation_id=conversation_id).order_by(Message.timestamp).all()
+
     try:
-        conversation = Conversation.query.get(conversation_id)
+        conversation, messages = db_resilience.run(fetch_conversation, idempotent=True)
 
         if not conversation:
             return jsonify({"error": "Conversa não encontrada"}), 404
 
-        messages = Message.query.filter_by(conversation_id=conversation_id).order_by(Message.timestamp).all()
-
         messages_list = []
         for msg in messages:
             messages_list.append({
@@ -777,6 +797,9 @@ def get_conversation(conversation_id):
             "created_at": conversation.created_at.isoformat(),
             "messages": messages_list
         })
+    except DatabaseUnavailable:
+        # Tratado pelo errorhandler de db_resilience (503 com Retry-After)
+        raise
     except Exception as e:
         logging.error(f"Erro ao buscar conversa: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -810,39 +833,62 @@ def logout():
     logout_user()
     return jsonify({"success": True})
 
+# Rotas para API de conversas
 @app.route('/api/conversations')
 @login_required
-def get_conversations_login_required():
-    def fetch_conversations():
-        """Função interna para buscar conversas (para uso com retry)"""
-        conversations = Conversation.query.filter_by(user_id=current_user.id).order_by(Conversation.last_updated.desc()).all()
-        return conversations
+def get_conversations():
+    """
+    Lista as conversas do usuário, das mais recentes para as mais antigas, paginadas por cursor.
 
+    Query string:
+        limit: conversas por página (padrão: 50, máximo: 200)
+        before: cursor para a página seguinte (conversas mais antigas)
+        after: cursor para conversas atualizadas depois do cursor
+    """
     try:
-        # Usar o mecanismo de retry para buscar conversas
-        user_conversations = db_operation_with_retry(fetch_conversations, max_retries=5, retry_delay=0.8)
+        page_args = parse_page_args(request.args)
+    except InvalidCursor as e:
+        return jsonify({"error": True, "message": str(e), "conversations": []}), 400
 
-        # Se todas as tentativas falharam, retornar uma lista vazia com uma mensagem amigável
-        if user_conversations is None:
-            logger.error("Falha ao recuperar conversas após múltiplas tentativas")
-            return jsonify({
-                "error": True,
-                "message": "Não foi possível recuperar suas conversas no momento. Por favor, tente novamente.",
-                "conversations": []
-            })
+    def fetch_conversations():
+        """Função interna para buscar conversas (leitura idempotente)"""
+        return keyset_page(
+            Conversation.query.filter_by(user_id=current_user.id),
+            Conversation.last_updated,
+            Conversation.id,
+            **page_args
+        )
+
+    try:
+        # Leitura idempotente: repetida com backoff se a conexão cair
+        page = db_resilience.run(fetch_conversations, idempotent=True)
 
         # Processar as conversas recuperadas com sucesso
         result = []
-        for conv in user_conversations:
+        for conv in page['items']:
             result.append({
                 "id": conv.id,
                 "title": conv.title,
+                "created_at": conv.created_at.isoformat(),
                 "last_updated": conv.last_updated.strftime("%d/%m/%Y")
             })
 
         logger.info(f"Conversas recuperadas com sucesso: {len(result)}")
-        return jsonify(result)
+        return jsonify({
+            "conversations": result,
+            "pagination": page_info(page, page_args['limit'], 'last_updated')
+        })
 
+    except DatabaseUnavailable as e:
+        # Banco indisponível: falhar rápido com uma lista vazia e uma mensagem amigável
+        logger.error(f"Falha ao recuperar conversas: {str(e)}")
+        response = jsonify({
+            "error": True,
+            "message": "Não foi possível recuperar suas conversas no momento. Por favor, tente novamente.",
+            "conversations": []
+        })
+        response.headers['Retry-After'] = str(max(1, int(round(e.retry_after))))
+        return response, 503
     except Exception as e:
         logger.error(f"Erro ao buscar conversas: {str(e)}")
         # Retornar uma resposta amigável ao usuário
@@ -854,41 +900,43 @@ def get_conversations_login_required():
 @app.route('/api/conversation/<int:conversation_id>/messages')
 @login_required
 def get_conversation_messages(conversation_id):
+    """
+    Lista as mensagens de uma conversa em ordem cronológica, paginadas por cursor.
+    Sem cursor, retorna a página mais recente da conversa.
+
+    Query string:
+        limit: mensagens por página (padrão: 50, máximo: 200)
+        before: cursor para mensagens anteriores (rolagem para cima)
+        after: cursor para mensagens posteriores
+    """
+    try:
+        page_args = parse_page_args(request.args)
+    except InvalidCursor as e:
+        return jsonify({"error": True, "message": str(e)}), 400
+
     def fetch_conversation():
-        """Função interna para buscar a conversa (para uso com retry)"""
+        """Função interna para buscar a conversa (leitura idempotente)"""
         return Conversation.query.filter_by(id=conversation_id, user_id=current_user.id).first()
 
     def fetch_messages():
-        """Função interna para buscar as mensagens (para uso com retry)"""
-        return Message.query.filter_by(conversation_id=conversation_id).order_by(Message.timestamp).all()
+        """Função interna para buscar as mensagens (leitura idempotente)"""
+        return keyset_page(
+            Message.query.filter_by(conversation_id=conversation_id),
+            Message.timestamp,
+            Message.id,
+            **page_args
+        )
 
     try:
-        # Buscar a conversa com retry
-        conv = db_operation_with_retry(fetch_conversation, max_retries=5, retry_delay=0.5)
-
-        if conv is None:
-            logger.error(f"Não foi possível recuperar a conversa {conversation_id} após várias tentativas")
-            return jsonify({
-                "error": True, 
-                "message": "Não foi possível recuperar esta conversa no momento. Por favor, tente novamente."
-            }), 500
-
+        # Buscar a conversa e as mensagens (leituras idempotentes, repetidas com backoff)
+        conv = db_resilience.run(fetch_conversation, idempotent=True)
         if not conv:
             return jsonify({"error": "Conversa não encontrada"}), 404
+        page = db_resilience.run(fetch_messages, idempotent=True)
 
-        # Buscar as mensagens com retry
-        messages = db_operation_with_retry(fetch_messages, max_retries=5, retry_delay=0.5)
-
-        if messages is None:
-            logger.error(f"Não foi possível recuperar as mensagens da conversa {conversation_id} após várias tentativas")
-            return jsonify({
-                "error": True,
-                "message": "Não foi possível recuperar as mensagens desta conversa no momento. Por favor, tente novamente."
-            }), 500
-
-        # Processar os resultados com sucesso
+        # Processar os resultados com sucesso (a página vem da mais recente para a mais antiga)
         result = []
-        for msg in messages:
+        for msg in reversed(page['items']):
             result.append({
                 "id": msg.id,
                 "is_user": msg.is_user,
@@ -897,8 +945,20 @@ def get_conversation_messages(conversation_id):
             })
 
         logger.info(f"Recuperadas {len(result)} mensagens da conversa {conversation_id}")
-        return jsonify(result)
+        return jsonify({
+            "messages": result,
+            "pagination": page_info(page, page_args['limit'], 'timestamp')
+        })
 
+    except DatabaseUnavailable as e:
+        # Banco indisponível: falhar rápido em vez de prender o worker
+        logger.error(f"Não foi possível recuperar a conversa {conversation_id}: {str(e)}")
+        response = jsonify({
+            "error": True,
+            "message": "Não foi possível recuperar esta conversa no momento. Por favor, tente novamente."
+        })
+        response.headers['Retry-After'] = str(max(1, int(round(e.retry_after))))
+        return response, 503
     except Exception as e:
         logger.error(f"Erro ao recuperar mensagens da conversa {conversation_id}: {str(e)}")
         return jsonify({
@@ -910,7 +970,12 @@ def get_conversation_messages(conversation_id):
 @app.route('/api/plans')
 @login_required
 def get_plans():
-    user_plans = TravelPlan.query.filter_by(user_id=current_user.id).order_by(TravelPlan.updated_at.desc()).all()
+    user_plans = db_resilience.run(
+        lambda: (TravelPlan.query.filter_by(user_id=current_user.id)
+                 .options(selectinload(TravelPlan.days))
+                 .order_by(TravelPlan.updated_at.desc()).all()),
+        idempotent=True
+    )
 
     result = []
     for plan in user_plans:
@@ -920,7 +985,7 @@ def get_plans():
             "destination": plan.destination,
             "start_date": plan.start_date.strftime("%d/%m/%Y") if plan.start_date else None,
             "end_date": plan.end_date.strftime("%d/%m/%Y") if plan.end_date else None,
-            "details": plan.details
+            "details": days_json(plan)
         })
 
     return jsonify(result)
@@ -928,7 +993,14 @@ def get_plans():
 @app.route('/api/plan/<int:plan_id>')
 @login_required
 def get_plan(plan_id):
-    plan = TravelPlan.query.filter_by(id=plan_id, user_id=current_user.id).first()
+    # Dias, voos e acomodações carregados na mesma leitura protegida pelo circuit breaker
+    plan = db_resilience.run(
+        lambda: (TravelPlan.query.filter_by(id=plan_id, user_id=current_user.id)
+                 .options(selectinload(TravelPlan.days), selectinload(TravelPlan.flights),
+                          selectinload(TravelPlan.accommodations))
+                 .first()),
+        idempotent=True
+    )
 
     if not plan:
         return jsonify({"error": "Plano não encontrado"}), 404
@@ -968,7 +1040,7 @@ def get_plan(plan_id):
         "destination": plan.destination,
         "start_date": plan.start_date.strftime("%d/%m/%Y") if plan.start_date else None,
         "end_date": plan.end_date.strftime("%d/%m/%Y") if plan.end_date else None,
-        "details": plan.details,
+        "details": days_json(plan),
         "flights": flights_data,
         "accommodations": accommodations_data
     }
@@ -993,7 +1065,7 @@ def download_plan_pdf(plan_id):
         "destination": plan.destination,
         "start_date": plan.start_date.isoformat() if plan.start_date else None,
         "end_date": plan.end_date.isoformat() if plan.end_date else None,
-        "details": plan.details,
+        "details": days_json(plan),
         "flights": [],
         "accommodations": []
     }
@@ -23,6 +23,9 @@ logger = logging.getLogger(__name__)
 # Importar os serviços necessários
 from services.travelpayouts_service import TravelPayoutsService
 from services.travelpayouts_connector import travelpayouts_connector
+from services.search_prefetcher import search_prefetcher, PENDING as PREFETCH_PENDING
+from services.json_provider import EncodedPayloadCache
+from services.admission_control import Overloaded
 # Importar a API REST para testes diretos
 import time
 
@@ -33,6 +36,22 @@ api_blueprint = Blueprint('flight_results_api', __name__)
 # Na implementação final, isso seria movido para um banco de dados
 flight_search_sessions = {}
 
+# Resultados em cache já serializados (reaproveitados enquanto a sessão não tiver nova busca)
+encoded_flight_results = EncodedPayloadCache()
+
+
+def store_session_results(session_id, results):
+    """
+    Grava os resultados da sessão e descarta os bytes serializados da busca anterior
+
+    Args:
+        session_id: ID da sessão do chat
+        results: resultado da busca (dict com "data")
+    """
+    flight_search_sessions[session_id] = results
+    encoded_flight_results.invalidate(session_id)
+
+
 @api_blueprint.route('/api/flight_results/<session_id>', methods=['GET'])
 @api_blueprint.route('/api/flight_results', methods=['GET'])
 def get_flight_results(session_id=None):
@@ -75,9 +94,9 @@ def get_flight_results(session_id=None):
             if cached_results and 'data' in cached_results and len(cached_results['data']) > 0:
                 logger.warning(f"📊 Retornando {len(cached_results['data'])} voos do cache")
                 
-                # Inserir cabeçalho para debugging
-                cached_results['source'] = 'cache'
-                return jsonify(cached_results)
+                # Inserir cabeçalho para debugging (na cópia: o resultado em cache não é alterado)
+                payload = dict(cached_results, source='cache')
+                return encoded_flight_results.response(session_id, payload, current_app.json)
             else:
                 logger.warning("⚠️ Dados em cache existem mas estão vazios ou inválidos")
         
@@ -105,7 +124,7 @@ def get_flight_results(session_id=None):
                 logger.warning(f"📊 Retornando {len(saved_results['data'])} voos da travel_info")
                 
                 # Atualizar o cache e retornar
-                flight_search_sessions[session_id] = saved_results
+                store_session_results(session_id, saved_results)
                 
                 # Inserir cabeçalho para debugging
                 saved_results['source'] = 'travel_info'
@@ -127,11 +146,24 @@ def get_flight_results(session_id=None):
         
         # Connector já está disponível no topo do arquivo
         
-        # Realizar a busca com o conector direto
-        search_results = travelpayouts_connector.search_flights_from_chat(
-            travel_info=travel_info,
-            session_id=session_id
-        )
+        # Aproveitar a busca antecipada do chat (aguardando-a por poucos segundos, para não
+        # prender o worker; em andamento, o painel consulta de novo) ou buscar com o conector direto
+        search_results = search_prefetcher.take(session_id, travel_info,
+                                                timeout=search_prefetcher.results_wait_seconds)
+        if search_results is PREFETCH_PENDING:
+            logger.warning(f"⏳ Busca antecipada da sessão {session_id} ainda em andamento")
+            response = jsonify({
+                "error": "A busca ainda está em andamento. Tente novamente em instantes.",
+                "pending": True,
+                "data": []
+            })
+            response.headers['Retry-After'] = '2'
+            return response, 503
+        if search_results is None:
+            search_results = travelpayouts_connector.search_flights_from_chat(
+                travel_info=travel_info,
+                session_id=session_id
+            )
         
         # Validar os resultados
         if not search_results:
@@ -163,11 +195,14 @@ def get_flight_results(session_id=None):
         
         # Salvar os resultados em todos os lugares relevantes
         logger.warning(f"✅ Obtidos {len(search_results['data'])} voos novos. Salvando para sessão {session_id}")
-        flight_search_sessions[session_id] = search_results
+        store_session_results(session_id, search_results)
         travel_info['search_results'] = search_results
         
         return jsonify(search_results)
         
+    except Overloaded:
+        # Fornecedor saturado: 429 com Retry-After (admission_control)
+        raise
     except Exception as e:
         import traceback
         logger.error(f"❌ Erro ao obter resultados de voos: {str(e)}")
@@ -218,13 +253,16 @@ def direct_flight_search():
             })
         
         # Cache e retorno dos resultados
-        flight_search_sessions[session_id] = search_results
+        store_session_results(session_id, search_results)
         logger.info(f"Busca direta concluída com sucesso: {len(search_results.get('data', []))} resultados")
         
         # Adicionar o ID da sessão na resposta
         search_results['session_id'] = session_id
         return jsonify(search_results)
     
+    except Overloaded:
+        # Fornecedor saturado: 429 com Retry-After (admission_control)
+        raise
     except Exception as e:
         logger.error(f"Erro na busca direta de voos: {str(e)}")
         return jsonify({
@@ -434,6 +472,9 @@ def travelpayouts_test():
         logger.warning(f"✅ TESTE TRAVELPAYOUTS: Conexão bem-sucedida - {flight_count} voos encontrados")
         return jsonify(search_results)
         
+    except Overloaded:
+        # Fornecedor saturado: 429 com Retry-After (admission_control)
+        raise
     except Exception as e:
         logger.error(f"❌ TESTE TRAVELPAYOUTS: Erro durante o teste - {str(e)}")
         import traceback
@@ -502,6 +543,9 @@ def test_travelpayouts_rest():
         
         return jsonify(response)
         
+    except Overloaded:
+        # Fornecedor saturado: 429 com Retry-After (admission_control)
+        raise
     except Exception as e:
         logger.error(f"❌ ERRO NO TESTE REST API: {str(e)}")
         import traceback
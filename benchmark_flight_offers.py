@@ -0,0 +1,126 @@
+"""
+Benchmark de memória e CPU das ofertas de voo
+Compara a lista de ofertas mantida em cache (ex.: flight_search_sessions,
+active_searches) em dois formatos:
+- modelo compacto (FlightOffer/FlightSegment com __slots__), como os formatadores
+  constroem hoje
+- dicionários aninhados no formato Amadeus, como os formatadores montavam antes
+  (equivalente a offer.to_dict())
+
+A memória é medida com tracemalloc; o tempo inclui a formatação e a serialização
+JSON na fronteira da resposta. Não faz chamadas de rede.
+
+Uso:
+    python benchmark_flight_offers.py                 # 10.000 ofertas
+    python benchmark_flight_offers.py --offers 50000 --runs 5
+"""
+
+import gc
+import json
+import time
+import argparse
+import statistics
+import tracemalloc
+from datetime import date, timedelta
+
+from services.travelpayouts_rest_api import TravelPayoutsRestAPI
+from services.json_provider import AviJSONProvider
+
+
+def build_raw_flights(count):
+    """
+    Gera respostas sintéticas da API de preços baratos
+
+    Args:
+        count: número de voos
+
+    Returns:
+        list: dicionários no formato bruto do TravelPayouts
+    """
+    start = date(2025, 6, 1)
+    airlines = ['LA', 'G3', 'AD', 'TP', 'AA']
+    raw = []
+    for i in range(count):
+        departure = start + timedelta(days=i % 90)
+        raw.append({
+            "price": 900 + (i * 37) % 2500,
+            "airline": airlines[i % len(airlines)],
+            "flight_number": str(1000 + i % 9000),
+            "departure_at": f"{departure.isoformat()}T{8 + i % 12:02d}:15:00-03:00",
+            "return_at": f"{(departure + timedelta(days=7)).isoformat()}T{10 + i % 10:02d}:40:00-03:00",
+            "transfers": i % 2,
+            "number_of_changes": i % 3
+        })
+    return raw
+
+
+def format_models(api, raw):
+    """Formata os voos com o formatador atual (modelo compacto)"""
+    return [
+        api._format_cheap_flight(flight_info=info, origin='GRU', destination='LIS', date=info["departure_at"][:10])
+        for info in raw
+    ]
+
+
+def format_dicts(api, raw):
+    """Formata os voos no formato de dicionários aninhados"""
+    return [offer.to_dict() for offer in format_models(api, raw)]
+
+
+def measure_memory(builder, api, raw):
+    """
+    Mede a memória retida pela lista de ofertas
+
+    Returns:
+        tuple: (bytes retidos, lista de ofertas)
+    """
+    gc.collect()
+    tracemalloc.start()
+    offers = builder(api, raw)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, offers
+
+
+def measure_time(func, runs):
+    """Mediana do tempo de execução em milissegundos"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de memória das ofertas de voo')
+    parser.add_argument('--offers', type=int, default=10000, help='número de ofertas (padrão: 10000)')
+    parser.add_argument('--runs', type=int, default=3, help='repetições das medições de tempo (padrão: 3)')
+    args = parser.parse_args()
+
+    api = TravelPayoutsRestAPI()
+    raw = build_raw_flights(args.offers)
+
+    model_bytes, models = measure_memory(format_models, api, raw)
+    dict_bytes, dicts = measure_memory(format_dicts, api, raw)
+
+    # Os dois formatos devem produzir exatamente o mesmo JSON
+    assert json.dumps(dicts) == json.dumps(models, default=AviJSONProvider.default)
+
+    format_models_ms = measure_time(lambda: format_models(api, raw), args.runs)
+    format_dicts_ms = measure_time(lambda: format_dicts(api, raw), args.runs)
+    json_models_ms = measure_time(lambda: json.dumps(models, default=AviJSONProvider.default), args.runs)
+    json_dicts_ms = measure_time(lambda: json.dumps(dicts), args.runs)
+
+    print(f"Ofertas: {args.offers}")
+    print(f"{'':28}{'modelo':>14}{'dicionários':>14}")
+    print(f"{'Memória retida (MB)':28}{model_bytes / 1e6:>14.2f}{dict_bytes / 1e6:>14.2f}")
+    print(f"{'Bytes por oferta':28}{model_bytes / args.offers:>14.0f}{dict_bytes / args.offers:>14.0f}")
+    print(f"{'Formatação (ms)':28}{format_models_ms:>14.1f}{format_dicts_ms:>14.1f}")
+    print(f"{'Serialização JSON (ms)':28}{json_models_ms:>14.1f}{json_dicts_ms:>14.1f}")
+    print(f"Economia de memória: {(1 - model_bytes / dict_bytes) * 100:.1f}%")
+
+
+if __name__ == '__main__':
+    main()
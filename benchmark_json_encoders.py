@@ -0,0 +1,153 @@
+"""
+Micro-benchmark dos encoders JSON das respostas
+Compara, para cada payload, o tempo de serialização com:
+- json da biblioteca padrão (configuração do provedor padrão do Flask)
+- orjson (quando instalado), pelo AviJSONProvider
+- bytes em cache (EncodedPayloadCache), como nos resultados de /api/flight_results
+
+Os payloads podem ser respostas reais gravadas em arquivos, por exemplo:
+    curl -s http://localhost:5000/api/flight_results/<session_id> > payloads/flight_results.json
+    curl -s -X POST http://localhost:5000/widget/search -H 'Content-Type: application/json' \\
+         -d '{"origin":"GRU","destination":"LIS","departure_date":"2025-06-01"}' > payloads/widget_search.json
+
+Sem arquivos, usa payloads montados pelos formatadores reais do TravelPayouts
+(sem chamadas de rede) no formato dessas mesmas respostas.
+
+Uso:
+    python benchmark_json_encoders.py                       # payloads gerados
+    python benchmark_json_encoders.py payloads/*.json --iterations 500
+"""
+
+import os
+import json
+import time
+import argparse
+import statistics
+from datetime import date, timedelta
+
+from flask import Flask
+
+from services.json_provider import AviJSONProvider, EncodedPayloadCache, orjson
+from services.travelpayouts_rest_api import TravelPayoutsRestAPI
+
+
+def build_payloads():
+    """
+    Monta payloads no formato das respostas de busca de voos
+
+    Returns:
+        dict: nome → payload
+    """
+    api = TravelPayoutsRestAPI()
+    start = date(2025, 6, 1)
+    raw = {
+        (start + timedelta(days=i)).isoformat(): {
+            "price": 800 + (i * 53) % 1900,
+            "airline": ["LA", "G3", "AD", "TP"][i % 4],
+            "flight_number": str(3000 + i),
+            "departure_at": f"{(start + timedelta(days=i)).isoformat()}T{7 + i % 14:02d}:30:00-03:00",
+            "return_at": f"{(start + timedelta(days=i + 10)).isoformat()}T{9 + i % 12:02d}:05:00-03:00",
+            "transfers": i % 2,
+            "number_of_changes": i % 3
+        }
+        for i in range(60)
+    }
+    flights = api._parse_cheap_data({"success": True, "data": {"LIS": raw}}, 'GRU', 'LIS', '2025-06-11')
+
+    flight_results = {
+        "data": flights,
+        "session_id": "00000000-0000-0000-0000-000000000000",
+        "search_timestamp": "2025-05-01T12:00:00",
+        "meta": {
+            "origin": "GRU",
+            "destination": "LIS",
+            "departure_date": "2025-06-01",
+            "return_date": "2025-06-11",
+            "currency": "BRL",
+            "source": "TravelPayouts"
+        },
+        "source": "cache"
+    }
+    widget_search = {
+        "search_id": "00000000-0000-0000-0000-000000000000",
+        "message": "Busca concluída com sucesso",
+        "status": "complete",
+        "results_count": len(flights),
+        "results": flights
+    }
+    price_calendar = {
+        "best_prices": [
+            {"date": (start + timedelta(days=i)).isoformat(), "price": 700 + (i * 31) % 1500, "airline": "LA"}
+            for i in range(180)
+        ],
+        "meta": {"origin": "GRU", "destination": "LIS", "months": ["2025-06", "2025-07", "2025-08", "2025-09", "2025-10", "2025-11"]}
+    }
+    return {
+        "flight_results": flight_results,
+        "widget_search": widget_search,
+        "price_calendar": price_calendar
+    }
+
+
+def load_payloads(paths):
+    """Carrega respostas gravadas em arquivos JSON"""
+    payloads = {}
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            payloads[os.path.splitext(os.path.basename(path))[0]] = json.load(f)
+    return payloads
+
+
+def measure(func, iterations):
+    """Mediana do tempo por chamada em microssegundos (5 rodadas)"""
+    rounds = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        rounds.append((time.perf_counter() - start) / iterations * 1e6)
+    return statistics.median(rounds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark dos encoders JSON')
+    parser.add_argument('payloads', nargs='*', help='arquivos JSON com respostas gravadas')
+    parser.add_argument('--iterations', type=int, default=200, help='serializações por rodada (padrão: 200)')
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.payloads) if args.payloads else build_payloads()
+
+    app = Flask(__name__)
+    stdlib_provider = AviJSONProvider(app)
+    stdlib_provider.encoder = 'stdlib'
+    orjson_provider = AviJSONProvider(app) if orjson is not None else None
+    if orjson_provider is not None:
+        orjson_provider.encoder = 'orjson'
+
+    print(f"{'payload':18}{'KB':>8}{'stdlib (µs)':>14}{'orjson (µs)':>14}{'cache (µs)':>12}{'ganho':>8}")
+    for name, payload in payloads.items():
+        size = len(stdlib_provider.dumps_bytes(payload)) / 1024
+        stdlib_us = measure(lambda: stdlib_provider.dumps_bytes(payload), args.iterations)
+
+        fastest = stdlib_provider
+        orjson_us = None
+        if orjson_provider is not None:
+            # Os dois encoders precisam produzir o mesmo documento
+            assert json.loads(orjson_provider.dumps_bytes(payload)) == json.loads(stdlib_provider.dumps_bytes(payload))
+            orjson_us = measure(lambda: orjson_provider.dumps_bytes(payload), args.iterations)
+            fastest = orjson_provider
+
+        cache = EncodedPayloadCache()
+        cache.get(name, payload, fastest)
+        cache_us = measure(lambda: cache.get(name, payload, fastest), args.iterations)
+
+        best_us = orjson_us if orjson_us is not None else stdlib_us
+        orjson_col = f"{orjson_us:>14.1f}" if orjson_us is not None else f"{'-':>14}"
+        print(f"{name:18}{size:>8.1f}{stdlib_us:>14.1f}{orjson_col}{cache_us:>12.2f}{stdlib_us / best_us:>7.1f}x")
+
+    if orjson_provider is None:
+        print("orjson não está instalado: apenas o encoder padrão foi medido")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,479 @@
+"""
+Build dos arquivos estáticos: pacotes por página, minificação, hash e pré-compressão
+Gera static/dist, usado pelas funções asset_url/asset_urls dos templates
+(services.static_assets):
+- cada arquivo de static/ com extensão em FINGERPRINT_EXTENSIONS é copiado com o
+  hash do conteúdo no nome (scripts e folhas de estilo minificados);
+- cada pacote de ASSET_BUNDLES junta os arquivos na ordem declarada;
+- nas folhas de estilo, url(...) relativas passam a apontar para as cópias versionadas;
+- arquivos de texto ganham versões .gz e, com o pacote brotli instalado, .br;
+- manifest.json mapeia os nomes lógicos para os arquivos versionados.
+
+A minificação é conservadora e não depende de ferramentas externas: remove
+comentários (exceto /*! ... */) e espaços redundantes, preservando strings,
+template literals e expressões regulares. Nos scripts as quebras de linha são
+mantidas, para não depender da inserção automática de ponto e vírgula. Com o
+node disponível, cada script gerado passa por "node --check" e o build falha se
+algum tiver erro de sintaxe.
+
+Rode antes de subir a aplicação (o deploy executa este script no build); sem
+static/dist, os templates usam os arquivos-fonte.
+
+Uso:
+    python build_assets.py                  # gera static/dist
+    python build_assets.py --no-minify      # só junta e versiona (depuração)
+    python build_assets.py --output /tmp/dist --no-compress
+"""
+
+import os
+import re
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+import subprocess
+
+from services.static_assets import (
+    ASSET_BUNDLES, COMPRESSIBLE_EXTENSIONS, FINGERPRINT_EXTENSIONS, MANIFEST_NAME
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, 'static')
+
+# Antes de uma "/" no código, estes caracteres indicam o início de uma expressão regular
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+REGEX_KEYWORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+                  'throw', 'case', 'do', 'else', 'yield', 'await'}
+
+# Espaços ao redor destes caracteres podem ser removidos nos scripts
+JS_PUNCTUATION = set('{}()[];,:=<>!&|?*%^~')
+
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+class InvalidScript(Exception):
+    """Script gerado com erro de sintaxe (detectado por node --check)"""
+
+
+def _last_word(chars):
+    """Última palavra (identificador) emitida, para decidir entre divisão e regex"""
+    end = len(chars)
+    start = end
+    while start > 0 and (chars[start - 1].isalnum() or chars[start - 1] in '_$'):
+        start -= 1
+    return ''.join(chars[start:end])
+
+
+def minify_js(source):
+    """
+    Remove comentários e espaços redundantes de um script
+
+    Args:
+        source: código JavaScript
+
+    Returns:
+        str: código minificado (com as quebras de linha entre instruções)
+    """
+    out = []
+    # Pilha de chaves abertas dentro de cada ${...} de template literal em andamento
+    template_stack = []
+    pending = None  # espaço pendente: ' ', '\n' ou None
+    i, n = 0, len(source)
+
+    def emit(text):
+        nonlocal pending
+        if pending and out:
+            if pending == '\n':
+                out.append('\n')
+            elif out[-1] not in JS_PUNCTUATION and text[0] not in JS_PUNCTUATION:
+                out.append(' ')
+        pending = None
+        out.extend(text)
+
+    def copy_quoted(start, quote):
+        """Copia uma string até a aspa de fechamento (respeitando escapes)"""
+        j = start + 1
+        while j < n:
+            if source[j] == '\\':
+                j += 2
+                continue
+            if source[j] == quote or (source[j] == '\n' and quote != '`'):
+                return j + 1
+            j += 1
+        return n
+
+    def copy_template(start):
+        """Copia um trecho de template literal até "`" ou "${"; retorna (fim, abriu_expressão)"""
+        j = start
+        while j < n:
+            if source[j] == '\\':
+                j += 2
+                continue
+            if source[j] == '`':
+                return j + 1, False
+            if source[j] == '$' and j + 1 < n and source[j + 1] == '{':
+                return j + 2, True
+            j += 1
+        return n, False
+
+    while i < n:
+        char = source[i]
+
+        if char.isspace() or char == '\ufeff':
+            if char == '\n':
+                pending = '\n'
+            elif pending is None:
+                pending = ' '
+            i += 1
+            continue
+
+        if char == '/' and i + 1 < n and source[i + 1] == '/':
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+            continue
+
+        if char == '/' and i + 1 < n and source[i + 1] == '*':
+            end = source.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            comment = source[i:end]
+            if comment.startswith('/*!'):
+                emit(comment)
+            elif '\n' in comment:
+                pending = '\n'
+            elif pending is None:
+                pending = ' '
+            i = end
+            continue
+
+        if char in '"\'':
+            end = copy_quoted(i, char)
+            emit(source[i:end])
+            i = end
+            continue
+
+        if char == '`':
+            end, opened = copy_template(i + 1)
+            emit(source[i:end])
+            if opened:
+                template_stack.append(0)
+            i = end
+            continue
+
+        if char == '{' and template_stack:
+            template_stack[-1] += 1
+        elif char == '}' and template_stack:
+            if template_stack[-1] == 0:
+                # Fim da expressão ${...}: o template literal continua
+                template_stack.pop()
+                end, opened = copy_template(i + 1)
+                emit(source[i:end])
+                if opened:
+                    template_stack.append(0)
+                i = end
+                continue
+            template_stack[-1] -= 1
+
+        if char == '/':
+            significant = out[-1] if out else ''
+            if not significant or significant in REGEX_PRECEDERS or _last_word(out) in REGEX_KEYWORDS:
+                # Expressão regular: copiar até a "/" final, respeitando classes [...]
+                j, in_class = i + 1, False
+                while j < n and source[j] != '\n':
+                    if source[j] == '\\':
+                        j += 2
+                        continue
+                    if source[j] == '[':
+                        in_class = True
+                    elif source[j] == ']':
+                        in_class = False
+                    elif source[j] == '/' and not in_class:
+                        j += 1
+                        while j < n and (source[j].isalnum() or source[j] == '_'):
+                            j += 1
+                        break
+                    j += 1
+                emit(source[i:j])
+                i = j
+                continue
+
+        emit(char)
+        i += 1
+
+    return ''.join(out).strip() + '\n'
+
+
+def minify_css(source):
+    """
+    Remove comentários e espaços redundantes de uma folha de estilo
+
+    Args:
+        source: código CSS
+
+    Returns:
+        str: CSS minificado
+    """
+    out = []
+    pending = False
+    i, n = 0, len(source)
+    tight = set('{};,>')
+
+    while i < n:
+        char = source[i]
+        if char.isspace():
+            pending = True
+            i += 1
+            continue
+        if char == '/' and i + 1 < n and source[i + 1] == '*':
+            end = source.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            if source.startswith('/*!', i):
+                out.append(source[i:end])
+            else:
+                pending = True
+            i = end
+            continue
+
+        if char in '"\'':
+            j = i + 1
+            while j < n and source[j] != char:
+                j += 2 if source[j] == '\\' else 1
+            token = source[i:j + 1]
+            i = j + 1
+        else:
+            token = char
+            i += 1
+
+        if pending and out and out[-1][-1] not in tight and token[0] not in tight:
+            out.append(' ')
+        pending = False
+        if token == '}' and out and out[-1] == ';':
+            out.pop()
+        out.append(token)
+
+    return ''.join(out).strip() + '\n'
+
+
+def content_hash(data):
+    """Hash curto do conteúdo usado no nome do arquivo"""
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def hashed_name(name, data):
+    """
+    Nome versionado: "js/chat.js" → "js/chat.<hash>.js"
+
+    Args:
+        name: caminho relativo
+        data: conteúdo em bytes
+    """
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{content_hash(data)}{ext}"
+
+
+def rewrite_css_urls(css, source_name, output_name, manifest):
+    """
+    Aponta as url(...) relativas de uma folha de estilo para os arquivos versionados
+
+    Args:
+        css: conteúdo da folha de estilo
+        source_name: caminho da folha em static/ (ex.: "css/styles.css")
+        output_name: caminho da saída em static/dist
+        manifest: nomes lógicos → versionados já gerados
+
+    Returns:
+        str: CSS com as URLs reescritas
+    """
+    output_dir = os.path.dirname(os.path.join('dist', output_name))
+
+    def replace(match):
+        quote, target = match.group(1), match.group(2).strip()
+        if target.startswith(('data:', 'http:', 'https:', '//', '#')):
+            return match.group(0)
+        path, suffix = re.match(r'([^?#]*)(.*)', target).groups()
+        if path.startswith('/static/'):
+            logical = path[len('/static/'):]
+        elif path.startswith('/'):
+            return match.group(0)
+        else:
+            logical = os.path.normpath(os.path.join(os.path.dirname(source_name), path)).replace(os.sep, '/')
+
+        # Versionado: caminho relativo dentro de static/dist; senão, o arquivo original em static/
+        resolved = os.path.join('dist', manifest[logical]) if logical in manifest else logical
+        relative = os.path.relpath(resolved, output_dir).replace(os.sep, '/')
+        quote = quote or ('"' if ' ' in relative else '')
+        return f"url({quote}{relative}{suffix}{quote})"
+
+    return CSS_URL.sub(replace, css)
+
+
+def minify(name, text, enabled):
+    """Minifica scripts e folhas de estilo (arquivos .min.* já vêm minificados)"""
+    if not enabled or '.min.' in name:
+        return text
+    if name.endswith('.js'):
+        return minify_js(text)
+    if name.endswith('.css'):
+        return minify_css(text)
+    return text
+
+
+def write_output(output, name, data, compress):
+    """
+    Grava um arquivo em static/dist e as versões pré-comprimidas
+
+    Returns:
+        dict: tamanhos em bytes ("raw", "gzip", "br")
+    """
+    path = os.path.join(output, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+    sizes = {'raw': len(data)}
+    if not compress or not name.endswith(COMPRESSIBLE_EXTENSIONS):
+        return sizes
+
+    # mtime fixo: o mesmo conteúdo gera sempre o mesmo .gz
+    compressed = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressed['br'] = brotli.compress(data, quality=11)
+    for encoding, payload in compressed.items():
+        if len(payload) < len(data):
+            with open(path + ('.gz' if encoding == 'gzip' else '.br'), 'wb') as f:
+                f.write(payload)
+            sizes[encoding] = len(payload)
+    return sizes
+
+
+def source_files():
+    """Arquivos de static/ versionados individualmente (fora de static/dist)"""
+    names = []
+    for directory, subdirs, files in os.walk(STATIC_DIR):
+        subdirs[:] = [d for d in subdirs if os.path.join(directory, d) != os.path.join(STATIC_DIR, 'dist')]
+        for file in files:
+            if file.lower().endswith(FINGERPRINT_EXTENSIONS):
+                names.append(os.path.relpath(os.path.join(directory, file), STATIC_DIR).replace(os.sep, '/'))
+    # Folhas de estilo por último: suas url(...) apontam para os demais arquivos já versionados
+    return sorted(names, key=lambda name: (name.endswith('.css'), name))
+
+
+def check_scripts(output, names):
+    """
+    Verifica a sintaxe dos scripts gerados com "node --check" (sem node, não verifica)
+
+    Args:
+        output: diretório de saída
+        names: caminhos dos scripts em output
+
+    Returns:
+        bool: True se a verificação foi feita
+
+    Raises:
+        InvalidScript: se algum script tiver erro de sintaxe
+    """
+    node = shutil.which('node')
+    if node is None:
+        return False
+    errors = []
+    for name in names:
+        result = subprocess.run([node, '--check', os.path.join(output, name)], capture_output=True, text=True)
+        if result.returncode != 0:
+            errors.append(f"{name}:\n{result.stderr.strip()}")
+    if errors:
+        raise InvalidScript("Erro de sintaxe nos scripts gerados:\n" + "\n".join(errors))
+    return True
+
+
+def read_text(name):
+    with open(os.path.join(STATIC_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def build(output, minify_enabled=True, compress=True):
+    """
+    Gera static/dist e o manifesto
+
+    Args:
+        output: diretório de saída
+        minify_enabled: minifica scripts e folhas de estilo
+        compress: grava as versões .gz/.br
+
+    Returns:
+        tuple: (manifesto, {nome lógico: tamanhos})
+
+    Raises:
+        InvalidScript: se node --check encontrar erro de sintaxe em um script gerado
+    """
+    if os.path.isdir(output):
+        shutil.rmtree(output)
+    os.makedirs(output)
+
+    manifest, report = {}, {}
+
+    for name in source_files():
+        if name.endswith(('.js', '.css')):
+            text = minify(name, read_text(name), minify_enabled)
+            if name.endswith('.css'):
+                text = rewrite_css_urls(text, name, name, manifest)
+            data = text.encode('utf-8')
+        else:
+            with open(os.path.join(STATIC_DIR, name), 'rb') as f:
+                data = f.read()
+        manifest[name] = hashed_name(name, data)
+        report[name] = write_output(output, manifest[name], data, compress)
+
+    for bundle, names in ASSET_BUNDLES.items():
+        parts = []
+        for name in names:
+            text = minify(name, read_text(name), minify_enabled)
+            if bundle.endswith('.css'):
+                text = rewrite_css_urls(text, name, bundle, manifest)
+            parts.append(text)
+        # Nos scripts, ";" separa arquivos que não terminam a última instrução
+        text = '\n;\n'.join(parts) if bundle.endswith('.js') else '\n'.join(parts)
+        data = text.encode('utf-8')
+        manifest[bundle] = hashed_name(bundle, data)
+        sizes = write_output(output, manifest[bundle], data, compress)
+        sizes['sources'] = sum(os.path.getsize(os.path.join(STATIC_DIR, name)) for name in names)
+        report[bundle] = sizes
+
+    # Um defeito na minificação quebraria a página inteira do pacote
+    check_scripts(output, [path for path in manifest.values() if path.endswith('.js')])
+
+    with open(os.path.join(output, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True, ensure_ascii=False)
+
+    return manifest, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build dos arquivos estáticos (static/dist)')
+    parser.add_argument('--output', default=os.path.join(STATIC_DIR, 'dist'),
+                        help='diretório de saída (padrão: static/dist)')
+    parser.add_argument('--no-minify', action='store_true', help='não minifica scripts e folhas de estilo')
+    parser.add_argument('--no-compress', action='store_true', help='não grava as versões .gz/.br')
+    args = parser.parse_args()
+
+    try:
+        manifest, report = build(args.output, minify_enabled=not args.no_minify, compress=not args.no_compress)
+    except InvalidScript as e:
+        print(str(e))
+        raise SystemExit(1)
+
+    print(f"{'pacote':<26}{'arquivos':>10}{'fontes':>10}{'minif.':>10}{'gzip':>10}{'brotli':>10}")
+    for bundle, names in ASSET_BUNDLES.items():
+        sizes = report[bundle]
+        print(f"{bundle:<26}{len(names):>10}{sizes['sources']:>10}{sizes['raw']:>10}"
+              f"{sizes.get('gzip', '-'):>10}{sizes.get('br', '-'):>10}")
+    print(f"{len(manifest)} arquivos versionados em {args.output}"
+          + ('' if brotli is not None or args.no_compress else ' (brotli não instalado: apenas .gz)'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Configuração compartilhada dos testes automatizados (pytest)
+Os testes usam um banco SQLite temporário e desligam as threads de fundo que
+acessam serviços externos. As variáveis precisam estar definidas antes da
+importação de app/main.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+_db_dir = tempfile.mkdtemp(prefix='avi-tests-')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_db_dir, 'avi.db')}")
+os.environ.setdefault('AVI_DB_HEALTH_PROBE', 'false')
+os.environ.setdefault('AVI_CACHE_WARMER', 'false')
+os.environ.setdefault('AVI_CHAT_PERSISTENCE', 'false')
+os.environ.setdefault('SESSION_SECRET', 'test-secret')
+
+
+@pytest.fixture(scope='session')
+def app():
+    """Aplicação Flask com o esquema do banco criado"""
+    from main import app as flask_app
+    from models import db
+    from services.db_schema import ensure_schema
+
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        ensure_schema(db)
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    """Cliente de teste da aplicação"""
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """Cria usuários de teste e os remove (com conversas e roteiros) ao final do teste"""
+    from models import db, User, Conversation, TravelPlan
+
+    created = []
+
+    def factory(email):
+        with app.app_context():
+            user = User(name='Teste', email=email, password='senha123')
+            db.session.add(user)
+            db.session.commit()
+            created.append(user.id)
+            return user.id
+
+    yield factory
+
+    with app.app_context():
+        for user_id in created:
+            for model in (Conversation, TravelPlan):
+                for row in model.query.filter_by(user_id=user_id).all():
+                    db.session.delete(row)
+            db.session.delete(db.session.get(User, user_id))
+        db.session.commit()
@@ -0,0 +1,141 @@
+"""
+Gera as tabelas de aeroportos e companhias aéreas usadas por services.iata_tables
+Baixa airports.json e airlines.json (TravelPayoutsService.get_airports/get_airlines),
+cities.json e countries.json da API de dados do TravelPayouts, além das versões
+em português (/data/pt/...), e grava as tabelas compactas em pickle.
+
+Também aceita um diretório com os arquivos já baixados (airports.json,
+airlines.json, cities.json, countries.json e, opcionalmente, pt/<arquivo>.json).
+
+Uso:
+    python generate_iata_tables.py                          # baixa os dados da API
+    python generate_iata_tables.py --source dados_tp/       # usa arquivos locais
+    python generate_iata_tables.py --output /tmp/iata.pickle
+    python generate_iata_tables.py --soft                   # no build: sem rede, mantém as tabelas atuais
+"""
+
+import os
+import sys
+import json
+import pickle
+import argparse
+from datetime import datetime
+
+import requests
+
+from services.iata_tables import DEFAULT_TABLES_PATH, LOCALES, build_tables
+
+# Arquivos de dados usados na geração
+DATASETS = ('airports', 'airlines', 'cities', 'countries')
+
+
+def fetch_datasets(timeout=60):
+    """
+    Baixa os arquivos de dados do TravelPayouts
+
+    Args:
+        timeout: tempo máximo de cada download em segundos
+
+    Returns:
+        tuple: (datasets em inglês, {locale: datasets traduzidos})
+    """
+    from services.travelpayouts_service import TravelPayoutsService
+
+    service = TravelPayoutsService()
+    datasets = {
+        'airports': service.get_airports(),
+        'airlines': service.get_airlines()
+    }
+    for name in ('cities', 'countries'):
+        response = requests.get(f"{service.data_api_base}/{name}.json", timeout=timeout)
+        response.raise_for_status()
+        datasets[name] = response.json()
+
+    localized = {}
+    for locale in LOCALES:
+        if locale == 'en':
+            continue
+        localized[locale] = {}
+        for name in DATASETS:
+            response = requests.get(f"{service.data_api_base}/{locale}/{name}.json", timeout=timeout)
+            if response.status_code == 200:
+                localized[locale][name] = response.json()
+            else:
+                print(f"Aviso: {locale}/{name}.json indisponível ({response.status_code})")
+    return datasets, localized
+
+
+def load_datasets(source):
+    """
+    Lê os arquivos de dados de um diretório
+
+    Args:
+        source: diretório com <nome>.json e <locale>/<nome>.json
+
+    Returns:
+        tuple: (datasets em inglês, {locale: datasets traduzidos})
+    """
+    def read(path):
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    datasets = {name: read(os.path.join(source, f"{name}.json")) or [] for name in DATASETS}
+    localized = {}
+    for locale in LOCALES:
+        if locale == 'en':
+            continue
+        localized[locale] = {
+            name: data for name in DATASETS
+            if (data := read(os.path.join(source, locale, f"{name}.json"))) is not None
+        }
+    return datasets, localized
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera as tabelas IATA de aeroportos e companhias aéreas')
+    parser.add_argument('--source', help='diretório com os arquivos JSON já baixados')
+    parser.add_argument('--output', default=DEFAULT_TABLES_PATH, help=f'arquivo gerado (padrão: {DEFAULT_TABLES_PATH})')
+    parser.add_argument('--soft', action='store_true',
+                        help='não falhar se os dados não puderem ser obtidos (ex.: build sem rede)')
+    args = parser.parse_args()
+
+    try:
+        datasets, localized = load_datasets(args.source) if args.source else fetch_datasets()
+    except (requests.RequestException, OSError, ValueError) as e:
+        if not args.soft:
+            raise
+        datasets, localized = {'airports': None, 'airlines': None}, {}
+        print(f"Aviso: não foi possível obter os dados do TravelPayouts: {str(e)}")
+
+    if not datasets['airports'] or not datasets['airlines']:
+        if args.soft:
+            kept = 'mantido o arquivo existente' if os.path.exists(args.output) else 'usando os dados revisados'
+            print(f"Aviso: tabelas IATA não geradas; {kept}")
+            sys.exit(0)
+        parser.error("airports.json e airlines.json são obrigatórios")
+
+    tables = build_tables(
+        datasets['airports'],
+        datasets['airlines'],
+        cities=datasets['cities'],
+        countries=datasets['countries'],
+        localized=localized
+    )
+    tables['generated_at'] = datetime.utcnow().isoformat()
+
+    # Gravação atômica: workers em execução nunca leem um arquivo incompleto
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    temp_path = f"{args.output}.tmp"
+    with open(temp_path, 'wb') as f:
+        pickle.dump(tables, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, args.output)
+
+    size_kb = os.path.getsize(args.output) / 1024
+    print(f"{len(tables['airports'])} aeroportos/cidades e {len(tables['airlines'])} companhias "
+          f"gravados em {args.output} ({size_kb:.0f} KB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Relatório de tempo de importação da aplicação
+Executa `python -X importtime -c "import <módulo>"` em um processo limpo e resume
+o resultado: tempo total, módulos com maior tempo acumulado e pacotes de
+primeiro nível com maior tempo próprio. Serve para acompanhar o custo de
+inicialização dos workers (cold start) após mudanças nas importações.
+
+Uso:
+    python import_time_report.py                # importa main.py
+    python import_time_report.py app --top 30   # importa app.py e mostra 30 módulos
+    python import_time_report.py --runs 5       # mediana de 5 execuções
+"""
+
+import sys
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+
+
+def run_importtime(module):
+    """
+    Importa o módulo em um novo interpretador com -X importtime
+
+    Args:
+        module: nome do módulo a importar
+
+    Returns:
+        list: tuplas (self_us, cumulative_us, profundidade, nome_do_módulo)
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {module}:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # cabeçalho da tabela
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((int(parts[0]), int(parts[1]), depth, name.strip()))
+    return entries
+
+
+def summarize(entries, module, top):
+    """
+    Monta o relatório de uma execução
+
+    Args:
+        entries: resultado de run_importtime
+        module: módulo importado
+        top: quantidade de linhas por tabela
+
+    Returns:
+        str: relatório formatado
+    """
+    total_us = next((cumulative for _, cumulative, _, name in entries if name == module), 0)
+
+    by_package = defaultdict(int)
+    for self_us, _, _, name in entries:
+        by_package[name.split('.')[0]] += self_us
+
+    lines = [
+        f"Importação de '{module}': {total_us / 1000:.1f} ms ({len(entries)} módulos)",
+        "",
+        f"Top {top} módulos por tempo acumulado (ms):"
+    ]
+    for self_us, cumulative_us, depth, name in sorted(entries, key=lambda e: e[1], reverse=True)[:top]:
+        lines.append(f"  {cumulative_us / 1000:9.1f}  {self_us / 1000:7.1f}  {name}")
+
+    lines.extend(["", f"Top {top} pacotes por tempo próprio (ms):"])
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]:
+        lines.append(f"  {self_us / 1000:9.1f}  {package}")
+
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumo do tempo de importação (-X importtime)")
+    parser.add_argument('module', nargs='?', default='main', help="módulo a importar (padrão: main)")
+    parser.add_argument('--top', type=int, default=20, help="linhas por tabela (padrão: 20)")
+    parser.add_argument('--runs', type=int, default=1, help="execuções para calcular a mediana do total")
+    args = parser.parse_args()
+
+    runs = [run_importtime(args.module) for _ in range(max(1, args.runs))]
+
+    # Usar a execução com total mediano para o detalhamento
+    totals = [next((c for _, c, _, n in entries if n == args.module), 0) for entries in runs]
+    median_total = statistics.median(totals)
+    chosen = min(range(len(runs)), key=lambda i: abs(totals[i] - median_total))
+
+    print(summarize(runs[chosen], args.module, args.top))
+    if len(runs) > 1:
+        print("")
+        print(f"Totais das {len(runs)} execuções (ms): " + ", ".join(f"{t / 1000:.1f}" for t in totals))
+        print(f"Mediana: {median_total / 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
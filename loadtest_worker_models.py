@@ -0,0 +1,777 @@
+"""
+Teste de carga de saturação por modelo de worker WSGI
+Mede quantos usuários simultâneos uma instância de main:app atende com workers
+síncronos, com threads ou com green threads, para que o planejamento de capacidade
+use dados em vez de palpites.
+
+Para cada configuração de worker o script:
+- sobe servidores stub locais da OpenAI (/v1/chat/completions) e do TravelPayouts
+  (/v1/prices/...), com latências de distribuição log-normal parecidas com as reais
+  (mediana de ~1,2 s e ~300 ms), apontados por OPENAI_API_BASE e
+  TRAVELPAYOUTS_API_BASE_URL;
+- cria um banco SQLite temporário com um usuário e ofertas monitoradas;
+- sobe a aplicação (gunicorn main:app ou o servidor de desenvolvimento do Flask);
+- aumenta os usuários virtuais em estágios (1, 2, 4, 8...). Cada usuário repete,
+  com tempo de reflexão entre as requisições, um dos fluxos:
+  - chat: conversa com a IA, informa a viagem, confirma ("sim") e abre /api/flight_results
+  - roteiro: /api/roteiro/iniciar e /api/roteiro/obter
+  - price_monitor: /login e /api/price-monitor
+- registra por estágio a vazão, as latências (p50/p95/p99), os erros, as recusas
+  (429) e as chamadas aos stubs.
+
+O joelho da curva é o último estágio em que dobrar os usuários ainda aumenta a vazão
+em pelo menos --min-gain e os erros ficam abaixo de --max-error-rate; a partir dele
+a latência cresce sem ganho de vazão.
+
+Por padrão os caches de busca e o controle de admissão ficam desligados (todas as
+requisições vêm do mesmo IP e a mesma rota seria servida do cache); use
+--with-cache e --with-admission para medir a configuração de produção. Os limites
+de chamadas simultâneas por fornecedor (AVI_UPSTREAM_LIMITS) continuam valendo.
+
+Configurações sem a dependência instalada (gunicorn, gevent) são puladas.
+
+Uso:
+    python loadtest_worker_models.py                        # sync, gthread, gevent e werkzeug
+    python loadtest_worker_models.py --configs gthread,gevent --workers 4 --threads 16
+    python loadtest_worker_models.py --stages 1,2,4,8,16,32,64 --stage-seconds 30 --json resultado.json
+    python loadtest_worker_models.py --latency-scale 0.5 --mix chat=6,roteiro=2,price_monitor=2
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import statistics
+import importlib.util
+import urllib.error
+import urllib.request
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import date, timedelta
+from urllib.parse import urlparse, parse_qs
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+LOADTEST_EMAIL = 'carga@avi.local'
+LOADTEST_PASSWORD = 'teste-de-carga'
+
+# Rotas usadas pelo fluxo de chat (variadas para não concentrar tudo em uma busca;
+# todas reconhecidas pelo extrator de chat_processor sem ajuda da IA)
+ROUTES = [
+    ('São Paulo', 'Rio de Janeiro'), ('São Paulo', 'Brasília'), ('São Paulo', 'Salvador'),
+    ('São Paulo', 'Recife'), ('São Paulo', 'Fortaleza'), ('São Paulo', 'Porto Alegre'),
+    ('São Paulo', 'Belo Horizonte'),
+]
+
+# Configurações de worker comparadas
+WORKER_CONFIGS = {
+    'sync': 'gunicorn, workers síncronos (uma requisição por processo)',
+    'gthread': 'gunicorn, workers com threads',
+    'gevent': 'gunicorn, workers com green threads (gevent)',
+    'werkzeug': 'servidor de desenvolvimento do Flask com threads (python main.py)',
+}
+
+
+# ---------------------------------------------------------------------------
+# Stubs dos fornecedores
+# ---------------------------------------------------------------------------
+
+class UpstreamStub:
+    """
+    Servidor HTTP local que imita a OpenAI e o TravelPayouts com latência log-normal.
+    """
+
+    def __init__(self, latency_scale=1.0, openai_median=1.2, travelpayouts_median=0.3):
+        """
+        Inicializa o stub (o servidor só sobe em start)
+
+        Args:
+            latency_scale: multiplicador das latências (0 desliga a espera)
+            openai_median: mediana da latência da OpenAI em segundos
+            travelpayouts_median: mediana da latência do TravelPayouts em segundos
+        """
+        self.latency_scale = latency_scale
+        self.latency = {
+            'openai': (openai_median, 0.5),
+            'travelpayouts': (travelpayouts_median, 0.6),
+        }
+        self.calls = {'openai': 0, 'travelpayouts': 0}
+        self._lock = threading.Lock()
+        self._server = None
+        self.port = None
+
+    def start(self):
+        """Sobe o servidor em uma porta livre, em uma thread de fundo"""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                stub.handle(self)
+
+            def do_POST(self):
+                stub.handle(self)
+
+        ThreadingHTTPServer.request_queue_size = 256
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='upstream-stub', daemon=True).start()
+
+    def stop(self):
+        """Encerra o servidor"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    @property
+    def openai_base(self):
+        return f"http://127.0.0.1:{self.port}/openai/v1"
+
+    @property
+    def travelpayouts_base(self):
+        return f"http://127.0.0.1:{self.port}/travelpayouts"
+
+    def calls_snapshot(self):
+        """Contadores de chamadas por fornecedor"""
+        with self._lock:
+            return dict(self.calls)
+
+    def _sleep(self, upstream):
+        """Espera uma latência sorteada da distribuição do fornecedor"""
+        median, sigma = self.latency[upstream]
+        if self.latency_scale > 0:
+            time.sleep(random.lognormvariate(math.log(median), sigma) * self.latency_scale)
+
+    def handle(self, handler):
+        """Atende uma requisição dos clientes da aplicação"""
+        url = urlparse(handler.path)
+        length = int(handler.headers.get('Content-Length') or 0)
+        body = handler.rfile.read(length) if length else b''
+
+        if url.path.startswith('/openai/'):
+            upstream, payload = 'openai', self._openai_response(body)
+        elif url.path.startswith('/travelpayouts/'):
+            upstream, payload = 'travelpayouts', self._travelpayouts_response(url.path, parse_qs(url.query))
+        else:
+            handler.send_response(404)
+            handler.send_header('Content-Length', '0')
+            handler.end_headers()
+            return
+
+        with self._lock:
+            self.calls[upstream] += 1
+        self._sleep(upstream)
+
+        data = json.dumps(payload).encode('utf-8')
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _openai_response(self, body):
+        """Resposta no formato de /v1/chat/completions"""
+        try:
+            model = json.loads(body or b'{}').get('model', 'gpt-4o')
+        except ValueError:
+            model = 'gpt-4o'
+        content = ("Claro! Posso ajudar a planejar sua viagem. Para buscar os voos, me diga "
+                   "a cidade de origem, o destino e as datas de ida e volta.")
+        return {
+            'id': f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                         'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': 900, 'completion_tokens': 40, 'total_tokens': 940},
+        }
+
+    def _travelpayouts_response(self, path, query):
+        """Respostas das APIs de preços (calendário com voos; as demais vazias)"""
+        if path.endswith('/prices/calendar'):
+            month = (query.get('month') or [date.today().strftime('%Y-%m')])[0]
+            year, month_number = (int(part) for part in month.split('-')[:2])
+            start = date(year, month_number, 1)
+            days = {}
+            for offset in range(0, 28, 3):
+                day = (start + timedelta(days=offset)).isoformat()
+                days[day] = [{
+                    'price': random.randint(250, 2500),
+                    'airline': random.choice(['G3', 'LA', 'AD']),
+                    'flight_number': random.randint(1000, 9999),
+                    'departure_at': f"{day}T10:00:00-03:00",
+                    'transfers': random.randint(0, 1),
+                    'number_of_changes': random.randint(0, 1),
+                }]
+            return {'success': True, 'data': days, 'currency': 'brl'}
+        if path.endswith('.json'):
+            return []
+        return {'success': True, 'data': {}, 'currency': 'brl'}
+
+
+# ---------------------------------------------------------------------------
+# Aplicação sob teste
+# ---------------------------------------------------------------------------
+
+def free_port():
+    """Porta TCP livre em 127.0.0.1"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def available_configs(names):
+    """
+    Separa as configurações cujas dependências estão instaladas
+
+    Args:
+        names: nomes das configurações pedidas
+
+    Returns:
+        tuple: (executáveis, {nome: motivo de terem sido puladas})
+    """
+    runnable, skipped = [], {}
+    for name in names:
+        if name not in WORKER_CONFIGS:
+            skipped[name] = 'configuração desconhecida'
+        elif name != 'werkzeug' and importlib.util.find_spec('gunicorn') is None:
+            skipped[name] = 'gunicorn não instalado'
+        elif name == 'gevent' and importlib.util.find_spec('gevent') is None:
+            skipped[name] = 'gevent não instalado'
+        else:
+            runnable.append(name)
+    return runnable, skipped
+
+
+def server_command(name, port, args):
+    """
+    Comando que sobe a aplicação com a configuração de worker
+
+    Args:
+        name: nome da configuração (WORKER_CONFIGS)
+        port: porta do servidor
+        args: argumentos da linha de comando
+
+    Returns:
+        list: comando para subprocess
+    """
+    if name == 'werkzeug':
+        return [sys.executable, '-c',
+                f"from main import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+               '--workers', str(args.workers), '--worker-class', name,
+               '--timeout', '120', '--log-level', 'warning']
+    if name == 'gthread':
+        command += ['--threads', str(args.threads)]
+    elif name == 'gevent':
+        command += ['--worker-connections', str(args.worker_connections)]
+    return command + ['main:app']
+
+
+def app_environment(stub, database_url, args):
+    """
+    Variáveis de ambiente da aplicação sob teste
+
+    Args:
+        stub: UpstreamStub em execução
+        database_url: URL do banco da rodada
+        args: argumentos da linha de comando
+
+    Returns:
+        dict: ambiente do processo
+    """
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': ROOT + os.pathsep + env.get('PYTHONPATH', ''),
+        'DATABASE_URL': database_url,
+        'OPENAI_API_KEY': 'sk-teste-de-carga',
+        'OPENAI_API_BASE': stub.openai_base,
+        'TRAVELPAYOUTS_API_BASE_URL': stub.travelpayouts_base,
+        'AVI_CACHE_WARMER': 'false',
+        'AVI_DB_HEALTH_PROBE': 'false',
+    })
+    if not args.with_admission:
+        env['AVI_ADMISSION'] = 'false'
+    if not args.with_cache:
+        for name in ('TRAVELPAYOUTS_CACHE_TTL', 'TRAVELPAYOUTS_CACHE_STALE_TTL', 'TRAVELPAYOUTS_MONTH_CACHE_TTL'):
+            env[name] = '0'
+    return env
+
+
+def seed_database():
+    """
+    Cria as tabelas, o usuário do teste e algumas ofertas monitoradas
+    (executado em um processo filho, com o ambiente da aplicação)
+    """
+    from app import app, db
+    from models import User, PriceMonitor
+    from services.db_schema import ensure_schema
+
+    with app.app_context():
+        # ensure_schema cria as tabelas (db.create_all) sob o mesmo lock usado pela
+        # thread de chat_persistence, que também verifica o esquema ao importar app
+        ensure_schema(db)
+        user = User.query.filter_by(email=LOADTEST_EMAIL).first()
+        if user is None:
+            user = User('Teste de Carga', LOADTEST_EMAIL, LOADTEST_PASSWORD)
+            db.session.add(user)
+            db.session.flush()
+            for index, (origin, destination) in enumerate(ROUTES):
+                price = 400.0 + 150 * index
+                db.session.add(PriceMonitor(
+                    user_id=user.id, type='flight', item_id=f"TP{index}",
+                    name=f"{origin} → {destination}", description='Voo monitorado pelo teste de carga',
+                    original_price=price, current_price=price, lowest_price=price
+                ))
+            db.session.commit()
+        print(json.dumps({'user_id': user.id}))
+
+
+def start_server(name, port, env, log_path, args):
+    """
+    Sobe a aplicação e espera ela responder
+
+    Returns:
+        subprocess.Popen: processo do servidor
+    """
+    log_file = open(log_path, 'w')
+    process = subprocess.Popen(server_command(name, port, args), cwd=ROOT, env=env,
+                               stdout=log_file, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"servidor encerrou ao iniciar (código {process.returncode}), veja {log_path}")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health/db", timeout=2).close()
+            return process
+        except urllib.error.HTTPError:
+            return process
+        except OSError:
+            time.sleep(0.25)
+    stop_server(process)
+    raise RuntimeError(f"servidor não respondeu em {args.startup_timeout}s, veja {log_path}")
+
+
+def stop_server(process):
+    """Encerra o servidor (SIGTERM e, se preciso, SIGKILL)"""
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+# ---------------------------------------------------------------------------
+# Usuários virtuais
+# ---------------------------------------------------------------------------
+
+class VirtualUser:
+    """
+    Cliente HTTP com cookies próprios que executa os fluxos em laço fechado.
+    """
+
+    def __init__(self, base_url, recorder, user_id, args):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.user_id = user_id
+        self.think_time = args.think_time
+        self.timeout = args.request_timeout
+        self.cookies = {}
+        self.logged_in = False
+
+    def request(self, method, path, label, payload=None, headers=None):
+        """
+        Executa uma requisição e registra latência e status
+
+        Returns:
+            tuple: (status, corpo decodificado ou None)
+        """
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            request.add_header('Content-Type', 'application/json')
+        if self.cookies:
+            request.add_header('Cookie', '; '.join(f"{key}={value}" for key, value in self.cookies.items()))
+        for key, value in (headers or {}).items():
+            request.add_header(key, value)
+
+        started = time.monotonic()
+        body = None
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                status, raw, set_cookies = response.status, response.read(), response.headers.get_all('Set-Cookie')
+        except urllib.error.HTTPError as e:
+            status, raw, set_cookies = e.code, e.read(), e.headers.get_all('Set-Cookie')
+        except OSError:
+            status, raw, set_cookies = 0, b'', None
+        self.recorder.record(label, started, time.monotonic() - started, status)
+
+        for header in set_cookies or []:
+            cookie = SimpleCookie()
+            cookie.load(header)
+            for key, morsel in cookie.items():
+                self.cookies[key] = morsel.value
+        if raw:
+            try:
+                body = json.loads(raw)
+            except ValueError:
+                body = None
+        return status, body
+
+    def think(self):
+        """Tempo de reflexão do usuário (exponencial, média --think-time)"""
+        if self.think_time > 0:
+            time.sleep(random.expovariate(1 / self.think_time))
+
+    def chat_flow(self):
+        """Conversa completa até a busca de voos e o mural de resultados"""
+        self.cookies['flai_session_id'] = str(uuid.uuid4())
+        origin, destination = random.choice(ROUTES)
+        departure = date.today() + timedelta(days=random.randint(20, 120))
+
+        self.request('POST', '/api/chat', 'chat', {'message': 'Estou pensando em viajar nas férias, pode me ajudar?'})
+        self.think()
+        self.request('POST', '/api/chat', 'chat', {
+            'message': f"Quero um voo saindo de {origin} para {destination} em {departure.strftime('%d/%m/%Y')}"
+        })
+        self.think()
+        self.request('POST', '/api/chat', 'chat', {'message': 'sim'})
+        self.think()
+        self.request('GET', '/api/flight_results', 'flight_results')
+
+    def roteiro_flow(self):
+        """Cria um roteiro e o consulta (a segunda consulta revalida com o ETag)"""
+        start = date.today() + timedelta(days=random.randint(20, 120))
+        self.request('POST', '/api/roteiro/iniciar', 'roteiro', {
+            'user_id': self.user_id,
+            'destination': random.choice(ROUTES)[1],
+            'startDate': start.isoformat(),
+            'endDate': (start + timedelta(days=4)).isoformat(),
+            'days': [],
+        })
+        self.think()
+        self.request('GET', '/api/roteiro/obter', 'roteiro')
+        self.think()
+        self.request('GET', '/api/roteiro/obter', 'roteiro')
+
+    def price_monitor_flow(self):
+        """Entra na conta (uma vez por usuário) e lista as ofertas monitoradas"""
+        if not self.logged_in:
+            status, _ = self.request('POST', '/login', 'price_monitor',
+                                     {'email': LOADTEST_EMAIL, 'password': LOADTEST_PASSWORD})
+            self.logged_in = status == 200
+            self.think()
+        status, _ = self.request('GET', '/api/price-monitor', 'price_monitor')
+        if status == 401:
+            self.logged_in = False
+
+    def run(self, mix, stop):
+        """Repete fluxos sorteados pelo mix até stop ser sinalizado"""
+        flows, weights = zip(*mix.items())
+        while not stop.is_set():
+            getattr(self, f"{random.choices(flows, weights)[0]}_flow")()
+            self.think()
+
+
+class Recorder:
+    """
+    Registro das requisições, atribuídas ao estágio em que começaram.
+    """
+
+    def __init__(self):
+        self.stage = 0
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def record(self, label, started, elapsed, status):
+        with self._lock:
+            self.samples.append((self.stage, label, started, elapsed, status))
+
+    def stage_samples(self, stage):
+        with self._lock:
+            return [sample for sample in self.samples if sample[0] == stage]
+
+
+def percentile(values, fraction):
+    """Percentil por vizinho mais próximo (values ordenados)"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(math.ceil(fraction * len(values))) - 1)]
+
+
+def summarize(samples, duration):
+    """
+    Métricas de um estágio
+
+    Args:
+        samples: [(estágio, rótulo, início, duração, status)]
+        duration: duração do estágio em segundos
+
+    Returns:
+        dict: vazão, latências em ms, taxas de erro e recusa, latência por fluxo
+    """
+    completed = [sample for sample in samples if 0 < sample[4] < 500 and sample[4] != 429]
+    latencies = sorted(sample[3] * 1000 for sample in completed)
+    errors = sum(1 for sample in samples if sample[4] == 0 or sample[4] >= 500)
+    rejected = sum(1 for sample in samples if sample[4] == 429)
+    total = len(samples)
+
+    by_flow = {}
+    for label in sorted({sample[1] for sample in completed}):
+        values = sorted(sample[3] * 1000 for sample in completed if sample[1] == label)
+        by_flow[label] = {'requests': len(values), 'p50_ms': round(percentile(values, 0.5), 1),
+                          'p95_ms': round(percentile(values, 0.95), 1)}
+
+    return {
+        'requests': total,
+        'throughput': round(len(completed) / duration, 2) if duration else 0.0,
+        'p50_ms': round(percentile(latencies, 0.5), 1) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95), 1) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99), 1) if latencies else None,
+        'mean_ms': round(statistics.fmean(latencies), 1) if latencies else None,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'rejected_rate': round(rejected / total, 4) if total else 0.0,
+        'by_flow': by_flow,
+    }
+
+
+def find_knee(stages, min_gain, max_error_rate):
+    """
+    Joelho da curva vazão × latência
+
+    Percorre os estágios em ordem crescente de usuários: o joelho avança enquanto
+    o estágio seguinte aumenta a vazão em pelo menos min_gain e mantém a taxa de
+    erros (incluindo recusas 429) até max_error_rate.
+
+    Args:
+        stages: métricas dos estágios (com "vus")
+        min_gain: ganho relativo mínimo de vazão (ex.: 0.1)
+        max_error_rate: taxa máxima de erros e recusas
+
+    Returns:
+        dict: estágio do joelho, ou None se nem o primeiro estágio for saudável
+    """
+    knee = None
+    for stage in stages:
+        healthy = stage['error_rate'] + stage['rejected_rate'] <= max_error_rate and stage['throughput'] > 0
+        if not healthy:
+            break
+        if knee is not None and stage['throughput'] < knee['throughput'] * (1 + min_gain):
+            break
+        knee = stage
+    return knee
+
+
+def run_stages(base_url, user_id, stub, args):
+    """
+    Executa os estágios de carga contra um servidor em execução
+
+    Returns:
+        list: métricas por estágio
+    """
+    recorder = Recorder()
+    stop = threading.Event()
+    threads = []
+    results = []
+
+    for index, vus in enumerate(args.stages):
+        recorder.stage = index
+        while len(threads) < vus:
+            user = VirtualUser(base_url, recorder, user_id, args)
+            thread = threading.Thread(target=user.run, args=(args.mix, stop), daemon=True)
+            thread.start()
+            threads.append(thread)
+
+        calls_before = stub.calls_snapshot()
+        time.sleep(args.stage_seconds)
+        calls_after = stub.calls_snapshot()
+
+        stage = summarize(recorder.stage_samples(index), args.stage_seconds)
+        stage['vus'] = vus
+        stage['upstream_calls'] = {name: calls_after[name] - calls_before[name] for name in calls_after}
+        results.append(stage)
+        print(format_stage(stage), flush=True)
+
+        if stage['requests'] and stage['error_rate'] >= args.abort_error_rate:
+            print(f"  taxa de erros acima de {args.abort_error_rate:.0%}, encerrando a rampa", flush=True)
+            break
+
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=args.request_timeout + 5)
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Relatório
+# ---------------------------------------------------------------------------
+
+HEADER = (f"  {'VUs':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'erros':>8}{'429':>7}{'OpenAI':>8}{'TP':>6}")
+
+
+def _ms(value):
+    return f"{value:.0f}" if value is not None else '-'
+
+
+def format_stage(stage):
+    """Linha da tabela de um estágio"""
+    calls = stage['upstream_calls']
+    return (f"  {stage['vus']:>5}{stage['throughput']:>9.1f}{_ms(stage['p50_ms']):>9}"
+            f"{_ms(stage['p95_ms']):>9}{_ms(stage['p99_ms']):>9}{stage['error_rate']:>8.1%}"
+            f"{stage['rejected_rate']:>7.1%}{calls['openai']:>8}{calls['travelpayouts']:>6}")
+
+
+def print_summary(results, skipped):
+    """Resumo com o joelho de cada configuração"""
+    print("\nResumo (joelho da curva vazão × latência)")
+    print(f"  {'configuração':<12}{'VUs':>6}{'req/s':>9}{'p95 ms':>9}{'p95/base':>10}")
+    for name, result in results.items():
+        knee = result.get('knee')
+        if knee is None:
+            print(f"  {name:<12}{'sem estágio saudável':>34}")
+            continue
+        baseline = result['stages'][0]['p95_ms'] or 0
+        ratio = f"{knee['p95_ms'] / baseline:.1f}x" if baseline and knee['p95_ms'] else '-'
+        print(f"  {name:<12}{knee['vus']:>6}{knee['throughput']:>9.1f}{_ms(knee['p95_ms']):>9}{ratio:>10}")
+    for name, reason in skipped.items():
+        print(f"  {name:<12} pulada: {reason}")
+
+
+# ---------------------------------------------------------------------------
+# Linha de comando
+# ---------------------------------------------------------------------------
+
+def parse_mix(value):
+    """Converte "chat=5,roteiro=3,price_monitor=2" em {fluxo: peso}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in ('chat', 'roteiro', 'price_monitor'):
+            raise argparse.ArgumentTypeError(f"fluxo desconhecido: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga de saturação por modelo de worker WSGI')
+    parser.add_argument('--configs', default=','.join(WORKER_CONFIGS),
+                        help=f"configurações comparadas (padrão: {','.join(WORKER_CONFIGS)})")
+    parser.add_argument('--workers', type=int, default=2, help='processos do gunicorn (padrão: 2)')
+    parser.add_argument('--threads', type=int, default=8, help='threads por worker gthread (padrão: 8)')
+    parser.add_argument('--worker-connections', type=int, default=100,
+                        help='conexões por worker gevent (padrão: 100)')
+    parser.add_argument('--stages', default='1,2,4,8,16,32',
+                        help='usuários virtuais de cada estágio (padrão: 1,2,4,8,16,32)')
+    parser.add_argument('--stage-seconds', type=float, default=20, help='duração de cada estágio (padrão: 20)')
+    parser.add_argument('--think-time', type=float, default=1.0,
+                        help='tempo médio de reflexão entre requisições em segundos (padrão: 1)')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('chat=5,roteiro=3,price_monitor=2'),
+                        help='peso de cada fluxo (padrão: chat=5,roteiro=3,price_monitor=2)')
+    parser.add_argument('--latency-scale', type=float, default=1.0,
+                        help='multiplicador das latências dos stubs (padrão: 1)')
+    parser.add_argument('--request-timeout', type=float, default=60, help='timeout das requisições (padrão: 60)')
+    parser.add_argument('--min-gain', type=float, default=0.1,
+                        help='ganho mínimo de vazão entre estágios para avançar o joelho (padrão: 0.1)')
+    parser.add_argument('--max-error-rate', type=float, default=0.01,
+                        help='taxa máxima de erros e recusas no joelho (padrão: 0.01)')
+    parser.add_argument('--abort-error-rate', type=float, default=0.5,
+                        help='taxa de erros que encerra a rampa da configuração (padrão: 0.5)')
+    parser.add_argument('--startup-timeout', type=float, default=60, help='espera pelo servidor (padrão: 60)')
+    parser.add_argument('--database-url', help='banco da aplicação (padrão: SQLite temporário por configuração)')
+    parser.add_argument('--with-cache', action='store_true', help='mantém os caches de busca do TravelPayouts')
+    parser.add_argument('--with-admission', action='store_true', help='mantém o controle de admissão (AVI_ADMISSION)')
+    parser.add_argument('--keep-logs', action='store_true', help='mantém o diretório temporário com os logs')
+    parser.add_argument('--json', help='grava os resultados completos neste arquivo')
+    parser.add_argument('--seed', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed_database()
+        return
+
+    args.stages = [int(value) for value in args.stages.split(',')]
+    configs, skipped = available_configs([name.strip() for name in args.configs.split(',') if name.strip()])
+    for name, reason in skipped.items():
+        print(f"Configuração '{name}' pulada: {reason}")
+
+    stub = UpstreamStub(latency_scale=args.latency_scale)
+    stub.start()
+    workdir = tempfile.mkdtemp(prefix='avi-loadtest-')
+    results = {}
+
+    print(f"Stubs em 127.0.0.1:{stub.port} | estágios: {args.stages} × {args.stage_seconds:.0f}s | "
+          f"mix: {args.mix} | diretório: {workdir}")
+    try:
+        for name in configs:
+            database_url = args.database_url or f"sqlite:///{os.path.join(workdir, name + '.db')}"
+            env = app_environment(stub, database_url, args)
+            seeded = subprocess.run([sys.executable, os.path.abspath(__file__), '--seed'], cwd=ROOT, env=env,
+                                    capture_output=True, text=True, check=True)
+            user_id = json.loads(seeded.stdout.strip().splitlines()[-1])['user_id']
+
+            port = free_port()
+            log_path = os.path.join(workdir, f"server-{name}.log")
+            print(f"\n{name}: {WORKER_CONFIGS[name]}")
+            try:
+                process = start_server(name, port, env, log_path, args)
+            except RuntimeError as e:
+                print(f"  {e}")
+                skipped[name] = str(e)
+                continue
+
+            try:
+                print(HEADER, flush=True)
+                stages = run_stages(f"http://127.0.0.1:{port}", user_id, stub, args)
+            finally:
+                stop_server(process)
+
+            knee = find_knee(stages, args.min_gain, args.max_error_rate)
+            results[name] = {'description': WORKER_CONFIGS[name], 'stages': stages, 'knee': knee}
+            if knee:
+                print(f"  joelho: {knee['vus']} VUs, {knee['throughput']:.1f} req/s, p95 {_ms(knee['p95_ms'])} ms")
+    finally:
+        stub.stop()
+        if args.keep_logs:
+            print(f"\nLogs em {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_summary(results, skipped)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'settings': {
+                    'workers': args.workers, 'threads': args.threads,
+                    'worker_connections': args.worker_connections, 'stages': args.stages,
+                    'stage_seconds': args.stage_seconds, 'think_time': args.think_time, 'mix': args.mix,
+                    'latency_scale': args.latency_scale, 'with_cache': args.with_cache,
+                    'with_admission': args.with_admission,
+                },
+                'results': results,
+                'skipped': skipped,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em {args.json}")
+
+
+if __name__ == '__main__':
+    main()
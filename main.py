@@ -7,6 +7,8 @@ from routes_travelpayouts import travelpayouts_bp
 from routes_widget_api import widget_api
 from routes_hidden_search import hidden_search_bp
 from routes_chat_flight_search import chat_flight_search_bp
+from routes_profiler import profiler_bp
+from routes_admin import admin_bp
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -18,6 +20,8 @@ app.register_blueprint(travelpayouts_bp, url_prefix='/travelpayouts')
 app.register_blueprint(widget_api, url_prefix='/widget')
 app.register_blueprint(hidden_search_bp)
 app.register_blueprint(chat_flight_search_bp)
+app.register_blueprint(profiler_bp)
+app.register_blueprint(admin_bp)
 
 # Adicionar log de inicialização
 logger.info("Aplicação inicializada com TravelPayouts, Roteiro Personalizado, Widget API e Busca Invisível")
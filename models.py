@@ -38,9 +38,17 @@ class User(db.Model, UserMixin):
         return f'<User {self.name}>'
 
 class Conversation(db.Model):
+    # Listagem paginada das conversas do usuário (mais recentes primeiro)
+    __table_args__ = (
+        db.Index('ix_conversation_user_last_updated', 'user_id', 'last_updated', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Nulo nas conversas de visitantes sem login
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    # ID da sessão do chat (cookie flai_session_id) que originou a conversa
+    session_key = db.Column(db.String(64), unique=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.now)
     last_updated = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
 
@@ -50,6 +58,11 @@ class Conversation(db.Model):
         return f'<Conversation {self.title}>'
 
 class Message(db.Model):
+    # Listagem paginada das mensagens de uma conversa em ordem cronológica
+    __table_args__ = (
+        db.Index('ix_message_conversation_timestamp', 'conversation_id', 'timestamp', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'), nullable=False)
     content = db.Column(db.Text, nullable=False)
@@ -67,16 +80,53 @@ class TravelPlan(db.Model):
     start_date = db.Column(db.Date)
     end_date = db.Column(db.Date)
     budget = db.Column(db.Float)
+    # Dias no formato antigo (JSON completo); None depois que os dias passam para TravelPlanDay
     details = db.Column(db.Text)
+    # Versão para controle de concorrência otimista (incrementada a cada alteração)
+    version = db.Column(db.Integer, nullable=False, default=1)
     created_at = db.Column(db.DateTime, default=datetime.now)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
 
     flights = db.relationship('FlightBooking', backref='travel_plan', lazy=True, cascade='all, delete-orphan')
     accommodations = db.relationship('Accommodation', backref='travel_plan', lazy=True, cascade='all, delete-orphan')
+    days = db.relationship('TravelPlanDay', backref='travel_plan', lazy=True, cascade='all, delete-orphan',
+                           order_by='TravelPlanDay.position')
+
+    # UPDATE ... WHERE version = :versão_carregada; StaleDataError se outra gravação chegou antes
+    __mapper_args__ = {'version_id_col': version}
 
     def __repr__(self):
         return f'<TravelPlan {self.title}>'
 
+class TravelPlanDay(db.Model):
+    # Um dia do roteiro; apenas os dias alterados são regravados
+    __table_args__ = (
+        db.UniqueConstraint('travel_plan_id', 'position', name='uq_travel_plan_day_position'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    travel_plan_id = db.Column(db.Integer, db.ForeignKey('travel_plan.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.Text, nullable=False)  # JSON do dia (date, title, blocks...)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f'<TravelPlanDay {self.travel_plan_id}/{self.position}>'
+
+class GeocodedPlace(db.Model):
+    # Cache persistente de geocodificação: nome normalizado → coordenadas
+    id = db.Column(db.Integer, primary_key=True)
+    query_key = db.Column(db.String(255), unique=True, nullable=False, index=True)
+    place_name = db.Column(db.String(255), nullable=False)  # Texto original da primeira consulta
+    latitude = db.Column(db.Float)  # None: lugar não encontrado no provedor
+    longitude = db.Column(db.Float)
+    display_name = db.Column(db.String(255))
+    provider = db.Column(db.String(30))
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f'<GeocodedPlace {self.query_key}>'
+
 class FlightBooking(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     travel_plan_id = db.Column(db.Integer, db.ForeignKey('travel_plan.id'), nullable=False)
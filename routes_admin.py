@@ -0,0 +1,63 @@
+"""
+Rotas administrativas de operação
+Consultar o aproveitamento do cache de prompt da OpenAI, acompanhar ou disparar o
+aquecimento do cache de preços, consultar o controle de admissão e o estado
+detalhado do banco.
+
+Todas as rotas exigem o token de administrador (AVI_ADMIN_TOKEN) no cabeçalho
+X-Avi-Admin (ver services.admin_auth); os perfis de requisição ficam em
+routes_profiler, com o token do profiler.
+"""
+
+import logging
+from flask import Blueprint, request, jsonify
+from services.admin_auth import admin_auth
+from services.prompt_builder import prompt_builder
+from services.cache_warmer import cache_warmer
+from services.admission_control import admission_control
+from services.db_resilience import db_resilience
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Criar Blueprint
+admin_bp = Blueprint('admin', __name__)
+
+
+@admin_bp.route('/admin/prompt-cache', methods=['GET'])
+@admin_auth.required
+def prompt_cache_stats():
+    """
+    Tamanho dos prefixos de prompt elegíveis ao cache e tokens reaproveitados pela API.
+    """
+    return jsonify(prompt_builder.stats())
+
+
+@admin_bp.route('/admin/cache-warmer', methods=['GET', 'POST'])
+@admin_auth.required
+def cache_warmer_status():
+    """
+    Rotas mais buscadas e rodadas do aquecedor do cache de preços.
+    POST executa uma rodada imediatamente.
+    """
+    if request.method == 'POST':
+        return jsonify({'run': cache_warmer.run_once(), **cache_warmer.snapshot()})
+    return jsonify(cache_warmer.snapshot())
+
+
+@admin_bp.route('/admin/admission', methods=['GET'])
+@admin_auth.required
+def admission_stats():
+    """
+    Cotas das rotas de chat e busca e ocupação dos limites por fornecedor.
+    """
+    return jsonify(admission_control.snapshot())
+
+
+@admin_bp.route('/admin/db', methods=['GET'])
+@admin_auth.required
+def database_stats():
+    """
+    Circuit breaker do banco, última sonda de saúde, estatísticas do pool e das operações.
+    """
+    return jsonify(db_resilience.health())
@@ -0,0 +1,77 @@
+"""
+Rotas administrativas para os perfis de requisição
+Permite listar e baixar os perfis gravados pelo RequestProfiler nos formatos
+collapsed-stack (flamegraph) ou speedscope. As demais rotas administrativas
+ficam em routes_admin, com um token próprio.
+
+Todas as rotas exigem o token de administrador (AVI_PROFILER_TOKEN), enviado
+apenas no cabeçalho X-Avi-Profile (um parâmetro na URL iria para os logs de
+acesso e para o cabeçalho Referer).
+"""
+
+import logging
+from flask import Blueprint, request, jsonify, make_response
+from services.request_profiler import request_profiler, PROFILE_HEADER, EXPORT_FORMATS
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Criar Blueprint
+profiler_bp = Blueprint('profiler', __name__)
+
+
+def _authorized():
+    """Verifica o token de administrador enviado na requisição"""
+    return request_profiler.is_authorized(request.headers.get(PROFILE_HEADER))
+
+
+@profiler_bp.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    """
+    Lista os perfis de requisição gravados, do mais recente para o mais antigo.
+    """
+    if not _authorized():
+        return jsonify({'error': 'Não autorizado'}), 403
+
+    profiles = request_profiler.list_profiles()
+    return jsonify({
+        'profiles': profiles,
+        'count': len(profiles),
+        'formats': list(EXPORT_FORMATS)
+    })
+
+
+@profiler_bp.route('/admin/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """
+    Baixa um perfil no formato solicitado.
+
+    Query parameters:
+    - format: collapsed (padrão) ou speedscope
+    """
+    if not _authorized():
+        return jsonify({'error': 'Não autorizado'}), 403
+
+    export_format = request.args.get('format', 'collapsed')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Formato não suportado: {export_format}. Use {', '.join(EXPORT_FORMATS)}"}), 400
+
+    try:
+        document = request_profiler.load_profile(profile_id)
+    except Exception as e:
+        logger.error(f"Erro ao carregar perfil {profile_id}: {str(e)}")
+        return jsonify({'error': 'Perfil ilegível'}), 500
+
+    if not document:
+        return jsonify({'error': 'Perfil não encontrado'}), 404
+
+    if export_format == 'speedscope':
+        response = make_response(jsonify(request_profiler.to_speedscope(document)))
+        filename = f"{profile_id}.speedscope.json"
+    else:
+        response = make_response(request_profiler.to_collapsed(document))
+        response.mimetype = 'text/plain'
+        filename = f"{profile_id}.collapsed.txt"
+
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
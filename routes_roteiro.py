@@ -13,8 +13,16 @@ import logging
 import uuid
 import re
 from datetime import datetime, timedelta
-from flask import Blueprint, render_template, request, jsonify, make_response, redirect, url_for
+from flask import Blueprint, current_app, render_template, request, jsonify, make_response, redirect, url_for
 from models import db, TravelPlan, FlightBooking, Accommodation
+from services.iata_tables import iata_tables
+from services.roteiro_view import build_roteiro, load_plan, roteiro_view
+from services.geocoding_service import block_locations, geocoding_service
+from services.intent_classifier import intent_classifier
+from services.admission_control import Overloaded
+from services.roteiro_patch import (
+    PatchError, VersionConflict, apply_patch, commit_plan, plan_document, replace_days
+)
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -23,6 +31,9 @@ logger = logging.getLogger(__name__)
 # Criar blueprint
 roteiro_bp = Blueprint('roteiro', __name__)
 
+# Intenções respondidas por generate_avi_response (as demais caem em "geral")
+ROTEIRO_INTENTS = ('voos', 'hospedagem', 'atrações', 'roteiro', 'buscar_tudo', 'ajuda', 'saudacao', 'agradecimento')
+
 # Rotas do Roteiro Personalizado
 
 @roteiro_bp.route('/roteiro-personalizado')
@@ -93,10 +104,10 @@ def iniciar_roteiro():
             destination=data.get('destination'),
             start_date=datetime.strptime(data.get('startDate'), '%Y-%m-%d') if data.get('startDate') else None,
             end_date=datetime.strptime(data.get('endDate'), '%Y-%m-%d') if data.get('endDate') else None,
-            details=json.dumps(data.get('days', [])),
             created_at=datetime.now(),
             updated_at=datetime.now()
         )
+        replace_days(roteiro, data.get('days', []))
 
         db.session.add(roteiro)
         db.session.commit()
@@ -105,6 +116,7 @@ def iniciar_roteiro():
         response = jsonify({
             'success': True,
             'roteiro_id': roteiro.id,
+            'version': roteiro.version,
             'message': 'Roteiro iniciado com sucesso'
         })
 
@@ -142,96 +154,32 @@ def obter_roteiro():
                 'error': 'ID do roteiro não fornecido'
             }), 400
         
-        # Buscar roteiro no banco de dados
-        roteiro = TravelPlan.query.get(roteiro_id)
+        try:
+            roteiro_id = int(roteiro_id)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'ID do roteiro inválido'
+            }), 400
+        
+        # Resposta montada em uma única consulta e reaproveitada enquanto a versão não mudar
+        body, version = roteiro_view.get(roteiro_id)
         
         # Se roteiro não existe, retornar erro
-        if not roteiro:
+        if body is None:
             return jsonify({
                 'success': False,
                 'error': 'Roteiro não encontrado'
             }), 404
         
-        # Converter para o formato esperado pelo frontend
-        roteiro_data = {
-            'id': roteiro.id,
-            'destination': roteiro.destination,
-            'startDate': roteiro.start_date.isoformat() if roteiro.start_date else None,
-            'endDate': roteiro.end_date.isoformat() if roteiro.end_date else None,
-            'travelers': 1,  # Valor padrão
-            'days': json.loads(roteiro.details) if roteiro.details else []
-        }
+        etag = f'"roteiro-{roteiro_id}-v{version}"'
+        if etag in request.if_none_match:
+            return make_response('', 304, {'ETag': etag})
         
-        # Buscar voos associados
-        flights = FlightBooking.query.filter_by(travel_plan_id=roteiro.id).all()
-        if flights:
-            # Adicionar voos aos dias apropriados
-            for flight in flights:
-                # Determinar em qual dia adicionar o voo
-                day_index = 0
-                if flight.departure_time and roteiro.start_date:
-                    flight_date = flight.departure_time.date()
-                    start_date = roteiro.start_date.date()
-                    day_diff = (flight_date - start_date).days
-                    if day_diff >= 0 and day_diff < len(roteiro_data['days']):
-                        day_index = day_diff
-                
-                # Criar bloco de voo
-                flight_block = {
-                    'id': f'flight_{flight.id}',
-                    'type': 'flight',
-                    'airline': flight.airline,
-                    'flightNumber': flight.flight_number,
-                    'departureAirport': flight.departure_location,
-                    'arrivalAirport': flight.arrival_location,
-                    'departureTime': flight.departure_time.isoformat() if flight.departure_time else None,
-                    'arrivalTime': flight.arrival_time.isoformat() if flight.arrival_time else None,
-                    'price': flight.price,
-                    'currency': flight.currency
-                }
-                
-                # Adicionar ao dia correspondente
-                if len(roteiro_data['days']) > day_index:
-                    if 'blocks' not in roteiro_data['days'][day_index]:
-                        roteiro_data['days'][day_index]['blocks'] = []
-                    roteiro_data['days'][day_index]['blocks'].append(flight_block)
-        
-        # Buscar hospedagens associadas
-        accommodations = Accommodation.query.filter_by(travel_plan_id=roteiro.id).all()
-        if accommodations:
-            for accommodation in accommodations:
-                # Determinar em qual dia adicionar a hospedagem
-                day_index = 0
-                if accommodation.check_in and roteiro.start_date:
-                    checkin_date = accommodation.check_in
-                    start_date = roteiro.start_date.date()
-                    day_diff = (checkin_date - start_date).days
-                    if day_diff >= 0 and day_diff < len(roteiro_data['days']):
-                        day_index = day_diff
-                
-                # Criar bloco de hospedagem
-                hotel_block = {
-                    'id': f'hotel_{accommodation.id}',
-                    'type': 'hotel',
-                    'name': accommodation.name,
-                    'location': accommodation.location,
-                    'checkIn': accommodation.check_in.isoformat() if accommodation.check_in else None,
-                    'checkOut': accommodation.check_out.isoformat() if accommodation.check_out else None,
-                    'pricePerNight': accommodation.price_per_night,
-                    'currency': accommodation.currency,
-                    'stars': accommodation.stars
-                }
-                
-                # Adicionar ao dia correspondente
-                if len(roteiro_data['days']) > day_index:
-                    if 'blocks' not in roteiro_data['days'][day_index]:
-                        roteiro_data['days'][day_index]['blocks'] = []
-                    roteiro_data['days'][day_index]['blocks'].append(hotel_block)
-        
-        return jsonify({
-            'success': True,
-            'roteiro': roteiro_data
-        })
+        response = current_app.json.bytes_response(body)
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
         
     except Exception as e:
         logger.error(f"Erro ao obter roteiro: {str(e)}")
@@ -288,7 +236,10 @@ def adicionar_item():
                 booking_status='planned'
             )
             db.session.add(voo)
+            # Nova versão do roteiro (invalida as respostas em cache)
+            roteiro.updated_at = datetime.now()
             db.session.commit()
+            roteiro_view.invalidate(roteiro.id)
             
             return jsonify({
                 'success': True,
@@ -310,7 +261,10 @@ def adicionar_item():
                 booking_status='planned'
             )
             db.session.add(hotel)
+            # Nova versão do roteiro (invalida as respostas em cache)
+            roteiro.updated_at = datetime.now()
             db.session.commit()
+            roteiro_view.invalidate(roteiro.id)
             
             return jsonify({
                 'success': True,
@@ -355,8 +309,12 @@ def remover_item():
             # Remover voo
             voo = FlightBooking.query.get(item_id)
             if voo:
+                roteiro = voo.travel_plan
                 db.session.delete(voo)
+                # Nova versão do roteiro (invalida as respostas em cache)
+                roteiro.updated_at = datetime.now()
                 db.session.commit()
+                roteiro_view.invalidate(roteiro.id)
                 return jsonify({
                     'success': True,
                     'message': 'Voo removido com sucesso'
@@ -371,8 +329,12 @@ def remover_item():
             # Remover hospedagem
             hotel = Accommodation.query.get(item_id)
             if hotel:
+                roteiro = hotel.travel_plan
                 db.session.delete(hotel)
+                # Nova versão do roteiro (invalida as respostas em cache)
+                roteiro.updated_at = datetime.now()
                 db.session.commit()
+                roteiro_view.invalidate(roteiro.id)
                 return jsonify({
                     'success': True,
                     'message': 'Hotel removido com sucesso'
@@ -428,15 +390,17 @@ def salvar_roteiro():
         roteiro.destination = data.get('destination')
         roteiro.start_date = datetime.fromisoformat(data.get('startDate')) if data.get('startDate') else None
         roteiro.end_date = datetime.fromisoformat(data.get('endDate')) if data.get('endDate') else None
-        roteiro.details = json.dumps(data.get('days', []))
-        roteiro.updated_at = datetime.now()
+        # Apenas os dias alterados são regravados
+        replace_days(roteiro, data.get('days', []), data.get('version'))
         
-        db.session.commit()
+        commit_plan(roteiro)
+        roteiro_view.invalidate(roteiro.id)
         
         # Configurar resposta com cookie
         response = jsonify({
             'success': True,
             'roteiro_id': roteiro.id,
+            'version': roteiro.version,
             'message': 'Roteiro salvo com sucesso'
         })
         
@@ -445,6 +409,14 @@ def salvar_roteiro():
         
         return response
         
+    except VersionConflict as e:
+        return _version_conflict_response(e)
+    except PatchError as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Erro ao salvar roteiro: {str(e)}")
         return jsonify({
@@ -488,17 +460,26 @@ def atualizar_roteiro():
             roteiro.end_date = datetime.fromisoformat(data.get('endDate')) if data.get('endDate') else None
             
         if 'days' in data:
-            roteiro.details = json.dumps(data.get('days'))
+            # Apenas os dias alterados são regravados
+            replace_days(roteiro, data.get('days'), data.get('version'))
             
-        roteiro.updated_at = datetime.now()
-        
-        db.session.commit()
+        commit_plan(roteiro)
+        roteiro_view.invalidate(roteiro.id)
         
         return jsonify({
             'success': True,
+            'version': roteiro.version,
             'message': 'Roteiro atualizado com sucesso'
         })
         
+    except VersionConflict as e:
+        return _version_conflict_response(e)
+    except PatchError as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Erro ao atualizar roteiro: {str(e)}")
         return jsonify({
@@ -507,6 +488,114 @@ def atualizar_roteiro():
             'details': str(e)
         }), 500
         
+@roteiro_bp.route('/api/roteiro/patch', methods=['POST'])
+def patch_roteiro():
+    """
+    Aplica alterações incrementais a um roteiro.
+    Recebe {"id", "version", "ops": [operações JSON Patch]}; grava apenas os dias
+    alterados e retorna a nova versão. Se o roteiro foi alterado depois da versão
+    informada (ex.: em outra aba), retorna 409 com o roteiro atual.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        if not data.get('id'):
+            return jsonify({
+                'success': False,
+                'error': 'ID do roteiro não fornecido'
+            }), 400
+        
+        roteiro = db.session.get(TravelPlan, data.get('id'))
+        if not roteiro:
+            return jsonify({
+                'success': False,
+                'error': 'Roteiro não encontrado'
+            }), 404
+        
+        result = apply_patch(roteiro, data.get('version'), data.get('ops'))
+        roteiro_view.invalidate(roteiro.id)
+        
+        return jsonify({
+            'success': True,
+            'roteiro_id': roteiro.id,
+            **result
+        })
+        
+    except VersionConflict as e:
+        return _version_conflict_response(e)
+    except PatchError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Erro ao aplicar alterações ao roteiro: {str(e)}")
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': 'Erro ao atualizar roteiro',
+            'details': str(e)
+        }), 500
+
+@roteiro_bp.route('/api/roteiro/geocode', methods=['GET', 'POST'])
+def geocode_locais():
+    """
+    Coordenadas dos locais do roteiro para o mapa (cache no servidor).
+    GET ?q=<local>: um local.
+    POST {"roteiro_id"} ou {"locations": [...]}: todos os locais em uma requisição.
+    """
+    try:
+        if request.method == 'GET':
+            names = [request.args.get('q', '')]
+        else:
+            data = request.get_json(silent=True) or {}
+            if data.get('roteiro_id'):
+                roteiro = load_plan(data.get('roteiro_id'))
+                if not roteiro:
+                    return jsonify({
+                        'success': False,
+                        'error': 'Roteiro não encontrado'
+                    }), 404
+                names = block_locations(build_roteiro(roteiro))
+            else:
+                names = data.get('locations')
+        
+        if not isinstance(names, list) or not any(isinstance(n, str) and n.strip() for n in names):
+            return jsonify({
+                'success': False,
+                'error': 'Nenhum local informado'
+            }), 400
+        
+        results = geocoding_service.geocode_many([n for n in names if isinstance(n, str)])
+        return jsonify({
+            'success': True,
+            'locations': results
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Erro ao geocodificar locais do roteiro: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Erro ao buscar coordenadas',
+            'details': str(e)
+        }), 500
+
+def _version_conflict_response(conflict):
+    """Resposta 409 com a versão e o conteúdo atuais do roteiro"""
+    plan = conflict.plan
+    return jsonify({
+        'success': False,
+        'error': 'conflict',
+        'message': 'O roteiro foi alterado em outra janela. Recarregue para ver a versão atual.',
+        'version': plan.version,
+        'roteiro': {'id': plan.id, 'version': plan.version, **plan_document(plan)}
+    }), 409
+
 @roteiro_bp.route('/api/roteiro/chat', methods=['POST'])
 def roteiro_chat():
     """
@@ -541,6 +630,9 @@ def roteiro_chat():
             'roteiro_updates': updates
         })
         
+    except Overloaded:
+        # Fornecedor saturado: 429 com Retry-After (admission_control), não 500
+        raise
     except Exception as e:
         logger.error(f"Erro ao processar mensagem do chat: {str(e)}")
         return jsonify({
@@ -560,10 +652,8 @@ def process_avi_message(message, roteiro_data):
     Returns:
         tuple: (resposta da AVI, atualizações para o roteiro)
     """
-    from services.travelpayouts_service import TravelPayoutsService
-    
-    # Inicializar serviço TravelPayouts (para buscar voos se necessário)
-    travelpayouts_service = TravelPayoutsService()
+    # Serviço TravelPayouts compartilhado (para buscar voos se necessário)
+    from services.travelpayouts_service import travelpayouts_service
     
     # Extrair informações do roteiro atual
     destination = roteiro_data.get('destination', '')
@@ -615,25 +705,8 @@ def process_avi_message(message, roteiro_data):
     # identificar intenções, e até mesmo ter um prompt específico para isso.
     # Por fins de demonstração, vamos implementar uma versão simplificada.
     
-    # Determinar o tipo de mensagem/intenção do usuário
-    intent = "geral"  # Padrão
-    
-    if any(word in message_lower for word in ['passag', 'voo', 'avião', 'companhia']):
-        intent = "voos"
-    elif any(word in message_lower for word in ['hotel', 'hosped', 'acomodaç', 'pousada', 'onde ficar']):
-        intent = "hospedagem"
-    elif any(word in message_lower for word in ['o que fazer', 'atração', 'atividade', 'passeio', 'visitar']):
-        intent = "atrações"
-    elif any(word in message_lower for word in ['roteiro', 'itinerário', 'planejar', 'organizar', 'programação']):
-        intent = "roteiro"
-    elif any(word in message_lower for word in ['busque tudo', 'buscar tudo', 'encontre tudo', 'mostre tudo']):
-        intent = "buscar_tudo"
-    elif any(word in message_lower for word in ['ajuda', 'ajudar', 'funciona', 'utilizar', 'como', 'não entendi']):
-        intent = "ajuda"
-    elif any(word in message_lower for word in ['olá', 'oi', 'ei', 'hey', 'boa', 'bom']):
-        intent = "saudacao"
-    elif any(word in message_lower for word in ['obrigad', 'agradeç', 'valeu', 'perfeito']):
-        intent = "agradecimento"
+    # Determinar o tipo de mensagem/intenção do usuário (apenas intenções com resposta no roteiro)
+    intent = intent_classifier.classify(message, intents=ROTEIRO_INTENTS)['intent']
     
     # Gerar resposta da AVI com base na intenção e contexto do roteiro
     response = generate_avi_response(intent, message, updates, roteiro_data)
@@ -649,12 +722,22 @@ def process_avi_message(message, roteiro_data):
             # Buscar voos na API TravelPayouts
             try:
                 logger.info(f"Buscando voos: {origin} -> {destination}, data: {start_date}")
-                flight_results = travelpayouts_service.search_flights(params={
-                    'originLocationCode': origin, 
-                    'destinationLocationCode': destination,
-                    'departureDate': start_date.split('T')[0] if 'T' in start_date else start_date,
-                    'adults': travelers
-                })
+                departure_date = start_date.split('T')[0] if 'T' in start_date else start_date
+                if intent == "buscar_tudo" and end_date:
+                    # Ida e volta em uma única busca em lote: os blocos são o itinerário combinado mais barato
+                    from services.batch_flight_search import batch_flight_search
+                    batch = batch_flight_search.search([
+                        {'origin': origin, 'destination': destination, 'departure_date': departure_date},
+                        {'origin': destination, 'destination': origin, 'departure_date': end_date.split('T')[0]}
+                    ])
+                    flight_results = [offer for offer in batch['itinerary']['offers'] if offer]
+                else:
+                    flight_results = travelpayouts_service.search_flights(params={
+                        'originLocationCode': origin, 
+                        'destinationLocationCode': destination,
+                        'departureDate': departure_date,
+                        'adults': travelers
+                    })
                 
                 # Se temos resultados, adicionar às atualizações
                 if flight_results and len(flight_results) > 0:
@@ -675,6 +758,8 @@ def process_avi_message(message, roteiro_data):
                         # Para buscar_tudo já está mencionado na resposta principal
                         if intent == "voos":
                             response += f"\n\nEncontrei {len(flight_blocks)} opções de voos para você e já adicionei ao seu roteiro. Você pode ver os detalhes no painel à direita."
+            except Overloaded:
+                raise
             except Exception as e:
                 logger.error(f"Erro ao buscar voos: {str(e)}")
                 if intent == "voos":
@@ -902,26 +987,7 @@ def get_airline_name(airline_code):
     Returns:
         string: Nome da companhia aérea ou None se não encontrado
     """
-    # Mapeamento simplificado de códigos para nomes de companhias
-    airlines = {
-        'LA': 'LATAM',
-        'G3': 'GOL',
-        'AD': 'Azul',
-        'AA': 'American Airlines',
-        'DL': 'Delta',
-        'UA': 'United',
-        'BA': 'British Airways',
-        'LH': 'Lufthansa',
-        'AF': 'Air France',
-        'KL': 'KLM',
-        'IB': 'Iberia',
-        'EK': 'Emirates',
-        'QR': 'Qatar Airways',
-        'TK': 'Turkish Airlines',
-        'AV': 'Avianca'
-    }
-    
-    return airlines.get(airline_code)
+    return iata_tables.airline_name(airline_code)
 
 def calculate_duration(departure_time, arrival_time):
     """
@@ -1022,6 +1088,7 @@ def save_updates_to_database(roteiro_id, updates):
         
         # Salvar alterações
         db.session.commit()
+        roteiro_view.invalidate(roteiro.id)
         
     except Exception as e:
         logger.error(f"Erro ao salvar atualizações no banco de dados: {str(e)}")
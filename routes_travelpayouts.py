@@ -3,7 +3,8 @@ Rotas para integração com a API TravelPayouts
 """
 
 from flask import Blueprint, jsonify, request, render_template, redirect, url_for, session
-from services.travelpayouts_service import TravelPayoutsService
+from services.travelpayouts_service import travelpayouts_service
+from services.admission_control import Overloaded
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,9 +12,6 @@ logger = logging.getLogger(__name__)
 # Criar Blueprint para as rotas do TravelPayouts
 travelpayouts_bp = Blueprint('travelpayouts', __name__)
 
-# Instanciar o serviço
-travelpayouts_service = TravelPayoutsService()
-
 @travelpayouts_bp.route('/search', methods=['GET', 'POST'])
 def search_flights():
     """
@@ -128,6 +126,41 @@ def api_best_prices():
         logger.error(f"Erro na API de melhores preços: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@travelpayouts_bp.route('/api/batch-search', methods=['POST'])
+def api_batch_search():
+    """
+    Busca vários trechos de um roteiro em uma única chamada.
+
+    Corpo JSON:
+    - legs: lista de {"origin", "destination", "departure_date"}
+    - deadline: prazo em segundos (opcional, limitado ao configurado)
+    - limit: ofertas por trecho (opcional, padrão: 10)
+
+    Retorna os resultados de cada trecho e o itinerário combinado mais barato.
+    """
+    from services.batch_flight_search import batch_flight_search, InvalidBatchRequest
+
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'error': 'Dados inválidos'}), 400
+
+    try:
+        deadline = float(data['deadline']) if data.get('deadline') else None
+        limit = max(1, min(int(data.get('limit', 10)), 50))
+    except (TypeError, ValueError):
+        return jsonify({'error': "Parâmetros 'deadline' e 'limit' devem ser numéricos"}), 400
+
+    try:
+        results = batch_flight_search.search(data.get('legs'), deadline=deadline, limit=limit)
+        return jsonify(results)
+    except InvalidBatchRequest as e:
+        return jsonify({'error': str(e)}), 400
+    except Overloaded:
+        raise
+    except Exception as e:
+        logger.error(f"Erro na busca em lote: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @travelpayouts_bp.route('/redirect', methods=['GET'])
 def redirect_to_partner():
     """
@@ -12,6 +12,9 @@ from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify, render_template, current_app
 from services.travelpayouts_rest_api import travelpayouts_api
 from services.travelpayouts_connector import travelpayouts_connector
+from services.async_bridge import async_bridge
+from services.json_provider import EncodedPayloadCache
+from services.admission_control import admission_control, Overloaded
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -23,7 +26,11 @@ widget_api = Blueprint('widget_api', __name__)
 # Na implementação final, utilizar Redis ou outro cache distribuído
 active_searches = {}
 
+# Resultados concluídos já serializados, reaproveitados nas consultas repetidas a /results
+encoded_search_results = EncodedPayloadCache()
+
 @widget_api.route('/search', methods=['POST'])
+@admission_control.limit('search')
 def start_search():
     """
     Inicia uma busca de voos usando a API REST do TravelPayouts.
@@ -34,7 +41,8 @@ def start_search():
         "destination": "JFK",
         "departure_date": "2025-06-01",
         "return_date": "2025-06-15",  // opcional
-        "adults": 1  // opcional, padrão é 1
+        "adults": 1,  // opcional, padrão é 1
+        "async": false  // opcional: se true, a busca roda no event loop de fundo
     }
     
     Response:
@@ -43,6 +51,10 @@ def start_search():
         "message": "Busca iniciada com sucesso",
         "results": [...] // resultados já disponíveis imediatamente
     }
+    
+    Com "async": true a resposta é 202 com status "processing", sem resultados;
+    o cliente acompanha por /status/<search_id> e obtém os voos em /results/<search_id>.
+    A thread do worker fica livre enquanto a busca aguarda o TravelPayouts.
     """
     try:
         # Obter dados da requisição
@@ -57,6 +69,10 @@ def start_search():
         # Gerar ID para a busca
         search_id = str(uuid.uuid4())
         
+        # Busca assíncrona: agendar no event loop de fundo e retornar imediatamente
+        if data.get('async'):
+            return _start_async_search(search_id, data)
+        
         # Iniciar busca de voos diretamente via API REST (sem browser!)
         logger.info(f"Iniciando busca via API REST: {data.get('origin')} → {data.get('destination')}")
         
@@ -93,6 +109,8 @@ def start_search():
                 'results': flight_results  # Já retornamos os resultados direto!
             })
             
+        except Overloaded:
+            raise
         except Exception as e:
             logger.error(f"Erro na API REST: {str(e)}")
             # Armazenar dados da busca com erro
@@ -112,24 +130,88 @@ def start_search():
                 'status': 'error'
             }), 500
         
+    except Overloaded:
+        raise
     except Exception as e:
         logger.error(f"Erro ao processar requisição de busca: {str(e)}")
         return jsonify({
             'error': f'Erro ao iniciar busca: {str(e)}'
         }), 500
 
+def _start_async_search(search_id, data):
+    """
+    Agenda a busca no cliente assíncrono do TravelPayouts e registra o estado
+    em active_searches, atualizado quando a corrotina termina.
+    
+    Args:
+        search_id: ID da busca
+        data: parâmetros recebidos na requisição
+        
+    Returns:
+        Resposta 202 com o ID da busca
+    """
+    from services.travelpayouts_async_api import travelpayouts_async_api
+    
+    logger.info(f"Iniciando busca assíncrona: {data.get('origin')} → {data.get('destination')}")
+    
+    active_searches[search_id] = {
+        'id': search_id,
+        'params': data,
+        'status': 'processing',
+        'message': 'Busca em andamento',
+        'created_at': datetime.utcnow().isoformat(),
+        'results': []
+    }
+    
+    future = async_bridge.submit(travelpayouts_async_api.search_flights(
+        origin=data.get('origin'),
+        destination=data.get('destination'),
+        departure_date=data.get('departure_date'),
+        return_date=data.get('return_date'),
+        adults=data.get('adults', 1)
+    ))
+    
+    def on_done(done_future):
+        search_data = active_searches.get(search_id)
+        if search_data is None:
+            return
+        try:
+            flight_results = done_future.result()
+            search_data.update({
+                'status': 'complete',
+                'message': 'Busca concluída',
+                'completed_at': datetime.utcnow().isoformat(),
+                'results': flight_results
+            })
+            logger.info(f"Busca assíncrona concluída: {search_id} - {len(flight_results)} resultados encontrados")
+        except Exception as e:
+            logger.error(f"Erro na busca assíncrona {search_id}: {str(e)}")
+            search_data.update({
+                'status': 'error',
+                'message': f'Erro na busca: {str(e)}',
+                'error': str(e)
+            })
+    
+    future.add_done_callback(on_done)
+    
+    return jsonify({
+        'search_id': search_id,
+        'message': 'Busca iniciada com sucesso',
+        'status': 'processing'
+    }), 202
+
 @widget_api.route('/status/<search_id>', methods=['GET'])
 def check_status(search_id):
     """
     Verifica o status de uma busca.
-    Com a API REST, as buscas são sempre síncronas e já retornam resultados imediatos,
-    então este endpoint serve apenas para compatibilidade com o código anterior.
+    Buscas síncronas já retornam resultados imediatos; buscas assíncronas
+    ficam em "processing" até a corrotina terminar.
     
     Retorna:
     {
-        "status": "complete|error",
+        "status": "processing|complete|error",
         "message": "Mensagem de status",
-        "progress": 100  // sempre 100% porque a API REST é síncrona
+        "progress": 100  // 50 enquanto a busca assíncrona está em andamento
     }
     """
     # Verificar se a busca existe
@@ -138,17 +220,14 @@ def check_status(search_id):
             'error': 'Busca não encontrada'
         }), 404
     
-    # Obter dados da busca (com API REST, já está concluído)
+    # Obter dados da busca
     search_data = active_searches[search_id]
     
-    # Com a API REST, o status é sempre "complete" ou "error"
-    # Não há estado intermediário, pois a busca é síncrona
-    
     # Retornar status atual
     return jsonify({
         'status': search_data['status'],
         'message': search_data.get('message', 'Busca concluída'),
-        'progress': 100  # Sempre 100% porque já foi processado
+        'progress': 50 if search_data['status'] == 'processing' else 100
     })
 
 @widget_api.route('/results/<search_id>', methods=['GET'])
@@ -192,11 +271,12 @@ def get_results(search_id):
         }), 400
     
     # Retornar resultados (que já foram obtidos na chamada /search)
-    return jsonify({
-        'flights': search_data.get('results', [])
-    })
+    if 'results_payload' not in search_data:
+        search_data['results_payload'] = {'flights': search_data.get('results', [])}
+    return encoded_search_results.response(search_id, search_data['results_payload'], current_app.json)
 
 @widget_api.route('/direct_search', methods=['POST'])
+@admission_control.limit('search')
 def direct_search():
     """
     Endpoint para busca direta de voos usando o conector TravelPayouts.
@@ -253,6 +333,8 @@ def direct_search():
         # Retornar resultados
         return jsonify(results)
     
+    except Overloaded:
+        raise
     except Exception as e:
         logger.error(f"Erro na busca direta: {str(e)}")
         return jsonify({
@@ -260,6 +342,69 @@ def direct_search():
             'data': []
         }), 500
 
+@widget_api.route('/federated_search', methods=['POST'])
+@admission_control.limit('search')
+def federated_search():
+    """
+    Endpoint para busca federada de voos em vários provedores ao mesmo tempo.
+    Retorna o que chegou dentro do prazo, deduplicado e ordenado por preço.
+
+    Request JSON:
+    {
+        "origin": "GRU",
+        "destination": "JFK",
+        "departure_date": "2025-06-01",
+        "return_date": "2025-06-15",  // opcional
+        "adults": 1,  // opcional, padrão é 1
+        "deadline": 5  // opcional, prazo em segundos
+    }
+
+    Response:
+    {
+        "data": [...],  // ofertas normalizadas, da mais barata para a mais cara
+        "meta": {
+            "providers": {...},
+            "timed_out": [...],
+            "failed": [...],
+            ...
+        }
+    }
+    """
+    try:
+        from services.federated_flight_search import federated_flight_search
+
+        data = request.json
+
+        # Validar dados obrigatórios
+        if not data or not all(k in data for k in ['origin', 'destination', 'departure_date']):
+            return jsonify({
+                'error': 'Parâmetros incompletos. Obrigatório: origin, destination, departure_date'
+            }), 400
+
+        deadline = data.get('deadline')
+        if deadline is not None:
+            # O cliente pode reduzir o prazo, mas não ultrapassar o configurado
+            deadline = min(float(deadline), federated_flight_search.deadline)
+
+        results = federated_flight_search.search(
+            origin=data.get('origin'),
+            destination=data.get('destination'),
+            departure_date=data.get('departure_date'),
+            return_date=data.get('return_date'),
+            adults=data.get('adults', 1),
+            currency=data.get('currency', 'BRL'),
+            deadline=deadline
+        )
+
+        return jsonify(results)
+
+    except Exception as e:
+        logger.error(f"Erro na busca federada: {str(e)}")
+        return jsonify({
+            'error': f'Erro na busca: {str(e)}',
+            'data': []
+        }), 500
+
 @widget_api.route('/demo_search', methods=['GET'])
 def demo_search():
     """
@@ -0,0 +1,68 @@
+"""
+Autenticação das rotas administrativas (routes_admin)
+As rotas de operação (cache de prompt, aquecedor do cache de preços, controle de
+admissão e estado do banco) usam um token próprio, separado do token do profiler:
+habilitar o profiler não dá acesso a essas rotas, e vice-versa.
+
+O token é aceito apenas no cabeçalho X-Avi-Admin (um parâmetro na URL iria para
+os logs de acesso e para o cabeçalho Referer) e comparado em tempo constante.
+
+Configuração (variáveis de ambiente):
+- AVI_ADMIN_TOKEN: token de administrador; sem ele, as rotas respondem 403
+"""
+
+import os
+import hmac
+import logging
+from functools import wraps
+
+from flask import jsonify, request
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Cabeçalho com o token de administrador
+ADMIN_HEADER = 'X-Avi-Admin'
+
+
+class AdminAuth:
+    """
+    Verificação do token de administrador das rotas de operação.
+    """
+
+    def __init__(self):
+        """Lê o token do ambiente"""
+        self.token = os.environ.get('AVI_ADMIN_TOKEN')
+
+    def is_authorized(self, provided_token):
+        """
+        Verifica o token de administrador
+
+        Args:
+            provided_token: token enviado pelo cliente
+
+        Returns:
+            bool: True se o token confere com AVI_ADMIN_TOKEN
+        """
+        if not self.token or not provided_token:
+            return False
+        return hmac.compare_digest(provided_token.encode('utf-8'), self.token.encode('utf-8'))
+
+    def required(self, view):
+        """
+        Decorador de rota: responde 403 sem o token de administrador no cabeçalho
+
+        Args:
+            view: função da rota
+        """
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.is_authorized(request.headers.get(ADMIN_HEADER)):
+                logger.warning(f"Acesso administrativo negado a {request.path}")
+                return jsonify({'error': 'Não autorizado'}), 403
+            return view(*args, **kwargs)
+        return wrapper
+
+
+# Instância global
+admin_auth = AdminAuth()
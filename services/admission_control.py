@@ -0,0 +1,355 @@
+"""
+Controle de admissão e limite de concorrência por fornecedor
+Duas camadas para que um pico de tráfego seja recusado rapidamente (429 com
+Retry-After) em vez de esgotar as cotas do TravelPayouts/OpenAI e acumular threads
+do worker bloqueadas esperando a rede:
+- admissão nas rotas de chat e de busca: token buckets por sessão
+  (cookie flai_session_id) e por IP, verificados antes de a rota executar;
+- no transporte HTTP dos clientes: um limite de chamadas simultâneas por
+  fornecedor, com uma fila de espera limitada. Com a fila cheia, ou passado o
+  tempo máximo de espera, a chamada falha imediatamente com Overloaded.
+
+Overloaded é convertida em 429 por um errorhandler registrado em init_app.
+
+Configuração (variáveis de ambiente):
+- AVI_ADMISSION: "true" (padrão) ou "false" para desativar a admissão nas rotas
+- AVI_ADMISSION_CHAT_SESSION_PER_MINUTE / AVI_ADMISSION_CHAT_IP_PER_MINUTE:
+  mensagens do chat por minuto por sessão e por IP (padrão: 20 / 60)
+- AVI_ADMISSION_SEARCH_SESSION_PER_MINUTE / AVI_ADMISSION_SEARCH_IP_PER_MINUTE:
+  buscas por minuto por sessão e por IP (padrão: 10 / 30)
+- AVI_ADMISSION_BURST_SECONDS: rajada permitida, em segundos de cota (padrão: 15)
+- AVI_ADMISSION_MAX_KEYS: buckets de sessão/IP mantidos em memória (padrão: 10000)
+- AVI_UPSTREAM_LIMITS: chamadas simultâneas por fornecedor, no formato
+  "travelpayouts=20,openai=10" (padrão: esses valores; demais fornecedores: 20)
+- AVI_UPSTREAM_QUEUE_SIZE: chamadas aguardando vaga por fornecedor (padrão: 20)
+- AVI_UPSTREAM_QUEUE_TIMEOUT: segundos máximos de espera por uma vaga (padrão: 2)
+"""
+
+import os
+import math
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager, asynccontextmanager
+from functools import wraps
+
+from flask import jsonify, request
+
+from services.rate_limiter import TokenBucket
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Cookie da sessão do chat (o mesmo de /api/chat)
+SESSION_COOKIE = 'flai_session_id'
+
+# Limites padrão por grupo de rotas: (por sessão, por IP) em requisições por minuto
+DEFAULT_POLICIES = {
+    'chat': (20, 60),
+    'search': (10, 30),
+}
+
+# Chamadas simultâneas padrão por fornecedor
+DEFAULT_UPSTREAM_LIMITS = {'travelpayouts': 20, 'openai': 10}
+DEFAULT_UPSTREAM_LIMIT = 20
+
+# Intervalo de verificação das esperas assíncronas por vaga
+ASYNC_POLL_INTERVAL = 0.05
+
+
+class Overloaded(Exception):
+    """Requisição recusada por excesso de carga (convertida em 429)"""
+
+    def __init__(self, message, retry_after=1.0, scope=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.scope = scope
+
+
+class UpstreamLimiter:
+    """
+    Limite de chamadas simultâneas a um fornecedor, com fila de espera limitada.
+    Compartilhado pelas threads do worker e pelo event loop da ponte assíncrona.
+    """
+
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout):
+        """
+        Inicializa o limitador sem chamadas em andamento
+
+        Args:
+            name: nome do fornecedor
+            max_concurrent: chamadas simultâneas permitidas
+            max_queue: chamadas que podem aguardar uma vaga
+            queue_timeout: segundos máximos de espera por uma vaga
+        """
+        self.name = name
+        self.max_concurrent = int(max_concurrent)
+        self.max_queue = int(max_queue)
+        self.queue_timeout = float(queue_timeout)
+
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+        self.stats = {'admitted': 0, 'queued': 0, 'rejected_queue_full': 0, 'rejected_timeout': 0}
+
+    def _busy(self, reason):
+        """Exceção de fornecedor saturado"""
+        return Overloaded(f"Fornecedor '{self.name}' sobrecarregado ({reason})",
+                          retry_after=max(1.0, self.queue_timeout), scope=f"upstream:{self.name}")
+
+    def _enter_queue(self):
+        """Entra na fila de espera ou recusa se estiver cheia (chamar com o lock)"""
+        if self.waiting >= self.max_queue:
+            self.stats['rejected_queue_full'] += 1
+            raise self._busy('fila cheia')
+        self.waiting += 1
+        self.stats['queued'] += 1
+
+    def acquire(self):
+        """
+        Ocupa uma vaga, aguardando na fila se necessário
+
+        Raises:
+            Overloaded: fila cheia ou tempo de espera esgotado
+        """
+        with self._cond:
+            if self.active < self.max_concurrent:
+                self.active += 1
+                self.stats['admitted'] += 1
+                return
+
+            self._enter_queue()
+            try:
+                admitted = self._cond.wait_for(lambda: self.active < self.max_concurrent,
+                                               timeout=self.queue_timeout)
+            finally:
+                self.waiting -= 1
+            if not admitted:
+                self.stats['rejected_timeout'] += 1
+                raise self._busy('tempo de espera esgotado')
+            self.active += 1
+            self.stats['admitted'] += 1
+
+    async def acquire_async(self):
+        """
+        Versão para corrotinas de acquire (aguarda sem bloquear o event loop)
+
+        Raises:
+            Overloaded: fila cheia ou tempo de espera esgotado
+        """
+        with self._cond:
+            if self.active < self.max_concurrent:
+                self.active += 1
+                self.stats['admitted'] += 1
+                return
+            self._enter_queue()
+
+        deadline = time.monotonic() + self.queue_timeout
+        try:
+            while True:
+                await asyncio.sleep(ASYNC_POLL_INTERVAL)
+                with self._cond:
+                    if self.active < self.max_concurrent:
+                        self.active += 1
+                        self.stats['admitted'] += 1
+                        return
+                    if time.monotonic() >= deadline:
+                        self.stats['rejected_timeout'] += 1
+                        raise self._busy('tempo de espera esgotado')
+        finally:
+            with self._cond:
+                self.waiting -= 1
+
+    def release(self):
+        """Libera a vaga ocupada por acquire/acquire_async"""
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        """Bloco executado com uma vaga ocupada"""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def async_slot(self):
+        """Bloco assíncrono executado com uma vaga ocupada"""
+        await self.acquire_async()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def snapshot(self):
+        """Ocupação e contadores"""
+        with self._cond:
+            return {'active': self.active, 'waiting': self.waiting, 'max_concurrent': self.max_concurrent,
+                    'max_queue': self.max_queue, **self.stats}
+
+
+def _parse_limits(value):
+    """Converte "travelpayouts=20,openai=10" em dict"""
+    limits = dict(DEFAULT_UPSTREAM_LIMITS)
+    for item in (value or '').split(','):
+        name, _, limit = item.partition('=')
+        if name.strip() and limit.strip().isdigit():
+            limits[name.strip()] = int(limit)
+    return limits
+
+
+# Limitadores compartilhados no processo, por fornecedor
+_upstream_limiters = {}
+_upstream_lock = threading.Lock()
+
+
+def upstream_limiter(name):
+    """
+    Retorna o limitador compartilhado do fornecedor, criando-o se necessário
+
+    Args:
+        name: nome do fornecedor ("travelpayouts", "openai"...)
+
+    Returns:
+        UpstreamLimiter: limitador do fornecedor
+    """
+    with _upstream_lock:
+        limiter = _upstream_limiters.get(name)
+        if limiter is None:
+            limits = _parse_limits(os.environ.get('AVI_UPSTREAM_LIMITS'))
+            limiter = UpstreamLimiter(
+                name,
+                max_concurrent=limits.get(name, DEFAULT_UPSTREAM_LIMIT),
+                max_queue=int(os.environ.get('AVI_UPSTREAM_QUEUE_SIZE', '20')),
+                queue_timeout=float(os.environ.get('AVI_UPSTREAM_QUEUE_TIMEOUT', '2'))
+            )
+            _upstream_limiters[name] = limiter
+            logger.info(f"Limite de concorrência '{name}': {limiter.max_concurrent} simultâneas, "
+                        f"fila de {limiter.max_queue}")
+        return limiter
+
+
+class AdmissionControl:
+    """
+    Token buckets por sessão e por IP para os grupos de rotas.
+    """
+
+    def __init__(self):
+        """Inicializa os buckets vazios com as configurações do ambiente"""
+        self.enabled = os.environ.get('AVI_ADMISSION', 'true').lower() == 'true'
+        self.burst_seconds = float(os.environ.get('AVI_ADMISSION_BURST_SECONDS', '15'))
+        self.max_keys = int(os.environ.get('AVI_ADMISSION_MAX_KEYS', '10000'))
+
+        # grupo → {"session": por minuto, "ip": por minuto}
+        self.policies = {}
+        for group, (session_limit, ip_limit) in DEFAULT_POLICIES.items():
+            prefix = f"AVI_ADMISSION_{group.upper()}"
+            self.policies[group] = {
+                'session': float(os.environ.get(f"{prefix}_SESSION_PER_MINUTE", str(session_limit))),
+                'ip': float(os.environ.get(f"{prefix}_IP_PER_MINUTE", str(ip_limit)))
+            }
+
+        # (grupo, escopo, chave) → TokenBucket, com descarte dos menos usados
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats = {'admitted': 0, 'rejected': 0}
+
+    def init_app(self, app):
+        """
+        Registra o tratamento de Overloaded (429 com Retry-After)
+
+        Args:
+            app: aplicação Flask
+        """
+        @app.errorhandler(Overloaded)
+        def _overloaded(error):
+            response = jsonify({
+                'success': False,
+                'error': 'Muitas solicitações no momento. Por favor, tente novamente em instantes.',
+                'retry_after': int(math.ceil(error.retry_after))
+            })
+            response.status_code = 429
+            response.headers['Retry-After'] = str(max(1, int(math.ceil(error.retry_after))))
+            return response
+
+    def _bucket(self, group, scope, key, per_minute):
+        """Bucket da chave (criado cheio no primeiro uso)"""
+        bucket_key = (group, scope, key)
+        with self._lock:
+            bucket = self._buckets.get(bucket_key)
+            if bucket is None:
+                rate = per_minute / 60.0
+                bucket = TokenBucket(rate, capacity=max(1.0, rate * self.burst_seconds))
+                self._buckets[bucket_key] = bucket
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(bucket_key)
+            return bucket
+
+    def check(self, group, session_key=None, ip=None):
+        """
+        Consome a cota da requisição no IP e na sessão
+
+        Args:
+            group: grupo de rotas ("chat" ou "search")
+            session_key: ID da sessão (opcional)
+            ip: endereço do cliente (opcional)
+
+        Raises:
+            Overloaded: cota do IP ou da sessão esgotada
+        """
+        if not self.enabled:
+            return
+        policy = self.policies[group]
+        for scope, key in (('ip', ip), ('session', session_key)):
+            if not key or policy[scope] <= 0:
+                continue
+            bucket = self._bucket(group, scope, key, policy[scope])
+            if not bucket.try_acquire():
+                self.stats['rejected'] += 1
+                retry_after = bucket.wait_time()
+                logger.warning(f"Requisição recusada ({group}, limite por {scope}); nova tentativa em {retry_after:.1f}s")
+                raise Overloaded(f"Limite de requisições por {scope} excedido", retry_after=retry_after,
+                                 scope=f"{group}:{scope}")
+        self.stats['admitted'] += 1
+
+    def limit(self, group):
+        """
+        Decorador de rota: aplica a admissão do grupo antes de executar a rota
+
+        Args:
+            group: grupo de rotas ("chat" ou "search")
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                self.check(group, session_key=request.cookies.get(SESSION_COOKIE), ip=request.remote_addr)
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        """Configuração, contadores e ocupação dos fornecedores"""
+        with self._lock:
+            buckets = len(self._buckets)
+        with _upstream_lock:
+            upstreams = dict(_upstream_limiters)
+        return {
+            'enabled': self.enabled,
+            'policies': self.policies,
+            'buckets': buckets,
+            'upstreams': {name: limiter.snapshot() for name, limiter in upstreams.items()},
+            **self.stats
+        }
+
+
+# Instância global do controle de admissão
+admission_control = AdmissionControl()
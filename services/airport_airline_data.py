@@ -1,5 +1,8 @@
 """
 Serviço para fornecer informações sobre aeroportos e companhias aéreas
+As consultas usam as tabelas geradas de services.iata_tables; os dicionários
+abaixo são os dados revisados manualmente, que prevalecem sobre os gerados e
+servem de base quando o arquivo gerado não existe.
 """
 
 # Mapeamento de códigos IATA para nomes de aeroportos e cidades
@@ -73,78 +76,86 @@ AIRLINE_DATA = {
     "KL": {"name": "KLM", "country": "Holanda"},
 }
 
-def get_airport_info(iata_code):
+def get_airport_info(iata_code, locale='pt'):
     """
     Retorna informações sobre o aeroporto com base no código IATA
     
     Args:
         iata_code: Código IATA do aeroporto (ex: GRU, MIA)
+        locale: idioma dos nomes ('pt' ou 'en')
         
     Returns:
         dict: Informações do aeroporto ou dicionário vazio se não encontrado
     """
+    from services.iata_tables import iata_tables
+
     if not iata_code:
         return {}
         
     iata_code = iata_code.upper()
-    if iata_code in AIRPORT_DATA:
-        return AIRPORT_DATA[iata_code]
+    info = iata_tables.airport(iata_code, locale)
+    if info:
+        return info
     else:
         # Se não encontrarmos o aeroporto, retornamos um objeto com o código
         return {"name": f"Aeroporto {iata_code}", "city": iata_code, "country": ""}
 
-def get_airline_info(iata_code):
+def get_airline_info(iata_code, locale='pt'):
     """
     Retorna informações sobre a companhia aérea com base no código IATA
     
     Args:
         iata_code: Código IATA da companhia aérea (ex: G3, AA)
+        locale: idioma do nome ('pt' ou 'en')
         
     Returns:
         dict: Informações da companhia ou dicionário vazio se não encontrado
     """
+    from services.iata_tables import iata_tables
+
     if not iata_code:
         return {}
         
     iata_code = iata_code.upper()
-    if iata_code in AIRLINE_DATA:
-        return AIRLINE_DATA[iata_code]
+    name = iata_tables.airline_name(iata_code, locale)
+    if name:
+        return {"name": name, "country": AIRLINE_DATA.get(iata_code, {}).get("country", "")}
     else:
         # Se não encontrarmos a companhia, retornamos um objeto com o código
         return {"name": f"Companhia {iata_code}", "country": ""}
 
-def get_airport_display_name(iata_code):
+def get_airport_display_name(iata_code, locale='pt'):
     """
-    Retorna o nome de exibição do aeroporto (Cidade - Nome do Aeroporto)
+    Retorna o nome de exibição do aeroporto (Cidade (COD))
     
     Args:
         iata_code: Código IATA do aeroporto
+        locale: idioma do nome da cidade ('pt' ou 'en')
         
     Returns:
         str: Nome para exibição ou o próprio código se não encontrado
     """
-    if not iata_code:
-        return ""
-        
-    info = get_airport_info(iata_code)
-    if info and info.get("city"):
-        return f"{info['city']} ({iata_code})"
-    return iata_code
+    from services.iata_tables import iata_tables
+
+    return iata_tables.airport_display_name(iata_code, locale)
 
-def get_airline_display_name(iata_code):
+def get_airline_display_name(iata_code, locale='pt'):
     """
-    Retorna o nome de exibição da companhia aérea
+    Retorna o nome de exibição da companhia aérea (Nome (COD))
     
     Args:
         iata_code: Código IATA da companhia aérea
+        locale: idioma do nome ('pt' ou 'en')
         
     Returns:
         str: Nome para exibição ou o próprio código se não encontrado
     """
+    from services.iata_tables import iata_tables
+
     if not iata_code:
         return ""
         
-    info = get_airline_info(iata_code)
-    if info and info.get("name"):
-        return f"{info['name']} ({iata_code})"
-    return iata_code
\ No newline at end of file
+    name = iata_tables.airline_name(iata_code, locale)
+    if name:
+        return f"{name} ({iata_code.upper()})"
+    return iata_code
@@ -2,11 +2,26 @@
 """
 Serviço Amadeus baseado no SDK oficial da Amadeus
 https://github.com/amadeus4dev/amadeus-python
+
+Configuração (variáveis de ambiente):
+- AMADEUS_RATE_LIMIT_PER_SEC: chamadas por segundo por credencial (padrão: 10)
+- AMADEUS_MAX_CONCURRENCY: consultas por data em paralelo por varredura (padrão: 5)
+- AMADEUS_SCAN_DEADLINE: prazo total, em segundos, da varredura de datas de
+  search_best_prices; as datas sem resposta até lá ficam de fora do resultado
+  parcial (padrão: 15). Não é um timeout por chamada: a chamada em andamento
+  termina no timeout HTTP do SDK (AMADEUS_SDK_TIMEOUT, ver amadeus_token_manager).
+
+Cada varredura usa seu próprio conjunto de threads: chamadas atrasadas não ocupam
+vagas das varreduras seguintes.
 """
 import os
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
-from amadeus import Client, ResponseError
+from amadeus import ResponseError
+from services.amadeus_token_manager import amadeus_token_manager, DEFAULT_BASE_URL
+from services.rate_limiter import get_bucket
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -27,13 +42,21 @@ class AmadeusSDKService:
         self.auth_token = None
         self.token_expiry = None
         
+        # Cota de chamadas por segundo (compartilhada por credencial) e prazo total da varredura de datas
+        rate = float(os.environ.get('AMADEUS_RATE_LIMIT_PER_SEC', '10'))
+        self.rate_limiter = get_bucket(f"amadeus:{self.api_key or 'anon'}", rate)
+        self.scan_deadline = float(os.environ.get('AMADEUS_SCAN_DEADLINE', '15'))
+        self.max_concurrency = int(os.environ.get('AMADEUS_MAX_CONCURRENCY', '5'))
+        
         # Inicializar o cliente Amadeus com o SDK oficial
         if self.api_key and self.api_secret:
             try:
-                self.client = Client(
-                    client_id=self.api_key,
-                    client_secret=self.api_secret,
-                    logger=logger
+                # Cliente do SDK compartilhado por credencial (token gerenciado no processo)
+                self.client = amadeus_token_manager.get_client(
+                    self.api_key,
+                    self.api_secret,
+                    DEFAULT_BASE_URL,
+                    sdk_logger=logger
                 )
                 logger.info(f"Amadeus SDK inicializado com sucesso")
                 logger.info(f"API Key configurada: {self.api_key[:3]}...{self.api_key[-4:]}")
@@ -51,48 +74,14 @@ class AmadeusSDKService:
         Returns:
             str: Token de autenticação ou None em caso de erro
         """
-        try:
-            # Verificar se já temos um token válido
-            if self.auth_token and self.token_expiry and datetime.now() < self.token_expiry:
-                logger.info("Usando token de autenticação existente")
-                return self.auth_token
-                
-            # Verificar se temos credenciais
-            if not self.api_key or not self.api_secret:
-                logger.error("Credenciais ausentes para obtenção de token")
-                return None
-                
-            # Requisição para obter token via API REST
-            import requests
-            
-            auth_url = "https://test.api.amadeus.com/v1/security/oauth2/token"
-            payload = {
-                "grant_type": "client_credentials",
-                "client_id": self.api_key,
-                "client_secret": self.api_secret
-            }
-            
-            response = requests.post(
-                auth_url,
-                data=payload,
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
-            
-            if response.status_code == 200:
-                token_data = response.json()
-                self.auth_token = token_data.get("access_token")
-                expires_in = token_data.get("expires_in", 1800)  # Padrão 30 minutos
-                self.token_expiry = datetime.now() + timedelta(seconds=expires_in)
-                
-                logger.info(f"Novo token obtido, válido até {self.token_expiry}")
-                return self.auth_token
-            else:
-                logger.error(f"Erro ao obter token: {response.status_code} - {response.text}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Exceção ao obter token de autenticação: {str(e)}")
+        # Token compartilhado por todas as instâncias (cache + renovação proativa)
+        token_info = amadeus_token_manager.get_token_info(self.api_key, self.api_secret, DEFAULT_BASE_URL)
+        if not token_info:
             return None
+        
+        self.auth_token = token_info['token']
+        self.token_expiry = datetime.fromtimestamp(token_info['expires_at'])
+        return self.auth_token
     
     def search_flights(self, params):
         """
@@ -479,108 +468,11 @@ class AmadeusSDKService:
                 # Ordenar datas cronologicamente
                 dates_to_check.sort()
             
-            # Buscar preços para cada data
-            best_prices = []
+            # Buscar preços para as datas em paralelo, respeitando a cota da API
             logger.info(f"Verificando preços para {len(dates_to_check)} datas")
-            
-            for date in dates_to_check:
-                # Para cada data, buscar a oferta de voo mais barata
-                logger.info(f"Buscando preço para {date}")
-                flight_params = {
-                    'originLocationCode': origin,
-                    'destinationLocationCode': destination,
-                    'departureDate': date,
-                    'adults': adults,
-                    'currencyCode': currency,
-                    'max': 1  # Apenas o melhor preço
-                }
-                
-                try:
-                    # Realizar a busca de voo para esta data específica
-                    response = self.client.shopping.flight_offers_search.get(**flight_params)
-                    
-                    if hasattr(response, 'data') and response.data:
-                        flight = response.data[0]  # Pegar apenas o primeiro resultado (mais barato)
-                        
-                        # Extrair preço da oferta
-                        price = float(flight['price']['total'])
-                        
-                        # Construir objeto com informações do voo
-                        flight_info = {
-                            'date': date,
-                            'price': price,
-                            'airline': '',
-                            'flight_number': '',
-                            'departure_time': '',
-                            'arrival_time': '',
-                            'duration': '',
-                            'origin': origin,
-                            'destination': destination,
-                            'origin_info': None,
-                            'destination_info': None,
-                            'provider': 'Amadeus API',
-                            'details': flight
-                        }
-                        
-                        # Extrair detalhes adicionais do voo
-                        if 'itineraries' in flight and flight['itineraries']:
-                            itinerary = flight['itineraries'][0]
-                            
-                            # Extrair duração do voo
-                            if 'duration' in itinerary:
-                                duration_str = itinerary['duration']
-                                
-                                # Converter formato PT10H30M para 10h 30min
-                                hours_match = duration_str.find('H')
-                                minutes_match = duration_str.find('M')
-                                
-                                if hours_match > 0:
-                                    hours = duration_str[2:hours_match]
-                                    minutes = '0'
-                                    if minutes_match > 0:
-                                        minutes = duration_str[hours_match+1:minutes_match]
-                                    flight_info['duration'] = f"{hours}h {minutes}min"
-                            
-                            # Extrair informações dos segmentos do voo
-                            if 'segments' in itinerary and itinerary['segments']:
-                                segment = itinerary['segments'][0]
-                                
-                                if 'carrierCode' in segment:
-                                    flight_info['airline'] = segment['carrierCode']
-                                
-                                if 'number' in segment:
-                                    flight_info['flight_number'] = segment['number']
-                                
-                                if 'departure' in segment and 'at' in segment['departure']:
-                                    departure_datetime = segment['departure']['at']
-                                    # Extrair hora da data completa (formato: 2023-10-25T10:30:00)
-                                    if 'T' in departure_datetime:
-                                        departure_time = departure_datetime.split('T')[1][:5]
-                                        flight_info['departure_time'] = departure_time
-                                
-                                if 'arrival' in segment and 'at' in segment['arrival']:
-                                    arrival_datetime = segment['arrival']['at']
-                                    # Extrair hora da data completa
-                                    if 'T' in arrival_datetime:
-                                        arrival_time = arrival_datetime.split('T')[1][:5]
-                                        flight_info['arrival_time'] = arrival_time
-                        
-                        # Adicionar links de compra
-                        flight_info['purchaseLinks'] = self._generate_purchase_links(flight, flight_params)
-                        
-                        # Adicionar à lista de melhores preços
-                        best_prices.append(flight_info)
-                        logger.info(f"Preço encontrado para {date}: {price} {currency}")
-                    else:
-                        logger.warning(f"Nenhuma oferta encontrada para {date}")
-                
-                except ResponseError as error:
-                    logger.warning(f"Erro ao buscar preço para {date}: {error}")
-                    continue
-                    
-                except Exception as e:
-                    logger.warning(f"Erro ao processar resultado para {date}: {str(e)}")
-                    continue
+            best_prices, missing_dates = self._check_dates_concurrently(
+                dates_to_check, origin, destination, adults, currency
+            )
             
             # Ordenar por preço
             if best_prices:
@@ -594,7 +486,10 @@ class AmadeusSDKService:
                     "origin": origin,
                     "destination": destination,
                     "currency": currency,
-                    "best_prices": best_prices
+                    "best_prices": best_prices,
+                    "dates_checked": len(dates_to_check),
+                    "partial": bool(missing_dates),
+                    "missing_dates": missing_dates
                 }
                 
                 return result
@@ -606,6 +501,176 @@ class AmadeusSDKService:
             logger.error(f"Erro ao buscar melhores preços: {str(e)}")
             return {"error": f"Erro ao buscar melhores preços: {str(e)}", "data": []}
             
+    def _check_dates_concurrently(self, dates_to_check, origin, destination, adults, currency):
+        """
+        Consulta a oferta mais barata de cada data em paralelo.
+        
+        Cada chamada consome um token do bucket compartilhado da credencial
+        (AMADEUS_RATE_LIMIT_PER_SEC) antes de ir à API. As datas que não
+        terminarem dentro do prazo total da varredura (AMADEUS_SCAN_DEADLINE) são descartadas e o
+        resultado parcial é retornado.
+        
+        Args:
+            dates_to_check: lista de datas (YYYY-MM-DD)
+            origin: código IATA da origem
+            destination: código IATA do destino
+            adults: número de adultos
+            currency: moeda
+            
+        Returns:
+            tuple: (lista de melhores preços encontrados, datas sem resposta no prazo)
+        """
+        if not dates_to_check:
+            return [], []
+        deadline = time.monotonic() + self.scan_deadline
+        
+        # Threads da varredura: datas atrasadas não prendem vagas de outras varreduras
+        executor = ThreadPoolExecutor(max_workers=min(len(dates_to_check), self.max_concurrency),
+                                      thread_name_prefix='amadeus-dates')
+        try:
+            futures = {
+                executor.submit(self._fetch_best_price_for_date, date, origin, destination, adults, currency, deadline): date
+                for date in dates_to_check
+            }
+            done, not_done = wait(futures, timeout=max(0, deadline - time.monotonic()))
+        finally:
+            # Não esperar pelas chamadas em andamento; as que nem começaram são canceladas
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        best_prices = []
+        for future in done:
+            try:
+                flight_info = future.result()
+            except Exception as e:
+                logger.warning(f"Erro inesperado ao buscar preço para {futures[future]}: {str(e)}")
+                continue
+            if flight_info:
+                best_prices.append(flight_info)
+        
+        # A chamada em andamento termina no timeout HTTP do SDK; o resultado tardio é descartado
+        missing_dates = sorted(futures[future] for future in not_done)
+        if missing_dates:
+            logger.warning(f"Prazo da varredura ({self.scan_deadline}s) excedido para as datas: {', '.join(missing_dates)}")
+        
+        return best_prices, missing_dates
+    
+    def _fetch_best_price_for_date(self, date, origin, destination, adults, currency, deadline):
+        """
+        Busca a oferta mais barata de uma data específica
+        
+        Args:
+            date: data de partida (YYYY-MM-DD)
+            origin: código IATA da origem
+            destination: código IATA do destino
+            adults: número de adultos
+            currency: moeda
+            deadline: instante limite (time.monotonic) para iniciar a chamada
+            
+        Returns:
+            dict: informações do voo mais barato ou None
+        """
+        # Aguardar a cota da API sem ultrapassar o prazo da busca
+        if not self.rate_limiter.acquire(timeout=max(0, deadline - time.monotonic())):
+            logger.warning(f"Cota da API esgotada até o prazo; data {date} ignorada")
+            return None
+        
+        logger.info(f"Buscando preço para {date}")
+        flight_params = {
+            'originLocationCode': origin,
+            'destinationLocationCode': destination,
+            'departureDate': date,
+            'adults': adults,
+            'currencyCode': currency,
+            'max': 1  # Apenas o melhor preço
+        }
+        
+        try:
+            # Realizar a busca de voo para esta data específica
+            response = self.client.shopping.flight_offers_search.get(**flight_params)
+            
+            if hasattr(response, 'data') and response.data:
+                flight = response.data[0]  # Pegar apenas o primeiro resultado (mais barato)
+                
+                # Extrair preço da oferta
+                price = float(flight['price']['total'])
+                
+                # Construir objeto com informações do voo
+                flight_info = {
+                    'date': date,
+                    'price': price,
+                    'airline': '',
+                    'flight_number': '',
+                    'departure_time': '',
+                    'arrival_time': '',
+                    'duration': '',
+                    'origin': origin,
+                    'destination': destination,
+                    'origin_info': None,
+                    'destination_info': None,
+                    'provider': 'Amadeus API',
+                    'details': flight
+                }
+                
+                # Extrair detalhes adicionais do voo
+                if 'itineraries' in flight and flight['itineraries']:
+                    itinerary = flight['itineraries'][0]
+                    
+                    # Extrair duração do voo
+                    if 'duration' in itinerary:
+                        duration_str = itinerary['duration']
+                        
+                        # Converter formato PT10H30M para 10h 30min
+                        hours_match = duration_str.find('H')
+                        minutes_match = duration_str.find('M')
+                        
+                        if hours_match > 0:
+                            hours = duration_str[2:hours_match]
+                            minutes = '0'
+                            if minutes_match > 0:
+                                minutes = duration_str[hours_match+1:minutes_match]
+                            flight_info['duration'] = f"{hours}h {minutes}min"
+                    
+                    # Extrair informações dos segmentos do voo
+                    if 'segments' in itinerary and itinerary['segments']:
+                        segment = itinerary['segments'][0]
+                        
+                        if 'carrierCode' in segment:
+                            flight_info['airline'] = segment['carrierCode']
+                        
+                        if 'number' in segment:
+                            flight_info['flight_number'] = segment['number']
+                        
+                        if 'departure' in segment and 'at' in segment['departure']:
+                            departure_datetime = segment['departure']['at']
+                            # Extrair hora da data completa (formato: 2023-10-25T10:30:00)
+                            if 'T' in departure_datetime:
+                                departure_time = departure_datetime.split('T')[1][:5]
+                                flight_info['departure_time'] = departure_time
+                        
+                        if 'arrival' in segment and 'at' in segment['arrival']:
+                            arrival_datetime = segment['arrival']['at']
+                            # Extrair hora da data completa
+                            if 'T' in arrival_datetime:
+                                arrival_time = arrival_datetime.split('T')[1][:5]
+                                flight_info['arrival_time'] = arrival_time
+                
+                # Adicionar links de compra
+                flight_info['purchaseLinks'] = self._generate_purchase_links(flight, flight_params)
+                
+                logger.info(f"Preço encontrado para {date}: {price} {currency}")
+                return flight_info
+            else:
+                logger.warning(f"Nenhuma oferta encontrada para {date}")
+                return None
+        
+        except ResponseError as error:
+            logger.warning(f"Erro ao buscar preço para {date}: {error}")
+            return None
+            
+        except Exception as e:
+            logger.warning(f"Erro ao processar resultado para {date}: {str(e)}")
+            return None
+
     def _get_airport_info(self, airport_codes):
         """
         Busca informações detalhadas sobre aeroportos pelo código IATA
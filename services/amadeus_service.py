@@ -6,7 +6,8 @@ import re
 import logging
 import requests
 from datetime import datetime, timedelta
-from amadeus import Client, ResponseError
+from amadeus import ResponseError
+from services.amadeus_token_manager import amadeus_token_manager
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -30,10 +31,12 @@ class AmadeusService:
         # Inicializar o cliente
         if self.api_key and self.api_secret:
             try:
-                self.client = Client(
-                    client_id=self.api_key,
-                    client_secret=self.api_secret,
-                    logger=logger
+                # Cliente do SDK compartilhado por credencial (token gerenciado no processo)
+                self.client = amadeus_token_manager.get_client(
+                    self.api_key,
+                    self.api_secret,
+                    self.base_url,
+                    sdk_logger=logger
                 )
                 logger.info(f"AmadeusService inicializado - Ambiente: {'Produção' if self.is_production else 'Teste'}")
                 logger.info(f"URL Base: {self.base_url}")
@@ -53,37 +56,8 @@ class AmadeusService:
             logger.error("Cliente Amadeus não inicializado. Verifique as credenciais.")
             return None
         
-        # Implementação direta para obter token via API OAuth
-        try:
-            logger.info("Obtendo token de autenticação Amadeus via API direta")
-            
-            # Usar diretamente a API OAuth em vez do SDK
-            url = "https://test.api.amadeus.com/v1/security/oauth2/token"
-            payload = {
-                "grant_type": "client_credentials",
-                "client_id": self.api_key,
-                "client_secret": self.api_secret
-            }
-            
-            response = requests.post(url, data=payload)
-            response.raise_for_status()
-            token_data = response.json()
-            
-            token = token_data.get('access_token')
-            expires_in = token_data.get('expires_in')
-            
-            if token:
-                logger.info(f"Token obtido com sucesso. Expira em {expires_in} segundos.")
-                # Mascarar o token ao exibir no log
-                masked_token = f"{token[:5]}...{token[-5:]}" if len(token) > 10 else "***"
-                return token
-            else:
-                logger.error("Falha ao obter token de autenticação")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Erro ao obter token de autenticação: {str(e)}")
-            return None
+        # Token compartilhado por todas as instâncias (cache + renovação proativa)
+        return amadeus_token_manager.get_token(self.api_key, self.api_secret, self.base_url)
     
     def search_flights(self, params):
         """
@@ -201,6 +175,8 @@ class AmadeusService:
                     # Verificar erros específicos
                     if status_code == 401:
                         logger.error("Problema com permissões da API: A chave API não tem acesso a este endpoint")
+                        # Descartar o token em cache para que a próxima chamada obtenha um novo
+                        amadeus_token_manager.invalidate(self.api_key, self.api_secret, self.base_url)
                         return {"error": "Permissão de API insuficiente", "data": []}
                     elif status_code == 400:
                         logger.error(f"Erro nos parâmetros: {error_details}")
@@ -6,6 +6,7 @@ import logging
 import time
 from datetime import datetime, timedelta
 from requests.adapters import HTTPAdapter
+from services.amadeus_token_manager import amadeus_token_manager
 
 # Configurar logger específico para o módulo
 logger = logging.getLogger('amadeus_service')
@@ -69,66 +70,16 @@ class AmadeusService:
         Returns:
             str: Token de autenticação válido
         """
-        now = datetime.now()
-        
-        # Se temos um token e ele não está prestes a expirar, usar o existente
-        if self.token and self.token_expires and now < (self.token_expires - timedelta(seconds=self.token_buffer)):
-            logger.debug("Usando token existente")
-            return self.token
-            
-        # Renovar o token
-        logger.info("Renovando token de autenticação Amadeus")
-        
-        url = f"{self.base_url}/security/oauth2/token"
-        headers = {
-            'Content-Type': 'application/x-www-form-urlencoded'
-        }
-        data = {
-            'grant_type': 'client_credentials',
-            'client_id': self.api_key,
-            'client_secret': self.api_secret
-        }
-        
-        try:
-            # Usar a sessão configurada sem autenticação Bearer
-            response = self.session.post(
-                url, 
-                headers=headers, 
-                data=data,
-                timeout=(3.05, 10)  # 3.05s para conexão, 10s para leitura
-            )
-            
-            # Log detalhado da resposta
-            logger.debug(f"Resposta de autenticação: Status {response.status_code}")
-            
-            if response.status_code != 200:
-                logger.error(f"Falha na autenticação: {response.status_code} - {response.text}")
-                return None
-                
-            # Processar resposta
-            result = response.json()
-            self.token = result.get('access_token')
-            
-            # Configurar tempo de expiração
-            expires_in = result.get('expires_in', 1800)  # Padrão 30 minutos
-            self.token_expires = now + timedelta(seconds=expires_in)
-            
-            logger.info(f"Token obtido com sucesso. Expira em {expires_in} segundos.")
-            
-            return self.token
-            
-        except requests.exceptions.ConnectTimeout:
-            logger.error("Timeout na conexão durante autenticação")
-            return None
-        except requests.exceptions.ReadTimeout:
-            logger.error("Timeout na leitura durante autenticação")
-            return None
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Erro de requisição durante autenticação: {str(e)}")
-            return None
-        except Exception as e:
-            logger.error(f"Erro desconhecido durante autenticação: {str(e)}")
+        # Token compartilhado por todas as instâncias: o gerenciador renova em
+        # segundo plano antes da expiração, com uma única renovação por vez
+        token_info = amadeus_token_manager.get_token_info(self.api_key, self.api_secret, self.base_url)
+        if not token_info:
+            logger.error("Falha na autenticação Amadeus")
             return None
+        
+        self.token = token_info['token']
+        self.token_expires = datetime.fromtimestamp(token_info['expires_at'])
+        return self.token
 
     def search_flights(self, params):
         """
@@ -2,7 +2,8 @@
 import os
 import logging
 from datetime import datetime, timedelta
-from amadeus import Client, ResponseError
+from amadeus import ResponseError
+from services.amadeus_token_manager import amadeus_token_manager, DEFAULT_BASE_URL
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -28,10 +29,12 @@ class AmadeusService:
             return
         
         try:
-            self.client = Client(
-                client_id=api_key,
-                client_secret=api_secret,
-                logger=logger
+            # Cliente do SDK compartilhado por credencial (token gerenciado no processo)
+            self.client = amadeus_token_manager.get_client(
+                api_key,
+                api_secret,
+                DEFAULT_BASE_URL,
+                sdk_logger=logger
             )
             logger.info("Cliente Amadeus inicializado com sucesso")
         except Exception as e:
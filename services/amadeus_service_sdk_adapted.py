@@ -3,7 +3,8 @@ import os
 import logging
 import json
 from datetime import datetime, timedelta
-from amadeus import Client, ResponseError
+from amadeus import ResponseError
+from services.amadeus_token_manager import amadeus_token_manager, DEFAULT_BASE_URL
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -33,10 +34,12 @@ class AmadeusService:
     def initialize_client(self):
         """Inicializa o cliente Amadeus com as credenciais"""
         try:
-            self.client = Client(
-                client_id=self.api_key,
-                client_secret=self.api_secret,
-                logger=logger
+            # Cliente do SDK compartilhado por credencial (token gerenciado no processo)
+            self.client = amadeus_token_manager.get_client(
+                self.api_key,
+                self.api_secret,
+                DEFAULT_BASE_URL,
+                sdk_logger=logger
             )
             logger.info("Cliente Amadeus inicializado com sucesso")
         except Exception as e:
@@ -47,7 +50,7 @@ class AmadeusService:
         """
         Obtém ou renova o token de autenticação OAuth2.
         Este método existe para manter compatibilidade com a implementação anterior.
-        O SDK gerencia automaticamente tokens.
+        O token é o mesmo usado pelo cliente do SDK (gerenciador compartilhado).
         """
         # Verificar se o cliente está inicializado
         if not self.client:
@@ -55,19 +58,13 @@ class AmadeusService:
             if not self.client:
                 return None
         
-        try:
-            # Para manter compatibilidade com a interface anterior,
-            # vamos simplesmente retornar um token fictício
-            logger.info("Criando token fictício para compatibilidade (SDK gerencia tokens automaticamente)")
-            
-            # Criar um token fictício para manter a compatibilidade com a interface anterior
-            self.token = "SDK_MANAGED_TOKEN"
-            self.token_expiry = datetime.now() + timedelta(hours=1)
-            return self.token
-            
-        except Exception as e:
-            logger.error(f"Erro inesperado ao criar token fictício: {str(e)}")
+        token_info = amadeus_token_manager.get_token_info(self.api_key, self.api_secret, DEFAULT_BASE_URL)
+        if not token_info:
             return None
+        
+        self.token = token_info['token']
+        self.token_expiry = datetime.fromtimestamp(token_info['expires_at'])
+        return self.token
     
     def test_connection(self):
         """Testa a conexão com a API do Amadeus e retorna um diagnóstico"""
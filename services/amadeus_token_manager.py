@@ -0,0 +1,291 @@
+"""
+Gerenciador de tokens OAuth da Amadeus compartilhado pelo processo
+Todos os serviços Amadeus (REST direto ou SDK oficial) obtêm o token por aqui:
+- um token em cache por conjunto de credenciais (api_key, api_secret, ambiente)
+- renovação em segundo plano antes da expiração (AMADEUS_TOKEN_REFRESH_MARGIN)
+- apenas uma renovação por credencial em andamento (single-flight)
+- persistência opcional em arquivo para sobreviver a reinícios dos workers
+  (AMADEUS_TOKEN_CACHE_PATH)
+
+Também mantém um único Client do SDK por credencial, cujo token é fornecido por
+este gerenciador, evitando uma ida extra ao OAuth a cada nova instância de serviço.
+As chamadas HTTP do Client têm timeout (AMADEUS_SDK_TIMEOUT, padrão: 20 segundos);
+sem ele, o urlopen padrão do SDK pode esperar indefinidamente.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from functools import partial
+from urllib.request import urlopen
+
+import requests
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# URL base padrão (ambiente de teste)
+DEFAULT_BASE_URL = "https://test.api.amadeus.com/v1"
+
+
+class ManagedAccessToken:
+    """
+    Substitui o AccessToken interno do SDK da Amadeus, delegando ao gerenciador.
+    O SDK chama apenas _bearer_token() ao montar as requisições autenticadas.
+    """
+
+    def __init__(self, manager, api_key, api_secret, base_url):
+        self.manager = manager
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.base_url = base_url
+
+    def _bearer_token(self):
+        return 'Bearer {0}'.format(self.manager.get_token(self.api_key, self.api_secret, self.base_url))
+
+
+class AmadeusTokenManager:
+    """
+    Cache de tokens OAuth da Amadeus por credencial, seguro para múltiplas threads.
+    """
+
+    def __init__(self):
+        """Inicializa o gerenciador com as configurações do ambiente"""
+        self.refresh_margin = int(os.environ.get('AMADEUS_TOKEN_REFRESH_MARGIN', '300'))
+        self.request_timeout = float(os.environ.get('AMADEUS_TOKEN_TIMEOUT', '10'))
+        self.sdk_timeout = float(os.environ.get('AMADEUS_SDK_TIMEOUT', '20'))
+        self.cache_path = os.environ.get('AMADEUS_TOKEN_CACHE_PATH')
+
+        self._entries = {}
+        self._key_locks = {}
+        self._timers = {}
+        self._clients = {}
+        self._lock = threading.Lock()
+
+        self._load_cache()
+
+    @staticmethod
+    def _credential_key(api_key, api_secret, base_url):
+        """Chave do cache: hash das credenciais (o segredo nunca é gravado em claro)"""
+        raw = f"{api_key}:{api_secret}:{base_url}".encode('utf-8')
+        return hashlib.sha256(raw).hexdigest()
+
+    def _key_lock(self, key):
+        """Lock de renovação da credencial (single-flight)"""
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._key_locks[key] = lock
+            return lock
+
+    def get_token(self, api_key, api_secret, base_url=DEFAULT_BASE_URL):
+        """
+        Retorna um token válido para as credenciais, renovando-o se necessário
+
+        Args:
+            api_key: AMADEUS_API_KEY
+            api_secret: AMADEUS_API_SECRET
+            base_url: URL base da API (ambiente de teste ou produção)
+
+        Returns:
+            str: token de acesso ou None em caso de erro
+        """
+        entry = self.get_token_info(api_key, api_secret, base_url)
+        return entry['token'] if entry else None
+
+    def get_token_info(self, api_key, api_secret, base_url=DEFAULT_BASE_URL):
+        """
+        Retorna o token e o instante de expiração para as credenciais
+
+        Args:
+            api_key: AMADEUS_API_KEY
+            api_secret: AMADEUS_API_SECRET
+            base_url: URL base da API
+
+        Returns:
+            dict: {"token": str, "expires_at": timestamp} ou None em caso de erro
+        """
+        if not api_key or not api_secret:
+            logger.error("Credenciais ausentes para obtenção de token Amadeus")
+            return None
+
+        key = self._credential_key(api_key, api_secret, base_url)
+        entry = self._entries.get(key)
+        now = time.time()
+
+        if entry and now < entry['expires_at'] - 10:
+            # Perto da expiração: renovar em segundo plano e seguir com o token atual
+            if now >= entry['expires_at'] - self.refresh_margin:
+                self._refresh_async(key, api_key, api_secret, base_url)
+            return entry
+
+        # Sem token válido: apenas uma thread busca, as demais aguardam o resultado
+        with self._key_lock(key):
+            entry = self._entries.get(key)
+            if entry and time.time() < entry['expires_at'] - 10:
+                return entry
+            return self._fetch_token(key, api_key, api_secret, base_url)
+
+    def invalidate(self, api_key, api_secret, base_url=DEFAULT_BASE_URL):
+        """
+        Descarta o token em cache (ex.: após uma resposta 401)
+
+        Args:
+            api_key: AMADEUS_API_KEY
+            api_secret: AMADEUS_API_SECRET
+            base_url: URL base da API
+        """
+        key = self._credential_key(api_key, api_secret, base_url)
+        with self._lock:
+            self._entries.pop(key, None)
+        self._save_cache()
+
+    def _refresh_async(self, key, api_key, api_secret, base_url):
+        """Dispara a renovação em uma thread, se nenhuma estiver em andamento"""
+        lock = self._key_lock(key)
+        if not lock.acquire(blocking=False):
+            return  # Renovação já em andamento
+
+        def refresh():
+            try:
+                self._fetch_token(key, api_key, api_secret, base_url)
+            finally:
+                lock.release()
+
+        threading.Thread(target=refresh, name='amadeus-token-refresh', daemon=True).start()
+
+    def _schedule_refresh(self, key, api_key, api_secret, base_url, expires_at):
+        """Agenda a renovação proativa para antes da expiração do token"""
+        delay = max(1.0, expires_at - self.refresh_margin - time.time())
+        timer = threading.Timer(delay, self._refresh_async, args=(key, api_key, api_secret, base_url))
+        timer.daemon = True
+
+        with self._lock:
+            previous = self._timers.pop(key, None)
+            if previous:
+                previous.cancel()
+            self._timers[key] = timer
+        timer.start()
+
+    def _fetch_token(self, key, api_key, api_secret, base_url):
+        """
+        Obtém um novo token no endpoint OAuth (chamar com o lock da credencial)
+
+        Returns:
+            dict: entrada do cache ou None em caso de erro
+        """
+        url = f"{base_url}/security/oauth2/token"
+        payload = {
+            "grant_type": "client_credentials",
+            "client_id": api_key,
+            "client_secret": api_secret
+        }
+
+        try:
+            start_time = time.time()
+            response = requests.post(
+                url,
+                data=payload,
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                timeout=self.request_timeout
+            )
+            if response.status_code != 200:
+                logger.error(f"Erro ao obter token Amadeus: {response.status_code} - {response.text}")
+                return None
+
+            token_data = response.json()
+            token = token_data.get("access_token")
+            if not token:
+                logger.error("Resposta de autenticação Amadeus sem access_token")
+                return None
+
+            expires_in = int(token_data.get("expires_in", 1799))
+            entry = {"token": token, "expires_at": time.time() + expires_in}
+            with self._lock:
+                self._entries[key] = entry
+
+            logger.info(f"Token Amadeus renovado em {time.time() - start_time:.2f}s, válido por {expires_in}s")
+            self._save_cache()
+            self._schedule_refresh(key, api_key, api_secret, base_url, entry['expires_at'])
+            return entry
+
+        except Exception as e:
+            logger.error(f"Exceção ao obter token Amadeus: {str(e)}")
+            return None
+
+    def get_client(self, api_key, api_secret, base_url=DEFAULT_BASE_URL, sdk_logger=None):
+        """
+        Retorna o Client do SDK compartilhado para as credenciais.
+        O token do cliente é fornecido por este gerenciador.
+
+        Args:
+            api_key: AMADEUS_API_KEY
+            api_secret: AMADEUS_API_SECRET
+            base_url: URL base da API (define o hostname test/production do SDK)
+            sdk_logger: logger repassado ao SDK (opcional)
+
+        Returns:
+            amadeus.Client: cliente compartilhado
+        """
+        from amadeus import Client
+
+        key = self._credential_key(api_key, api_secret, base_url)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                options = {
+                    'client_id': api_key,
+                    'client_secret': api_secret,
+                    # urlopen com timeout: uma chamada travada não prende a thread para sempre
+                    'http': partial(urlopen, timeout=self.sdk_timeout)
+                }
+                if sdk_logger is not None:
+                    options['logger'] = sdk_logger
+                if 'test.' not in base_url:
+                    options['hostname'] = 'production'
+                client = Client(**options)
+                client.access_token = ManagedAccessToken(self, api_key, api_secret, base_url)
+                self._clients[key] = client
+            return client
+
+    def _load_cache(self):
+        """Carrega os tokens persistidos que ainda não expiraram"""
+        if not self.cache_path or not os.path.isfile(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            now = time.time()
+            self._entries = {
+                key: entry for key, entry in data.items()
+                if entry.get('token') and entry.get('expires_at', 0) > now + 10
+            }
+            logger.info(f"{len(self._entries)} token(s) Amadeus carregados de {self.cache_path}")
+        except Exception as e:
+            logger.warning(f"Não foi possível carregar o cache de tokens Amadeus: {str(e)}")
+
+    def _save_cache(self):
+        """Grava os tokens no arquivo de cache (escrita atômica, permissão 0600)"""
+        if not self.cache_path:
+            return
+        try:
+            with self._lock:
+                data = dict(self._entries)
+            directory = os.path.dirname(os.path.abspath(self.cache_path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.amadeus_tokens_')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"Não foi possível gravar o cache de tokens Amadeus: {str(e)}")
+
+
+# Instância global do gerenciador de tokens
+amadeus_token_manager = AmadeusTokenManager()
@@ -0,0 +1,102 @@
+"""
+Ponte entre o código síncrono (rotas Flask/WSGI) e corrotinas asyncio
+Mantém um único event loop em uma thread de fundo por processo. As rotas podem
+submeter corrotinas (ex.: buscas no TravelPayouts) sem ocupar uma thread do
+worker durante a espera pela rede: centenas de buscas em andamento compartilham
+o mesmo loop e o mesmo pool de conexões.
+"""
+
+import asyncio
+import logging
+import threading
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+class AsyncBridge:
+    """
+    Event loop em thread de fundo, iniciado no primeiro uso.
+    """
+
+    def __init__(self):
+        """Inicializa a ponte sem iniciar o loop"""
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        """Event loop da ponte (iniciado sob demanda)"""
+        if self._loop is None or self._loop.is_closed():
+            with self._lock:
+                if self._loop is None or self._loop.is_closed():
+                    self._start()
+        return self._loop
+
+    def _start(self):
+        """Cria o event loop e a thread que o executa"""
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run_loop():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=run_loop, name='avi-async-bridge', daemon=True)
+        self._thread.start()
+        ready.wait()
+        self._loop = loop
+        logger.info("Event loop da ponte assíncrona iniciado")
+
+    def submit(self, coro):
+        """
+        Agenda uma corrotina no loop de fundo sem bloquear
+
+        Args:
+            coro: corrotina a executar
+
+        Returns:
+            concurrent.futures.Future: futuro com o resultado da corrotina
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """
+        Executa uma corrotina no loop de fundo e aguarda o resultado
+
+        Args:
+            coro: corrotina a executar
+            timeout: tempo máximo de espera em segundos (None para sem limite)
+
+        Returns:
+            object: resultado da corrotina
+        """
+        future = self.submit(coro)
+        try:
+            return future.result(timeout=timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+    def shutdown(self, timeout=5):
+        """
+        Interrompe o loop de fundo
+
+        Args:
+            timeout: tempo máximo de espera pela thread em segundos
+        """
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            if self._thread:
+                self._thread.join(timeout=timeout)
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+
+
+# Instância global da ponte
+async_bridge = AsyncBridge()
@@ -0,0 +1,301 @@
+"""
+Busca de voos em lote para roteiros com vários trechos
+Recebe uma lista de trechos (origem, destino, data), remove os repetidos e executa
+as buscas em paralelo no TravelPayoutsRestAPI, com um prazo único. Retorna os
+resultados de cada trecho e o itinerário combinado mais barato, respeitando a
+ordem dos trechos (um voo só é combinado com o seguinte se chegar antes dele partir).
+
+Cada requisição usa seu próprio conjunto de threads: uma busca que passa do prazo
+continua até o timeout HTTP do cliente (TRAVELPAYOUTS_TIMEOUT), mas não ocupa vaga
+das buscas seguintes. O limite de chamadas simultâneas ao TravelPayouts no
+processo é o de services.admission_control (AVI_UPSTREAM_LIMITS).
+
+Configuração (variáveis de ambiente):
+- AVI_BATCH_MAX_LEGS: número máximo de trechos por requisição (padrão: 12)
+- AVI_BATCH_MAX_CONCURRENCY: trechos buscados simultaneamente por requisição (padrão: 6)
+- AVI_BATCH_DEADLINE: prazo total da busca em segundos (padrão: 15)
+- AVI_BATCH_CANDIDATES: ofertas mais baratas de cada trecho consideradas na
+  combinação do itinerário (padrão: 20)
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+from services.service_registry import lazy_service
+from services.admission_control import Overloaded
+from services.federated_flight_search import normalize_offer
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+class InvalidBatchRequest(ValueError):
+    """Lista de trechos inválida recebida do cliente"""
+
+
+def _parse_datetime(value):
+    """Converte uma data/hora ISO em datetime, ou None se ausente/inválida"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def _connects(previous, offer):
+    """
+    Verifica se a oferta pode seguir a anterior no itinerário (chega antes de partir).
+    Horários ausentes ou incomparáveis não impedem a combinação.
+    """
+    arrival = _parse_datetime(previous.get('arrival_at'))
+    departure = _parse_datetime(offer.get('departure_at'))
+    if arrival is None or departure is None:
+        return True
+    try:
+        return arrival <= departure
+    except TypeError:
+        # Horário com e sem fuso horário
+        return True
+
+
+class BatchFlightSearch:
+    """
+    Executa a busca de vários trechos em paralelo e combina o itinerário.
+    """
+
+    def __init__(self, api=None):
+        """
+        Inicializa o motor de busca em lote
+
+        Args:
+            api: cliente TravelPayoutsRestAPI (padrão: instância global)
+        """
+        if api is None:
+            from services.travelpayouts_rest_api import travelpayouts_api
+            api = travelpayouts_api
+        self.api = api
+
+        self.max_legs = int(os.environ.get('AVI_BATCH_MAX_LEGS', '12'))
+        self.max_concurrency = int(os.environ.get('AVI_BATCH_MAX_CONCURRENCY', '6'))
+        self.deadline = float(os.environ.get('AVI_BATCH_DEADLINE', '15'))
+        self.candidates = int(os.environ.get('AVI_BATCH_CANDIDATES', '20'))
+
+        logger.info(f"Busca em lote configurada (concorrência: {self.max_concurrency}, prazo: {self.deadline}s)")
+
+    def parse_legs(self, legs):
+        """
+        Valida e normaliza a lista de trechos
+
+        Args:
+            legs: lista de dicts com origin, destination e departure_date (ou date)
+
+        Returns:
+            list: trechos normalizados {"origin", "destination", "departure_date"}
+
+        Raises:
+            InvalidBatchRequest: se a lista ou algum trecho for inválido
+        """
+        if not isinstance(legs, list) or not legs:
+            raise InvalidBatchRequest("Informe uma lista de trechos em 'legs'")
+        if len(legs) > self.max_legs:
+            raise InvalidBatchRequest(f"Máximo de {self.max_legs} trechos por busca")
+
+        parsed = []
+        for position, leg in enumerate(legs, start=1):
+            if not isinstance(leg, dict):
+                raise InvalidBatchRequest(f"Trecho {position} inválido")
+            origin = (leg.get('origin') or '').strip().upper()
+            destination = (leg.get('destination') or '').strip().upper()
+            departure_date = (leg.get('departure_date') or leg.get('date') or '').strip()[:10]
+            if not origin or not destination or not departure_date:
+                raise InvalidBatchRequest(f"Trecho {position}: origem, destino e data são obrigatórios")
+            try:
+                datetime.strptime(departure_date, '%Y-%m-%d')
+            except ValueError:
+                raise InvalidBatchRequest(f"Trecho {position}: data inválida '{departure_date}' (use YYYY-MM-DD)")
+            parsed.append({'origin': origin, 'destination': destination, 'departure_date': departure_date})
+        return parsed
+
+    def search(self, legs, deadline=None, limit=10):
+        """
+        Busca todos os trechos e monta o itinerário combinado mais barato
+
+        Args:
+            legs: lista de trechos (ver parse_legs)
+            deadline: prazo em segundos (padrão: AVI_BATCH_DEADLINE)
+            limit: ofertas retornadas por trecho
+
+        Returns:
+            dict: {"legs": resultados na ordem pedida, "itinerary": {...}, "meta": {...}}
+
+        Raises:
+            InvalidBatchRequest: se a lista de trechos for inválida
+            Overloaded: se o TravelPayouts recusou todos os trechos (limite de chamadas simultâneas)
+        """
+        legs = self.parse_legs(legs)
+        deadline = self.deadline if deadline is None else min(deadline, self.deadline)
+        start_time = time.monotonic()
+
+        # Trechos repetidos são buscados uma única vez
+        unique = {}
+        for leg in legs:
+            unique.setdefault((leg['origin'], leg['destination'], leg['departure_date']), leg)
+
+        # Threads da requisição: trechos atrasados não prendem vagas de outras buscas
+        executor = ThreadPoolExecutor(max_workers=min(len(unique), self.max_concurrency),
+                                      thread_name_prefix='batch-search')
+        try:
+            futures = {executor.submit(self._search_leg, leg): key for key, leg in unique.items()}
+            done, not_done = wait(futures, timeout=deadline)
+        finally:
+            # Não esperar pelos trechos em andamento; os que nem começaram são cancelados
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        results = {}
+        refused = []
+        for future in done:
+            key = futures[future]
+            try:
+                results[key] = future.result()
+            except Overloaded as e:
+                refused.append(e)
+                results[key] = {"status": "overloaded", "error": str(e), "offers": []}
+            except Exception as e:
+                logger.warning(f"Busca do trecho {key[0]}→{key[1]} ({key[2]}) falhou: {str(e)}")
+                results[key] = {"status": "error", "error": str(e), "offers": []}
+        for future in not_done:
+            # A busca em andamento termina no timeout HTTP; o resultado tardio é descartado
+            results[futures[future]] = {"status": "timed_out", "offers": []}
+
+        # Nenhum trecho admitido pelo limite do TravelPayouts: 429 com Retry-After
+        if refused and len(refused) == len(unique):
+            raise refused[0]
+
+        leg_results = []
+        for leg in legs:
+            result = results[(leg['origin'], leg['destination'], leg['departure_date'])]
+            offers = result['offers']
+            leg_results.append({
+                **leg,
+                "status": result['status'],
+                "error": result.get('error'),
+                "booking_url": result.get('booking_url'),
+                "offers_count": len(offers),
+                "cheapest": offers[0] if offers else None,
+                "offers": offers[:limit],
+                "elapsed_ms": result.get('elapsed_ms')
+            })
+
+        timed_out = [f"{key[0]}-{key[1]}-{key[2]}" for key, result in results.items() if result['status'] == 'timed_out']
+        if timed_out:
+            logger.warning(f"Trechos fora do prazo de {deadline}s: {', '.join(timed_out)}")
+
+        return {
+            "legs": leg_results,
+            "itinerary": self.cheapest_itinerary([results[(l['origin'], l['destination'], l['departure_date'])]['offers'] for l in legs]),
+            "search_timestamp": datetime.utcnow().isoformat(),
+            "meta": {
+                "requested_legs": len(legs),
+                "unique_legs": len(unique),
+                "timed_out": timed_out,
+                "currency": "BRL",
+                "source": "TravelPayouts",
+                "elapsed_ms": round((time.monotonic() - start_time) * 1000, 1)
+            }
+        }
+
+    def _search_leg(self, leg):
+        """
+        Busca um trecho no TravelPayouts
+
+        Returns:
+            dict: {"status", "offers" normalizadas e ordenadas por preço, "booking_url", "elapsed_ms"}
+        """
+        start = time.monotonic()
+        flights = self.api.search_flights(leg['origin'], leg['destination'], leg['departure_date'])
+        offers = [offer for offer in (normalize_offer(f, 'travelpayouts') for f in flights or []) if offer]
+        offers.sort(key=lambda o: o['price_value'])
+
+        # Sem voos, a API devolve apenas o link de redirecionamento para o parceiro
+        redirect = next((f for f in flights or [] if f.get('is_redirect')), None)
+        return {
+            "status": "ok" if offers else "no_results",
+            "offers": offers,
+            "booking_url": redirect.get('booking_url') if redirect else None,
+            "elapsed_ms": round((time.monotonic() - start) * 1000, 1)
+        }
+
+    def cheapest_itinerary(self, offers_by_leg):
+        """
+        Combina uma oferta por trecho com o menor preço total, exigindo que cada voo
+        chegue antes de o voo do trecho seguinte partir (programação dinâmica sobre
+        as ofertas mais baratas de cada trecho).
+
+        Args:
+            offers_by_leg: listas de ofertas normalizadas, ordenadas por preço, na ordem dos trechos
+
+        Returns:
+            dict: {"complete", "total", "currency", "offers" (None nos trechos sem oferta),
+                   "missing_legs" (índices)}
+        """
+        missing = [index for index, offers in enumerate(offers_by_leg) if not offers]
+        present = [index for index, offers in enumerate(offers_by_leg) if offers]
+
+        # best[i]: custo mínimo do itinerário terminando na oferta i do trecho atual
+        chosen = {}
+        previous_offers = None
+        previous_best = None
+        back_pointers = []
+        for index in present:
+            candidates = offers_by_leg[index][:self.candidates]
+            best = []
+            pointers = []
+            for offer in candidates:
+                if previous_offers is None:
+                    best.append(offer['price_value'])
+                    pointers.append(None)
+                    continue
+                options = [
+                    (cost, position) for position, (cost, prior) in enumerate(zip(previous_best, previous_offers))
+                    if cost is not None and _connects(prior, offer)
+                ]
+                if options:
+                    cost, position = min(options)
+                    best.append(cost + offer['price_value'])
+                    pointers.append(position)
+                else:
+                    best.append(None)
+                    pointers.append(None)
+            back_pointers.append((index, candidates, pointers))
+            previous_offers, previous_best = candidates, best
+
+        total = None
+        if previous_best:
+            reachable = [(cost, position) for position, cost in enumerate(previous_best) if cost is not None]
+            if reachable:
+                total, position = min(reachable)
+                for index, candidates, pointers in reversed(back_pointers):
+                    chosen[index] = candidates[position]
+                    position = pointers[position]
+
+        # Sem combinação que respeite os horários: usar a oferta mais barata de cada trecho
+        if present and total is None:
+            logger.info("Nenhuma combinação respeita a ordem dos horários; usando a oferta mais barata de cada trecho")
+            chosen = {index: offers_by_leg[index][0] for index in present}
+            total = sum(offer['price_value'] for offer in chosen.values())
+
+        return {
+            "complete": not missing and bool(present),
+            "total": f"{total:.2f}" if total is not None else None,
+            "currency": "BRL",
+            "offers": [chosen.get(index) for index in range(len(offers_by_leg))],
+            "missing_legs": missing
+        }
+
+
+# Instância global (construída no primeiro uso)
+batch_flight_search = lazy_service('batch_flight_search', BatchFlightSearch)
@@ -8,6 +8,7 @@ import json
 from datetime import datetime, timedelta
 from services.amadeus_sdk_service import AmadeusSDKService
 from services.chat_processor import ChatProcessor
+from services.airport_airline_data import get_airport_display_name
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -419,8 +420,8 @@ class BuscaRapidaService:
             return "Não foram encontrados preços para o período solicitado."
         
         # Texto explicativo
-        origin_name = cheapest.get('origin_info', {}).get('name', origin) if cheapest.get('origin_info') else origin
-        dest_name = cheapest.get('destination_info', {}).get('name', destination) if cheapest.get('destination_info') else destination
+        origin_name = cheapest.get('origin_info', {}).get('name', origin) if cheapest.get('origin_info') else get_airport_display_name(origin)
+        dest_name = cheapest.get('destination_info', {}).get('name', destination) if cheapest.get('destination_info') else get_airport_display_name(destination)
         
         response.append(f"🔍 **Melhor preço encontrado para {origin_name} → {dest_name}**")
         
@@ -504,7 +505,7 @@ class BuscaRapidaService:
             # Hora
             departure_time = departure_date.split('T')[1][:5]
             
-            response.append(f"✈️ **Voo de {origin} para {destination} em {formatted_date}**")
+            response.append(f"✈️ **Voo de {get_airport_display_name(origin)} para {get_airport_display_name(destination)} em {formatted_date}**")
             response.append(f"💰 **A partir de:** R$ {price:.2f}")
             response.append("\nEssas são as melhores opções que encontrei para sua viagem.")
         
@@ -0,0 +1,232 @@
+"""
+Aquecedor do cache de preços das rotas mais buscadas
+A primeira busca do dia em uma rota popular (GRU → GIG, GRU → BSB...) esperava pelo
+TravelPayouts. Em intervalos regulares, este aquecedor consulta as respostas de
+calendário e de matriz de mês das rotas mais buscadas (services.route_popularity)
+para o mês atual e os seguintes e grava-as em month_price_cache, o cache usado pelas
+buscas síncronas, assíncronas e pela varredura de datas flexíveis.
+
+Cada rodada respeita um orçamento de requisições ao fornecedor: respostas ainda
+frescas no cache não são consultadas de novo, e endpoints com o circuito aberto
+são pulados até a próxima rodada.
+
+A popularidade e o cache ficam em memória, então cada worker aquece as rotas que
+ele próprio observou.
+
+Configuração (variáveis de ambiente):
+- AVI_CACHE_WARMER: "true" (padrão) ou "false" para desativar
+- AVI_CACHE_WARMER_INTERVAL: segundos entre as rodadas (padrão: 1800)
+- AVI_CACHE_WARMER_TOP_ROUTES: rotas aquecidas por rodada (padrão: 10)
+- AVI_CACHE_WARMER_MONTHS: meses aquecidos por rota, a partir do atual (padrão: 3)
+- AVI_CACHE_WARMER_BUDGET: requisições ao fornecedor por rodada (padrão: 40)
+- AVI_CACHE_WARMER_SEED_ROUTES: rotas aquecidas mesmo sem buscas observadas,
+  no formato "GRU-GIG,GRU-BSB" (padrão: nenhuma)
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+from datetime import date
+
+from services.circuit_breaker import CircuitOpenError
+from services.route_popularity import route_popularity
+from services.search_cache import FRESH
+from services.travelpayouts_rest_api import MONTH_KINDS, month_cache_key, month_price_cache
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+def upcoming_months(count, today=None):
+    """
+    Meses a partir do atual
+
+    Args:
+        count: número de meses
+        today: data de referência (padrão: hoje)
+
+    Returns:
+        list: meses no formato YYYY-MM
+    """
+    today = today or date.today()
+    year, month = today.year, today.month
+    months = []
+    for _ in range(count):
+        months.append(f"{year:04d}-{month:02d}")
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return months
+
+
+class CacheWarmer:
+    """
+    Rodadas periódicas de aquecimento do cache mensal, em uma thread de fundo.
+    """
+
+    def __init__(self, api=None):
+        """
+        Inicializa o aquecedor com as configurações do ambiente
+
+        Args:
+            api: cliente síncrono do TravelPayouts (padrão: travelpayouts_api)
+        """
+        self._api = api
+        self.enabled = os.environ.get('AVI_CACHE_WARMER', 'true').lower() == 'true'
+        self.interval = float(os.environ.get('AVI_CACHE_WARMER_INTERVAL', '1800'))
+        self.top_routes = int(os.environ.get('AVI_CACHE_WARMER_TOP_ROUTES', '10'))
+        self.months = int(os.environ.get('AVI_CACHE_WARMER_MONTHS', '3'))
+        self.budget = int(os.environ.get('AVI_CACHE_WARMER_BUDGET', '40'))
+        self.seed_routes = [
+            tuple(route.strip().upper().split('-', 1))
+            for route in os.environ.get('AVI_CACHE_WARMER_SEED_ROUTES', '').split(',')
+            if '-' in route
+        ]
+
+        self._thread = None
+        self._stopped = threading.Event()
+        self._run_lock = threading.Lock()
+
+        self.stats = {'runs': 0, 'upstream_calls': 0, 'warmed': 0, 'already_fresh': 0, 'failures': 0}
+        self.last_run = None
+
+    @property
+    def api(self):
+        """Cliente síncrono do TravelPayouts (importado no primeiro uso)"""
+        if self._api is None:
+            from services.travelpayouts_rest_api import travelpayouts_api
+            self._api = travelpayouts_api
+        return self._api
+
+    def init_app(self, app):
+        """
+        Inicia a thread das rodadas de aquecimento
+
+        Args:
+            app: aplicação Flask
+        """
+        if not self.enabled:
+            logger.info("Aquecedor do cache de preços desabilitado (AVI_CACHE_WARMER)")
+            return
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(target=self._run, name='cache-warmer', daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+        logger.info(f"Aquecedor do cache de preços iniciado (intervalo: {self.interval}s, "
+                    f"rotas: {self.top_routes}, orçamento: {self.budget} requisições)")
+
+    def _run(self):
+        """Laço da thread: uma rodada a cada AVI_CACHE_WARMER_INTERVAL segundos"""
+        while not self._stopped.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Erro na rodada de aquecimento do cache: {str(e)}")
+
+    def routes(self):
+        """
+        Rotas a aquecer: as mais buscadas, completadas pelas rotas fixas
+
+        Returns:
+            list: [(origem, destino)]
+        """
+        routes = [(origin, destination) for origin, destination, _ in route_popularity.top(self.top_routes)]
+        for route in self.seed_routes:
+            if len(routes) >= self.top_routes:
+                break
+            if route not in routes:
+                routes.append(route)
+        return routes
+
+    def run_once(self, today=None):
+        """
+        Executa uma rodada de aquecimento
+
+        Percorre as rotas em ordem de popularidade e, para cada uma, os meses em
+        ordem cronológica, até esgotar o orçamento de requisições.
+
+        Args:
+            today: data de referência dos meses (padrão: hoje)
+
+        Returns:
+            dict: {"routes", "upstream_calls", "warmed", "already_fresh", "skipped_open_circuit",
+                   "budget_exhausted", "elapsed_ms"}
+        """
+        with self._run_lock:
+            started = time.monotonic()
+            routes = self.routes()
+            months = upcoming_months(self.months, today)
+            result = {'routes': len(routes), 'upstream_calls': 0, 'warmed': 0, 'already_fresh': 0,
+                      'skipped_open_circuit': 0, 'budget_exhausted': False}
+            open_kinds = set()
+
+            for origin, destination in routes:
+                for month in months:
+                    for kind in MONTH_KINDS:
+                        key = month_cache_key(kind, origin, destination, month)
+                        if month_price_cache.status(key) == FRESH:
+                            result['already_fresh'] += 1
+                            continue
+                        if kind in open_kinds:
+                            result['skipped_open_circuit'] += 1
+                            continue
+                        if result['upstream_calls'] >= self.budget:
+                            result['budget_exhausted'] = True
+                            break
+
+                        result['upstream_calls'] += 1
+                        try:
+                            if self.api.warm_month(kind, origin, destination, month):
+                                result['warmed'] += 1
+                        except CircuitOpenError as e:
+                            logger.info(f"Aquecimento de '{kind}' pulado nesta rodada: {str(e)}")
+                            open_kinds.add(kind)
+                            result['upstream_calls'] -= 1
+                            result['skipped_open_circuit'] += 1
+                        except Exception as e:
+                            logger.warning(f"Erro ao aquecer {kind} {origin} → {destination} ({month}): {str(e)}")
+                            self.stats['failures'] += 1
+                    if result['budget_exhausted']:
+                        break
+                if result['budget_exhausted']:
+                    break
+
+            result['elapsed_ms'] = round((time.monotonic() - started) * 1000, 1)
+            self.stats['runs'] += 1
+            self.stats['upstream_calls'] += result['upstream_calls']
+            self.stats['warmed'] += result['warmed']
+            self.stats['already_fresh'] += result['already_fresh']
+            self.last_run = result
+
+        logger.info(f"Rodada de aquecimento do cache: {result['warmed']} respostas gravadas, "
+                    f"{result['upstream_calls']} requisições, {result['already_fresh']} já frescas "
+                    f"({result['routes']} rotas, {result['elapsed_ms']} ms)")
+        return result
+
+    def snapshot(self):
+        """Configuração, contadores, última rodada e rotas mais buscadas"""
+        return {
+            'enabled': self.enabled,
+            'interval': self.interval,
+            'budget': self.budget,
+            'months': self.months,
+            'top_routes': [
+                {'origin': origin, 'destination': destination, 'score': score}
+                for origin, destination, score in route_popularity.top(self.top_routes)
+            ],
+            'last_run': self.last_run,
+            'month_cache': month_price_cache.snapshot(),
+            **self.stats
+        }
+
+    def shutdown(self):
+        """Encerra a thread das rodadas"""
+        self._stopped.set()
+
+
+# Instância global do aquecedor
+cache_warmer = CacheWarmer()
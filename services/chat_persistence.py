@@ -0,0 +1,300 @@
+"""
+Persistência write-behind dos turnos do chat
+Cada turno de /api/chat (mensagem do usuário + resposta da AVI) é apenas colocado
+em um buffer em memória; uma thread de fundo grava os turnos nas tabelas
+Conversation/Message em lotes, por intervalo ou quando o buffer atinge o tamanho
+do lote. A requisição do chat nunca espera por um commit no banco.
+
+A conversa é identificada pela sessão do chat (cookie flai_session_id), gravada
+em Conversation.session_key. Conversas de visitantes sem login ficam sem dono
+(Conversation.user_id nulo). As colunas novas em bancos antigos são criadas no
+deploy (python setup.py --schema-only), não pelos workers. No encerramento do
+worker (atexit) o buffer restante é gravado.
+
+Configuração (variáveis de ambiente):
+- AVI_CHAT_PERSISTENCE: "true" (padrão) ou "false" para desabilitar a gravação
+- AVI_CHAT_FLUSH_INTERVAL: intervalo máximo entre gravações em segundos (padrão: 2)
+- AVI_CHAT_FLUSH_BATCH: mensagens no buffer que disparam uma gravação imediata (padrão: 50)
+- AVI_CHAT_BUFFER_MAX: limite de mensagens pendentes; acima dele as mais antigas
+  são descartadas (padrão: 10000)
+- AVI_CHAT_ANONYMOUS: "true" (padrão) grava as conversas sem login sem dono;
+  "false" grava apenas as conversas de usuários autenticados
+"""
+
+import os
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from services.db_resilience import db_resilience
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Tamanho máximo do título da conversa (Conversation.title)
+TITLE_MAX_LENGTH = 100
+
+
+class ChatPersistence:
+    """
+    Buffer de mensagens do chat com gravação em lote em segundo plano.
+    """
+
+    def __init__(self):
+        """Inicializa o buffer com as configurações do ambiente"""
+        self.enabled = os.environ.get('AVI_CHAT_PERSISTENCE', 'true').lower() == 'true'
+        self.flush_interval = float(os.environ.get('AVI_CHAT_FLUSH_INTERVAL', '2'))
+        self.batch_size = int(os.environ.get('AVI_CHAT_FLUSH_BATCH', '50'))
+        self.buffer_max = int(os.environ.get('AVI_CHAT_BUFFER_MAX', '10000'))
+        self.record_anonymous = os.environ.get('AVI_CHAT_ANONYMOUS', 'true').lower() == 'true'
+
+        self.app = None
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._conversation_ids = {}
+
+        self.stats = {'enqueued': 0, 'written': 0, 'dropped': 0, 'flushes': 0, 'failures': 0}
+
+    def init_app(self, app):
+        """
+        Associa a aplicação Flask e inicia a thread de gravação
+
+        Args:
+            app: aplicação Flask
+        """
+        self.app = app
+        if not self.enabled:
+            logger.info("Persistência dos turnos do chat desabilitada (AVI_CHAT_PERSISTENCE)")
+            return
+
+        self._thread = threading.Thread(target=self._run, name='chat-persistence', daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+        logger.info(f"ChatPersistence iniciado (intervalo: {self.flush_interval}s, lote: {self.batch_size})")
+
+    def record_turn(self, session_key, user_message, assistant_message, user_id=None):
+        """
+        Enfileira um turno do chat para gravação (não acessa o banco)
+
+        Args:
+            session_key: ID da sessão do chat
+            user_message: mensagem do usuário
+            assistant_message: resposta da AVI
+            user_id: ID do usuário autenticado (None para visitantes sem login)
+        """
+        if not self.enabled or not session_key:
+            return
+        if user_id is None and not self.record_anonymous:
+            return
+
+        now = datetime.now()
+        entries = []
+        if user_message:
+            entries.append((session_key, user_id, user_message, True, now))
+        if assistant_message:
+            entries.append((session_key, user_id, assistant_message, False, now))
+
+        with self._lock:
+            self._buffer.extend(entries)
+            self.stats['enqueued'] += len(entries)
+            overflow = len(self._buffer) - self.buffer_max
+            for _ in range(max(overflow, 0)):
+                self._buffer.popleft()
+            if overflow > 0:
+                self.stats['dropped'] += overflow
+                logger.warning(f"Buffer do chat cheio: {overflow} mensagem(ns) antiga(s) descartada(s)")
+            pending = len(self._buffer)
+
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def pending(self):
+        """Número de mensagens aguardando gravação"""
+        with self._lock:
+            return len(self._buffer)
+
+    def _run(self):
+        """Laço da thread de gravação"""
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Erro inesperado na gravação dos turnos do chat: {str(e)}")
+
+    def flush(self):
+        """
+        Grava no banco todas as mensagens pendentes, em um único commit
+
+        Returns:
+            int: número de mensagens gravadas
+        """
+        if self.app is None:
+            return 0
+
+        # Banco indisponível (circuito aberto): manter o buffer até a recuperação
+        if db_resilience.breaker.is_open():
+            return 0
+
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._buffer)
+                self._buffer.clear()
+            if not batch:
+                return 0
+
+            with self.app.app_context():
+                from models import db
+                try:
+                    written = self._write_batch(db, batch)
+                    db.session.commit()
+                except OperationalError as e:
+                    # Falha de conexão: devolver o lote ao buffer para a próxima tentativa
+                    db.session.rollback()
+                    self._conversation_ids.clear()
+                    self._requeue(batch)
+                    db_resilience.breaker.record_failure()
+                    self.stats['failures'] += 1
+                    logger.warning(f"Banco indisponível, {len(batch)} mensagem(ns) do chat reenfileirada(s): {str(e)}")
+                    return 0
+                except Exception as e:
+                    # Erros de dados (ex.: esquema desatualizado) não se resolvem com nova tentativa
+                    db.session.rollback()
+                    self._conversation_ids.clear()
+                    self.stats['failures'] += 1
+                    self.stats['dropped'] += len(batch)
+                    logger.error(f"Erro ao gravar {len(batch)} mensagem(ns) do chat, lote descartado: {str(e)}")
+                    return 0
+                finally:
+                    db.session.remove()
+
+            self.stats['written'] += written
+            self.stats['flushes'] += 1
+            logger.debug(f"{written} mensagem(ns) do chat gravada(s)")
+            return written
+
+    def _requeue(self, batch):
+        """Devolve um lote ao início do buffer, respeitando o limite"""
+        with self._lock:
+            self._buffer.extendleft(reversed(batch))
+            overflow = len(self._buffer) - self.buffer_max
+            for _ in range(max(overflow, 0)):
+                self._buffer.popleft()
+            if overflow > 0:
+                self.stats['dropped'] += overflow
+
+    def _write_batch(self, db, batch, retry=True):
+        """
+        Cria as conversas que faltam e insere as mensagens do lote
+
+        Args:
+            db: instância do SQLAlchemy
+            batch: tuplas (session_key, user_id, conteúdo, is_user, timestamp)
+            retry: repetir uma vez em caso de conflito na criação das conversas
+
+        Returns:
+            int: número de mensagens inseridas
+        """
+        from models import Conversation, Message
+
+        # Resolver as conversas das sessões do lote (uma consulta para as desconhecidas)
+        first_entry = {}
+        for entry in batch:
+            first_entry.setdefault(entry[0], entry)
+
+        unknown = [key for key in first_entry if key not in self._conversation_ids]
+        if unknown:
+            rows = db.session.execute(
+                select(Conversation.session_key, Conversation.id).where(Conversation.session_key.in_(unknown))
+            ).all()
+            self._conversation_ids.update({key: conversation_id for key, conversation_id in rows})
+
+        missing = [key for key in unknown if key not in self._conversation_ids]
+        created = {}
+        for key in missing:
+            _, owner_id, content, _, timestamp = first_entry[key]
+            created[key] = Conversation(
+                title=self._title(content),
+                user_id=owner_id,
+                session_key=key,
+                created_at=timestamp,
+                last_updated=timestamp
+            )
+            db.session.add(created[key])
+        if created:
+            try:
+                db.session.flush()
+            except IntegrityError:
+                db.session.rollback()
+                if not retry:
+                    raise
+                # Outro worker pode ter criado a mesma conversa: tentar de novo usando a existente
+                return self._write_batch(db, batch, retry=False)
+            self._conversation_ids.update({key: conversation.id for key, conversation in created.items()})
+
+        # Inserção em lote das mensagens
+        db.session.execute(insert(Message), [
+            {
+                'conversation_id': self._conversation_ids[key],
+                'content': content,
+                'is_user': is_user,
+                'timestamp': timestamp
+            }
+            for key, _, content, is_user, timestamp in batch
+        ])
+
+        # Atualizar a data da última mensagem de cada conversa
+        last_seen = {}
+        for key, _, _, _, timestamp in batch:
+            last_seen[key] = max(timestamp, last_seen.get(key, timestamp))
+        for key, timestamp in last_seen.items():
+            db.session.execute(
+                update(Conversation)
+                .where(Conversation.id == self._conversation_ids[key])
+                .values(last_updated=timestamp)
+            )
+
+        return len(batch)
+
+    @staticmethod
+    def _title(content):
+        """Título da conversa a partir da primeira mensagem"""
+        title = ' '.join((content or '').split())
+        if len(title) > TITLE_MAX_LENGTH:
+            title = title[:TITLE_MAX_LENGTH - 3].rstrip() + '...'
+        return title or 'Conversa'
+
+    def shutdown(self, timeout=5):
+        """
+        Interrompe a thread e grava o que restou no buffer
+
+        Args:
+            timeout: tempo máximo de espera pela thread em segundos
+        """
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+        pending = self.pending()
+        if pending:
+            logger.info(f"Gravando {pending} mensagem(ns) do chat antes de encerrar")
+            self.flush()
+
+
+# Instância global do buffer de persistência
+chat_persistence = ChatPersistence()
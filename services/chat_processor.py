@@ -10,6 +10,8 @@ from datetime import datetime, timedelta
 import requests
 
 from services.flight_data_provider import flight_data_provider
+from services.service_registry import lazy_service
+from services.iata_tables import iata_tables
 
 # Configurar logger
 logging.basicConfig(level=logging.INFO)
@@ -101,7 +103,8 @@ class ChatProcessor:
         Returns:
             str: Introdução para os resultados de voo
         """
-        return f"Estou buscando as melhores opções de voo de {origin} para {destination}..."
+        return (f"Estou buscando as melhores opções de voo de {iata_tables.airport_display_name(origin)} "
+                f"para {iata_tables.airport_display_name(destination)}...")
     
     def format_error_message(self, error_message):
         """
@@ -434,4 +437,4 @@ class ChatProcessor:
 
 
 # Instância global para uso em toda a aplicação
-chat_processor = ChatProcessor()
\ No newline at end of file
+chat_processor = lazy_service('chat_processor', ChatProcessor)
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+Circuit breaker para dependências instáveis (banco de dados, APIs externas)
+Depois de um número de falhas consecutivas o circuito abre e as chamadas falham
+imediatamente, sem ocupar o worker esperando uma dependência fora do ar. Passado
+o tempo de recuperação, um número limitado de chamadas de teste (half-open) é
+liberado: sucesso fecha o circuito, falha volta a abri-lo.
+
+Os circuitos são compartilhados por nome dentro do processo, como os token buckets
+de services.rate_limiter.
+"""
+
+import time
+import logging
+import threading
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Estados do circuito
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Chamada recusada porque o circuito está aberto"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"Circuito '{name}' aberto; nova tentativa em {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker seguro para múltiplas threads.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, half_open_max_calls=1):
+        """
+        Inicializa o circuito fechado
+
+        Args:
+            name: nome do circuito (usado nos logs e nas estatísticas)
+            failure_threshold: falhas consecutivas que abrem o circuito
+            reset_timeout: segundos com o circuito aberto antes de liberar chamadas de teste
+            half_open_max_calls: chamadas de teste simultâneas no estado half-open
+        """
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self.half_open_max_calls = max(1, int(half_open_max_calls))
+
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+
+        self.stats = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    def _update_state(self, now):
+        """Passa de aberto para half-open quando o tempo de recuperação acabou (chamar com o lock)"""
+        if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._half_open_calls = 0
+            logger.info(f"Circuito '{self.name}' em half-open: liberando chamadas de teste")
+
+    @property
+    def state(self):
+        """Estado atual do circuito (closed, open ou half_open)"""
+        with self._lock:
+            self._update_state(time.monotonic())
+            return self._state
+
+    def is_open(self):
+        """True se as chamadas estão sendo recusadas (não consome chamadas de teste)"""
+        return self.state == OPEN
+
+    def retry_after(self):
+        """Segundos até o circuito liberar chamadas de teste (0 se não estiver aberto)"""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow(self):
+        """
+        Verifica se uma chamada pode ser feita agora
+
+        Returns:
+            bool: True se a chamada está liberada; no estado half-open, cada
+                  chamada liberada ocupa uma das vagas de teste até registrar o resultado
+        """
+        with self._lock:
+            self._update_state(time.monotonic())
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def record_success(self):
+        """Registra uma chamada bem-sucedida; fecha o circuito se estiver aberto ou em teste"""
+        with self._lock:
+            self.stats['successes'] += 1
+            self._failures = 0
+            if self._state != CLOSED:
+                logger.info(f"Circuito '{self.name}' fechado: dependência respondendo novamente")
+                self._state = CLOSED
+                self._half_open_calls = 0
+
+    def record_failure(self):
+        """Registra uma falha; abre o circuito ao atingir o limite ou se a chamada de teste falhar"""
+        with self._lock:
+            now = time.monotonic()
+            self._update_state(now)
+            self.stats['failures'] += 1
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._trip(now)
+            elif self._state == OPEN:
+                # Falha observada com o circuito já aberto (ex.: sonda de saúde): reiniciar o prazo
+                self._opened_at = now
+
+    def trip(self):
+        """Abre o circuito imediatamente (ex.: sonda de saúde detectou a falha)"""
+        with self._lock:
+            if self._state != OPEN:
+                self._trip(time.monotonic())
+
+    def _trip(self, now):
+        """Abre o circuito (chamar com o lock)"""
+        self._state = OPEN
+        self._opened_at = now
+        self._half_open_calls = 0
+        self.stats['opened'] += 1
+        logger.warning(f"Circuito '{self.name}' aberto após {self._failures} falha(s); "
+                       f"chamadas recusadas por {self.reset_timeout:.0f}s")
+
+    def call(self, func, *args, **kwargs):
+        """
+        Executa uma função protegida pelo circuito
+
+        Args:
+            func: função a executar
+            *args, **kwargs: argumentos da função
+
+        Returns:
+            O resultado da função
+
+        Raises:
+            CircuitOpenError: se o circuito estiver aberto
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self):
+        """
+        Estado e contadores do circuito
+
+        Returns:
+            dict: estado, falhas consecutivas, tempo até nova tentativa e contadores
+        """
+        state = self.state
+        with self._lock:
+            consecutive = self._failures
+        return {
+            'name': self.name,
+            'state': state,
+            'consecutive_failures': consecutive,
+            'retry_after': round(self.retry_after(), 1),
+            **self.stats
+        }
+
+
+# Circuitos compartilhados no processo, por nome
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name, failure_threshold=5, reset_timeout=30.0, half_open_max_calls=1):
+    """
+    Retorna o circuito compartilhado com o nome informado, criando-o se necessário
+
+    Args:
+        name: nome do circuito (ex.: "database")
+        failure_threshold: falhas consecutivas que abrem o circuito (usado apenas na criação)
+        reset_timeout: segundos em aberto antes das chamadas de teste (usado apenas na criação)
+        half_open_max_calls: chamadas de teste simultâneas (usado apenas na criação)
+
+    Returns:
+        CircuitBreaker: circuito compartilhado
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, failure_threshold, reset_timeout, half_open_max_calls)
+            _breakers[name] = breaker
+            logger.info(f"Circuit breaker '{name}' criado: {breaker.failure_threshold} falha(s), "
+                        f"recuperação em {breaker.reset_timeout}s")
+        return breaker
+
+
+def all_breakers():
+    """Estado de todos os circuitos do processo"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [breaker.snapshot() for breaker in breakers]
@@ -0,0 +1,350 @@
+"""
+Resiliência do acesso ao banco de dados
+Substitui as tentativas com time.sleep no thread da requisição por:
+- um circuit breaker ("database") que recusa imediatamente as operações enquanto
+  o banco está indisponível, liberando o worker em vez de prendê-lo em esperas;
+- uma sonda de saúde em segundo plano (SELECT 1) que detecta a queda e fecha o
+  circuito assim que o banco volta a responder;
+- novas tentativas com backoff exponencial e jitter apenas para leituras
+  idempotentes, limitadas por um orçamento de tempo por operação;
+- estatísticas do pool de conexões do SQLAlchemy (conexões em uso, overflow e
+  tempo de espera por uma conexão livre).
+
+Configuração (variáveis de ambiente):
+- AVI_DB_BREAKER_THRESHOLD: falhas de conexão consecutivas que abrem o circuito (padrão: 5)
+- AVI_DB_BREAKER_RESET: segundos com o circuito aberto antes de uma chamada de teste (padrão: 15)
+- AVI_DB_RETRIES: novas tentativas para leituras idempotentes (padrão: 2)
+- AVI_DB_RETRY_BASE: atraso base do backoff em segundos (padrão: 0.05)
+- AVI_DB_RETRY_MAX_DELAY: atraso máximo entre tentativas em segundos (padrão: 0.5)
+- AVI_DB_RETRY_BUDGET: tempo máximo gasto em novas tentativas por operação (padrão: 1.0)
+- AVI_DB_HEALTH_PROBE: "true" (padrão) ou "false" para desabilitar a sonda
+- AVI_DB_HEALTH_INTERVAL: intervalo da sonda em segundos (padrão: 5)
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, DisconnectionError, InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from services.circuit_breaker import get_breaker, CLOSED
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+class DatabaseUnavailable(Exception):
+    """Operação recusada ou abandonada porque o banco está indisponível"""
+
+    def __init__(self, message, retry_after=0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PoolWaitStats:
+    """
+    Tempo de espera por conexões do pool, acumulado no processo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Zera os contadores"""
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def record(self, elapsed, timed_out=False):
+        """
+        Registra uma obtenção de conexão do pool
+
+        Args:
+            elapsed: segundos esperando pela conexão
+            timed_out: True se o pool_timeout foi atingido
+        """
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += elapsed
+            self.max_wait = max(self.max_wait, elapsed)
+
+    def snapshot(self):
+        """Contadores de espera em milissegundos"""
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                'checkouts': self.checkouts,
+                'checkout_timeouts': self.timeouts,
+                'wait_ms_total': round(self.total_wait * 1000, 1),
+                'wait_ms_avg': round(self.total_wait / attempts * 1000, 2) if attempts else 0.0,
+                'wait_ms_max': round(self.max_wait * 1000, 1)
+            }
+
+
+# Estatísticas de espera de todos os pools TimedQueuePool do processo
+pool_wait_stats = PoolWaitStats()
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool que mede quanto tempo cada requisição espera por uma conexão.
+    Inclui o tempo de abertura de novas conexões (dentro de pool_size + max_overflow).
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_wait_stats.record(time.perf_counter() - start)
+        return connection
+
+
+def engine_pool_options(database_url):
+    """
+    Opções de pool a acrescentar em SQLALCHEMY_ENGINE_OPTIONS
+
+    Args:
+        database_url: URI do banco de dados
+
+    Returns:
+        dict: {"poolclass": TimedQueuePool}, exceto para SQLite em memória,
+              que precisa do StaticPool configurado pelo Flask-SQLAlchemy
+    """
+    if database_url.startswith('sqlite') and (':memory:' in database_url or database_url.rstrip('/') == 'sqlite:'):
+        return {}
+    return {'poolclass': TimedQueuePool}
+
+
+def is_connection_error(error):
+    """
+    Verifica se o erro indica falha de conexão com o banco (e não erro da consulta)
+
+    Args:
+        error: exceção levantada pela operação
+
+    Returns:
+        bool: True para conexões perdidas, SSL encerrado, banco fora do ar ou pool esgotado
+    """
+    if isinstance(error, DBAPIError) and error.connection_invalidated:
+        return True
+    return isinstance(error, (OperationalError, InterfaceError, DisconnectionError, PoolTimeoutError))
+
+
+class DBResilience:
+    """
+    Circuit breaker, sonda de saúde e novas tentativas para o banco de dados.
+    """
+
+    def __init__(self):
+        """Inicializa com as configurações do ambiente"""
+        self.max_retries = int(os.environ.get('AVI_DB_RETRIES', '2'))
+        self.retry_base = float(os.environ.get('AVI_DB_RETRY_BASE', '0.05'))
+        self.retry_max_delay = float(os.environ.get('AVI_DB_RETRY_MAX_DELAY', '0.5'))
+        self.retry_budget = float(os.environ.get('AVI_DB_RETRY_BUDGET', '1.0'))
+        self.probe_enabled = os.environ.get('AVI_DB_HEALTH_PROBE', 'true').lower() == 'true'
+        self.probe_interval = float(os.environ.get('AVI_DB_HEALTH_INTERVAL', '5'))
+
+        self.breaker = get_breaker(
+            'database',
+            failure_threshold=int(os.environ.get('AVI_DB_BREAKER_THRESHOLD', '5')),
+            reset_timeout=float(os.environ.get('AVI_DB_BREAKER_RESET', '15'))
+        )
+
+        self.app = None
+        self.db = None
+        self._stopped = threading.Event()
+        self._thread = None
+        self.last_probe = None
+
+        self.stats = {'operations': 0, 'retries': 0, 'rejected': 0, 'unavailable': 0}
+
+    def init_app(self, app, db):
+        """
+        Associa a aplicação e o SQLAlchemy, registra o tratamento de
+        DatabaseUnavailable (503) e inicia a sonda de saúde
+
+        Args:
+            app: aplicação Flask
+            db: instância do SQLAlchemy
+        """
+        self.app = app
+        self.db = db
+
+        @app.errorhandler(DatabaseUnavailable)
+        def _database_unavailable(error):
+            from flask import jsonify
+            response = jsonify({
+                'error': True,
+                'message': 'Banco de dados temporariamente indisponível. Por favor, tente novamente em instantes.'
+            })
+            response.status_code = 503
+            response.headers['Retry-After'] = str(max(1, int(round(error.retry_after))))
+            return response
+
+        if not self.probe_enabled:
+            logger.info("Sonda de saúde do banco desabilitada (AVI_DB_HEALTH_PROBE)")
+            return
+
+        self._thread = threading.Thread(target=self._run_probe, name='db-health-probe', daemon=True)
+        self._thread.start()
+        logger.info(f"Sonda de saúde do banco iniciada (intervalo: {self.probe_interval}s)")
+
+    def run(self, operation, idempotent=False, retries=None):
+        """
+        Executa uma operação de banco protegida pelo circuit breaker
+
+        Falhas de conexão abrem o circuito após o limite configurado; enquanto ele
+        estiver aberto, a operação falha imediatamente com DatabaseUnavailable.
+        Apenas operações idempotentes (leituras) são repetidas, com backoff
+        exponencial com jitter e dentro do orçamento de tempo.
+
+        Args:
+            operation: função sem argumentos que executa a operação
+            idempotent: True se a operação pode ser repetida com segurança
+            retries: novas tentativas (padrão: AVI_DB_RETRIES; ignorado se não idempotente)
+
+        Returns:
+            O resultado da operação
+
+        Raises:
+            DatabaseUnavailable: se o circuito estiver aberto ou as tentativas se esgotarem
+            Outros erros da operação (ex.: erros de integridade) são repassados sem alteração
+        """
+        attempts = 1 + (self.max_retries if retries is None else max(0, retries)) if idempotent else 1
+        deadline = time.monotonic() + self.retry_budget
+        self.stats['operations'] += 1
+
+        for attempt in range(1, attempts + 1):
+            if not self.breaker.allow():
+                self.stats['rejected'] += 1
+                raise DatabaseUnavailable("Circuito do banco de dados aberto", self.breaker.retry_after())
+
+            try:
+                result = operation()
+            except Exception as e:
+                if not is_connection_error(e):
+                    # O banco respondeu: o erro é da operação, não da conexão
+                    self.breaker.record_success()
+                    raise
+
+                self.breaker.record_failure()
+                self._reset_session()
+                logger.warning(f"Falha de conexão com o banco ({attempt}/{attempts}): {str(e)}")
+
+                delay = random.uniform(0, min(self.retry_max_delay, self.retry_base * (2 ** (attempt - 1))))
+                if (attempt == attempts or isinstance(e, PoolTimeoutError)
+                        or time.monotonic() + delay > deadline):
+                    self.stats['unavailable'] += 1
+                    raise DatabaseUnavailable(f"Banco de dados indisponível: {str(e)}",
+                                              self.breaker.retry_after()) from e
+
+                self.stats['retries'] += 1
+                time.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def _reset_session(self):
+        """Descarta a transação da sessão atual para que a próxima tentativa use outra conexão"""
+        if self.db is None:
+            return
+        try:
+            self.db.session.rollback()
+        except Exception as e:
+            logger.debug(f"Erro ao desfazer a sessão após falha de conexão: {str(e)}")
+
+    def probe(self):
+        """
+        Executa um SELECT 1 e atualiza o circuito com o resultado.
+        Chamar dentro de um app context.
+
+        Returns:
+            dict: {"ok", "latency_ms", "error", "checked_at"}
+        """
+        start = time.perf_counter()
+        try:
+            with self.db.engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+        except Exception as e:
+            self.last_probe = {
+                'ok': False,
+                'latency_ms': round((time.perf_counter() - start) * 1000, 1),
+                'error': str(e).splitlines()[0] if str(e) else type(e).__name__,
+                'checked_at': time.time()
+            }
+            self.breaker.record_failure()
+            logger.warning(f"Sonda de saúde do banco falhou: {self.last_probe['error']}")
+        else:
+            self.last_probe = {
+                'ok': True,
+                'latency_ms': round((time.perf_counter() - start) * 1000, 1),
+                'error': None,
+                'checked_at': time.time()
+            }
+            if self.breaker.state != CLOSED:
+                self.breaker.record_success()
+        return self.last_probe
+
+    def _run_probe(self):
+        """Laço da sonda de saúde"""
+        while not self._stopped.wait(self.probe_interval):
+            try:
+                with self.app.app_context():
+                    self.probe()
+            except Exception as e:
+                logger.error(f"Erro inesperado na sonda de saúde do banco: {str(e)}")
+
+    def shutdown(self):
+        """Interrompe a sonda de saúde"""
+        self._stopped.set()
+
+    def pool_stats(self):
+        """
+        Estatísticas do pool de conexões do engine. Chamar dentro de um app context.
+
+        Returns:
+            dict: classe do pool, tamanho, conexões livres, em uso, overflow e espera
+        """
+        pool = self.db.engine.pool
+        stats = {'pool_class': type(pool).__name__}
+        for name in ('size', 'checkedin', 'checkedout', 'overflow', 'timeout'):
+            method = getattr(pool, name, None)
+            if callable(method):
+                stats[name] = method()
+        stats['max_overflow'] = getattr(pool, '_max_overflow', None)
+        stats.update(pool_wait_stats.snapshot())
+        return stats
+
+    def health(self):
+        """
+        Estado do banco para a rota de saúde. Chamar dentro de um app context.
+
+        Returns:
+            dict: {"status", "circuit", "last_probe", "pool", "operations"}
+        """
+        circuit = self.breaker.snapshot()
+        return {
+            'status': 'unavailable' if circuit['state'] == 'open' else 'ok',
+            'circuit': circuit,
+            'last_probe': self.last_probe,
+            'pool': self.pool_stats(),
+            'operations': dict(self.stats)
+        }
+
+
+# Instância global da camada de resiliência do banco
+db_resilience = DBResilience()
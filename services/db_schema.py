@@ -0,0 +1,110 @@
+"""
+Atualização do esquema de bancos já existentes
+O projeto não usa migrações: as tabelas são criadas por db.create_all, que não
+altera tabelas existentes. Este módulo adiciona, de forma idempotente, as colunas
+e índices introduzidos depois da criação das tabelas.
+
+A atualização roda uma vez no deploy (python setup.py --schema-only, no build do
+.replit) ou pela rota /setup, nunca nos workers que atendem requisições. No
+PostgreSQL ela é feita sob um advisory lock, para que duas execuções simultâneas
+não disputem o mesmo CREATE/ALTER.
+"""
+
+import logging
+import threading
+
+from sqlalchemy import inspect, text
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Colunas adicionadas depois da criação das tabelas: (tabela, coluna, DDL)
+ADDED_COLUMNS = [
+    ('conversation', 'session_key', "ALTER TABLE conversation ADD COLUMN session_key VARCHAR(64)"),
+    ('travel_plan', 'version', "ALTER TABLE travel_plan ADD COLUMN version INTEGER NOT NULL DEFAULT 1"),
+]
+
+# Colunas que passaram a aceitar nulo: (tabela, coluna, DDL). O SQLite não altera
+# colunas existentes; nele a tabela precisa ser recriada manualmente.
+NULLABLE_COLUMNS = [
+    ('conversation', 'user_id', "ALTER TABLE conversation ALTER COLUMN user_id DROP NOT NULL"),
+]
+
+# Chave do advisory lock do PostgreSQL que serializa a atualização do esquema
+SCHEMA_LOCK_KEY = 0x41564953
+
+_checked = False
+_lock = threading.Lock()
+
+
+def ensure_schema(db):
+    """
+    Garante as tabelas, colunas e índices dos modelos em um banco existente.
+    Executa apenas uma vez por processo; chamar dentro de um app context.
+
+    Args:
+        db: instância do SQLAlchemy
+    """
+    global _checked
+    if _checked:
+        return
+
+    with _lock:
+        if _checked:
+            return
+
+        if db.engine.dialect.name == 'postgresql':
+            with db.engine.connect() as lock_connection:
+                lock_connection.execute(text("SELECT pg_advisory_lock(:key)"), {'key': SCHEMA_LOCK_KEY})
+                try:
+                    _upgrade(db)
+                finally:
+                    lock_connection.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': SCHEMA_LOCK_KEY})
+                    lock_connection.commit()
+        else:
+            _upgrade(db)
+
+        _checked = True
+
+
+def _upgrade(db):
+    """
+    Aplica as colunas, tabelas e índices que faltam
+
+    Args:
+        db: instância do SQLAlchemy
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    relax_columns = db.engine.dialect.name != 'sqlite'
+
+    with db.engine.begin() as connection:
+        for table, column, ddl in ADDED_COLUMNS:
+            if table not in existing_tables:
+                continue
+            columns = {c['name'] for c in inspector.get_columns(table)}
+            if column not in columns:
+                logger.warning(f"Adicionando coluna {table}.{column} ao banco existente")
+                connection.execute(text(ddl))
+
+        for table, column, ddl in NULLABLE_COLUMNS:
+            if table not in existing_tables:
+                continue
+            nullable = {c['name']: c['nullable'] for c in inspector.get_columns(table)}
+            if nullable.get(column) is False:
+                if relax_columns:
+                    logger.warning(f"Permitindo nulo em {table}.{column}")
+                    connection.execute(text(ddl))
+                else:
+                    logger.warning(f"{table}.{column} não aceita nulo; recrie a tabela no SQLite")
+
+    # Tabelas novas são criadas com todos os índices; nas existentes, criar os que faltam
+    db.create_all()
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                logger.warning(f"Criando índice {index.name} em {table.name}")
+                index.create(bind=db.engine, checkfirst=True)
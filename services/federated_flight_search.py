@@ -0,0 +1,405 @@
+"""
+Busca federada de voos em múltiplos provedores
+Consulta em paralelo um conjunto configurável de provedores (TravelPayouts REST,
+TravelPayoutsService, Amadeus SDK, Skyscanner e widget Trip.com) sob um prazo
+único. Os resultados que chegarem a tempo são normalizados em um único formato de
+oferta, deduplicados por (companhia, número do voo, partida) e ordenados por preço.
+Provedores lentos deixam de bloquear o turno do chat: o que não chegar no prazo
+é reportado em meta.timed_out. Cada busca usa seu próprio conjunto de threads,
+para que um provedor travado não ocupe vagas das buscas de outras requisições.
+
+Configuração (variáveis de ambiente):
+- AVI_FEDERATED_PROVIDERS: provedores separados por vírgula
+  (padrão: "travelpayouts,amadeus"; disponíveis: travelpayouts, travelpayouts_service,
+  amadeus, skyscanner, trip_widget)
+- AVI_FEDERATED_DEADLINE: prazo total da busca em segundos (padrão: 8)
+- AVI_FEDERATED_MAX_WORKERS: provedores consultados simultaneamente por busca (padrão: 8)
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from collections.abc import Mapping
+
+from services.service_registry import lazy_service
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROVIDERS = "travelpayouts,amadeus"
+
+
+def _price_value(value):
+    """Converte um preço (str/int/float) em float, ou None se inválido"""
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    return price if price > 0 else None
+
+
+def normalize_offer(offer, provider):
+    """
+    Normaliza uma oferta no formato Amadeus (itineraries/segments/price), usado pelo
+    TravelPayouts REST, pelo TravelPayoutsService e pelo SDK da Amadeus.
+
+    O formato normalizado mantém os campos já consumidos pelo frontend e pelo chat
+    (id, itineraries, price.total/currency, validatingAirlineCodes, source, booking_url)
+    e acrescenta campos planos usados na deduplicação e na ordenação.
+
+    Args:
+        offer: oferta do provedor
+        provider: nome do provedor
+
+    Returns:
+        dict: oferta normalizada ou None se não tiver preço/segmentos
+    """
+    if not isinstance(offer, Mapping) or offer.get('is_redirect'):
+        return None
+
+    price = offer.get('price') or {}
+    price_value = _price_value(price.get('total') if isinstance(price, dict) else price)
+    itineraries = offer.get('itineraries') or []
+    segments = itineraries[0].get('segments') if itineraries else None
+    if price_value is None or not segments:
+        return None
+
+    first, last = segments[0], segments[-1]
+    return_segments = itineraries[1].get('segments') if len(itineraries) > 1 else None
+    carrier = first.get('carrierCode') or (offer.get('validatingAirlineCodes') or [''])[0]
+
+    return {
+        "id": f"{provider}:{offer.get('id', '')}",
+        "provider": provider,
+        "sources": [provider],
+        "source": offer.get('source', provider),
+        "carrier": carrier,
+        "flight_number": str(first.get('number') or ''),
+        "origin": first.get('departure', {}).get('iataCode'),
+        "destination": last.get('arrival', {}).get('iataCode'),
+        "departure_at": first.get('departure', {}).get('at'),
+        "arrival_at": last.get('arrival', {}).get('at'),
+        "return_at": return_segments[0].get('departure', {}).get('at') if return_segments else None,
+        "stops": max(len(segments) - 1, 0),
+        "price_value": price_value,
+        "price": {
+            "total": f"{price_value:.2f}",
+            "currency": (price.get('currency') if isinstance(price, dict) else None) or 'BRL'
+        },
+        "itineraries": itineraries,
+        "validatingAirlineCodes": [carrier] if carrier else [],
+        "booking_url": offer.get('booking_url') or offer.get('redirect_url')
+    }
+
+
+# Adaptadores de provedor: cada classe tem um atributo name e um método
+# search(query) que recebe um dict com origin, destination, departure_date,
+# return_date, adults e currency e devolve a lista de ofertas normalizadas.
+
+class TravelPayoutsRestProvider:
+    """TravelPayouts via API REST (travelpayouts_api)"""
+
+    name = 'travelpayouts'
+
+    def search(self, query):
+        from services.travelpayouts_rest_api import travelpayouts_api
+
+        offers = travelpayouts_api.search_flights(
+            origin=query['origin'],
+            destination=query['destination'],
+            departure_date=query['departure_date'],
+            return_date=query.get('return_date'),
+            adults=query.get('adults', 1)
+        )
+        return [o for o in (normalize_offer(offer, self.name) for offer in offers or []) if o]
+
+
+class TravelPayoutsServiceProvider:
+    """TravelPayouts via serviço legado (travelpayouts_service)"""
+
+    name = 'travelpayouts_service'
+
+    def search(self, query):
+        from services.travelpayouts_service import travelpayouts_service
+
+        offers = travelpayouts_service.search_flights(_amadeus_params(query))
+        return [o for o in (normalize_offer(offer, self.name) for offer in offers or []) if o]
+
+
+class AmadeusProvider:
+    """Amadeus via SDK oficial (AmadeusSDKService)"""
+
+    name = 'amadeus'
+
+    def __init__(self):
+        self._service = None
+
+    def search(self, query):
+        if self._service is None:
+            from services.amadeus_sdk_service import AmadeusSDKService
+            self._service = AmadeusSDKService()
+
+        result = self._service.search_flights(_amadeus_params(query))
+        if result.get('error'):
+            raise RuntimeError(result['error'])
+        return [o for o in (normalize_offer(offer, self.name) for offer in result.get('data') or []) if o]
+
+
+class SkyscannerProvider:
+    """Skyscanner (formato próprio de cotações)"""
+
+    name = 'skyscanner'
+
+    def search(self, query):
+        from services.skyscanner_service import SkyscannerService
+
+        result = SkyscannerService().search_flights({
+            'origin': query['origin'],
+            'destination': query['destination'],
+            'departure_date': query['departure_date'],
+            'return_date': query.get('return_date') or '',
+            'adults': query.get('adults', 1),
+            'currency': query.get('currency', 'BRL')
+        })
+        if result.get('error'):
+            raise RuntimeError(result['error'])
+
+        offers = []
+        for flight in result.get('flights', []):
+            price_value = _price_value(flight.get('price'))
+            if price_value is None:
+                continue
+            departure_at = (flight.get('departure') or {}).get('time')
+            offers.append({
+                "id": f"{self.name}:{flight.get('id', '')}",
+                "provider": self.name,
+                "sources": [self.name],
+                "source": "Skyscanner",
+                "carrier": flight.get('airline', ''),
+                "flight_number": '',
+                "origin": query['origin'],
+                "destination": query['destination'],
+                "departure_at": departure_at,
+                "arrival_at": None,
+                "return_at": None,
+                "stops": 0 if flight.get('is_direct') else None,
+                "price_value": price_value,
+                "price": {"total": f"{price_value:.2f}", "currency": flight.get('currency', 'BRL')},
+                "itineraries": [{"segments": [{
+                    "departure": {"iataCode": query['origin'], "at": departure_at},
+                    "arrival": {"iataCode": query['destination'], "at": None},
+                    "carrierCode": flight.get('airline', ''),
+                    "number": ''
+                }]}],
+                "validatingAirlineCodes": [],
+                "booking_url": flight.get('affiliate_link')
+            })
+        return offers
+
+
+class TripWidgetProvider:
+    """Widget Trip.com via Playwright (requer navegador instalado)"""
+
+    name = 'trip_widget'
+
+    def search(self, query):
+        from services.async_bridge import async_bridge
+        from services.trip_widget_service import trip_widget_service
+
+        # Sem o prazo, uma busca travada no navegador prenderia a thread para sempre
+        offers = async_bridge.run(trip_widget_service.search_flights(
+            origin=query['origin'],
+            destination=query['destination'],
+            departure_date=query['departure_date'],
+            return_date=query.get('return_date'),
+            adults=query.get('adults', 1)
+        ), timeout=query.get('deadline'))
+        return [o for o in (normalize_offer(offer, self.name) for offer in offers or []) if o]
+
+
+# Adaptadores disponíveis por nome
+PROVIDER_CLASSES = {
+    cls.name: cls for cls in (
+        TravelPayoutsRestProvider,
+        TravelPayoutsServiceProvider,
+        AmadeusProvider,
+        SkyscannerProvider,
+        TripWidgetProvider
+    )
+}
+
+
+def _amadeus_params(query):
+    """Converte a consulta para os nomes de parâmetros no estilo Amadeus"""
+    params = {
+        'originLocationCode': query['origin'],
+        'destinationLocationCode': query['destination'],
+        'departureDate': query['departure_date'],
+        'adults': query.get('adults', 1),
+        'currencyCode': query.get('currency', 'BRL'),
+        'max': query.get('max_per_provider', 20)
+    }
+    if query.get('return_date'):
+        params['returnDate'] = query['return_date']
+    return params
+
+
+class FederatedFlightSearch:
+    """
+    Executa a busca em vários provedores em paralelo sob um prazo único.
+    """
+
+    def __init__(self, providers=None):
+        """
+        Inicializa o motor de busca federada
+
+        Args:
+            providers: lista de nomes de provedores (padrão: AVI_FEDERATED_PROVIDERS)
+        """
+        if providers is None:
+            providers = os.environ.get('AVI_FEDERATED_PROVIDERS', DEFAULT_PROVIDERS).split(',')
+
+        self.providers = []
+        for name in (p.strip() for p in providers):
+            if not name:
+                continue
+            if name not in PROVIDER_CLASSES:
+                logger.warning(f"Provedor de voos desconhecido ignorado: {name}")
+                continue
+            self.providers.append(PROVIDER_CLASSES[name]())
+
+        self.deadline = float(os.environ.get('AVI_FEDERATED_DEADLINE', '8'))
+        self.max_workers = int(os.environ.get('AVI_FEDERATED_MAX_WORKERS', '8'))
+
+        logger.info(f"Busca federada configurada com provedores: {', '.join(p.name for p in self.providers)}")
+
+    def search(self, origin, destination, departure_date, return_date=None, adults=1, currency='BRL', deadline=None, limit=50):
+        """
+        Busca voos em todos os provedores configurados
+
+        Args:
+            origin: código IATA de origem
+            destination: código IATA de destino
+            departure_date: data de partida (YYYY-MM-DD)
+            return_date: data de retorno (opcional)
+            adults: número de adultos
+            currency: moeda
+            deadline: prazo em segundos (padrão: AVI_FEDERATED_DEADLINE)
+            limit: número máximo de ofertas retornadas
+
+        Returns:
+            dict: {"data": ofertas ordenadas por preço, "meta": {...}}
+        """
+        query = {
+            'origin': origin,
+            'destination': destination,
+            'departure_date': departure_date,
+            'return_date': return_date,
+            'adults': adults,
+            'currency': currency
+        }
+        deadline = self.deadline if deadline is None else deadline
+        query['deadline'] = deadline
+        start_time = time.monotonic()
+
+        # Threads da busca: provedores atrasados não prendem vagas de outras buscas
+        executor = ThreadPoolExecutor(max_workers=max(1, min(len(self.providers), self.max_workers)),
+                                      thread_name_prefix='federated-search')
+        try:
+            futures = {executor.submit(self._run_provider, provider, query): provider for provider in self.providers}
+            done, not_done = wait(futures, timeout=deadline)
+        finally:
+            # Não esperar pelos provedores em andamento; os que nem começaram são cancelados
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        offers = []
+        providers_meta = {}
+        failed = []
+        for future in done:
+            provider = futures[future]
+            try:
+                provider_offers, elapsed = future.result()
+                offers.extend(provider_offers)
+                providers_meta[provider.name] = {"count": len(provider_offers), "elapsed_ms": elapsed}
+            except Exception as e:
+                logger.warning(f"Provedor {provider.name} falhou: {str(e)}")
+                failed.append(provider.name)
+                providers_meta[provider.name] = {"error": str(e)}
+
+        timed_out = sorted(futures[future].name for future in not_done)
+        for future in not_done:
+            # A chamada em andamento termina no próprio timeout; o resultado tardio é descartado
+            providers_meta[futures[future].name] = {"timed_out": True}
+        if timed_out:
+            logger.warning(f"Provedores fora do prazo de {deadline}s: {', '.join(timed_out)}")
+
+        merged = self.merge(offers)
+
+        return {
+            "data": merged[:limit],
+            "search_timestamp": datetime.utcnow().isoformat(),
+            "meta": {
+                "origin": origin,
+                "destination": destination,
+                "departure_date": departure_date,
+                "return_date": return_date,
+                "currency": currency,
+                "source": "Federated",
+                "providers": providers_meta,
+                "timed_out": timed_out,
+                "failed": failed,
+                "total_offers": len(offers),
+                "unique_offers": len(merged),
+                "elapsed_ms": round((time.monotonic() - start_time) * 1000, 1)
+            }
+        }
+
+    @staticmethod
+    def _run_provider(provider, query):
+        """Executa um provedor medindo o tempo de resposta"""
+        start = time.monotonic()
+        offers = provider.search(query)
+        return offers, round((time.monotonic() - start) * 1000, 1)
+
+    @staticmethod
+    def dedup_key(offer):
+        """
+        Chave de deduplicação: (companhia, número do voo, partida até o minuto).
+        Ofertas sem companhia ou número não são deduplicadas.
+        """
+        carrier = (offer.get('carrier') or '').upper()
+        number = (offer.get('flight_number') or '').lstrip('0')
+        departure = (offer.get('departure_at') or '')[:16]
+        if not carrier or not number or not departure:
+            return ('unique', offer['id'])
+        return (carrier, number, departure, offer.get('return_at') or '')
+
+    def merge(self, offers):
+        """
+        Deduplica as ofertas mantendo a mais barata e ordena por preço
+
+        Args:
+            offers: ofertas normalizadas de todos os provedores
+
+        Returns:
+            list: ofertas únicas ordenadas por preço
+        """
+        best = {}
+        for offer in offers:
+            key = self.dedup_key(offer)
+            current = best.get(key)
+            if current is None:
+                best[key] = offer
+                continue
+            sources = sorted(set(current['sources']) | set(offer['sources']))
+            if offer['price_value'] < current['price_value']:
+                best[key] = offer
+            best[key]['sources'] = sources
+
+        return sorted(best.values(), key=lambda o: o['price_value'])
+
+
+# Instância global (construída no primeiro uso)
+federated_flight_search = lazy_service('federated_flight_search', FederatedFlightSearch)
@@ -0,0 +1,441 @@
+"""
+Scanner de preços para datas flexíveis
+Busca, em paralelo, a matriz de mês e o calendário de preços de todos os meses
+tocados por um período (date_range_start a date_range_end), pelo cache mensal do
+cliente TravelPayouts, e combina as linhas em uma grade NumPy (dia de partida ×
+duração da estadia). A partir da grade são calculadas, de forma vetorizada, as tabelas:
+- mais barato por dia de partida
+- mais barato por semana (semanas iniciando na segunda-feira)
+- melhor duração de estadia (mais barato por duração)
+
+Configuração (variáveis de ambiente):
+- FLEX_SCAN_TIMEOUT: tempo máximo da varredura completa em segundos (padrão: 30)
+- FLEX_SCAN_MAX_MONTHS: número máximo de meses varridos por busca (padrão: 12)
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from services.service_registry import lazy_service
+from services.route_popularity import route_popularity
+from services.travelpayouts_rest_api import month_cache_key
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Duração usada para voos somente ida (sem data de retorno)
+ONE_WAY_STAY = 0
+
+
+class MonthUnavailable(Exception):
+    """Nenhuma resposta válida da API para um mês da varredura"""
+
+
+class InvalidDateRange(ValueError):
+    """Período de datas em formato inválido"""
+
+
+def upstream_errors():
+    """
+    Falhas esperadas da API na varredura (rede, prazo, mês sem resposta).
+    Os demais erros (ex.: aiohttp ausente, defeito na agregação) não estão aqui
+    e não devem ser tratados como indisponibilidade do fornecedor.
+
+    Returns:
+        tuple: classes de exceção
+    """
+    errors = (MonthUnavailable, TimeoutError, OSError)
+    try:
+        import aiohttp
+    except ImportError:
+        return errors
+    return errors + (aiohttp.ClientError,)
+
+
+class FlexibleDateScanner:
+    """
+    Varredura multi-mês de preços com agregação vetorizada.
+    """
+
+    def __init__(self, api=None):
+        """
+        Inicializa o scanner
+
+        Args:
+            api: cliente assíncrono do TravelPayouts (padrão: travelpayouts_async_api)
+        """
+        if api is None:
+            from services.travelpayouts_async_api import travelpayouts_async_api
+            api = travelpayouts_async_api
+        self.api = api
+        self.timeout = float(os.environ.get('FLEX_SCAN_TIMEOUT', '30'))
+        self.max_months = int(os.environ.get('FLEX_SCAN_MAX_MONTHS', '12'))
+
+    @staticmethod
+    def months_in_range(start_date, end_date):
+        """
+        Lista os meses (YYYY-MM) tocados pelo período
+
+        Args:
+            start_date: data inicial (date)
+            end_date: data final (date)
+
+        Returns:
+            list: meses em ordem cronológica
+        """
+        months = []
+        year, month = start_date.year, start_date.month
+        while (year, month) <= (end_date.year, end_date.month):
+            months.append(f"{year:04d}-{month:02d}")
+            month += 1
+            if month > 12:
+                year, month = year + 1, 1
+        return months
+
+    def scan(self, origin, destination, date_range_start, date_range_end, min_stay=None, max_stay=None, limit=20):
+        """
+        Versão síncrona de scan_async, executada no event loop de fundo
+
+        Args:
+            origin: código IATA de origem
+            destination: código IATA de destino
+            date_range_start: início do período de partida (YYYY-MM-DD)
+            date_range_end: fim do período de partida (YYYY-MM-DD)
+            min_stay: duração mínima da estadia em dias (opcional)
+            max_stay: duração máxima da estadia em dias (opcional)
+            limit: número máximo de voos retornados
+
+        Returns:
+            dict: resultado da varredura (ver scan_async)
+        """
+        from services.async_bridge import async_bridge
+
+        return async_bridge.run(
+            self.scan_async(origin, destination, date_range_start, date_range_end, min_stay, max_stay, limit),
+            timeout=self.timeout + 5
+        )
+
+    async def scan_async(self, origin, destination, date_range_start, date_range_end, min_stay=None, max_stay=None, limit=20):
+        """
+        Varre todos os meses do período e agrega os preços
+
+        Args:
+            origin: código IATA de origem
+            destination: código IATA de destino
+            date_range_start: início do período de partida (YYYY-MM-DD)
+            date_range_end: fim do período de partida (YYYY-MM-DD)
+            min_stay: duração mínima da estadia em dias (opcional)
+            max_stay: duração máxima da estadia em dias (opcional)
+            limit: número máximo de voos retornados
+
+        Returns:
+            dict: {
+                "flights": voos formatados (mais barato de cada dia, por preço),
+                "months": meses varridos,
+                "failed_months": meses cuja busca falhou,
+                "tables": {"cheapest_per_day", "cheapest_per_week", "best_stay_length"}
+            }
+
+        Raises:
+            InvalidDateRange: se as datas do período não estiverem no formato YYYY-MM-DD
+            Exception: a falha do primeiro mês, se a busca de todos os meses falhou
+        """
+        try:
+            start = datetime.strptime(date_range_start, '%Y-%m-%d').date()
+            end = datetime.strptime(date_range_end, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            raise InvalidDateRange(f"Período inválido: {date_range_start} a {date_range_end}")
+        if end < start:
+            start, end = end, start
+
+        months = self.months_in_range(start, end)
+        if len(months) > self.max_months:
+            logger.warning(f"Período de {len(months)} meses limitado a {self.max_months} meses")
+            months = months[:self.max_months]
+            end = min(end, self._last_day_of_month(months[-1]))
+
+        logger.info(f"Varredura flexível {origin} → {destination}: {start} a {end} ({len(months)} meses)")
+        route_popularity.record(origin, destination)
+
+        tasks = [self._fetch_month(origin, destination, month) for month in months]
+        try:
+            month_results = await asyncio.wait_for(
+                asyncio.gather(*tasks, return_exceptions=True),
+                timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"Varredura flexível excedeu {self.timeout}s")
+            month_results = [asyncio.TimeoutError()] * len(months)
+
+        rows = []
+        failed_months = []
+        for month, result in zip(months, month_results):
+            if isinstance(result, Exception):
+                logger.error(f"Falha ao varrer o mês {month}: {str(result)}")
+                failed_months.append(month)
+                continue
+            rows.extend(result)
+
+        # Nenhum mês respondeu: propagar a falha em vez de um resultado vazio
+        if failed_months and len(failed_months) == len(months):
+            raise next(result for result in month_results if isinstance(result, Exception))
+
+        rows = self._filter_rows(rows, start, end, min_stay, max_stay)
+        tables, best_rows = self.aggregate(rows, start, end)
+
+        best_rows.sort(key=lambda row: row['price'])
+        flights = [self._format_row(row, origin, destination) for row in best_rows[:limit]]
+
+        return {
+            "flights": flights,
+            "months": months,
+            "failed_months": failed_months,
+            "tables": tables
+        }
+
+    async def _fetch_month(self, origin, destination, month):
+        """
+        Busca matriz de mês e calendário de um mês em paralelo
+
+        Args:
+            origin: código IATA de origem
+            destination: código IATA de destino
+            month: mês no formato YYYY-MM
+
+        Returns:
+            list: linhas normalizadas do mês
+        """
+        month_start = f"{month}-01"
+        matrix_data, calendar_data = await asyncio.gather(
+            self.api._get_month_json(
+                month_cache_key('month_matrix', origin, destination, month_start),
+                self.api.month_matrix_endpoint,
+                self.api._matrix_params(origin, destination, month_start),
+                'matriz mês'
+            ),
+            self.api._get_month_json(
+                month_cache_key('calendar', origin, destination, month_start),
+                self.api.calendar_prices_endpoint,
+                self.api._calendar_params(origin, destination, month_start),
+                'calendário'
+            )
+        )
+
+        rows = []
+        if matrix_data and matrix_data.get("success", False):
+            for flight_info in matrix_data.get("data") or []:
+                row = self._matrix_row(flight_info)
+                if row:
+                    rows.append(row)
+
+        if calendar_data and calendar_data.get("success", False) and isinstance(calendar_data.get("data"), dict):
+            for date_str, entries in calendar_data["data"].items():
+                # O calendário pode trazer um objeto ou uma lista de objetos por data
+                for flight_info in (entries if isinstance(entries, list) else [entries]):
+                    row = self._calendar_row(date_str, flight_info)
+                    if row:
+                        rows.append(row)
+
+        if matrix_data is None and calendar_data is None:
+            raise MonthUnavailable(f"Nenhuma resposta válida para {month}")
+
+        return rows
+
+    @staticmethod
+    def _stay_length(depart_date, return_date):
+        """Calcula a duração da estadia em dias (0 para somente ida)"""
+        if not return_date:
+            return ONE_WAY_STAY
+        depart = datetime.strptime(depart_date, '%Y-%m-%d').date()
+        ret = datetime.strptime(return_date[:10], '%Y-%m-%d').date()
+        return max((ret - depart).days, ONE_WAY_STAY)
+
+    def _matrix_row(self, flight_info):
+        """Normaliza uma linha da matriz de mês"""
+        price = flight_info.get("value")
+        depart_date = flight_info.get("depart_date")
+        if not price or not depart_date:
+            return None
+        return_date = flight_info.get("return_date") or None
+        return {
+            "depart_date": depart_date,
+            "return_date": return_date,
+            "stay": self._stay_length(depart_date, return_date),
+            "price": float(price),
+            "source": "matrix",
+            "raw": flight_info
+        }
+
+    def _calendar_row(self, date_str, flight_info):
+        """Normaliza uma linha do calendário de preços"""
+        if not isinstance(flight_info, dict) or not flight_info.get("price"):
+            return None
+        depart_date = (flight_info.get("departure_at") or date_str)[:10]
+        return_date = (flight_info.get("return_at") or flight_info.get("return_date") or "")[:10] or None
+        raw = dict(flight_info)
+        if return_date:
+            raw["return_date"] = return_date
+        return {
+            "depart_date": depart_date,
+            "return_date": return_date,
+            "stay": self._stay_length(depart_date, return_date),
+            "price": float(flight_info["price"]),
+            "source": "calendar",
+            "raw": raw
+        }
+
+    @staticmethod
+    def _filter_rows(rows, start, end, min_stay=None, max_stay=None):
+        """
+        Mantém apenas as linhas dentro do período e das durações solicitadas.
+        Voos somente ida têm duração ONE_WAY_STAY e, portanto, ficam de fora
+        quando min_stay é maior que zero.
+        """
+        start_str, end_str = start.isoformat(), end.isoformat()
+        filtered = []
+        for row in rows:
+            if not (start_str <= row["depart_date"] <= end_str):
+                continue
+            if min_stay is not None and row["stay"] < min_stay:
+                continue
+            if max_stay is not None and row["stay"] > max_stay:
+                continue
+            filtered.append(row)
+        return filtered
+
+    def aggregate(self, rows, start, end):
+        """
+        Monta a grade de preços (dia × duração) e calcula as tabelas agregadas
+
+        Args:
+            rows: linhas normalizadas dentro do período
+            start: primeiro dia do período (date)
+            end: último dia do período (date)
+
+        Returns:
+            tuple: (tabelas agregadas, linhas mais baratas de cada dia)
+        """
+        n_days = (end - start).days + 1
+        empty_tables = {"cheapest_per_day": [], "cheapest_per_week": [], "best_stay_length": []}
+        if not rows or n_days <= 0:
+            return empty_tables, []
+
+        day_idx = np.fromiter(
+            ((datetime.strptime(row["depart_date"], '%Y-%m-%d').date() - start).days for row in rows),
+            dtype=np.int64, count=len(rows)
+        )
+        stays = np.fromiter((row["stay"] for row in rows), dtype=np.int64, count=len(rows))
+        prices = np.fromiter((row["price"] for row in rows), dtype=np.float64, count=len(rows))
+
+        stay_values, stay_idx = np.unique(stays, return_inverse=True)
+        n_stays = len(stay_values)
+
+        # Linha mais barata de cada célula: ordenar por célula e preço e pegar a primeira
+        cells = day_idx * n_stays + stay_idx
+        order = np.lexsort((prices, cells))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = cells[order][1:] != cells[order][:-1]
+        best = order[first]
+
+        grid = np.full(n_days * n_stays, np.inf)
+        grid_row = np.full(n_days * n_stays, -1, dtype=np.int64)
+        grid[cells[best]] = prices[best]
+        grid_row[cells[best]] = best
+        grid = grid.reshape(n_days, n_stays)
+        grid_row = grid_row.reshape(n_days, n_stays)
+
+        # Mais barato por dia de partida
+        day_best_stay = grid.argmin(axis=1)
+        day_min = grid[np.arange(n_days), day_best_stay]
+        day_has_price = np.isfinite(day_min)
+        day_rows = grid_row[np.arange(n_days), day_best_stay]
+
+        cheapest_per_day = [
+            {
+                "date": (start + timedelta(days=int(d))).isoformat(),
+                "price": float(day_min[d]),
+                "stay_length": int(stay_values[day_best_stay[d]])
+            }
+            for d in np.flatnonzero(day_has_price)
+        ]
+
+        # Mais barato por semana (alinhada na segunda-feira)
+        offset = start.weekday()
+        n_weeks = -(-(offset + n_days) // 7)
+        week_grid = np.full(n_weeks * 7, np.inf)
+        week_grid[offset:offset + n_days] = day_min
+        week_grid = week_grid.reshape(n_weeks, 7)
+        week_best_day = week_grid.argmin(axis=1)
+        week_min = week_grid[np.arange(n_weeks), week_best_day]
+        first_monday = start - timedelta(days=offset)
+
+        cheapest_per_week = [
+            {
+                "week_start": (first_monday + timedelta(weeks=int(w))).isoformat(),
+                "date": (first_monday + timedelta(days=int(w * 7 + week_best_day[w]))).isoformat(),
+                "price": float(week_min[w])
+            }
+            for w in np.flatnonzero(np.isfinite(week_min))
+        ]
+
+        # Melhor duração de estadia
+        stay_best_day = grid.argmin(axis=0)
+        stay_min = grid[stay_best_day, np.arange(n_stays)]
+        stay_count = np.isfinite(grid).sum(axis=0)
+        stay_mean = np.where(
+            stay_count > 0,
+            np.where(np.isfinite(grid), grid, 0).sum(axis=0) / np.maximum(stay_count, 1),
+            np.inf
+        )
+
+        best_stay_length = sorted(
+            (
+                {
+                    "stay_length": int(stay_values[s]),
+                    "price": float(stay_min[s]),
+                    "date": (start + timedelta(days=int(stay_best_day[s]))).isoformat(),
+                    "average_price": round(float(stay_mean[s]), 2),
+                    "days_with_price": int(stay_count[s])
+                }
+                for s in np.flatnonzero(np.isfinite(stay_min))
+            ),
+            key=lambda item: item["price"]
+        )
+
+        tables = {
+            "cheapest_per_day": cheapest_per_day,
+            "cheapest_per_week": cheapest_per_week,
+            "best_stay_length": best_stay_length
+        }
+        best_rows = [rows[int(r)] for r in day_rows[day_has_price]]
+        return tables, best_rows
+
+    def _format_row(self, row, origin, destination):
+        """Formata uma linha com o formatador correspondente do cliente REST"""
+        if row["source"] == "calendar":
+            return self.api._format_calendar_flight(
+                flight_info=row["raw"],
+                origin=origin,
+                destination=destination,
+                date=row["depart_date"]
+            )
+        return self.api._format_matrix_flight(
+            flight_info=row["raw"],
+            origin=origin,
+            destination=destination
+        )
+
+    @staticmethod
+    def _last_day_of_month(month):
+        """Retorna o último dia (date) de um mês YYYY-MM"""
+        first = datetime.strptime(f"{month}-01", '%Y-%m-%d').date()
+        next_month = (first.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return next_month - timedelta(days=1)
+
+
+# Instância global do scanner (construída no primeiro uso)
+flexible_date_scanner = lazy_service('flexible_date_scanner', FlexibleDateScanner)
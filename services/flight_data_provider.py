@@ -8,6 +8,8 @@ import json
 import logging
 import requests
 from datetime import datetime, timedelta
+from services.service_registry import lazy_service
+from services.iata_tables import iata_tables
 
 # Configurar logger
 logging.basicConfig(level=logging.INFO)
@@ -218,7 +220,8 @@ class FlightDataProvider:
             
             # Construir a mensagem para o chat
             message = (
-                f"Encontrei {num_offers} voos disponíveis de {origin} para {destination}! "
+                f"Encontrei {num_offers} voos disponíveis de {iata_tables.airport_display_name(origin)} "
+                f"para {iata_tables.airport_display_name(destination)}! "
                 f"Os preços começam em {currency} {cheapest_price:.2f}.\n\n"
                 f"Para ver todos os detalhes, consulte o painel lateral de resultados que acabei de abrir, "
                 f"onde você pode visualizar informações completas sobre cada opção de voo."
@@ -260,4 +263,4 @@ class FlightDataProvider:
 
 
 # Instância global para uso em toda a aplicação
-flight_data_provider = FlightDataProvider()
\ No newline at end of file
+flight_data_provider = lazy_service('flight_data_provider', FlightDataProvider)
\ No newline at end of file
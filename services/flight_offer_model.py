@@ -0,0 +1,152 @@
+"""
+Modelo compacto de ofertas de voo
+Os formatadores do TravelPayouts constroem FlightOffer/FlightSegment em vez dos
+dicionários aninhados no formato Amadeus (itineraries → segments → departure/arrival).
+Os objetos usam __slots__ e guardam apenas os valores planos; a estrutura aninhada
+é gerada sob demanda:
+- to_dict() produz exatamente o JSON anterior e é usado na fronteira da resposta
+  (provedor JSON do Flask, ver services/json_provider.py)
+- o acesso por chave (offer['price']['total'], offer.get('itineraries'), ...) continua
+  funcionando para o código que lia os dicionários, sem materializar a oferta inteira
+"""
+
+from collections.abc import Mapping
+
+
+class FlightSegment(Mapping):
+    """
+    Trecho de voo (equivalente a um item de itineraries[n].segments)
+    """
+
+    __slots__ = ('origin', 'destination', 'departure_at', 'arrival_at', 'carrier', 'number', 'duration')
+
+    def __init__(self, origin, destination, departure_at, arrival_at, carrier, number, duration=None):
+        self.origin = origin
+        self.destination = destination
+        self.departure_at = departure_at
+        self.arrival_at = arrival_at
+        self.carrier = carrier
+        self.number = number
+        self.duration = duration
+
+    def __getitem__(self, key):
+        if key == 'departure':
+            return {"iataCode": self.origin, "at": self.departure_at}
+        if key == 'arrival':
+            return {"iataCode": self.destination, "at": self.arrival_at}
+        if key == 'carrierCode':
+            return self.carrier
+        if key == 'number':
+            return self.number
+        if key == 'duration' and self.duration is not None:
+            return self.duration
+        raise KeyError(key)
+
+    def _keys(self):
+        keys = ('departure', 'arrival', 'carrierCode', 'number')
+        return keys + ('duration',) if self.duration is not None else keys
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def to_dict(self):
+        """
+        Converte o trecho para o formato de dicionário da API
+
+        Returns:
+            dict: trecho no formato Amadeus
+        """
+        return {key: self[key] for key in self._keys()}
+
+    def __repr__(self):
+        return f"FlightSegment({self.origin}→{self.destination} {self.departure_at} {self.carrier}{self.number})"
+
+
+class FlightOffer(Mapping):
+    """
+    Oferta de voo com ida e volta opcional (equivalente a um item de "data").
+    Os atributos não repetem as chaves do JSON com outro significado (ex.: price_total),
+    para que templates Jinja (flight.price.total) continuem lendo pela chave.
+    """
+
+    # Campos opcionais, na ordem em que aparecem no JSON; omitidos quando None
+    OPTIONAL_FIELDS = ('booking_url', 'number_of_bookings', 'transfers', 'is_direct', 'is_redirect', 'label')
+
+    __slots__ = (
+        'id', 'segments', 'return_segments', 'price_total', 'currency', 'validating_airline', 'source'
+    ) + OPTIONAL_FIELDS
+
+    def __init__(self, id, segments, price, currency='BRL', validating_airline='TP', source='TravelPayouts',
+                 return_segments=None, booking_url=None, number_of_bookings=None, transfers=None,
+                 is_direct=None, is_redirect=None, label=None):
+        self.id = id
+        self.segments = tuple(segments)
+        self.return_segments = tuple(return_segments) if return_segments else None
+        self.price_total = str(price)
+        self.currency = currency
+        self.validating_airline = validating_airline
+        self.source = source
+        self.booking_url = booking_url
+        self.number_of_bookings = number_of_bookings
+        self.transfers = transfers
+        self.is_direct = is_direct
+        self.is_redirect = is_redirect
+        self.label = label
+
+    def __getitem__(self, key):
+        if key == 'id':
+            return self.id
+        if key == 'itineraries':
+            itineraries = [{"segments": list(self.segments)}]
+            if self.return_segments:
+                itineraries.append({"segments": list(self.return_segments)})
+            return itineraries
+        if key == 'price':
+            return {"total": self.price_total, "currency": self.currency}
+        if key == 'validatingAirlineCodes':
+            return [self.validating_airline]
+        if key == 'source':
+            return self.source
+        if key in self.OPTIONAL_FIELDS and getattr(self, key) is not None:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def _keys(self):
+        keys = ['id', 'itineraries', 'price', 'validatingAirlineCodes', 'source']
+        keys.extend(field for field in self.OPTIONAL_FIELDS if getattr(self, field) is not None)
+        return keys
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def to_dict(self):
+        """
+        Converte a oferta para o formato de dicionário da API (mesmo JSON de antes)
+
+        Returns:
+            dict: oferta no formato Amadeus
+        """
+        offer = {
+            "id": self.id,
+            "itineraries": [{"segments": [segment.to_dict() for segment in self.segments]}],
+            "price": {"total": self.price_total, "currency": self.currency},
+            "validatingAirlineCodes": [self.validating_airline],
+            "source": self.source
+        }
+        if self.return_segments:
+            offer["itineraries"].append({"segments": [segment.to_dict() for segment in self.return_segments]})
+        for field in self.OPTIONAL_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                offer[field] = value
+        return offer
+
+    def __repr__(self):
+        return f"FlightOffer({self.id}, {self.price_total} {self.currency}, {len(self.segments)} trecho(s))"
+
@@ -8,6 +8,7 @@ import json
 import requests
 import os
 from datetime import datetime, timedelta
+from services.service_registry import lazy_service
 
 # Configuração do logger
 logging.basicConfig(level=logging.INFO)
@@ -312,4 +313,4 @@ class FlightServiceConnector:
             }
 
 # Instância global para uso em outros módulos
-flight_service_connector = FlightServiceConnector()
\ No newline at end of file
+flight_service_connector = lazy_service('flight_service_connector', FlightServiceConnector)
\ No newline at end of file
@@ -12,7 +12,6 @@ import time
 import logging
 import tempfile
 from datetime import datetime
-from playwright.sync_api import sync_playwright
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -82,7 +81,8 @@ class FlightWidgetLoader:
         def run_browser_search():
             try:
                 logger.info(f"Iniciando busca headless para {search_id} ({origin} → {destination})")
-                # Iniciar Playwright
+                # Iniciar Playwright (importado aqui para não pesar na inicialização)
+                from playwright.sync_api import sync_playwright
                 playwright_instance = sync_playwright().start()
                 browser = playwright_instance.chromium.launch(headless=True)
                 context = browser.new_context()
@@ -0,0 +1,440 @@
+"""
+Geocodificação dos locais do roteiro com cache no servidor
+O navegador não consulta mais o Nominatim diretamente: os nomes de lugares são
+normalizados (minúsculas, sem acentos nem pontuação) e resolvidos, em ordem, por:
+1. cache em memória do processo;
+2. tabela GeocodedPlace (compartilhada por todos os usuários e workers);
+3. provedor externo, apenas nas faltas, com o resultado gravado na tabela.
+
+O Nominatim admite uma requisição por segundo. As faltas não esperam por ele na
+requisição: entram em uma fila (sem repetição) e voltam como "pending"; uma thread
+de fundo consulta a fila no ritmo permitido e grava os resultados, que a próxima
+requisição do cliente encontra em memória ou na tabela. Provedores locais
+(ex.: "static") são consultados na própria requisição.
+
+Lugares não encontrados também são gravados (sem coordenadas) e só voltam a ser
+consultados no provedor depois de AVI_GEOCODE_NEGATIVE_TTL. Códigos IATA de
+aeroportos (ex.: blocos de voo com "GRU") são consultados pelo nome do aeroporto.
+
+Provedores (AVI_GEOCODER):
+- "nominatim" (padrão): API pública do OpenStreetMap, consultada em segundo plano
+  no máximo uma vez por AVI_GEOCODE_MIN_INTERVAL segundos (por processo),
+  protegida por circuit breaker;
+- "static": arquivo JSON local {"nome do lugar": [lat, lon]} (AVI_GEOCODE_STATIC_FILE),
+  para desenvolvimento e testes sem acesso à rede.
+
+Configuração (variáveis de ambiente):
+- AVI_GEOCODER: provedor usado nas faltas (padrão: nominatim)
+- AVI_GEOCODE_STATIC_FILE: arquivo do provedor "static"
+- AVI_GEOCODE_URL: endpoint de busca do Nominatim (padrão: https://nominatim.openstreetmap.org/search)
+- AVI_GEOCODE_USER_AGENT: User-Agent enviado ao Nominatim (padrão: Avi-Travel-Assistant/1.0)
+- AVI_GEOCODE_TIMEOUT: tempo máximo de cada consulta em segundos (padrão: 5)
+- AVI_GEOCODE_MIN_INTERVAL: intervalo mínimo entre consultas ao Nominatim (padrão: 1)
+- AVI_GEOCODE_MAX_BATCH: locais por requisição em lote (padrão: 50)
+- AVI_GEOCODE_MAX_UPSTREAM: consultas a provedores locais por requisição (padrão: 5)
+- AVI_GEOCODE_QUEUE_MAX: lugares aguardando consulta ao Nominatim (padrão: 1000)
+- AVI_GEOCODE_NEGATIVE_TTL: segundos até repetir a consulta de um lugar não encontrado (padrão: 604800)
+- AVI_GEOCODE_MEMORY_ENTRIES: lugares mantidos no cache em memória (padrão: 2000)
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import requests
+from sqlalchemy.exc import IntegrityError
+
+from models import db, GeocodedPlace
+from services.circuit_breaker import get_breaker
+from services.iata_tables import iata_tables
+from services.service_registry import lazy_service
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Estados de um local na resposta
+FOUND = 'found'
+NOT_FOUND = 'not_found'
+PENDING = 'pending'
+
+
+def normalize_place(name):
+    """
+    Chave de cache de um nome de lugar
+
+    Args:
+        name: nome digitado (ex.: "  São Paulo,  Brasil ")
+
+    Returns:
+        str: nome normalizado (ex.: "sao paulo brasil") ou "" se vazio
+    """
+    if not isinstance(name, str):
+        return ""
+    text = unicodedata.normalize('NFKD', name)
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    text = re.sub(r'[^\w]+', ' ', text)
+    return ' '.join(text.split())[:255]
+
+
+def block_locations(roteiro):
+    """
+    Locais mostrados no mapa para um roteiro no formato do frontend
+
+    Args:
+        roteiro: dict com "destination" e "days" (ver roteiro_view.build_roteiro)
+
+    Returns:
+        list: nomes dos locais, sem repetição, na ordem do roteiro
+    """
+    locations = []
+    for day in roteiro.get('days') or []:
+        for block in day.get('blocks') or []:
+            if not isinstance(block, dict):
+                continue
+            if block.get('type') == 'flight':
+                locations.append(block.get('arrivalAirport'))
+            elif block.get('type') in ('hotel', 'activity'):
+                locations.append(block.get('location'))
+    locations.append(roteiro.get('destination'))
+    return list(dict.fromkeys(name.strip() for name in locations if isinstance(name, str) and name.strip()))
+
+
+class NominatimGeocoder:
+    """
+    Provedor Nominatim (OpenStreetMap). O limite de uma requisição por segundo
+    (min_interval) é respeitado pela fila de GeocodingService.
+    """
+
+    name = 'nominatim'
+    # Consultado pela thread de fundo, nunca na requisição
+    background = True
+
+    def __init__(self):
+        self.url = os.environ.get('AVI_GEOCODE_URL', 'https://nominatim.openstreetmap.org/search')
+        self.user_agent = os.environ.get('AVI_GEOCODE_USER_AGENT', 'Avi-Travel-Assistant/1.0')
+        self.timeout = float(os.environ.get('AVI_GEOCODE_TIMEOUT', '5'))
+        self.min_interval = float(os.environ.get('AVI_GEOCODE_MIN_INTERVAL', '1'))
+        self.breaker = get_breaker('geocoding:nominatim', failure_threshold=3, reset_timeout=60)
+
+    def geocode(self, query):
+        """
+        Consulta um lugar
+
+        Args:
+            query: texto da busca
+
+        Returns:
+            dict: {"lat", "lon", "display_name"} ou None se não encontrado
+
+        Raises:
+            CircuitOpenError, requests.RequestException: se o provedor estiver indisponível
+        """
+        results = self.breaker.call(self._search, query)
+        if not results:
+            return None
+        return {
+            'lat': float(results[0]['lat']),
+            'lon': float(results[0]['lon']),
+            'display_name': results[0].get('display_name')
+        }
+
+    def _search(self, query):
+        """Requisição ao Nominatim (erros HTTP contam como falhas do circuito)"""
+        response = requests.get(
+            self.url,
+            params={'q': query, 'format': 'json', 'limit': 1},
+            headers={'User-Agent': self.user_agent, 'Accept-Language': 'pt-BR,pt,en'},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+
+class StaticGeocoder:
+    """
+    Provedor local a partir de um arquivo JSON {"nome": [lat, lon]}.
+    """
+
+    name = 'static'
+    background = False
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get('AVI_GEOCODE_STATIC_FILE', '')
+        self.places = {}
+        if self.path and os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.places = {normalize_place(name): coords for name, coords in json.load(f).items()}
+        logger.info(f"Geocodificador estático com {len(self.places)} lugares")
+
+    def geocode(self, query):
+        coords = self.places.get(normalize_place(query))
+        if not coords:
+            return None
+        return {'lat': float(coords[0]), 'lon': float(coords[1]), 'display_name': query}
+
+
+# Provedores disponíveis por nome (AVI_GEOCODER)
+PROVIDERS = {
+    NominatimGeocoder.name: NominatimGeocoder,
+    StaticGeocoder.name: StaticGeocoder
+}
+
+
+class GeocodingService:
+    """
+    Resolve nomes de lugares em coordenadas com cache em memória e no banco.
+    """
+
+    def __init__(self, provider=None):
+        """
+        Inicializa o serviço
+
+        Args:
+            provider: provedor com geocode(query) (padrão: definido por AVI_GEOCODER)
+        """
+        if provider is None:
+            provider_name = os.environ.get('AVI_GEOCODER', NominatimGeocoder.name)
+            provider = PROVIDERS.get(provider_name, NominatimGeocoder)()
+        self.provider = provider
+
+        self.max_batch = int(os.environ.get('AVI_GEOCODE_MAX_BATCH', '50'))
+        self.max_upstream = int(os.environ.get('AVI_GEOCODE_MAX_UPSTREAM', '5'))
+        self.negative_ttl = float(os.environ.get('AVI_GEOCODE_NEGATIVE_TTL', str(7 * 24 * 3600)))
+        self.memory_entries = int(os.environ.get('AVI_GEOCODE_MEMORY_ENTRIES', '2000'))
+        self.queue_max = int(os.environ.get('AVI_GEOCODE_QUEUE_MAX', '1000'))
+        self.background = getattr(self.provider, 'background', False)
+        self.min_interval = getattr(self.provider, 'min_interval', 0.0)
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Fila do provedor em segundo plano: chave → (nome, app)
+        self._queue = OrderedDict()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+        self.stats = {'memory': 0, 'database': 0, 'upstream': 0, 'upstream_errors': 0, 'pending': 0,
+                      'queued': 0, 'queue_full': 0}
+        logger.info(f"Geocodificação configurada (provedor: {self.provider.name})")
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _from_memory(self, key):
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+            return result
+
+    @staticmethod
+    def _result(query, place, source):
+        """Resultado de um local a partir da linha de GeocodedPlace"""
+        if place.latitude is None:
+            return {'query': query, 'status': NOT_FOUND, 'source': source}
+        return {
+            'query': query,
+            'status': FOUND,
+            'lat': place.latitude,
+            'lon': place.longitude,
+            'display_name': place.display_name,
+            'source': source
+        }
+
+    @staticmethod
+    def _upstream_query(name):
+        """Texto enviado ao provedor (códigos IATA viram o nome do aeroporto)"""
+        code = name.strip()
+        if len(code) == 3 and code.isalpha():
+            airport = iata_tables.airport(code)
+            if airport:
+                return ', '.join(part for part in (airport['name'], airport['city'], airport['country']) if part)
+        return name
+
+    def _is_fresh(self, place):
+        """True se a linha de GeocodedPlace dispensa nova consulta ao provedor"""
+        if place.latitude is not None:
+            return True
+        return place.updated_at > datetime.now() - timedelta(seconds=self.negative_ttl)
+
+    def geocode_many(self, names):
+        """
+        Resolve vários lugares. Chamar dentro de um app context.
+
+        Args:
+            names: nomes dos lugares (repetidos e vazios são ignorados)
+
+        Returns:
+            dict: nome → {"query", "status" (found | not_found | pending), "lat", "lon",
+                  "display_name", "source" (memory | database | provedor)}.
+                  "pending": o lugar aguarda a consulta ao provedor (fila em segundo
+                  plano, com "retry_after" estimado em segundos), o limite de consultas
+                  da requisição foi atingido ou o provedor está indisponível; o
+                  cliente pode tentar de novo depois.
+
+        Raises:
+            ValueError: se houver mais lugares que AVI_GEOCODE_MAX_BATCH
+        """
+        keys = {}
+        for name in names:
+            key = normalize_place(name)
+            if key and name not in keys:
+                keys[name] = key
+        if len(set(keys.values())) > self.max_batch:
+            raise ValueError(f"Máximo de {self.max_batch} locais por requisição")
+
+        results = {}
+        missing = {}
+        for name, key in keys.items():
+            cached = self._from_memory(key)
+            if cached is not None:
+                self.stats['memory'] += 1
+                results[name] = {**cached, 'query': name, 'source': 'memory'}
+            else:
+                missing.setdefault(key, []).append(name)
+
+        if not missing:
+            return results
+
+        # Uma consulta para todos os lugares que não estão em memória
+        stored = {place.query_key: place for place in
+                  GeocodedPlace.query.filter(GeocodedPlace.query_key.in_(list(missing))).all()}
+
+        upstream_calls = 0
+        for key, key_names in missing.items():
+            place = stored.get(key)
+            if place is not None and self._is_fresh(place):
+                self.stats['database'] += 1
+                result = self._result(key_names[0], place, 'database')
+                if result['status'] == FOUND:
+                    self._remember(key, result)
+            elif self.background:
+                self.stats['pending'] += 1
+                result = {'query': key_names[0], 'status': PENDING,
+                          'retry_after': self._enqueue(key, key_names[0])}
+            elif upstream_calls < self.max_upstream:
+                upstream_calls += 1
+                result = self._resolve_upstream(key, key_names[0], place)
+            else:
+                self.stats['pending'] += 1
+                result = {'query': key_names[0], 'status': PENDING}
+            for name in key_names:
+                results[name] = {**result, 'query': name}
+        return results
+
+    def geocode(self, name):
+        """
+        Resolve um lugar. Chamar dentro de um app context.
+
+        Returns:
+            dict: resultado no formato de geocode_many, ou None se o nome for vazio
+        """
+        return self.geocode_many([name]).get(name)
+
+    def _enqueue(self, key, name):
+        """
+        Coloca um lugar na fila do provedor em segundo plano (sem repetição)
+
+        Args:
+            key: nome normalizado
+            name: nome usado na consulta
+
+        Returns:
+            float: segundos estimados até o lugar ser consultado
+        """
+        from flask import current_app
+
+        with self._lock:
+            if key not in self._queue:
+                if len(self._queue) >= self.queue_max:
+                    self.stats['queue_full'] += 1
+                    return self.min_interval * len(self._queue)
+                self._queue[key] = (name, current_app._get_current_object())
+                self.stats['queued'] += 1
+            position = list(self._queue).index(key) + 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._drain, name='geocoding-queue', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return round(self.min_interval * position, 1)
+
+    def _drain(self):
+        """Thread de fundo: consulta a fila respeitando o intervalo mínimo do provedor"""
+        while True:
+            with self._lock:
+                item = next(iter(self._queue.items()), None)
+            if item is None:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            key, (name, app) = item
+            try:
+                with app.app_context():
+                    # Outro worker pode ter gravado o lugar enquanto ele esperava na fila
+                    place = GeocodedPlace.query.filter_by(query_key=key).first()
+                    if place is None or not self._is_fresh(place):
+                        self._resolve_upstream(key, name, place)
+                    db.session.remove()
+            except Exception as e:
+                logger.error(f"Erro na fila de geocodificação ('{name}'): {str(e)}")
+            finally:
+                with self._lock:
+                    self._queue.pop(key, None)
+
+            # Política de uso do Nominatim: no máximo uma requisição por intervalo
+            time.sleep(self.min_interval)
+
+    def _resolve_upstream(self, key, name, place):
+        """Consulta o provedor e grava o resultado (inclusive "não encontrado")"""
+        try:
+            found = self.provider.geocode(self._upstream_query(name))
+        except Exception as e:
+            self.stats['upstream_errors'] += 1
+            logger.warning(f"Erro ao geocodificar '{name}' ({self.provider.name}): {str(e)}")
+            return {'query': name, 'status': PENDING}
+        self.stats['upstream'] += 1
+
+        if place is None:
+            place = GeocodedPlace(query_key=key, place_name=name[:255])
+            db.session.add(place)
+        place.latitude = found['lat'] if found else None
+        place.longitude = found['lon'] if found else None
+        place.display_name = (found.get('display_name') or '')[:255] if found else None
+        place.provider = self.provider.name
+        place.updated_at = datetime.now()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Outro worker gravou o mesmo lugar ao mesmo tempo
+            db.session.rollback()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Erro ao gravar geocodificação de '{name}': {str(e)}")
+
+        result = {'query': name, 'status': FOUND, **found} if found else {'query': name, 'status': NOT_FOUND}
+        result['source'] = self.provider.name
+        if found:
+            self._remember(key, result)
+        return result
+
+    def snapshot(self):
+        """Provedor, tamanho do cache em memória e da fila, e contadores"""
+        with self._lock:
+            size = len(self._memory)
+            queue_size = len(self._queue)
+        return {'provider': self.provider.name, 'memory_entries': size, 'queue_size': queue_size, **self.stats}
+
+
+# Instância global (construída no primeiro uso)
+geocoding_service = lazy_service('geocoding_service', GeocodingService)
@@ -0,0 +1,310 @@
+"""
+Tabelas de consulta de aeroportos e companhias aéreas por código IATA
+As tabelas são geradas por generate_iata_tables.py a partir dos arquivos
+airports.json, airlines.json, cities.json e countries.json da API de dados do
+TravelPayouts (em inglês e português) e gravadas em pickle. No primeiro uso o
+arquivo é carregado uma única vez e as consultas são acessos diretos a
+dicionários (O(1)), sem requisições à API.
+
+O arquivo é gerado no build do deploy (generate_iata_tables.py --soft, que
+mantém as tabelas atuais quando a API não responde). Sem o arquivo, as tabelas
+são montadas a partir dos dados revisados manualmente em
+services/airport_airline_data.py, que também têm prioridade
+sobre os nomes em português do TravelPayouts quando o arquivo existe.
+
+Formato das tabelas (tuplas, na ordem de LOCALES):
+- airports: código → (código da cidade, código do país, nomes, cidades, países)
+- airlines: código → nomes
+
+Configuração (variáveis de ambiente):
+- AVI_IATA_TABLES: caminho do arquivo gerado (padrão: data/iata_tables.pickle)
+"""
+
+import os
+import sys
+import pickle
+import logging
+
+from services.service_registry import lazy_service
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Idiomas das tabelas; o primeiro é o padrão das consultas
+LOCALES = ('pt', 'en')
+
+# Versão do formato do arquivo gerado
+TABLES_VERSION = 1
+
+# Caminho padrão do arquivo gerado (relativo à raiz do projeto)
+DEFAULT_TABLES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'iata_tables.pickle')
+
+# Posições das tuplas de aeroportos
+_CITY_CODE, _COUNTRY_CODE, _NAMES, _CITIES, _COUNTRIES = range(5)
+
+
+def curated_tables():
+    """
+    Monta as tabelas a partir dos dados revisados de airport_airline_data
+
+    Returns:
+        dict: tabelas no formato do arquivo gerado
+    """
+    from services.airport_airline_data import AIRPORT_DATA, AIRLINE_DATA
+
+    airports = {}
+    for code, info in AIRPORT_DATA.items():
+        airports[code] = (
+            '', '',
+            (info['name'], info['name']),
+            (info['city'], info['city']),
+            (info['country'], info['country'])
+        )
+    airlines = {code: (info['name'], info['name']) for code, info in AIRLINE_DATA.items()}
+    return {'version': TABLES_VERSION, 'locales': LOCALES, 'generated_at': None, 'airports': airports, 'airlines': airlines}
+
+
+class IataTables:
+    """
+    Consulta de nomes de aeroportos, cidades, países e companhias aéreas.
+    """
+
+    def __init__(self, path=None):
+        """
+        Carrega as tabelas geradas ou, na falta delas, as revisadas manualmente
+
+        Args:
+            path: caminho do arquivo gerado (padrão: AVI_IATA_TABLES)
+        """
+        self.path = path or os.environ.get('AVI_IATA_TABLES', DEFAULT_TABLES_PATH)
+        tables = self._load(self.path)
+        if tables is None:
+            tables = curated_tables()
+            self.source = 'curated'
+        else:
+            self.source = 'generated'
+
+        self.generated_at = tables.get('generated_at')
+        self._locale_index = {locale: i for i, locale in enumerate(tables['locales'])}
+        self._airports = tables['airports']
+        self._airlines = tables['airlines']
+        logger.info(f"Tabelas IATA carregadas ({self.source}): {len(self._airports)} aeroportos, "
+                    f"{len(self._airlines)} companhias")
+
+    @staticmethod
+    def _load(path):
+        """
+        Lê o arquivo gerado
+
+        Args:
+            path: caminho do pickle
+
+        Returns:
+            dict: tabelas ou None se o arquivo não existir ou for incompatível
+        """
+        if not os.path.exists(path):
+            logger.info(f"Arquivo de tabelas IATA não encontrado ({path}); usando dados revisados")
+            return None
+        try:
+            with open(path, 'rb') as f:
+                tables = pickle.load(f)
+        except Exception as e:
+            logger.error(f"Erro ao carregar tabelas IATA de {path}: {str(e)}")
+            return None
+        if not isinstance(tables, dict) or tables.get('version') != TABLES_VERSION:
+            logger.warning(f"Tabelas IATA em {path} com versão incompatível; usando dados revisados")
+            return None
+        return tables
+
+    def _pick(self, values, locale):
+        """Valor no idioma pedido, com o idioma padrão e os demais como alternativa"""
+        index = self._locale_index.get(locale, 0)
+        value = values[index] if index < len(values) else None
+        if value:
+            return value
+        return next((v for v in values if v), None)
+
+    @staticmethod
+    def _normalize(code):
+        """Código em maiúsculas (ou None)"""
+        return code.strip().upper() if isinstance(code, str) and code.strip() else None
+
+    def airport_name(self, code, locale='pt'):
+        """Nome do aeroporto ou None se o código não for conhecido"""
+        record = self._airports.get(self._normalize(code))
+        return self._pick(record[_NAMES], locale) if record else None
+
+    def airport_city(self, code, locale='pt'):
+        """Cidade do aeroporto (ou da própria cidade, para códigos de cidade) ou None"""
+        record = self._airports.get(self._normalize(code))
+        return self._pick(record[_CITIES], locale) if record else None
+
+    def airport_country(self, code, locale='pt'):
+        """País do aeroporto ou None"""
+        record = self._airports.get(self._normalize(code))
+        return self._pick(record[_COUNTRIES], locale) if record else None
+
+    def airport_city_code(self, code):
+        """Código IATA da cidade do aeroporto (ex.: GRU → SAO) ou None"""
+        record = self._airports.get(self._normalize(code))
+        return (record[_CITY_CODE] or None) if record else None
+
+    def airport(self, code, locale='pt'):
+        """
+        Informações do aeroporto
+
+        Args:
+            code: código IATA do aeroporto ou da cidade
+            locale: idioma dos nomes ('pt' ou 'en')
+
+        Returns:
+            dict: {"name", "city", "country"} ou None se o código não for conhecido;
+                  sem cidade nas tabelas, "city" repete o nome do aeroporto
+        """
+        record = self._airports.get(self._normalize(code))
+        if record is None:
+            return None
+        name = self._pick(record[_NAMES], locale)
+        return {
+            "name": name,
+            "city": self._pick(record[_CITIES], locale) or name,
+            "country": self._pick(record[_COUNTRIES], locale) or ""
+        }
+
+    def airline_name(self, code, locale='pt'):
+        """Nome da companhia aérea ou None se o código não for conhecido"""
+        record = self._airlines.get(self._normalize(code))
+        return self._pick(record, locale) if record else None
+
+    def airport_display_name(self, code, locale='pt'):
+        """Nome de exibição "Cidade (COD)", ou o próprio código se não for conhecido"""
+        if not code:
+            return ""
+        city = self.airport_city(code, locale)
+        return f"{city} ({code.upper()})" if city else code
+
+    def airline_display_name(self, code, locale='pt'):
+        """Nome de exibição da companhia, ou o próprio código se não for conhecido"""
+        if not code:
+            return ""
+        return self.airline_name(code, locale) or code
+
+    def stats(self):
+        """Origem e tamanho das tabelas"""
+        return {
+            'source': self.source,
+            'path': self.path,
+            'generated_at': self.generated_at,
+            'airports': len(self._airports),
+            'airlines': len(self._airlines)
+        }
+
+
+def build_tables(airports, airlines, cities=None, countries=None, localized=None):
+    """
+    Monta as tabelas a partir dos arquivos de dados do TravelPayouts.
+    Usado por generate_iata_tables.py.
+
+    Args:
+        airports: conteúdo de airports.json (lista de dicts)
+        airlines: conteúdo de airlines.json
+        cities: conteúdo de cities.json (opcional)
+        countries: conteúdo de countries.json (opcional)
+        localized: {locale: {"airports": [...], "airlines": [...], "cities": [...],
+                    "countries": [...]}} com as versões traduzidas (ex.: /data/pt/)
+
+    Returns:
+        dict: tabelas no formato do arquivo gerado
+    """
+    localized = localized or {}
+
+    def names_by_code(kind, entries, locale):
+        """código → nome no idioma (name_translations ou o arquivo traduzido)"""
+        names = {}
+        for entry in entries or []:
+            code = entry.get('code')
+            if not code:
+                continue
+            translations = entry.get('name_translations') or {}
+            name = translations.get(locale) or (entry.get('name') if locale == 'en' else None)
+            if name:
+                names[code] = sys.intern(name)
+        for entry in (localized.get(locale) or {}).get(kind) or []:
+            if entry.get('code') and entry.get('name'):
+                names[entry['code']] = sys.intern(entry['name'])
+        return names
+
+    airport_names = {locale: names_by_code('airports', airports, locale) for locale in LOCALES}
+    airline_names = {locale: names_by_code('airlines', airlines, locale) for locale in LOCALES}
+    city_names = {locale: names_by_code('cities', cities, locale) for locale in LOCALES}
+    country_names = {locale: names_by_code('countries', countries, locale) for locale in LOCALES}
+    city_country = {entry['code']: entry.get('country_code') or '' for entry in cities or [] if entry.get('code')}
+
+    def localized_tuple(names, code):
+        return tuple(names[locale].get(code) for locale in LOCALES)
+
+    table_airports = {}
+    for entry in airports or []:
+        code = entry.get('code')
+        if not code or entry.get('flightable') is False:
+            continue
+        city_code = entry.get('city_code') or ''
+        country_code = entry.get('country_code') or city_country.get(city_code, '')
+        table_airports[code] = (
+            sys.intern(city_code), sys.intern(country_code),
+            localized_tuple(airport_names, code),
+            localized_tuple(city_names, city_code),
+            localized_tuple(country_names, country_code)
+        )
+
+    # Códigos de cidade (ex.: SAO, RIO) também são usados nas buscas
+    for entry in cities or []:
+        code = entry.get('code')
+        if not code or code in table_airports:
+            continue
+        country_code = entry.get('country_code') or ''
+        city = localized_tuple(city_names, code)
+        table_airports[code] = (
+            sys.intern(code), sys.intern(country_code),
+            city, city,
+            localized_tuple(country_names, country_code)
+        )
+
+    table_airlines = {}
+    for entry in airlines or []:
+        code = entry.get('code')
+        names = localized_tuple(airline_names, code) if code else ()
+        if code and any(names):
+            table_airlines[code] = names
+
+    # Os dados revisados manualmente prevalecem em português
+    curated = curated_tables()
+    pt = LOCALES.index('pt')
+    for code, record in curated['airports'].items():
+        current = table_airports.get(code)
+        if current is None:
+            table_airports[code] = record
+            continue
+        table_airports[code] = current[:_NAMES] + tuple(
+            _replace(current[position], pt, record[position][pt])
+            for position in (_NAMES, _CITIES, _COUNTRIES)
+        )
+    for code, names in curated['airlines'].items():
+        current = table_airlines.get(code)
+        table_airlines[code] = names if current is None else _replace(current, pt, names[pt])
+
+    return {
+        'version': TABLES_VERSION,
+        'locales': LOCALES,
+        'airports': table_airports,
+        'airlines': table_airlines
+    }
+
+
+def _replace(values, index, value):
+    """Tupla com o item da posição substituído"""
+    return values[:index] + (value,) + values[index + 1:]
+
+
+# Instância global das tabelas (carregadas no primeiro uso)
+iata_tables = lazy_service('iata_tables', IataTables)
@@ -0,0 +1,349 @@
+"""
+Classificação local de intenções das mensagens do chat
+Substitui os testes de substring espalhados pelas rotas ("sim" in message, "oi" in
+message...) por um classificador com pontuação de confiança:
+- regras compiladas sobre o texto normalizado (minúsculas, sem acentos nem
+  pontuação). Mensagens que são inteiramente uma saudação, confirmação etc.
+  ("oi", "sim, pode buscar", "obrigado!") recebem confiança alta; palavras-chave
+  dentro de frases maiores recebem confiança menor;
+- opcionalmente, um Naive Bayes minúsculo treinado na inicialização com as frases
+  de EXAMPLES, usado apenas quando nenhuma regra se aplica.
+
+Com intenções simples e confiança alta, templated_reply monta a resposta do chat
+sem chamar a OpenAI (ver /api/chat).
+
+Configuração (variáveis de ambiente):
+- AVI_INTENT_MODEL: "naive_bayes" (padrão) ou "off" para usar apenas as regras
+- AVI_INTENT_MODEL_MIN_CONFIDENCE: confiança mínima do modelo (padrão: 0.6)
+- AVI_INTENT_FASTPATH_THRESHOLD: confiança mínima para responder sem a OpenAI (padrão: 0.85)
+- AVI_INTENT_CONFIRM_THRESHOLD: confiança mínima para aceitar uma confirmação da busca (padrão: 0.7)
+"""
+
+import os
+import re
+import math
+import random
+import logging
+import unicodedata
+from collections import Counter
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Intenção padrão quando nada se aplica
+GENERAL = 'geral'
+
+# Confiança das regras: mensagem inteira, palavra-chave forte e palavra-chave fraca
+WHOLE = 0.95
+STRONG = 0.8
+WEAK = 0.6
+
+# Redução de confiança quando a segunda intenção tem pontuação próxima
+AMBIGUITY_MARGIN = 0.15
+AMBIGUITY_PENALTY = 0.2
+
+# Intenções que contradizem uma confirmação ("sim, mas muda a data"). Os assuntos
+# (voos, hospedagem...) não contam: "sim, pode buscar os voos" é uma confirmação.
+CONFIRMATION_RIVALS = ('negacao', 'alteracao')
+
+# Intenções respondidas por template no chat (sem OpenAI)
+SIMPLE_INTENTS = ('saudacao', 'agradecimento', 'despedida', 'negacao')
+
+# Regras por intenção: (expressão sobre o texto normalizado, confiança)
+RULES = {
+    'saudacao': [
+        (r'^(oi+|ola|opa|ei|hey|e ai|eai|salve|bom dia|boa tarde|boa noite)( avi)?( tudo (bem|bom|certo))?( avi)?$', WHOLE),
+        (r'^(tudo (bem|bom|certo)|como vai)( avi)?$', WHOLE),
+        (r'^(oi+|ola|bom dia|boa tarde|boa noite)\b', WEAK),
+    ],
+    'agradecimento': [
+        (r'^(muito )?(obrigad[oa]|brigad[oa]|obg|valeu|vlw|agradeco)( mesmo| demais| avi| pela ajuda)*$', WHOLE),
+        (r'\b(obrigad[oa]|valeu|agradec\w*)\b', WEAK),
+    ],
+    'despedida': [
+        (r'^(tchau|ate (mais|logo|breve|a proxima)|falou|flw|adeus|bye)( avi)?$', WHOLE),
+    ],
+    'confirmacao': [
+        (r'^(sim|s|ok|okay|okey|yes|yep|sure|confirmo|confirmado|confirma|isso|isso mesmo|correto|certo|exato|'
+         r'claro|claro que sim|com certeza|beleza|blz|perfeito|fechado|pode|pode sim|bora|vamos|vamos la|'
+         r'manda ver|sim pode|pode buscar|pode prosseguir|pode seguir|prossiga|(esta|ta|tudo) (certo|correto))'
+         r'( (sim|pode buscar|confirmo|por favor|pode|isso|obrigad[oa]|esta (certo|correto)))*$', WHOLE),
+        (r'\b(confirmo|pode buscar|pode procurar|busque|procure|encontre|pode prosseguir|prossiga|claro que sim)\b',
+         STRONG),
+        (r'^(sim|ok|isso|correto|yes|vamos la|com certeza)\b', STRONG),
+    ],
+    'negacao': [
+        (r'^(nao|n|nope|negativo|nao obrigad[oa]|nao e isso|esta errado)$', WHOLE),
+        (r'^nao\b', STRONG),
+    ],
+    'alteracao': [
+        (r'\b(mud\w*|alter\w*|troc\w*|corrig\w*)\b', STRONG),
+    ],
+    'buscar_tudo': [
+        (r'\b(busc\w*|busq\w*|encontr\w*|mostr\w*) tudo\b', 0.9),
+    ],
+    'voos': [
+        (r'\b(passag\w*|voo|voos|aviao|companhias? aereas?)\b', 0.75),
+    ],
+    'hospedagem': [
+        (r'\b(hoteis|hotel|hosped\w*|acomodac\w*|pousadas?|onde ficar|airbnb)\b', 0.75),
+    ],
+    'atrações': [
+        (r'\b(o que fazer|atrac\w*|atividades?|passeios?|visitar|pontos turisticos)\b', 0.7),
+    ],
+    'roteiro': [
+        (r'\b(roteiro|itinerario|planejar|organizar|programacao)\b', 0.65),
+    ],
+    'ajuda': [
+        (r'\b(ajuda|ajudar|como funciona|nao entendi|como (usar|utilizar)|utilizar)\b', 0.7),
+    ],
+}
+
+# Frases de treino do modelo opcional (inclui exemplos gerais para absorver o resto)
+EXAMPLES = {
+    'saudacao': ['oi', 'ola', 'bom dia avi', 'boa noite', 'oi avi tudo bem', 'e ai', 'ola tudo bom'],
+    'agradecimento': ['obrigado', 'muito obrigada', 'valeu pela ajuda', 'agradeco muito', 'obrigado avi'],
+    'despedida': ['tchau', 'ate mais', 'ate logo avi', 'falou'],
+    'confirmacao': ['sim', 'pode buscar', 'confirmo os dados', 'isso mesmo pode procurar', 'esta correto sim', 'ok pode ser',
+                    'claro que sim', 'pode prosseguir', 'vamos la', 'yes'],
+    'negacao': ['nao', 'nao esta certo', 'nao e isso', 'negativo'],
+    'alteracao': ['quero mudar a data', 'alterar o destino', 'troca a volta para domingo', 'corrige a origem'],
+    'voos': ['quero passagem para paris', 'tem voo barato', 'qual companhia aerea', 'passagens para lisboa em maio'],
+    'hospedagem': ['hotel em roma', 'onde ficar em londres', 'pousada barata', 'hospedagem perto da praia'],
+    GENERAL: ['quero ir para salvador em julho', 'de sao paulo para recife dia 10', 'qual o clima em paris',
+              'preciso de visto para os estados unidos', 'quanto custa viajar para o japao', 'volto dia 20'],
+}
+
+
+def normalize_text(text):
+    """
+    Texto normalizado para as regras
+
+    Args:
+        text: mensagem original
+
+    Returns:
+        str: minúsculas, sem acentos e com a pontuação trocada por espaços
+    """
+    if not isinstance(text, str):
+        return ""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return ' '.join(re.sub(r'[^\w]+', ' ', text).split())
+
+
+class NaiveBayesIntentModel:
+    """
+    Naive Bayes multinomial sobre palavras, treinado com poucos exemplos (CPU, sem dependências).
+    """
+
+    def __init__(self, examples):
+        """
+        Treina o modelo
+
+        Args:
+            examples: {intenção: [frases normalizadas]}
+        """
+        self.intents = list(examples)
+        self.vocabulary = set()
+        word_counts = {}
+        for intent, phrases in examples.items():
+            counts = Counter(word for phrase in phrases for word in normalize_text(phrase).split())
+            word_counts[intent] = counts
+            self.vocabulary.update(counts)
+
+        total_phrases = sum(len(phrases) for phrases in examples.values())
+        vocabulary_size = len(self.vocabulary)
+        self.log_prior = {intent: math.log(len(examples[intent]) / total_phrases) for intent in self.intents}
+        self.log_likelihood = {}
+        self.log_unknown = {}
+        for intent, counts in word_counts.items():
+            denominator = sum(counts.values()) + vocabulary_size
+            self.log_likelihood[intent] = {word: math.log((count + 1) / denominator) for word, count in counts.items()}
+            self.log_unknown[intent] = math.log(1 / denominator)
+
+    def predict(self, normalized):
+        """
+        Probabilidade de cada intenção
+
+        Args:
+            normalized: texto normalizado
+
+        Returns:
+            dict: intenção → probabilidade (vazio se nenhuma palavra for conhecida)
+        """
+        words = [word for word in normalized.split() if word in self.vocabulary]
+        if not words:
+            return {}
+        scores = {
+            intent: self.log_prior[intent] + sum(
+                self.log_likelihood[intent].get(word, self.log_unknown[intent]) for word in words)
+            for intent in self.intents
+        }
+        top = max(scores.values())
+        exp_scores = {intent: math.exp(score - top) for intent, score in scores.items()}
+        total = sum(exp_scores.values())
+        return {intent: value / total for intent, value in exp_scores.items()}
+
+
+class IntentClassifier:
+    """
+    Classificador de intenções por regras, com modelo opcional de apoio.
+    """
+
+    def __init__(self):
+        """Compila as regras e treina o modelo opcional"""
+        self.rules = {
+            intent: [(re.compile(pattern), confidence) for pattern, confidence in rules]
+            for intent, rules in RULES.items()
+        }
+        self.model_min_confidence = float(os.environ.get('AVI_INTENT_MODEL_MIN_CONFIDENCE', '0.6'))
+        self.fastpath_threshold = float(os.environ.get('AVI_INTENT_FASTPATH_THRESHOLD', '0.85'))
+        self.confirm_threshold = float(os.environ.get('AVI_INTENT_CONFIRM_THRESHOLD', '0.7'))
+
+        self.model = None
+        if os.environ.get('AVI_INTENT_MODEL', 'naive_bayes').lower() == 'naive_bayes':
+            self.model = NaiveBayesIntentModel(EXAMPLES)
+        logger.info(f"Classificador de intenções: {len(self.rules)} intenções, "
+                    f"modelo {'naive_bayes' if self.model else 'desabilitado'}")
+
+    def classify(self, message, intents=None):
+        """
+        Classifica a mensagem
+
+        Args:
+            message: mensagem do usuário
+            intents: intenções consideradas (padrão: todas)
+
+        Returns:
+            dict: {"intent", "confidence" (0 a 1), "source" ("rules", "model" ou "default"),
+                   "scores" (pontuação das regras por intenção)}
+        """
+        normalized = normalize_text(message)
+        scores = {}
+        for intent, rules in self.rules.items():
+            if intents is not None and intent not in intents:
+                continue
+            best = max((confidence for pattern, confidence in rules if pattern.search(normalized)), default=0.0)
+            if best:
+                scores[intent] = best
+
+        if scores:
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            intent, confidence = ranked[0]
+            if len(ranked) > 1 and ranked[1][1] >= confidence - AMBIGUITY_MARGIN:
+                confidence -= AMBIGUITY_PENALTY
+            return {'intent': intent, 'confidence': round(confidence, 3), 'source': 'rules', 'scores': scores}
+
+        if self.model is not None:
+            probabilities = self.model.predict(normalized)
+            candidates = {intent: p for intent, p in probabilities.items()
+                          if intents is None or intent in intents or intent == GENERAL}
+            if candidates:
+                intent, probability = max(candidates.items(), key=lambda item: item[1])
+                if intent != GENERAL and probability >= self.model_min_confidence:
+                    return {'intent': intent, 'confidence': round(probability, 3), 'source': 'model', 'scores': {}}
+
+        return {'intent': GENERAL, 'confidence': 0.0, 'source': 'default', 'scores': {}}
+
+    def is_confident(self, result, intent=None):
+        """
+        Verifica se o resultado tem confiança suficiente para dispensar a OpenAI
+
+        Args:
+            result: dict retornado por classify
+            intent: intenção esperada (opcional)
+
+        Returns:
+            bool: True se a confiança atinge AVI_INTENT_FASTPATH_THRESHOLD
+        """
+        if intent is not None and result['intent'] != intent:
+            return False
+        return result['confidence'] >= self.fastpath_threshold
+
+    def is_confirmation(self, result):
+        """
+        Verifica se o resultado é uma confirmação clara ("sim", "pode buscar", "ok"...)
+
+        Apenas negação e alteração competem com a confirmação: confirmações
+        ambíguas ("sim, mas muda a data") ficam abaixo do limite, enquanto menções
+        ao assunto da busca ("sim, pode buscar os voos") não reduzem a confiança.
+
+        Args:
+            result: dict retornado por classify
+
+        Returns:
+            bool: True se a confiança atinge AVI_INTENT_CONFIRM_THRESHOLD
+        """
+        scores = result.get('scores') or {}
+        if 'confirmacao' not in scores:
+            # Sem regra de confirmação: apenas o modelo pode ter reconhecido a intenção
+            return result['intent'] == 'confirmacao' and result['confidence'] >= self.confirm_threshold
+
+        confidence = scores['confirmacao']
+        rival = max((scores.get(intent, 0.0) for intent in CONFIRMATION_RIVALS), default=0.0)
+        if rival >= confidence - AMBIGUITY_MARGIN:
+            confidence -= AMBIGUITY_PENALTY
+        return confidence >= self.confirm_threshold
+
+
+# Templates das respostas do chat por intenção e etapa (0: coleta, 1: confirmação)
+CHAT_TEMPLATES = {
+    ('saudacao', 0): [
+        "Olá! 😊 Sou a Avi, sua assistente de viagens. Para onde você quer viajar? "
+        "Me conte a origem, o destino e as datas que eu encontro as melhores passagens para você. ✈️",
+        "Oi! Que bom falar com você! 🛫 Me diga de onde você sai, para onde quer ir e quando, "
+        "que eu busco as melhores opções de voos.",
+    ],
+    ('saudacao', 1): [
+        "Olá! 😊 Só para confirmar os detalhes da sua busca:\n\n{summary}\n\n"
+        "Posso buscar os voos? Responda \"sim\" para confirmar ou me diga o que deseja alterar.",
+    ],
+    ('agradecimento', 0): [
+        "Por nada! 😊 Se quiser procurar passagens, é só me dizer a origem, o destino e as datas.",
+        "Fico feliz em ajudar! Quando quiser planejar a próxima viagem, estou por aqui. 🧳",
+    ],
+    ('agradecimento', 1): [
+        "Por nada! 😊 Posso buscar os voos com estes dados?\n\n{summary}\n\n"
+        "Responda \"sim\" para confirmar ou me diga o que deseja alterar.",
+    ],
+    ('despedida', 0): [
+        "Até logo! Boa viagem! 🛫",
+        "Tchau! Quando precisar de passagens, é só chamar a Avi. ✈️",
+    ],
+    ('despedida', 1): [
+        "Até logo! Quando quiser, é só responder \"sim\" que eu busco os voos com os dados que você me passou. 🛫",
+    ],
+    ('negacao', 1): [
+        "Sem problemas! O que você gostaria de alterar? Pode me informar a origem, o destino ou as datas corretas.",
+    ],
+}
+
+
+def templated_reply(result, step, summary="", missing=None):
+    """
+    Resposta de template para intenções simples (sem chamar a OpenAI)
+
+    Args:
+        result: dict retornado por IntentClassifier.classify
+        step: etapa atual do chat (0: coleta de informações, 1: confirmação)
+        summary: resumo das informações de viagem (usado na etapa 1)
+        missing: mensagens das informações que faltam (usadas na saudação da etapa 0)
+
+    Returns:
+        str: resposta, ou None se a mensagem precisar da OpenAI
+    """
+    if result['intent'] not in SIMPLE_INTENTS or not intent_classifier.is_confident(result):
+        return None
+    templates = CHAT_TEMPLATES.get((result['intent'], step))
+    if not templates:
+        return None
+
+    reply = random.choice(templates).format(summary=summary)
+    if step == 0 and result['intent'] == 'saudacao' and missing:
+        reply += "\n\nAinda faltam estas informações:\n" + "\n".join(f"- {item}" for item in missing)
+    return reply
+
+
+# Instância global (regras compiladas e modelo treinado na importação)
+intent_classifier = IntentClassifier()
@@ -0,0 +1,190 @@
+"""
+Provedor JSON da aplicação Flask
+Estende o provedor padrão para:
+- serializar os modelos compactos de voo (FlightOffer/FlightSegment) na fronteira
+  da resposta, produzindo o mesmo JSON dos dicionários que os formatadores montavam
+- usar um encoder mais rápido (orjson) quando instalado, com fallback para o módulo
+  json da biblioteca padrão
+- servir conjuntos de resultados em cache já serializados (EncodedPayloadCache),
+  evitando serializar o mesmo resultado a cada requisição
+
+Configuração (variáveis de ambiente):
+- AVI_JSON_ENCODER: "auto" (padrão, orjson se disponível), "orjson" ou "stdlib"
+- AVI_JSON_CACHE_MAX_ENTRIES: resultados serializados mantidos em memória (padrão: 256)
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+
+from flask.json.provider import DefaultJSONProvider
+
+from services.flight_offer_model import FlightOffer, FlightSegment
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+def _select_encoder():
+    """
+    Escolhe o encoder conforme AVI_JSON_ENCODER e os pacotes instalados
+
+    Returns:
+        str: "orjson" ou "stdlib"
+    """
+    requested = os.environ.get('AVI_JSON_ENCODER', 'auto').lower()
+    if requested == 'stdlib':
+        return 'stdlib'
+    if orjson is None:
+        if requested == 'orjson':
+            logger.warning("AVI_JSON_ENCODER=orjson, mas o pacote orjson não está instalado; usando json padrão")
+        return 'stdlib'
+    return 'orjson'
+
+
+class AviJSONProvider(DefaultJSONProvider):
+    """Provedor JSON com suporte aos modelos de oferta de voo e encoder plugável"""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.encoder = _select_encoder()
+        logger.info(f"Encoder JSON das respostas: {self.encoder}")
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (FlightOffer, FlightSegment)):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
+    def _orjson_options(self, indent=False):
+        """Opções do orjson equivalentes às do provedor padrão"""
+        # Datas passam pelo default para manter o formato HTTP do Flask
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps_bytes(self, obj, indent=False):
+        """
+        Serializa um objeto para bytes UTF-8 com o encoder configurado
+
+        Args:
+            obj: objeto a serializar
+            indent: formatar com indentação (modo debug)
+
+        Returns:
+            bytes: JSON codificado
+        """
+        if self.encoder == 'orjson':
+            try:
+                return orjson.dumps(obj, default=self.default, option=self._orjson_options(indent))
+            except (orjson.JSONEncodeError, TypeError) as e:
+                # Ex.: inteiros acima de 64 bits; o json padrão ainda consegue serializar
+                logger.debug(f"orjson não serializou o objeto, usando json padrão: {str(e)}")
+
+        kwargs = {'indent': 2} if indent else {'separators': (',', ':')}
+        return super().dumps(obj, **kwargs).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if self.encoder == 'orjson' and not kwargs:
+            return self.dumps_bytes(obj).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.encoder == 'orjson' and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def _pretty(self):
+        """Indica se as respostas devem ser indentadas (mesma regra do Flask)"""
+        return self.compact is False or (self.compact is None and self._app.debug)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self.bytes_response(self.dumps_bytes(obj, indent=self._pretty()) + b"\n")
+
+    def bytes_response(self, body, status=None):
+        """
+        Cria a resposta HTTP a partir de um JSON já serializado
+
+        Args:
+            body: JSON em bytes
+            status: código HTTP (opcional)
+
+        Returns:
+            Response: resposta com mimetype JSON
+        """
+        return self._app.response_class(body, status=status, mimetype=self.mimetype)
+
+
+class EncodedPayloadCache:
+    """
+    Cache dos resultados já serializados em bytes, por chave (ex.: session_id).
+    Os bytes da chave são reaproveitados até invalidate(key): quem grava um novo
+    resultado para a chave (ou altera o atual) deve invalidá-la. A identidade do
+    objeto não é usada, então cópias do mesmo resultado aproveitam os bytes e um
+    objeto novo no mesmo endereço não recebe os bytes de outro.
+    As chaves menos usadas são descartadas acima de max_entries.
+    """
+
+    def __init__(self, max_entries=None):
+        if max_entries is None:
+            max_entries = int(os.environ.get('AVI_JSON_CACHE_MAX_ENTRIES', '256'))
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, payload, provider):
+        """
+        Retorna o JSON em bytes do resultado da chave, serializando-o apenas na primeira vez
+
+        Args:
+            key: chave do resultado
+            payload: resultado atual da chave (serializado se a chave não estiver em cache)
+            provider: provedor JSON da aplicação (current_app.json)
+
+        Returns:
+            bytes: JSON codificado
+        """
+        indent = provider._pretty()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == indent:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        body = provider.dumps_bytes(payload, indent=indent) + b"\n"
+        with self._lock:
+            self._entries[key] = (indent, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+    def invalidate(self, key):
+        """Remove os bytes em cache da chave"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def response(self, key, payload, provider, status=None):
+        """
+        Cria a resposta HTTP reaproveitando os bytes em cache
+
+        Args:
+            key: chave do resultado
+            payload: resultado atual da chave
+            provider: provedor JSON da aplicação (current_app.json)
+            status: código HTTP (opcional)
+
+        Returns:
+            Response: resposta com mimetype JSON
+        """
+        return provider.bytes_response(self.get(key, payload, provider), status=status)
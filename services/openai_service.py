@@ -4,11 +4,15 @@ import requests
 import json
 import inspect
 import traceback
+from services.service_registry import lazy_service
+from services.prompt_builder import prompt_builder
+from services.admission_control import upstream_limiter
 
 class OpenAIService:
     def __init__(self):
         self.api_key = os.environ.get('OPENAI_API_KEY')
-        self.api_url = 'https://api.openai.com/v1/chat/completions'
+        # OPENAI_API_BASE permite apontar para um servidor compatível (ex.: stub do teste de carga)
+        self.api_url = os.environ.get('OPENAI_API_BASE', 'https://api.openai.com/v1').rstrip('/') + '/chat/completions'
         self.model = 'gpt-4o'
         
     def create_chat_completion(self, messages, temperature=0.7, max_tokens=1000, model=None):
@@ -43,6 +47,10 @@ class OpenAIService:
         # Preparar resposta de fallback para caso ocorra erro
         fallback_response = {'choices': [{'message': {'content': 'Estou tendo dificuldades para processar sua solicitação. Por favor, tente novamente em alguns instantes.'}}]}
         
+        # Vaga no limite de chamadas simultâneas à OpenAI: com a fila cheia, Overloaded
+        # sobe até a rota (429) em vez de prender a thread esperando a API
+        limiter = upstream_limiter('openai')
+        limiter.acquire()
         try:
             logging.info(f"[OPENAI SERVICE DEBUG] Enviando requisição para OpenAI API - Função: {str(inspect.currentframe().f_back.f_code.co_name)}")
             response = requests.post(
@@ -68,6 +76,8 @@ class OpenAIService:
         except Exception as e:
             logging.error(f"Erro inesperado ao chamar a API OpenAI: {str(e)}")
             return {'error': f'Erro inesperado: {str(e)}'}
+        finally:
+            limiter.release()
     
     # Função antiga removida para evitar duplicação
     
@@ -79,78 +89,28 @@ class OpenAIService:
         - user_message: mensagem do usuário
         - conversation_history: histórico da conversa
         - system_context: contexto adicional para o sistema
-        - session_id: ID da sessão atual para substituir no prompt
+        - session_id: ID da sessão atual (enviado no contexto variável, fora do prefixo)
         """
         if conversation_history is None:
             conversation_history = []
             
         logging.info(f"Processando mensagem normal de usuário via OpenAI")
         
-        # Importar os prompts do Avi
-        from services.prompts.avi_system_prompt import AVI_SYSTEM_PROMPT
-        from services.prompts.busca_rapida_prompt import BUSCA_RAPIDA_PROMPT
-        from services.prompts.planejamento_completo_prompt import PLANEJAMENTO_COMPLETO_PROMPT
-        
-        # Substituir SESSION_ID_ATUAL pelo ID de sessão real
-        custom_prompt = AVI_SYSTEM_PROMPT
-        if session_id:
-            custom_prompt = AVI_SYSTEM_PROMPT.replace('SESSION_ID_ATUAL', session_id)
-            logging.info(f"Prompt personalizado com session_id: {session_id}")
-        
-        # Identificar o contexto atual com base na mensagem e histórico
-        current_prompt = custom_prompt
-        
-        # Verificar se há um contexto específico de modo de busca
-        if "planejamento completo" in user_message.lower() or any("planejamento completo" in msg.get('content', '').lower() for msg in conversation_history if msg.get('is_user', False)):
-            current_prompt += "\n\n" + PLANEJAMENTO_COMPLETO_PROMPT
-            
-        # Criação do sistema de mensagens com o contexto da Avi
-        base_system_content = current_prompt
-        
-        # Adicionar contexto específico do sistema, se fornecido
-        if system_context:
-            base_system_content += f"\n\n{system_context}"
-            
-        # IMPORTANTE: Avisar explicitamente para NÃO simular voos
-        base_system_content += """
-        ATENÇÃO CRÍTICA: NÃO TENTE BUSCAR OU SIMULAR INFORMAÇÕES DE VOOS!
-        
-        - NUNCA forneça informações de preços, horários ou disponibilidade de voos
-        - NUNCA simule ou invente informações de passagens aéreas
-        - Se o usuário perguntar sobre voos específicos, explique que você está verificando
-          a API da Amadeus para obter dados reais e confiáveis
-        - Apenas responda perguntas gerais sobre viagens, sem fornecer informações de voos específicos
-        """
-            
-        system_message = {
-            "role": "system",
-            "content": base_system_content
-        }
-        
-        # Montagem do histórico de conversa no formato esperado pela API
-        api_messages = [system_message]
-        
-        for msg in conversation_history:
-            if msg.get('is_user'):
-                api_messages.append({
-                    "role": "user",
-                    "content": msg.get('content', '')
-                })
-            else:
-                api_messages.append({
-                    "role": "assistant", 
-                    "content": msg.get('content', '')
-                })
-        
-        # Adição da mensagem atual do usuário
-        api_messages.append({
-            "role": "user",
-            "content": user_message
-        })
+        # Prefixo de sistema pré-montado (igual para todas as sessões) e as partes
+        # variáveis (sessão, contexto da etapa) no fim, antes da mensagem atual
+        api_messages, prompt_info = prompt_builder.build_messages(
+            user_message,
+            conversation_history,
+            system_context=system_context,
+            session_id=session_id
+        )
         
         # Chamada à API
         response = self.create_chat_completion(api_messages)
         
+        if 'usage' in response:
+            prompt_builder.record_usage(prompt_info, response['usage'])
+        
         if 'error' in response:
             return response
         
@@ -162,6 +122,8 @@ class OpenAIService:
             logging.error(f"Erro ao processar resposta da OpenAI: {str(e)}")
             return {'error': 'Erro ao processar resposta da API'}
 
+# Instância global (construída no primeiro uso)
+openai_service = lazy_service('openai_service', OpenAIService)
+
 # Exemplo de uso:
-# openai_service = OpenAIService()
 # result = openai_service.travel_assistant("Quero planejar uma viagem para a Europa em dezembro. O que sugere?")
\ No newline at end of file
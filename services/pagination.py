@@ -0,0 +1,155 @@
+"""
+Paginação por cursor (keyset) para listagens ordenadas por data
+Em vez de OFFSET, cada página é filtrada a partir da última linha vista
+(data, id), o que usa os índices compostos e mantém o custo constante
+independentemente de quantas páginas o usuário já percorreu.
+
+Os cursores são opacos para o cliente: base64 de "<data ISO>|<id>".
+"""
+
+import base64
+import binascii
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+# Tamanho de página padrão e máximo
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    """Cursor ou tamanho de página inválido recebido do cliente"""
+
+
+def encode_cursor(timestamp, row_id):
+    """
+    Codifica a posição (data, id) de uma linha em um cursor opaco
+
+    Args:
+        timestamp: datetime da coluna de ordenação
+        row_id: chave primária da linha
+
+    Returns:
+        str: cursor
+    """
+    raw = f"{timestamp.isoformat()}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodifica um cursor gerado por encode_cursor
+
+    Args:
+        cursor: cursor recebido na query string
+
+    Returns:
+        tuple: (datetime, id)
+
+    Raises:
+        InvalidCursor: se o cursor for inválido
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise InvalidCursor(f"Cursor inválido: {cursor}")
+
+
+def parse_page_args(args):
+    """
+    Lê os parâmetros de paginação da query string (before, after, limit)
+
+    Args:
+        args: request.args
+
+    Returns:
+        dict: {"before": (datetime, id) ou None, "after": ..., "limit": int}
+
+    Raises:
+        InvalidCursor: se os parâmetros forem inválidos
+    """
+    before = args.get('before')
+    after = args.get('after')
+    if before and after:
+        raise InvalidCursor("Use apenas um dos parâmetros 'before' ou 'after'")
+
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise InvalidCursor("Parâmetro 'limit' deve ser um número inteiro")
+
+    return {
+        "before": decode_cursor(before) if before else None,
+        "after": decode_cursor(after) if after else None,
+        "limit": max(1, min(limit, MAX_PAGE_SIZE))
+    }
+
+
+def keyset_page(query, sort_column, id_column, limit, before=None, after=None):
+    """
+    Executa uma página da consulta ordenada por (sort_column, id_column)
+
+    Sem cursor, retorna as linhas mais recentes. Com before, as linhas
+    imediatamente anteriores ao cursor; com after, as imediatamente posteriores.
+
+    Args:
+        query: consulta SQLAlchemy já filtrada (ex.: por usuário)
+        sort_column: coluna de data usada na ordenação
+        id_column: chave primária (desempate)
+        limit: tamanho da página
+        before: cursor decodificado (datetime, id) ou None
+        after: cursor decodificado (datetime, id) ou None
+
+    Returns:
+        dict: {"items": linhas da mais recente para a mais antiga, "has_more": bool}
+              has_more indica se há mais linhas na direção percorrida
+    """
+    if after is not None:
+        timestamp, row_id = after
+        query = query.filter(or_(
+            sort_column > timestamp,
+            and_(sort_column == timestamp, id_column > row_id)
+        )).order_by(sort_column.asc(), id_column.asc())
+    else:
+        if before is not None:
+            timestamp, row_id = before
+            query = query.filter(or_(
+                sort_column < timestamp,
+                and_(sort_column == timestamp, id_column < row_id)
+            ))
+        query = query.order_by(sort_column.desc(), id_column.desc())
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after is not None:
+        rows.reverse()
+
+    return {"items": rows, "has_more": has_more}
+
+
+def page_info(page, limit, timestamp_attr):
+    """
+    Monta os metadados de paginação da resposta
+
+    Args:
+        page: resultado de keyset_page
+        limit: tamanho da página
+        timestamp_attr: nome do atributo de data das linhas
+
+    Returns:
+        dict: {"limit", "has_more", "before", "after"} — before aponta para a linha
+              mais antiga da página e after para a mais recente
+    """
+    items = page["items"]
+    newest = items[0] if items else None
+    oldest = items[-1] if items else None
+    return {
+        "limit": limit,
+        "has_more": page["has_more"],
+        "before": encode_cursor(getattr(oldest, timestamp_attr), oldest.id) if oldest else None,
+        "after": encode_cursor(getattr(newest, timestamp_attr), newest.id) if newest else None
+    }
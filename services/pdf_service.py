@@ -4,11 +4,6 @@ import os
 import json
 from datetime import datetime
 import tempfile
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.units import inch
 from flask import url_for
 
 logging.basicConfig(level=logging.INFO)
@@ -31,6 +26,14 @@ class PDFService:
         Retorna:
         - Caminho do arquivo PDF gerado
         """
+        # O ReportLab é importado apenas na geração do PDF para não pesar no
+        # tempo de inicialização dos workers
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+        from reportlab.lib.units import inch
+
         try:
             # Criar arquivo temporário para o PDF
             with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
@@ -0,0 +1,230 @@
+"""
+Montagem das mensagens do assistente com prefixo estável (cache de prompt)
+A API da OpenAI reaproveita o processamento do início da requisição quando ele é
+idêntico ao de uma requisição recente (a partir de 1024 tokens, em blocos de 128).
+Para isso o prefixo precisa ser o mesmo em todas as sessões:
+- os prompts do Avi e o aviso contra simulação de voos são montados uma única vez,
+  na importação do módulo, em uma mensagem de sistema por modo (padrão ou
+  planejamento completo);
+- o que varia por sessão ou etapa (ID da sessão, system_context) vai em uma
+  mensagem de sistema no fim, depois do histórico e antes da mensagem atual;
+- o histórico só cresce no fim, então também passa a fazer parte do prefixo
+  reaproveitado nas mensagens seguintes da mesma conversa.
+
+Os tokens do prefixo são contados com tiktoken quando instalado (ou estimados) e,
+a cada resposta, os tokens reaproveitados informados pela API
+(usage.prompt_tokens_details.cached_tokens) são acumulados em stats().
+"""
+
+import logging
+import textwrap
+import threading
+
+from services.prompts import AVI_SYSTEM_PROMPT, PLANEJAMENTO_COMPLETO_PROMPT
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Regras do cache de prompt da OpenAI: tamanho mínimo e granularidade do prefixo
+CACHE_MIN_TOKENS = 1024
+CACHE_INCREMENT_TOKENS = 128
+
+# Marcador antigo do ID da sessão nos prompts (o valor vai para o contexto da sessão)
+SESSION_PLACEHOLDER = 'SESSION_ID_ATUAL'
+
+# Modos do assistente
+MODE_DEFAULT = 'default'
+MODE_PLANEJAMENTO_COMPLETO = 'planejamento_completo'
+
+NO_FLIGHT_SIMULATION_WARNING = textwrap.dedent("""
+    ATENÇÃO CRÍTICA: NÃO TENTE BUSCAR OU SIMULAR INFORMAÇÕES DE VOOS!
+
+    - NUNCA forneça informações de preços, horários ou disponibilidade de voos
+    - NUNCA simule ou invente informações de passagens aéreas
+    - Se o usuário perguntar sobre voos específicos, explique que você está verificando
+      a API da Amadeus para obter dados reais e confiáveis
+    - Apenas responda perguntas gerais sobre viagens, sem fornecer informações de voos específicos
+    """).strip()
+
+
+def _encoder():
+    """Codificador do tiktoken para os modelos gpt-4o (ou None sem o pacote)"""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding('o200k_base')
+    except Exception as e:
+        logger.warning(f"tiktoken indisponível, usando estimativa de tokens: {str(e)}")
+        return None
+
+
+_ENCODER = _encoder()
+
+
+def count_tokens(text):
+    """
+    Número de tokens do texto (estimado em ~4 caracteres por token sem tiktoken)
+
+    Args:
+        text: texto a contar
+
+    Returns:
+        int: tokens
+    """
+    if _ENCODER is not None:
+        return len(_ENCODER.encode(text))
+    return (len(text) + 3) // 4
+
+
+def cache_eligible_tokens(prefix_tokens):
+    """
+    Tokens do prefixo que podem ser reaproveitados pelo cache de prompt
+
+    Args:
+        prefix_tokens: tokens do prefixo estável
+
+    Returns:
+        int: 0 abaixo do mínimo; senão o prefixo arredondado para baixo em blocos de 128
+    """
+    if prefix_tokens < CACHE_MIN_TOKENS:
+        return 0
+    return CACHE_MIN_TOKENS + (prefix_tokens - CACHE_MIN_TOKENS) // CACHE_INCREMENT_TOKENS * CACHE_INCREMENT_TOKENS
+
+
+class PromptBuilder:
+    """
+    Prefixos de sistema pré-montados e montagem das mensagens de cada chamada.
+    """
+
+    def __init__(self):
+        """Monta os prefixos estáticos de cada modo"""
+        templates = {
+            MODE_DEFAULT: [AVI_SYSTEM_PROMPT],
+            MODE_PLANEJAMENTO_COMPLETO: [AVI_SYSTEM_PROMPT, PLANEJAMENTO_COMPLETO_PROMPT]
+        }
+        self.uses_session_id = any(SESSION_PLACEHOLDER in part for parts in templates.values() for part in parts)
+
+        self.prefixes = {}
+        for mode, parts in templates.items():
+            content = "\n\n".join(part.strip() for part in parts + [NO_FLIGHT_SIMULATION_WARNING])
+            content = content.replace(SESSION_PLACEHOLDER, 'o ID da sessão informado no contexto da sessão')
+            tokens = count_tokens(content)
+            self.prefixes[mode] = {
+                'message': {'role': 'system', 'content': content},
+                'tokens': tokens,
+                'cache_eligible_tokens': cache_eligible_tokens(tokens)
+            }
+            logger.info(f"Prefixo do prompt '{mode}': {tokens} tokens "
+                        f"({self.prefixes[mode]['cache_eligible_tokens']} elegíveis ao cache)")
+
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'requests_with_cache_hit': 0}
+
+    @staticmethod
+    def detect_mode(user_message, conversation_history):
+        """
+        Modo do assistente para a mensagem
+
+        Args:
+            user_message: mensagem atual do usuário
+            conversation_history: histórico ({"content", "is_user"})
+
+        Returns:
+            str: MODE_PLANEJAMENTO_COMPLETO se o usuário pediu planejamento completo, senão MODE_DEFAULT
+        """
+        if "planejamento completo" in user_message.lower() or any(
+                "planejamento completo" in msg.get('content', '').lower()
+                for msg in conversation_history if msg.get('is_user', False)):
+            return MODE_PLANEJAMENTO_COMPLETO
+        return MODE_DEFAULT
+
+    def build_messages(self, user_message, conversation_history=None, system_context="", session_id=None):
+        """
+        Monta a lista de mensagens para a API
+
+        Ordem: prefixo estático do modo, histórico, contexto variável (se houver),
+        mensagem atual do usuário.
+
+        Args:
+            user_message: mensagem atual do usuário
+            conversation_history: histórico ({"content", "is_user"})
+            system_context: contexto adicional da etapa atual
+            session_id: ID da sessão atual
+
+        Returns:
+            tuple: (mensagens, {"mode", "prefix_tokens", "cache_eligible_tokens"})
+        """
+        conversation_history = conversation_history or []
+        mode = self.detect_mode(user_message, conversation_history)
+        prefix = self.prefixes[mode]
+
+        messages = [prefix['message']]
+        for msg in conversation_history:
+            messages.append({
+                "role": "user" if msg.get('is_user') else "assistant",
+                "content": msg.get('content', '')
+            })
+
+        context_parts = []
+        if session_id and self.uses_session_id:
+            context_parts.append(f"ID da sessão: {session_id}")
+        if system_context and system_context.strip():
+            context_parts.append(textwrap.dedent(system_context).strip())
+        if context_parts:
+            messages.append({"role": "system", "content": "\n\n".join(context_parts)})
+
+        messages.append({"role": "user", "content": user_message})
+
+        return messages, {
+            'mode': mode,
+            'prefix_tokens': prefix['tokens'],
+            'cache_eligible_tokens': prefix['cache_eligible_tokens']
+        }
+
+    def record_usage(self, info, usage):
+        """
+        Acumula o uso de tokens informado pela API
+
+        Args:
+            info: dict retornado por build_messages
+            usage: campo "usage" da resposta da API (pode ser None)
+        """
+        if not usage:
+            return
+        prompt_tokens = usage.get('prompt_tokens') or 0
+        cached_tokens = (usage.get('prompt_tokens_details') or {}).get('cached_tokens') or 0
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['prompt_tokens'] += prompt_tokens
+            self._stats['cached_tokens'] += cached_tokens
+            if cached_tokens:
+                self._stats['requests_with_cache_hit'] += 1
+        logger.info(f"Prompt '{info['mode']}': {prompt_tokens} tokens, {cached_tokens} em cache "
+                    f"(prefixo elegível: {info['cache_eligible_tokens']})")
+
+    def stats(self):
+        """
+        Tamanho dos prefixos e tokens reaproveitados desde o início do processo
+
+        Returns:
+            dict: {"prefixes", "token_counter", "requests", "prompt_tokens", "cached_tokens",
+                   "cached_ratio", "requests_with_cache_hit"}
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['cached_ratio'] = round(stats['cached_tokens'] / stats['prompt_tokens'], 3) if stats['prompt_tokens'] else 0.0
+        stats['token_counter'] = 'tiktoken' if _ENCODER is not None else 'estimate'
+        stats['prefixes'] = {
+            mode: {'tokens': prefix['tokens'], 'cache_eligible_tokens': prefix['cache_eligible_tokens']}
+            for mode, prefix in self.prefixes.items()
+        }
+        return stats
+
+
+# Instância global (prefixos montados na importação, ao iniciar a aplicação)
+prompt_builder = PromptBuilder()
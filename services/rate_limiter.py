@@ -0,0 +1,129 @@
+"""
+Limitador de taxa por token bucket
+Usado para respeitar as cotas das APIs externas (ex.: Amadeus) quando várias
+chamadas são feitas em paralelo. Os buckets são compartilhados por nome dentro
+do processo, de forma que todas as instâncias de um serviço dividam a mesma cota.
+"""
+
+import time
+import logging
+import threading
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket seguro para múltiplas threads.
+    Tokens são repostos continuamente a `rate` por segundo até `capacity`.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        Inicializa o bucket cheio
+
+        Args:
+            rate: tokens repostos por segundo
+            capacity: número máximo de tokens acumulados (padrão: igual a rate)
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        """Repõe os tokens proporcionais ao tempo decorrido (chamar com o lock)"""
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+
+    def try_acquire(self, tokens=1):
+        """
+        Tenta consumir tokens sem esperar
+
+        Args:
+            tokens: quantidade de tokens a consumir
+
+        Returns:
+            bool: True se os tokens foram consumidos
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def wait_time(self, tokens=1):
+        """
+        Calcula quanto tempo falta para haver tokens suficientes
+
+        Args:
+            tokens: quantidade de tokens desejada
+
+        Returns:
+            float: segundos até os tokens estarem disponíveis (0 se já estiverem)
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            missing = tokens - self._tokens
+            return max(0.0, missing / self.rate) if self.rate > 0 else float('inf')
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Consome tokens, aguardando a reposição se necessário
+
+        Args:
+            tokens: quantidade de tokens a consumir
+            timeout: tempo máximo de espera em segundos (None para esperar indefinidamente)
+
+        Returns:
+            bool: True se os tokens foram consumidos, False se o tempo acabou
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate if self.rate > 0 else float('inf')
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait > remaining:
+                    return False
+                wait = min(wait, remaining)
+
+            time.sleep(wait)
+
+
+# Buckets compartilhados no processo, por nome
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(name, rate, capacity=None):
+    """
+    Retorna o bucket compartilhado com o nome informado, criando-o se necessário
+
+    Args:
+        name: nome do bucket (ex.: "amadeus:<client_id>")
+        rate: tokens por segundo (usado apenas na criação)
+        capacity: capacidade máxima (usada apenas na criação)
+
+    Returns:
+        TokenBucket: bucket compartilhado
+    """
+    with _buckets_lock:
+        bucket = _buckets.get(name)
+        if bucket is None:
+            bucket = TokenBucket(rate, capacity)
+            _buckets[name] = bucket
+            logger.info(f"Token bucket '{name}' criado: {bucket.rate}/s, capacidade {bucket.capacity}")
+        return bucket
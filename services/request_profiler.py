@@ -0,0 +1,393 @@
+"""
+Profiler sob demanda para requisições Flask
+Este módulo permite amostrar a pilha de execução de uma requisição específica
+(ativado por cabeçalho de administrador ou por taxa de amostragem) e gravar os
+perfis em um diretório limitado, para diagnosticar turnos lentos do chat
+(extração, GPT, TravelPayouts, formatação ou ORM).
+
+Configuração (variáveis de ambiente):
+- AVI_PROFILER_TOKEN: token de administrador; habilita o cabeçalho X-Avi-Profile
+  e os endpoints de listagem/download
+- AVI_PROFILER_SAMPLE_RATE: fração de requisições perfiladas automaticamente (0.0 a 1.0)
+- AVI_PROFILER_INTERVAL_MS: intervalo entre amostras da pilha (padrão: 5 ms)
+- AVI_PROFILER_DIR: diretório onde os perfis são gravados
+- AVI_PROFILER_MAX_FILES: número máximo de perfis mantidos no diretório
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import hmac
+import random
+import logging
+import tempfile
+import threading
+from collections import Counter
+from datetime import datetime
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Cabeçalho usado para solicitar o profiling de uma requisição
+PROFILE_HEADER = 'X-Avi-Profile'
+
+# Formatos de exportação suportados
+EXPORT_FORMATS = ('collapsed', 'speedscope')
+
+
+class StackSampler:
+    """
+    Amostrador estatístico da pilha de uma thread.
+
+    Uma thread auxiliar lê periodicamente o frame atual da thread alvo
+    (via sys._current_frames) e conta quantas vezes cada pilha foi observada.
+    """
+
+    def __init__(self, target_thread_id, interval=0.005):
+        """
+        Inicializa o amostrador
+
+        Args:
+            target_thread_id: ID da thread a ser amostrada
+            interval: intervalo entre amostras em segundos
+        """
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self.sample_count = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Inicia a thread de amostragem"""
+        self._thread = threading.Thread(target=self._run, name='avi-stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Interrompe a amostragem e aguarda a thread auxiliar"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+
+    def _run(self):
+        """Laço de amostragem executado na thread auxiliar"""
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+            self.samples[self._extract_stack(frame)] += 1
+            self.sample_count += 1
+
+    @staticmethod
+    def _extract_stack(frame):
+        """
+        Converte um frame em uma tupla de quadros da raiz até a folha
+
+        Args:
+            frame: frame mais interno da thread amostrada
+
+        Returns:
+            tuple: tuplas (função, arquivo, linha) da raiz até a folha
+        """
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+
+class RequestProfiler:
+    """
+    Gerencia o profiling opt-in das requisições e o armazenamento dos perfis.
+    """
+
+    def __init__(self):
+        """Inicializa o profiler com as configurações do ambiente"""
+        self.token = os.environ.get('AVI_PROFILER_TOKEN')
+        self.sample_rate = float(os.environ.get('AVI_PROFILER_SAMPLE_RATE', '0'))
+        self.interval = float(os.environ.get('AVI_PROFILER_INTERVAL_MS', '5')) / 1000.0
+        self.directory = os.environ.get(
+            'AVI_PROFILER_DIR',
+            os.path.join(tempfile.gettempdir(), 'avi_profiles')
+        )
+        self.max_files = int(os.environ.get('AVI_PROFILER_MAX_FILES', '50'))
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """Indica se algum gatilho de profiling está configurado"""
+        return bool(self.token) or self.sample_rate > 0
+
+    def is_authorized(self, provided_token):
+        """
+        Verifica o token de administrador
+
+        Args:
+            provided_token: token enviado pelo cliente
+
+        Returns:
+            bool: True se o token confere com AVI_PROFILER_TOKEN
+        """
+        if not self.token or not provided_token:
+            return False
+        # Comparação em tempo constante
+        return hmac.compare_digest(provided_token.encode('utf-8'), self.token.encode('utf-8'))
+
+    def should_profile(self, request):
+        """
+        Decide se a requisição atual deve ser perfilada
+
+        Args:
+            request: requisição Flask atual
+
+        Returns:
+            bool: True se a requisição deve ser perfilada
+        """
+        if not self.enabled:
+            return False
+
+        # Não perfilar os próprios endpoints de perfis nem arquivos estáticos
+        if request.path.startswith('/admin/profiles') or request.path.startswith('/static/'):
+            return False
+
+        if self.is_authorized(request.headers.get(PROFILE_HEADER)):
+            return True
+
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def init_app(self, app):
+        """
+        Registra os hooks de requisição na aplicação Flask.
+        Os hooks valem para as rotas do app.py e de todos os blueprints.
+
+        Args:
+            app: aplicação Flask
+        """
+        from flask import request, g
+
+        @app.before_request
+        def _start_request_profile():
+            if not self.should_profile(request):
+                return
+            sampler = StackSampler(threading.get_ident(), self.interval)
+            g.avi_profile = {
+                'sampler': sampler,
+                'started_at': time.time()
+            }
+            sampler.start()
+
+        @app.after_request
+        def _finish_request_profile(response):
+            profile = g.pop('avi_profile', None)
+            if profile is None:
+                return response
+            profile_id = self._finish(profile, request, response.status_code)
+            if profile_id:
+                response.headers['X-Avi-Profile-Id'] = profile_id
+            return response
+
+        @app.teardown_request
+        def _abort_request_profile(error=None):
+            # Garante que o amostrador não fique ativo se a view levantar uma exceção
+            profile = g.pop('avi_profile', None)
+            if profile is not None:
+                self._finish(profile, request, 500)
+
+        logger.info(f"RequestProfiler registrado (habilitado: {self.enabled}, diretório: {self.directory})")
+
+    def _finish(self, profile, request, status_code):
+        """
+        Encerra o amostrador e grava o perfil em disco
+
+        Args:
+            profile: dicionário com o amostrador e o horário de início
+            request: requisição Flask perfilada
+            status_code: status HTTP da resposta
+
+        Returns:
+            str: ID do perfil gravado ou None em caso de erro
+        """
+        sampler = profile['sampler']
+        sampler.stop()
+        duration_ms = (time.time() - profile['started_at']) * 1000
+
+        try:
+            return self.save_profile(sampler, {
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status_code': status_code,
+                'duration_ms': round(duration_ms, 2)
+            })
+        except Exception as e:
+            logger.error(f"Erro ao gravar perfil da requisição {request.path}: {str(e)}")
+            return None
+
+    def save_profile(self, sampler, metadata):
+        """
+        Grava as amostras de um perfil no diretório configurado
+
+        Args:
+            sampler: StackSampler já encerrado
+            metadata: informações da requisição perfilada
+
+        Returns:
+            str: ID do perfil gravado
+        """
+        os.makedirs(self.directory, exist_ok=True)
+
+        profile_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        document = dict(metadata)
+        document.update({
+            'id': profile_id,
+            'created_at': datetime.utcnow().isoformat(),
+            'interval_ms': self.interval * 1000,
+            'sample_count': sampler.sample_count,
+            'stacks': [
+                {'frames': [list(frame) for frame in stack], 'count': count}
+                for stack, count in sampler.samples.most_common()
+            ]
+        })
+
+        path = os.path.join(self.directory, f"{profile_id}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(document, f)
+
+        self._enforce_limit()
+        logger.info(f"Perfil {profile_id} gravado: {metadata.get('path')} em {metadata.get('duration_ms')} ms "
+                    f"({sampler.sample_count} amostras)")
+        return profile_id
+
+    def _enforce_limit(self):
+        """Remove os perfis mais antigos quando o diretório excede o limite"""
+        with self._lock:
+            files = sorted(
+                (name for name in os.listdir(self.directory) if name.endswith('.json')),
+                key=lambda name: os.path.getmtime(os.path.join(self.directory, name))
+            )
+            for name in files[:max(0, len(files) - self.max_files)]:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError as e:
+                    logger.warning(f"Não foi possível remover o perfil antigo {name}: {str(e)}")
+
+    def list_profiles(self):
+        """
+        Lista os perfis gravados, do mais recente para o mais antigo
+
+        Returns:
+            list: metadados dos perfis (sem as pilhas)
+        """
+        if not os.path.isdir(self.directory):
+            return []
+
+        profiles = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                document = self.load_profile(name[:-len('.json')])
+            except Exception as e:
+                logger.warning(f"Perfil ilegível {name}: {str(e)}")
+                continue
+            if document:
+                document.pop('stacks', None)
+                profiles.append(document)
+
+        profiles.sort(key=lambda p: p.get('created_at', ''), reverse=True)
+        return profiles
+
+    def load_profile(self, profile_id):
+        """
+        Carrega um perfil gravado
+
+        Args:
+            profile_id: ID do perfil
+
+        Returns:
+            dict: documento do perfil ou None se não existir
+        """
+        # Evitar acesso a arquivos fora do diretório de perfis
+        if not profile_id or os.path.basename(profile_id) != profile_id:
+            return None
+
+        path = os.path.join(self.directory, f"{profile_id}.json")
+        if not os.path.isfile(path):
+            return None
+
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _frame_label(frame):
+        """Formata um quadro (função, arquivo, linha) para exibição"""
+        name, filename, line = frame
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+    def to_collapsed(self, document):
+        """
+        Converte um perfil para o formato collapsed-stack (flamegraph.pl / speedscope)
+
+        Args:
+            document: documento do perfil
+
+        Returns:
+            str: uma linha "raiz;...;folha contagem" por pilha
+        """
+        lines = []
+        for stack in document.get('stacks', []):
+            labels = [self._frame_label(frame).replace(';', ',') for frame in stack['frames']]
+            lines.append(f"{';'.join(labels)} {stack['count']}")
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self, document):
+        """
+        Converte um perfil para o formato JSON do speedscope (perfil amostrado)
+
+        Args:
+            document: documento do perfil
+
+        Returns:
+            dict: documento no esquema https://www.speedscope.app/file-format-schema.json
+        """
+        frames = []
+        frame_index = {}
+        samples = []
+        weights = []
+
+        for stack in document.get('stacks', []):
+            indexes = []
+            for frame in stack['frames']:
+                key = tuple(frame)
+                if key not in frame_index:
+                    frame_index[key] = len(frames)
+                    name, filename, line = frame
+                    frames.append({'name': name, 'file': filename, 'line': line})
+                indexes.append(frame_index[key])
+            samples.append(indexes)
+            weights.append(stack['count'] * document.get('interval_ms', 1))
+
+        total = sum(weights)
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': f"{document.get('method', '')} {document.get('path', '')}".strip(),
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': total,
+                'samples': samples,
+                'weights': weights
+            }],
+            'name': document.get('id'),
+            'exporter': 'avi-request-profiler'
+        }
+
+
+# Instância global do profiler
+request_profiler = RequestProfiler()
@@ -0,0 +1,401 @@
+"""
+Atualizações incrementais e versionadas do Roteiro Personalizado
+Em vez de regravar o JSON completo de TravelPlan.details a cada salvamento, os dias
+ficam em linhas de TravelPlanDay e o cliente envia operações no estilo JSON Patch
+(RFC 6902: add, remove, replace, move, copy e test) sobre o documento
+
+    {"destination": ..., "startDate": ..., "endDate": ..., "days": [...]}
+
+junto com a versão em que se baseou. O servidor aplica as operações, grava apenas
+os dias cujo conteúdo mudou e incrementa TravelPlan.version. Se o roteiro foi
+alterado depois daquela versão (ex.: em outra aba), nada é gravado e o cliente
+recebe o estado atual para recarregar (VersionConflict).
+
+Roteiros antigos, com os dias em TravelPlan.details, são migrados para
+TravelPlanDay na primeira gravação.
+
+Configuração (variáveis de ambiente):
+- AVI_ROTEIRO_PATCH_MAX_OPS: número máximo de operações por requisição (padrão: 500)
+"""
+
+import os
+import copy
+import json
+import logging
+from datetime import datetime
+
+from sqlalchemy.orm.exc import StaleDataError
+
+from models import db, TravelPlan, TravelPlanDay
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Número máximo de operações aceitas em uma requisição
+MAX_OPERATIONS = int(os.environ.get('AVI_ROTEIRO_PATCH_MAX_OPS', '500'))
+
+# Campos do documento gravados em colunas de TravelPlan
+PLAN_FIELDS = ('destination', 'startDate', 'endDate')
+
+# Operações JSON Patch suportadas
+OPERATIONS = ('add', 'remove', 'replace', 'move', 'copy', 'test')
+
+
+class PatchError(ValueError):
+    """Operação inválida ou que não pode ser aplicada ao roteiro"""
+
+
+class VersionConflict(Exception):
+    """O roteiro foi alterado depois da versão usada pelo cliente"""
+
+    def __init__(self, plan):
+        super().__init__(f"Roteiro {plan.id} está na versão {plan.version}")
+        self.plan = plan
+
+
+def _dumps(value):
+    """Serialização usada para gravar e comparar os dias"""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def _format_date(value):
+    """Data da coluna no formato do frontend (YYYY-MM-DD)"""
+    if value is None:
+        return None
+    return value.date().isoformat() if isinstance(value, datetime) else value.isoformat()
+
+
+def _parse_date(value, field):
+    """Data ISO enviada pelo cliente (ou None)"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        raise PatchError(f"Data inválida em '{field}': {value}")
+
+
+def load_days(plan):
+    """
+    Dias do roteiro, das linhas de TravelPlanDay ou do JSON antigo em details
+
+    Args:
+        plan: TravelPlan
+
+    Returns:
+        list: dias do roteiro (novos objetos, podem ser alterados)
+    """
+    if plan.details is not None:
+        try:
+            days = json.loads(plan.details)
+        except ValueError:
+            logger.error(f"JSON inválido em details do roteiro {plan.id}")
+            return []
+        return days if isinstance(days, list) else []
+    return [json.loads(day.data) for day in plan.days]
+
+
+def days_json(plan):
+    """
+    Dias do roteiro serializados, no formato do antigo TravelPlan.details
+
+    Args:
+        plan: TravelPlan
+
+    Returns:
+        str: JSON da lista de dias
+    """
+    if plan.details is not None:
+        return plan.details
+    return '[' + ','.join(day.data for day in plan.days) + ']'
+
+
+def plan_document(plan):
+    """
+    Documento sobre o qual as operações são aplicadas
+
+    Args:
+        plan: TravelPlan
+
+    Returns:
+        dict: {"destination", "startDate", "endDate", "days"}
+    """
+    return {
+        'destination': plan.destination,
+        'startDate': _format_date(plan.start_date),
+        'endDate': _format_date(plan.end_date),
+        'days': load_days(plan)
+    }
+
+
+def _parse_pointer(path):
+    """Converte um JSON Pointer ("/days/0/title") em lista de chaves"""
+    if not isinstance(path, str) or (path and not path.startswith('/')):
+        raise PatchError(f"Caminho inválido: {path!r}")
+    if path == '':
+        return []
+    return [token.replace('~1', '/').replace('~0', '~') for token in path[1:].split('/')]
+
+
+def _list_index(container, token, allow_end=False):
+    """Índice de lista de um token do caminho ("-" significa o fim da lista)"""
+    if allow_end and token == '-':
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith('0')):
+        raise PatchError(f"Índice inválido: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"Índice fora da lista: {index}")
+    return index
+
+
+def _resolve(document, tokens):
+    """Contêiner pai e última chave do caminho"""
+    if not tokens:
+        raise PatchError("Operações sobre o documento inteiro não são permitidas")
+    parent = document
+    for token in tokens[:-1]:
+        if isinstance(parent, list):
+            parent = parent[_list_index(parent, token)]
+        elif isinstance(parent, dict) and token in parent:
+            parent = parent[token]
+        else:
+            raise PatchError(f"Caminho inexistente: /{'/'.join(tokens)}")
+    return parent, tokens[-1]
+
+
+def _get(document, tokens):
+    parent, key = _resolve(document, tokens)
+    if isinstance(parent, list):
+        return parent[_list_index(parent, key)]
+    if isinstance(parent, dict) and key in parent:
+        return parent[key]
+    raise PatchError(f"Caminho inexistente: /{'/'.join(tokens)}")
+
+
+def _add(document, tokens, value):
+    parent, key = _resolve(document, tokens)
+    if isinstance(parent, list):
+        parent.insert(_list_index(parent, key, allow_end=True), value)
+    elif isinstance(parent, dict):
+        parent[key] = value
+    else:
+        raise PatchError(f"Caminho inválido: /{'/'.join(tokens)}")
+
+
+def _replace(document, tokens, value):
+    parent, key = _resolve(document, tokens)
+    if isinstance(parent, list):
+        parent[_list_index(parent, key)] = value
+    elif isinstance(parent, dict) and key in parent:
+        parent[key] = value
+    else:
+        raise PatchError(f"Caminho inexistente: /{'/'.join(tokens)}")
+
+
+def _remove(document, tokens):
+    parent, key = _resolve(document, tokens)
+    if isinstance(parent, list):
+        return parent.pop(_list_index(parent, key))
+    if isinstance(parent, dict) and key in parent:
+        return parent.pop(key)
+    raise PatchError(f"Caminho inexistente: /{'/'.join(tokens)}")
+
+
+def apply_operations(document, operations):
+    """
+    Aplica operações JSON Patch ao documento (alterando-o)
+
+    Args:
+        document: documento do roteiro (ver plan_document)
+        operations: lista de {"op", "path", "value"/"from"}
+
+    Returns:
+        dict: o documento alterado
+
+    Raises:
+        PatchError: se alguma operação for inválida ou falhar (incluindo "test")
+    """
+    if not isinstance(operations, list):
+        raise PatchError("Informe a lista de operações em 'ops'")
+    if len(operations) > MAX_OPERATIONS:
+        raise PatchError(f"Máximo de {MAX_OPERATIONS} operações por requisição")
+
+    for position, operation in enumerate(operations, start=1):
+        if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS:
+            raise PatchError(f"Operação {position} inválida")
+        op = operation['op']
+        tokens = _parse_pointer(operation.get('path'))
+        if tokens and tokens[0] not in PLAN_FIELDS + ('days',):
+            raise PatchError(f"Campo não editável: {operation.get('path')}")
+        if op in ('add', 'replace', 'test') and 'value' not in operation:
+            raise PatchError(f"Operação {position} ({op}) sem 'value'")
+
+        if op == 'add':
+            _add(document, tokens, copy.deepcopy(operation['value']))
+        elif op == 'remove':
+            _remove(document, tokens)
+        elif op == 'replace':
+            _replace(document, tokens, copy.deepcopy(operation['value']))
+        elif op in ('move', 'copy'):
+            source = _parse_pointer(operation.get('from'))
+            if op == 'move' and tokens[:len(source)] == source and tokens != source:
+                raise PatchError(f"Operação {position}: não é possível mover para dentro de si mesmo")
+            value = _remove(document, source) if op == 'move' else copy.deepcopy(_get(document, source))
+            _add(document, tokens, value)
+        elif op == 'test':
+            if _get(document, tokens) != operation['value']:
+                raise PatchError(f"Teste falhou em {operation.get('path')}")
+
+    if not isinstance(document.get('days'), list) or not all(isinstance(day, dict) for day in document['days']):
+        raise PatchError("'days' deve ser uma lista de dias")
+    return document
+
+
+def _store_days(plan, days):
+    """
+    Grava os dias em TravelPlanDay, regravando apenas as posições alteradas
+
+    Args:
+        plan: TravelPlan
+        days: lista completa de dias
+
+    Returns:
+        list: posições inseridas, alteradas ou removidas
+    """
+    if plan.details is not None:
+        # Migração do formato antigo: todas as posições são gravadas
+        existing = {}
+        plan.details = None
+    else:
+        existing = {day.position: day for day in plan.days}
+
+    changed = []
+    for position, day in enumerate(days):
+        data = _dumps(day)
+        row = existing.get(position)
+        if row is None:
+            plan.days.append(TravelPlanDay(position=position, data=data))
+            changed.append(position)
+        elif row.data != data:
+            row.data = data
+            changed.append(position)
+
+    for position in sorted(existing):
+        if position >= len(days):
+            plan.days.remove(existing[position])
+            changed.append(position)
+    return changed
+
+
+def _apply_fields(plan, document):
+    """Grava destino e datas do documento nas colunas de TravelPlan"""
+    destination = document.get('destination')
+    if not destination:
+        raise PatchError("O destino do roteiro não pode ficar vazio")
+    if destination != plan.destination:
+        plan.destination = destination
+        plan.title = f"Viagem para {destination or 'Destino'}"
+    start_date = _parse_date(document.get('startDate'), 'startDate')
+    if _format_date(start_date) != _format_date(plan.start_date):
+        plan.start_date = start_date
+    end_date = _parse_date(document.get('endDate'), 'endDate')
+    if _format_date(end_date) != _format_date(plan.end_date):
+        plan.end_date = end_date
+
+
+def _commit(plan):
+    """
+    Confirma a gravação com a verificação de versão do ORM
+
+    Raises:
+        VersionConflict: se outra gravação incrementou a versão antes desta
+    """
+    # Marca o roteiro como alterado mesmo quando só os dias mudaram: o UPDATE
+    # incrementa a versão e falha se ela não for mais a carregada
+    plan.updated_at = datetime.now()
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        current = db.session.get(TravelPlan, plan.id)
+        logger.info(f"Conflito de versão ao gravar o roteiro {plan.id}")
+        raise VersionConflict(current)
+
+
+def apply_patch(plan, base_version, operations):
+    """
+    Aplica operações ao roteiro com controle de concorrência otimista
+
+    Args:
+        plan: TravelPlan
+        base_version: versão em que o cliente se baseou
+        operations: operações JSON Patch (ver apply_operations)
+
+    Returns:
+        dict: {"version", "changed_days" (posições regravadas), "fields_changed"}
+
+    Raises:
+        PatchError: se as operações forem inválidas (nada é gravado)
+        VersionConflict: se o roteiro já estiver em outra versão (nada é gravado)
+    """
+    try:
+        base_version = int(base_version)
+    except (TypeError, ValueError):
+        raise PatchError("Informe a versão do roteiro em 'version'")
+    if plan.version != base_version:
+        raise VersionConflict(plan)
+
+    original = plan_document(plan)
+    document = apply_operations(copy.deepcopy(original), operations)
+    fields_changed = [field for field in PLAN_FIELDS if document.get(field) != original.get(field)]
+    if not fields_changed and document['days'] == original['days'] and plan.details is None:
+        return {'version': plan.version, 'changed_days': [], 'fields_changed': []}
+
+    # Sem autoflush: um flush intermediário (ao carregar plan.days) incrementaria a versão duas vezes
+    with db.session.no_autoflush:
+        try:
+            _apply_fields(plan, document)
+        except PatchError:
+            db.session.rollback()
+            raise
+        changed = _store_days(plan, document['days'])
+    _commit(plan)
+    logger.info(f"Roteiro {plan.id} atualizado para a versão {plan.version} "
+                f"({len(changed)} dia(s) regravado(s))")
+    return {'version': plan.version, 'changed_days': sorted(changed), 'fields_changed': fields_changed}
+
+
+def replace_days(plan, days, base_version=None):
+    """
+    Substitui a lista completa de dias (salvar/atualizar), regravando apenas os
+    dias alterados. Não confirma a transação.
+
+    Args:
+        plan: TravelPlan (novo ou existente)
+        days: lista de dias
+        base_version: versão em que o cliente se baseou (opcional)
+
+    Returns:
+        list: posições regravadas
+
+    Raises:
+        PatchError: se days não for uma lista de dias
+        VersionConflict: se base_version for informada e diferente da atual
+    """
+    if not isinstance(days, list) or not all(isinstance(day, dict) for day in days):
+        raise PatchError("'days' deve ser uma lista de dias")
+    if base_version is not None and plan.version is not None and plan.version != int(base_version):
+        raise VersionConflict(plan)
+    with db.session.no_autoflush:
+        return _store_days(plan, days)
+
+
+def commit_plan(plan):
+    """
+    Confirma as alterações de um roteiro existente verificando a versão
+
+    Raises:
+        VersionConflict: se outra gravação incrementou a versão antes desta
+    """
+    _commit(plan)
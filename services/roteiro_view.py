@@ -0,0 +1,213 @@
+"""
+Modelo de leitura do Roteiro Personalizado (/api/roteiro/obter)
+Monta a estrutura de dias e blocos usada pelo frontend a partir do TravelPlan com
+dias, voos e hospedagens carregados antecipadamente (uma consulta por coleção) e
+guarda a resposta já serializada em JSON, por roteiro e versão.
+
+Toda alteração de um roteiro incrementa TravelPlan.version (inclusive ao adicionar
+ou remover voos e hospedagens), então a versão identifica o conteúdo:
+- dentro de AVI_ROTEIRO_CACHE_TRUST segundos desde a última verificação, a
+  resposta em cache é servida sem acessar o banco;
+- depois disso, uma consulta da versão (pela chave primária) confirma a entrada;
+- as rotas que alteram o roteiro neste processo invalidam a entrada na hora.
+
+Configuração (variáveis de ambiente):
+- AVI_ROTEIRO_CACHE_MAX_ENTRIES: roteiros mantidos em cache (padrão: 500)
+- AVI_ROTEIRO_CACHE_TRUST: segundos em que uma entrada é servida sem verificar
+  a versão no banco (padrão: 2; 0 verifica sempre)
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy.orm import selectinload
+
+from models import db, TravelPlan
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+def _as_date(value):
+    """Data (sem horário) de uma coluna Date ou DateTime"""
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _day_index(item_date, start_date, total_days):
+    """Índice do dia do roteiro para a data do item (o primeiro dia se fora do período)"""
+    if item_date and start_date:
+        day_diff = (item_date - start_date).days
+        if 0 <= day_diff < total_days:
+            return day_diff
+    return 0
+
+
+def load_plan(roteiro_id):
+    """
+    Carrega o roteiro com dias, voos e hospedagens. Cada coleção vem em uma
+    consulta própria (selectinload): um JOIN das três multiplicaria as linhas
+    (dias × voos × hospedagens).
+
+    Args:
+        roteiro_id: ID do roteiro
+
+    Returns:
+        TravelPlan: roteiro ou None se não existir
+    """
+    return (TravelPlan.query
+            .options(selectinload(TravelPlan.days),
+                     selectinload(TravelPlan.flights),
+                     selectinload(TravelPlan.accommodations))
+            .filter_by(id=roteiro_id)
+            .first())
+
+
+def build_roteiro(plan):
+    """
+    Monta o roteiro no formato do frontend
+
+    Args:
+        plan: TravelPlan com days, flights e accommodations carregados
+
+    Returns:
+        dict: {"id", "destination", "startDate", "endDate", "travelers", "version", "days"}
+    """
+    if plan.details is not None:
+        days = json.loads(plan.details) if plan.details else []
+    else:
+        days = [json.loads(day.data) for day in plan.days]
+
+    # Blocos já gravados nos dias (o cliente reenvia os blocos de voos e hospedagens)
+    stored_block_ids = {
+        block.get('id') for day in days
+        for block in day.get('blocks') or [] if isinstance(block, dict)
+    }
+    start_date = _as_date(plan.start_date)
+
+    def add_block(day_index, block):
+        if day_index < len(days) and block['id'] not in stored_block_ids:
+            days[day_index].setdefault('blocks', []).append(block)
+
+    for flight in sorted(plan.flights, key=lambda f: f.id):
+        add_block(_day_index(_as_date(flight.departure_time), start_date, len(days)), {
+            'id': f'flight_{flight.id}',
+            'type': 'flight',
+            'airline': flight.airline,
+            'flightNumber': flight.flight_number,
+            'departureAirport': flight.departure_location,
+            'arrivalAirport': flight.arrival_location,
+            'departureTime': flight.departure_time.isoformat() if flight.departure_time else None,
+            'arrivalTime': flight.arrival_time.isoformat() if flight.arrival_time else None,
+            'price': flight.price,
+            'currency': flight.currency
+        })
+
+    for accommodation in sorted(plan.accommodations, key=lambda a: a.id):
+        add_block(_day_index(accommodation.check_in, start_date, len(days)), {
+            'id': f'hotel_{accommodation.id}',
+            'type': 'hotel',
+            'name': accommodation.name,
+            'location': accommodation.location,
+            'checkIn': accommodation.check_in.isoformat() if accommodation.check_in else None,
+            'checkOut': accommodation.check_out.isoformat() if accommodation.check_out else None,
+            'pricePerNight': accommodation.price_per_night,
+            'currency': accommodation.currency,
+            'stars': accommodation.stars
+        })
+
+    return {
+        'id': plan.id,
+        'destination': plan.destination,
+        'startDate': plan.start_date.isoformat() if plan.start_date else None,
+        'endDate': plan.end_date.isoformat() if plan.end_date else None,
+        'travelers': 1,  # Valor padrão
+        'version': plan.version,
+        'days': days
+    }
+
+
+class RoteiroView:
+    """
+    Cache das respostas de /api/roteiro/obter já serializadas, por roteiro e versão.
+    """
+
+    def __init__(self):
+        """Inicializa o cache vazio com as configurações do ambiente"""
+        self.max_entries = int(os.environ.get('AVI_ROTEIRO_CACHE_MAX_ENTRIES', '500'))
+        self.trust_seconds = float(os.environ.get('AVI_ROTEIRO_CACHE_TRUST', '2'))
+
+        # roteiro_id → (versão, JSON da resposta, momento da última verificação)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats = {'hits': 0, 'validated_hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, roteiro_id):
+        """
+        Resposta serializada do roteiro. Chamar dentro de um app context.
+
+        Args:
+            roteiro_id: ID do roteiro
+
+        Returns:
+            tuple: (JSON em bytes de {"success": True, "roteiro": {...}}, versão),
+                   ou (None, None) se o roteiro não existir
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(roteiro_id)
+            if entry is not None and now - entry[2] <= self.trust_seconds:
+                self._entries.move_to_end(roteiro_id)
+                self.stats['hits'] += 1
+                return entry[1], entry[0]
+
+        if entry is not None:
+            # Entrada antiga: confirmar a versão pela chave primária
+            version = db.session.query(TravelPlan.version).filter_by(id=roteiro_id).scalar()
+            if version == entry[0]:
+                with self._lock:
+                    if roteiro_id in self._entries:
+                        self._entries[roteiro_id] = (version, entry[1], now)
+                        self._entries.move_to_end(roteiro_id)
+                self.stats['validated_hits'] += 1
+                return entry[1], version
+
+        self.stats['misses'] += 1
+        plan = load_plan(roteiro_id)
+        if plan is None:
+            self.invalidate(roteiro_id)
+            return None, None
+
+        body = current_app.json.dumps_bytes({'success': True, 'roteiro': build_roteiro(plan)})
+        with self._lock:
+            self._entries[roteiro_id] = (plan.version, body, time.monotonic())
+            self._entries.move_to_end(roteiro_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body, plan.version
+
+    def invalidate(self, roteiro_id):
+        """Descarta a resposta em cache de um roteiro (chamar após alterá-lo)"""
+        try:
+            roteiro_id = int(roteiro_id)
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            if self._entries.pop(roteiro_id, None) is not None:
+                self.stats['invalidations'] += 1
+
+    def snapshot(self):
+        """Tamanho e contadores do cache"""
+        with self._lock:
+            size = len(self._entries)
+        return {'entries': size, 'trust_seconds': self.trust_seconds, **self.stats}
+
+
+# Instância global do modelo de leitura
+roteiro_view = RoteiroView()
@@ -0,0 +1,93 @@
+"""
+Popularidade das rotas buscadas (contador com decaimento exponencial)
+Cada busca executada soma 1 ao placar da rota (origem → destino) e os placares
+decaem pela metade a cada AVI_ROUTE_POPULARITY_HALF_LIFE horas, então as rotas
+mais buscadas recentemente ficam no topo sem guardar o histórico de buscas.
+
+A tabela é limitada a AVI_ROUTE_POPULARITY_MAX_ROUTES rotas: ao passar do limite,
+as de menor placar são descartadas. Os placares ficam em memória no processo.
+
+Configuração (variáveis de ambiente):
+- AVI_ROUTE_POPULARITY_HALF_LIFE: meia-vida dos placares em horas (padrão: 24)
+- AVI_ROUTE_POPULARITY_MAX_ROUTES: rotas mantidas na tabela (padrão: 2000)
+"""
+
+import os
+import time
+import logging
+import threading
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+class RoutePopularity:
+    """
+    Tabela de placares decaídos por rota, segura para múltiplas threads.
+    """
+
+    def __init__(self):
+        """Inicializa a tabela vazia com as configurações do ambiente"""
+        self.half_life = float(os.environ.get('AVI_ROUTE_POPULARITY_HALF_LIFE', '24')) * 3600
+        self.max_routes = int(os.environ.get('AVI_ROUTE_POPULARITY_MAX_ROUTES', '2000'))
+
+        # (origem, destino) → (placar, momento da última atualização)
+        self._scores = {}
+        self._lock = threading.Lock()
+
+    def _decayed(self, score, updated_at, now):
+        """Placar decaído até o momento now"""
+        if self.half_life <= 0:
+            return score
+        return score * 0.5 ** ((now - updated_at) / self.half_life)
+
+    def record(self, origin, destination, weight=1.0):
+        """
+        Registra uma busca da rota
+
+        Args:
+            origin: código IATA de origem
+            destination: código IATA de destino
+            weight: peso da busca (padrão: 1)
+        """
+        if not origin or not destination:
+            return
+        route = (origin.upper(), destination.upper())
+        now = time.monotonic()
+        with self._lock:
+            score, updated_at = self._scores.get(route, (0.0, now))
+            self._scores[route] = (self._decayed(score, updated_at, now) + weight, now)
+            if len(self._scores) > self.max_routes:
+                self._prune(now)
+
+    def _prune(self, now):
+        """Descarta as rotas de menor placar até 90% do limite (chamar com o lock)"""
+        keep = int(self.max_routes * 0.9)
+        ranked = sorted(self._scores.items(),
+                        key=lambda item: self._decayed(item[1][0], item[1][1], now), reverse=True)
+        self._scores = dict(ranked[:keep])
+
+    def top(self, limit=10):
+        """
+        Rotas mais buscadas
+
+        Args:
+            limit: número de rotas
+
+        Returns:
+            list: [(origem, destino, placar)] em ordem decrescente de placar
+        """
+        now = time.monotonic()
+        with self._lock:
+            scored = [(route, self._decayed(score, updated_at, now))
+                      for route, (score, updated_at) in self._scores.items()]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return [(origin, destination, round(score, 3)) for (origin, destination), score in scored[:limit]]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._scores)
+
+
+# Instância global da popularidade das rotas
+route_popularity = RoutePopularity()
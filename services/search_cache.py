@@ -0,0 +1,220 @@
+"""
+Cache de resultados de busca com stale-while-revalidate
+Cada entrada tem dois prazos:
+- ttl: enquanto estiver dentro dele, o resultado é servido como fresco;
+- stale_ttl: depois do ttl e até este prazo adicional, o resultado ainda é servido
+  (obsoleto) imediatamente, enquanto uma única atualização roda em segundo plano.
+
+Assim, durante uma instabilidade do fornecedor, as buscas já feitas recentemente
+continuam respondendo sem esperar pela rede; se a atualização falhar, o resultado
+obsoleto é mantido até expirar o stale_ttl.
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Estado de uma consulta ao cache
+FRESH = 'fresh'
+STALE = 'stale'
+MISS = 'miss'
+
+
+class SearchCache:
+    """
+    Cache LRU seguro para múltiplas threads, com entradas frescas e obsoletas.
+    """
+
+    def __init__(self, name, ttl=300, stale_ttl=3600, max_entries=1000, refresh_workers=4):
+        """
+        Inicializa o cache vazio
+
+        Args:
+            name: nome do cache (usado nos logs)
+            ttl: segundos em que um resultado é considerado fresco
+            stale_ttl: segundos adicionais em que um resultado expirado ainda é servido
+            max_entries: número máximo de entradas (as menos usadas são descartadas)
+            refresh_workers: threads para as atualizações em segundo plano
+        """
+        self.name = name
+        self.ttl = float(ttl)
+        self.stale_ttl = float(stale_ttl)
+        self.max_entries = int(max_entries)
+        self.refresh_workers = int(refresh_workers)
+
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = None
+
+        self.stats = {'fresh': 0, 'stale': 0, 'miss': 0, 'refreshes': 0, 'refresh_failures': 0}
+
+    def lookup(self, key):
+        """
+        Consulta o cache
+
+        Args:
+            key: chave da busca
+
+        Returns:
+            tuple: (valor ou None, FRESH | STALE | MISS)
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['miss'] += 1
+                return None, MISS
+
+            value, stored_at = entry
+            age = now - stored_at
+            if age <= self.ttl:
+                self._entries.move_to_end(key)
+                self.stats['fresh'] += 1
+                return value, FRESH
+            if age <= self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stats['stale'] += 1
+                return value, STALE
+
+            del self._entries[key]
+            self.stats['miss'] += 1
+            return None, MISS
+
+    def status(self, key):
+        """
+        Estado de uma chave sem contar como consulta nem alterar a ordem LRU
+
+        Args:
+            key: chave da busca
+
+        Returns:
+            str: FRESH, STALE ou MISS
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return MISS
+        age = time.monotonic() - entry[1]
+        if age <= self.ttl:
+            return FRESH
+        return STALE if age <= self.ttl + self.stale_ttl else MISS
+
+    def store(self, key, value):
+        """
+        Grava um resultado no cache
+
+        Args:
+            key: chave da busca
+            value: resultado
+        """
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Remove uma entrada (ou todas, sem chave)"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def begin_refresh(self, key):
+        """
+        Reserva a atualização de uma chave (apenas uma atualização por chave)
+
+        Returns:
+            bool: True se a atualização deve ser feita por quem chamou
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key, value=None, cacheable=False):
+        """
+        Conclui uma atualização iniciada com begin_refresh
+
+        Args:
+            key: chave da busca
+            value: novo resultado
+            cacheable: True se o novo resultado deve substituir o do cache
+        """
+        if cacheable:
+            self.store(key, value)
+            self.stats['refreshes'] += 1
+        else:
+            self.stats['refresh_failures'] += 1
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def get_or_load(self, key, loader, cacheable=None):
+        """
+        Retorna o resultado em cache ou carrega-o
+
+        Resultados frescos e obsoletos são retornados imediatamente; para os
+        obsoletos, uma atualização é agendada em segundo plano. Sem resultado
+        em cache, o loader é executado na thread de quem chamou.
+
+        Args:
+            key: chave da busca
+            loader: função sem argumentos que executa a busca
+            cacheable: função (resultado) → bool indicando se o resultado pode ser
+                       guardado (ex.: não guardar resultados de fallback); padrão: sempre
+
+        Returns:
+            O resultado da busca
+        """
+        value, status = self.lookup(key)
+        if status == FRESH:
+            return value
+        if status == STALE:
+            if self.begin_refresh(key):
+                self._get_executor().submit(self._refresh, key, loader, cacheable)
+            return value
+
+        value = loader()
+        if cacheable is None or cacheable(value):
+            self.store(key, value)
+        return value
+
+    def _refresh(self, key, loader, cacheable):
+        """Atualiza uma entrada obsoleta (executado em segundo plano)"""
+        value = None
+        ok = False
+        try:
+            value = loader()
+            ok = cacheable is None or cacheable(value)
+            if not ok:
+                logger.info(f"Atualização de '{key}' no cache {self.name} sem resultado; mantendo o obsoleto")
+        except Exception as e:
+            logger.warning(f"Erro ao atualizar '{key}' no cache {self.name}: {str(e)}")
+        finally:
+            self.end_refresh(key, value, ok)
+
+    def _get_executor(self):
+        """Executor das atualizações em segundo plano (criado no primeiro uso)"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.refresh_workers,
+                        thread_name_prefix=f"{self.name}-refresh"
+                    )
+        return self._executor
+
+    def snapshot(self):
+        """Tamanho e contadores do cache"""
+        with self._lock:
+            size = len(self._entries)
+            refreshing = len(self._refreshing)
+        return {'name': self.name, 'entries': size, 'refreshing': refreshing, **self.stats}
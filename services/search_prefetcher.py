@@ -0,0 +1,198 @@
+"""
+Busca antecipada (especulativa) de voos no chat
+Assim que as informações de viagem ficam completas, o /api/chat pede a confirmação
+do usuário (etapa 1). Em vez de esperar o "sim" para consultar o TravelPayouts, a
+busca começa em segundo plano na ponte assíncrona e o futuro fica registrado por
+sessão, junto com os parâmetros usados:
+- na etapa 2 do chat, take() aguarda o resultado por poucos segundos; se a busca
+  ainda estiver em andamento, o chat responde que está buscando e abre o painel;
+- em /api/flight_results (painel), take() aguarda a mesma busca por mais tempo,
+  sem iniciar uma segunda busca enquanto ela estiver em andamento;
+- se o usuário alterar origem, destino, datas ou passageiros, a busca em andamento
+  é cancelada e o resultado descartado (a chave dos parâmetros não confere mais).
+
+Os futuros ficam em memória no processo (não são serializáveis para a sessão);
+sem busca antecipada válida, as rotas fazem a busca normal.
+
+Configuração (variáveis de ambiente):
+- AVI_SEARCH_PREFETCH: "true" (padrão) ou "false" para desativar
+- AVI_SEARCH_PREFETCH_WAIT: segundos de espera pela busca antecipada no chat (padrão: 3)
+- AVI_SEARCH_PREFETCH_RESULTS_WAIT: segundos de espera em /api/flight_results (padrão: 2);
+  curto porque a espera ocupa o worker (gunicorn síncrono): com a busca em
+  andamento, a rota responde 503 com Retry-After e o painel consulta de novo
+- AVI_SEARCH_PREFETCH_TTL: segundos em que uma busca antecipada é aproveitada (padrão: 300)
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from services.async_bridge import async_bridge
+from services.travelpayouts_connector import travelpayouts_connector
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Retorno de take() quando a busca antecipada ainda está em andamento
+PENDING = object()
+
+# Campos de travel_info que determinam o resultado da busca
+SEARCH_FIELDS = ('origin', 'destination', 'departure_date', 'return_date',
+                 'date_range_start', 'date_range_end', 'min_stay', 'max_stay', 'adults')
+
+
+def search_key(travel_info):
+    """
+    Chave dos parâmetros de busca de uma travel_info
+
+    Args:
+        travel_info: informações de viagem da sessão
+
+    Returns:
+        tuple: valores de SEARCH_FIELDS
+    """
+    return tuple(travel_info.get(field) for field in SEARCH_FIELDS)
+
+
+class SearchPrefetcher:
+    """
+    Registro das buscas antecipadas em andamento, por sessão do chat.
+    """
+
+    def __init__(self):
+        """Inicializa o registro vazio com as configurações do ambiente"""
+        self.enabled = os.environ.get('AVI_SEARCH_PREFETCH', 'true').lower() == 'true'
+        self.wait_seconds = float(os.environ.get('AVI_SEARCH_PREFETCH_WAIT', '3'))
+        self.results_wait_seconds = float(os.environ.get('AVI_SEARCH_PREFETCH_RESULTS_WAIT', '2'))
+        self.ttl_seconds = float(os.environ.get('AVI_SEARCH_PREFETCH_TTL', '300'))
+
+        # session_id → {"key", "future", "started_at"}
+        self._entries = {}
+        self._lock = threading.Lock()
+
+        self.stats = {'started': 0, 'reused': 0, 'discarded': 0, 'hits': 0, 'misses': 0, 'pending': 0}
+
+    def _expired(self, entry, now):
+        """Verifica se a busca antecipada passou do AVI_SEARCH_PREFETCH_TTL"""
+        return now - entry['started_at'] > self.ttl_seconds
+
+    def _drop(self, entry, reason):
+        """Cancela a busca de uma entrada removida do registro"""
+        entry['future'].cancel()
+        self.stats['discarded'] += 1
+        logger.info(f"Busca antecipada descartada ({reason})")
+
+    def start(self, session_id, travel_info):
+        """
+        Inicia a busca antecipada da sessão (ou mantém a atual se os parâmetros não mudaram)
+
+        Args:
+            session_id: ID da sessão do chat
+            travel_info: informações de viagem completas
+
+        Returns:
+            concurrent.futures.Future: futuro da busca, ou None se desativada
+        """
+        if not self.enabled or not session_id:
+            return None
+
+        key = search_key(travel_info)
+        now = time.monotonic()
+        with self._lock:
+            # Limpar buscas antigas de sessões abandonadas
+            for expired_id in [sid for sid, entry in self._entries.items() if self._expired(entry, now)]:
+                self._drop(self._entries.pop(expired_id), 'expirada')
+
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                if entry['key'] == key:
+                    self.stats['reused'] += 1
+                    return entry['future']
+                self._drop(self._entries.pop(session_id), 'parâmetros alterados')
+
+            future = async_bridge.submit(
+                travelpayouts_connector.search_flights_from_chat_async(dict(travel_info), session_id))
+            self._entries[session_id] = {'key': key, 'future': future, 'started_at': now}
+            self.stats['started'] += 1
+
+        logger.info(f"Busca antecipada iniciada para a sessão {session_id}: "
+                    f"{travel_info.get('origin')} → {travel_info.get('destination')}")
+        return future
+
+    def discard(self, session_id):
+        """
+        Cancela e descarta a busca antecipada da sessão (informações incompletas ou alteradas)
+
+        Args:
+            session_id: ID da sessão do chat
+        """
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is not None:
+                self._drop(entry, 'informações incompletas')
+
+    def take(self, session_id, travel_info, timeout=None):
+        """
+        Resultado da busca antecipada, aguardando se ainda estiver em andamento
+
+        A entrada só é usada se os parâmetros forem os mesmos da travel_info atual.
+        Sem busca válida, ou em caso de erro ou cancelamento, retorna None e a rota
+        faz a busca normal. Se o tempo de espera acabar com a busca ainda em
+        andamento, retorna PENDING e a busca continua registrada: a rota não deve
+        iniciar uma busca duplicada.
+
+        Args:
+            session_id: ID da sessão do chat
+            travel_info: informações de viagem atuais
+            timeout: segundos de espera (padrão: AVI_SEARCH_PREFETCH_WAIT)
+
+        Returns:
+            dict: resultado no formato de search_flights_from_chat, PENDING ou None
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            if entry['key'] != search_key(travel_info) or self._expired(entry, time.monotonic()):
+                self._drop(self._entries.pop(session_id), 'não corresponde à busca atual')
+                self.stats['misses'] += 1
+                return None
+
+        waited = time.monotonic()
+        try:
+            result = entry['future'].result(timeout=self.wait_seconds if timeout is None else timeout)
+        except FutureTimeoutError:
+            # Continua registrada: a próxima chamada (ex.: /api/flight_results) aguarda a mesma busca
+            logger.info(f"Busca antecipada da sessão {session_id} ainda em andamento")
+            self.stats['pending'] += 1
+            return PENDING
+        except Exception as e:
+            logger.warning(f"Busca antecipada da sessão {session_id} falhou: {str(e)}")
+            result = None
+
+        with self._lock:
+            if self._entries.get(session_id) is entry:
+                del self._entries[session_id]
+
+        if not result or 'error' in result:
+            self.stats['misses'] += 1
+            return None
+
+        self.stats['hits'] += 1
+        logger.info(f"Busca antecipada aproveitada para a sessão {session_id} "
+                    f"(espera de {(time.monotonic() - waited) * 1000:.0f} ms)")
+        return result
+
+    def snapshot(self):
+        """Buscas registradas e contadores"""
+        with self._lock:
+            pending = sum(1 for entry in self._entries.values() if not entry['future'].done())
+            size = len(self._entries)
+        return {'entries': size, 'pending': pending, 'enabled': self.enabled, **self.stats}
+
+
+# Instância global das buscas antecipadas
+search_prefetcher = SearchPrefetcher()
@@ -0,0 +1,176 @@
+"""
+Registro de serviços com construção preguiçosa
+Os serviços da aplicação (TravelPayouts, OpenAI, processador de chat etc.) eram
+instanciados no momento da importação dos módulos, o que deixava a importação do
+app.py/main.py lenta e fazia cada worker pagar por serviços que talvez nunca use.
+
+Este módulo permite registrar uma fábrica para cada serviço e construí-lo apenas
+no primeiro uso. O LazyService é um proxy que pode ocupar o lugar das instâncias
+globais existentes (ex.: travelpayouts_api), mantendo as importações atuais.
+"""
+
+import time
+import logging
+import threading
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """
+    Registro de fábricas e instâncias de serviços, seguro para múltiplas threads.
+    """
+
+    def __init__(self):
+        """Inicializa o registro vazio"""
+        self._factories = {}
+        self._instances = {}
+        self._build_times = {}
+        self._lock = threading.RLock()
+
+    def register(self, name, factory):
+        """
+        Registra a fábrica de um serviço
+
+        Args:
+            name: nome único do serviço
+            factory: função sem argumentos que constrói o serviço
+
+        Returns:
+            LazyService: proxy que constrói o serviço no primeiro acesso
+        """
+        with self._lock:
+            if name in self._factories and self._factories[name] is not factory:
+                logger.warning(f"Serviço '{name}' registrado novamente; a fábrica anterior foi substituída")
+                self._instances.pop(name, None)
+            self._factories[name] = factory
+        return LazyService(name, self)
+
+    def get(self, name):
+        """
+        Retorna a instância do serviço, construindo-a no primeiro acesso
+
+        Args:
+            name: nome do serviço
+
+        Returns:
+            object: instância do serviço
+        """
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            # Verificar novamente dentro do lock: outra thread pode ter construído
+            if name in self._instances:
+                return self._instances[name]
+
+            factory = self._factories.get(name)
+            if factory is None:
+                raise KeyError(f"Serviço não registrado: {name}")
+
+            start = time.perf_counter()
+            instance = factory()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            self._instances[name] = instance
+            self._build_times[name] = round(elapsed_ms, 2)
+            logger.info(f"Serviço '{name}' construído sob demanda em {elapsed_ms:.1f} ms")
+            return instance
+
+    def is_initialized(self, name):
+        """
+        Indica se o serviço já foi construído
+
+        Args:
+            name: nome do serviço
+
+        Returns:
+            bool: True se a instância já existe
+        """
+        return name in self._instances
+
+    def reset(self, name=None):
+        """
+        Descarta instâncias já construídas (útil em testes)
+
+        Args:
+            name: nome do serviço ou None para descartar todos
+        """
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+                self._build_times.clear()
+            else:
+                self._instances.pop(name, None)
+                self._build_times.pop(name, None)
+
+    def status(self):
+        """
+        Retorna o estado de cada serviço registrado
+
+        Returns:
+            dict: {nome: {"initialized": bool, "build_ms": float ou None}}
+        """
+        with self._lock:
+            return {
+                name: {
+                    "initialized": name in self._instances,
+                    "build_ms": self._build_times.get(name)
+                }
+                for name in self._factories
+            }
+
+
+class LazyService:
+    """
+    Proxy para um serviço registrado.
+    Qualquer acesso a atributo constrói (uma única vez) e delega ao serviço real.
+    """
+
+    __slots__ = ('_service_name', '_registry')
+
+    def __init__(self, name, registry):
+        """
+        Inicializa o proxy
+
+        Args:
+            name: nome do serviço no registro
+            registry: ServiceRegistry responsável pela construção
+        """
+        object.__setattr__(self, '_service_name', name)
+        object.__setattr__(self, '_registry', registry)
+
+    def _resolve(self):
+        """Retorna a instância real do serviço"""
+        return self._registry.get(self._service_name)
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._resolve(), attr, value)
+
+    def __repr__(self):
+        if self._registry.is_initialized(self._service_name):
+            return repr(self._resolve())
+        return f"<LazyService '{self._service_name}' (não inicializado)>"
+
+
+# Registro global da aplicação
+service_registry = ServiceRegistry()
+
+
+def lazy_service(name, factory):
+    """
+    Registra um serviço no registro global e retorna o proxy preguiçoso
+
+    Args:
+        name: nome único do serviço
+        factory: função sem argumentos (ou classe) que constrói o serviço
+
+    Returns:
+        LazyService: proxy do serviço
+    """
+    return service_registry.register(name, factory)
@@ -0,0 +1,176 @@
+"""
+Arquivos estáticos com nome versionado (hash do conteúdo) e cache imutável
+As páginas carregavam vários scripts e folhas de estilo separados de static/, sem
+cabeçalhos de cache longos. O build (build_assets.py) grava em static/dist:
+- um pacote minificado por página (ASSET_BUNDLES), na ordem original dos arquivos;
+- uma cópia de cada arquivo estático com o hash do conteúdo no nome;
+- versões pré-comprimidas (.gz e, com o pacote brotli instalado, .br);
+- manifest.json, que mapeia o nome lógico ("bundles/index.js", "img/favicon.png")
+  para o arquivo versionado.
+
+Os templates usam asset_url(nome) e asset_urls(pacote). Com o manifesto carregado,
+apontam para static/dist, servido com Cache-Control imutável de um ano: como o nome
+muda a cada alteração do conteúdo, recarregar a página não faz requisições dos
+arquivos. Sem manifesto (desenvolvimento, sem rodar o build), apontam para os
+arquivos-fonte em static/, como antes.
+
+Configuração (variáveis de ambiente):
+- AVI_ASSETS: "true" (padrão) usa o manifesto quando existir; "false" serve os arquivos-fonte
+- AVI_ASSETS_DIR: diretório da saída do build (padrão: static/dist)
+- AVI_STATIC_MAX_AGE: segundos de cache dos arquivos não versionados de static/
+  (ex.: imagens referenciadas pelos scripts) quando o manifesto está ativo (padrão: 3600)
+"""
+
+import os
+import json
+import logging
+import mimetypes
+
+from flask import abort, request, send_file, url_for
+from werkzeug.security import safe_join
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+# Pacotes por página: nome lógico → arquivos de static/, na ordem de execução.
+# Scripts com e sem defer ficam em pacotes separados para manter a ordem original.
+ASSET_BUNDLES = {
+    'bundles/index.css': [
+        'css/styles.css', 'css/flight-results-panel.css', 'css/chat-additions.css', 'css/flight-widget.css',
+    ],
+    'bundles/index-head.js': [
+        'js/hidden-search.js', 'js/chat-hidden-search-integration.js', 'js/avi-invisible-search.js',
+    ],
+    'bundles/index.js': [
+        'js/script.js', 'js/chat.js', 'js/flight-panel.js', 'js/widget-api-client.js',
+        'js/chat-widget-integration.js', 'js/trip-com-button.js',
+    ],
+    'bundles/roteiro.css': [
+        'css/styles.css', 'css/roteiro-personalizado.css',
+    ],
+    'bundles/roteiro.js': [
+        'js/roteiro-personalizado.js', 'js/hidden-search.js', 'js/chat-hidden-search-integration.js',
+        'js/avi-invisible-search.js',
+    ],
+}
+
+# Extensões versionadas individualmente pelo build (cópias .bak e afins ficam de fora)
+FINGERPRINT_EXTENSIONS = ('.js', '.css', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp',
+                          '.woff', '.woff2', '.ttf')
+
+# Extensões pré-comprimidas pelo build
+COMPRESSIBLE_EXTENSIONS = ('.js', '.css', '.svg', '.json', '.ttf')
+
+# Cache dos arquivos versionados: o conteúdo de um nome nunca muda
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+MANIFEST_NAME = 'manifest.json'
+
+
+class StaticAssets:
+    """
+    Manifesto dos arquivos versionados, funções dos templates e rota de static/dist.
+    """
+
+    def __init__(self):
+        """Inicializa sem manifesto (carregado em init_app)"""
+        self.enabled = os.environ.get('AVI_ASSETS', 'true').lower() == 'true'
+        self.directory = None
+        self.manifest = {}
+
+    def init_app(self, app):
+        """
+        Carrega o manifesto, registra a rota de static/dist e as funções dos templates
+
+        Args:
+            app: aplicação Flask
+        """
+        self.directory = os.path.abspath(
+            os.environ.get('AVI_ASSETS_DIR') or os.path.join(app.static_folder, 'dist'))
+        self.manifest = self.load_manifest() if self.enabled else {}
+
+        app.add_url_rule(f"{app.static_url_path}/dist/<path:filename>", 'static_assets', self.serve)
+        app.jinja_env.globals.update(asset_url=self.url, asset_urls=self.urls)
+
+        if self.manifest:
+            # Arquivos ainda servidos de static/ sem versão (ex.: imagens usadas pelos scripts)
+            app.config['SEND_FILE_MAX_AGE_DEFAULT'] = int(os.environ.get('AVI_STATIC_MAX_AGE', '3600'))
+            logger.info(f"Manifesto de arquivos estáticos carregado: {len(self.manifest)} arquivos em {self.directory}")
+        else:
+            logger.info("Arquivos estáticos servidos sem versão (rode build_assets.py para gerar static/dist)")
+
+    def load_manifest(self):
+        """
+        Lê o manifesto gerado por build_assets.py
+
+        Returns:
+            dict: nome lógico → caminho versionado em static/dist (vazio se não existir)
+        """
+        path = os.path.join(self.directory, MANIFEST_NAME)
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.error(f"Manifesto de arquivos estáticos inválido ({path}): {str(e)}")
+            return {}
+
+    def url(self, name):
+        """
+        URL de um arquivo estático (função asset_url dos templates)
+
+        Args:
+            name: caminho relativo a static/ (ex.: "img/favicon.png")
+
+        Returns:
+            str: URL versionada em static/dist, ou a URL do arquivo-fonte sem manifesto
+        """
+        hashed = self.manifest.get(name)
+        if hashed:
+            return url_for('static_assets', filename=hashed)
+        return url_for('static', filename=name)
+
+    def urls(self, bundle):
+        """
+        URLs de um pacote (função asset_urls dos templates)
+
+        Args:
+            bundle: nome lógico do pacote (chave de ASSET_BUNDLES)
+
+        Returns:
+            list: a URL do pacote versionado, ou as URLs dos arquivos-fonte sem manifesto
+        """
+        if bundle in self.manifest:
+            return [self.url(bundle)]
+        return [self.url(name) for name in ASSET_BUNDLES[bundle]]
+
+    def serve(self, filename):
+        """
+        Serve um arquivo de static/dist com cache imutável, na versão pré-comprimida
+        aceita pelo navegador (brotli, depois gzip) quando existir
+
+        Args:
+            filename: caminho relativo a static/dist
+        """
+        path = safe_join(self.directory, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        encoding = None
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if candidate in request.accept_encodings and os.path.isfile(path + suffix):
+                path, encoding = path + suffix, candidate
+                break
+
+        response = send_file(path, mimetype=mimetype, conditional=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+# Instância global dos arquivos estáticos
+static_assets = StaticAssets()
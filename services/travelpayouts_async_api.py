@@ -0,0 +1,366 @@
+"""
+Cliente assíncrono (asyncio/aiohttp) para a API REST do TravelPayouts
+Oferece os mesmos métodos e formatos de retorno do TravelPayoutsRestAPI, mas sem
+bloquear a thread durante a espera pela rede. Parâmetros, conversão das respostas
+e formatação dos voos são herdados do cliente síncrono, garantindo resultados
+idênticos nos dois caminhos.
+
+Configuração (variáveis de ambiente):
+- TRAVELPAYOUTS_ASYNC_MAX_CONNECTIONS: conexões simultâneas por processo (padrão: 200)
+- TRAVELPAYOUTS_ASYNC_TIMEOUT: tempo máximo de cada requisição em segundos (padrão: 20)
+
+Os circuit breakers por endpoint, o cache de buscas (stale-while-revalidate) e o
+cache das respostas mensais de calendário e matriz de mês são os mesmos do cliente
+síncrono.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+
+from services.travelpayouts_rest_api import (
+    TravelPayoutsRestAPI, flight_search_cache, search_cache_key, is_cacheable_result,
+    month_price_cache, month_cache_key, is_cacheable_month_data
+)
+from services.route_popularity import route_popularity
+from services.admission_control import Overloaded, upstream_limiter
+from services.search_cache import FRESH, STALE
+from services.service_registry import lazy_service
+
+# Configurar logger
+logger = logging.getLogger(__name__)
+
+
+class AsyncTravelPayoutsRestAPI(TravelPayoutsRestAPI):
+    """
+    Versão assíncrona do cliente TravelPayouts.
+    Os métodos públicos e de busca são corrotinas com as mesmas assinaturas do
+    cliente síncrono.
+    """
+
+    def __init__(self):
+        """Inicializa o cliente com as mesmas credenciais do cliente síncrono"""
+        super().__init__()
+        self.max_connections = int(os.environ.get('TRAVELPAYOUTS_ASYNC_MAX_CONNECTIONS', '200'))
+        self.request_timeout = float(os.environ.get('TRAVELPAYOUTS_ASYNC_TIMEOUT', '20'))
+        self._session = None
+        self._session_loop = None
+        # Atualizações de cache em andamento (referências para não serem coletadas)
+        self._refresh_tasks = set()
+
+    async def _get_session(self):
+        """
+        Retorna a sessão HTTP do event loop atual, criando-a se necessário.
+        Sessões aiohttp são ligadas ao loop em que foram criadas.
+
+        Returns:
+            aiohttp.ClientSession: sessão compartilhada pelas requisições do loop
+        """
+        # aiohttp só é importado quando o caminho assíncrono é usado
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+            )
+            self._session_loop = loop
+        return self._session
+
+    async def close(self):
+        """Fecha a sessão HTTP do loop atual"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    async def _get_json(self, url, params, api_name):
+        """
+        Executa uma requisição GET e decodifica o JSON da resposta
+
+        Args:
+            url: endpoint da API
+            params: parâmetros da requisição (None para nenhum)
+            api_name: nome da API para os logs
+
+        Returns:
+            JSON decodificado ou None em caso de erro HTTP/formato ou circuito aberto
+
+        Raises:
+            Overloaded: se o limite de chamadas simultâneas ao TravelPayouts estiver esgotado
+        """
+        breaker = self._breaker(url)
+        if not breaker.allow():
+            logger.info(f"API {api_name} pulada: circuito '{breaker.name}' aberto")
+            return None
+
+        session = await self._get_session()
+        start_time = time.time()
+
+        async with upstream_limiter('travelpayouts').async_slot():
+            try:
+                async with session.get(url, params=params) as response:
+                    body = await response.text()
+                    elapsed_time = time.time() - start_time
+                    logger.info(f"Requisição assíncrona API {api_name}: {elapsed_time:.2f}s | Status: {response.status}")
+            except Exception:
+                # Timeout ou erro de conexão
+                breaker.record_failure()
+                raise
+
+        if self._is_upstream_failure(response.status):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+        if response.status != 200:
+            logger.error(f"Erro na API {api_name}: {response.status} - {body[:500]}")
+            return None
+
+        try:
+            data = json.loads(body)
+            # Algumas respostas chegam como JSON codificado dentro de uma string
+            if isinstance(data, str):
+                data = json.loads(data)
+        except Exception as json_error:
+            logger.error(f"Erro ao processar JSON da API {api_name}: {str(json_error)}")
+            return None
+
+        return data
+
+    async def _get_month_json(self, key, url, params, api_name):
+        """
+        Resposta mensal (calendário ou matriz de mês) do cache, ou da API se ausente.
+        Respostas obsoletas são retornadas e atualizadas em uma tarefa no mesmo loop.
+
+        Args:
+            key: chave em month_price_cache
+            url: endpoint da API
+            params: parâmetros da requisição
+            api_name: nome da API para os logs
+
+        Returns:
+            JSON decodificado ou None
+        """
+        data, status = month_price_cache.lookup(key)
+        if status == STALE and month_price_cache.begin_refresh(key):
+            task = asyncio.get_running_loop().create_task(self._refresh_month_json(key, url, params, api_name))
+            self._refresh_tasks.add(task)
+            task.add_done_callback(self._refresh_tasks.discard)
+        if status in (FRESH, STALE):
+            return data
+
+        data = await self._get_json(url, params, api_name)
+        if is_cacheable_month_data(data):
+            month_price_cache.store(key, data)
+        return data
+
+    async def _refresh_month_json(self, key, url, params, api_name):
+        """Atualiza em segundo plano uma resposta mensal obsoleta do cache"""
+        data = None
+        try:
+            data = await self._get_json(url, params, api_name)
+        except Exception as e:
+            logger.warning(f"Erro ao atualizar resposta mensal em cache {key}: {str(e)}")
+        finally:
+            month_price_cache.end_refresh(key, data, is_cacheable_month_data(data))
+
+    async def search_flights(self, origin, destination, departure_date, return_date=None, adults=1):
+        """
+        Busca voos usando a API REST TravelPayouts (mesma cascata e mesmo cache do
+        cliente síncrono). Resultados obsoletos são retornados imediatamente e
+        atualizados em uma tarefa no mesmo event loop.
+
+        Args:
+            origin: código IATA do aeroporto de origem
+            destination: código IATA do aeroporto de destino
+            departure_date: data de partida no formato YYYY-MM-DD
+            return_date: data de retorno no formato YYYY-MM-DD (opcional)
+            adults: número de adultos
+
+        Returns:
+            Lista de ofertas de voos ou resultado de redirecionamento
+        """
+        route_popularity.record(origin, destination)
+        key = search_cache_key(origin, destination, departure_date, return_date)
+        flights, status = flight_search_cache.lookup(key)
+        if status == STALE and flight_search_cache.begin_refresh(key):
+            task = asyncio.get_running_loop().create_task(
+                self._refresh_cached_search(key, origin, destination, departure_date, return_date)
+            )
+            self._refresh_tasks.add(task)
+            task.add_done_callback(self._refresh_tasks.discard)
+        if status in (FRESH, STALE):
+            return list(flights)
+
+        flights = await self._search_flights_uncached(origin, destination, departure_date, return_date)
+        if is_cacheable_result(flights):
+            flight_search_cache.store(key, flights)
+        return list(flights)
+
+    async def _refresh_cached_search(self, key, origin, destination, departure_date, return_date):
+        """Atualiza em segundo plano uma busca obsoleta do cache"""
+        flights = None
+        try:
+            flights = await self._search_flights_uncached(origin, destination, departure_date, return_date)
+        except Exception as e:
+            logger.warning(f"Erro ao atualizar busca em cache {key}: {str(e)}")
+        finally:
+            flight_search_cache.end_refresh(key, flights, flights is not None and is_cacheable_result(flights))
+
+    async def _search_flights_uncached(self, origin, destination, departure_date, return_date=None):
+        """
+        Cascata de endpoints da busca de voos (endpoints com o circuito aberto são pulados)
+
+        Args:
+            origin: código IATA do aeroporto de origem
+            destination: código IATA do aeroporto de destino
+            departure_date: data de partida no formato YYYY-MM-DD
+            return_date: data de retorno no formato YYYY-MM-DD (opcional)
+
+        Returns:
+            Lista de ofertas de voos ou resultado de redirecionamento
+        """
+        logger.info(f"Buscando voos (async): {origin} → {destination} | Partida: {departure_date} | Retorno: {return_date}")
+
+        calendar_results = await self._search_calendar_prices(origin, destination, departure_date)
+        if calendar_results:
+            logger.info(f"Encontrados {len(calendar_results)} voos via API de calendário")
+            return calendar_results
+
+        cheap_results = await self._search_cheap_prices(origin, destination, departure_date, return_date)
+        if cheap_results:
+            logger.info(f"Encontrados {len(cheap_results)} voos via API de preços baratos")
+            return cheap_results
+
+        month_matrix_results = await self._search_month_matrix(origin, destination, departure_date)
+        if month_matrix_results:
+            logger.info(f"Encontrados {len(month_matrix_results)} voos via API de matriz de mês")
+            return month_matrix_results
+
+        logger.warning(f"Nenhum resultado encontrado. Criando link de redirecionamento.")
+        return [self._create_redirect_result(origin, destination, departure_date, return_date)]
+
+    async def _search_calendar_prices(self, origin, destination, departure_date):
+        """
+        Busca preços de voos usando a API de calendário
+
+        Args:
+            origin: código IATA do aeroporto de origem
+            destination: código IATA do aeroporto de destino
+            departure_date: data de partida no formato YYYY-MM-DD
+
+        Returns:
+            Lista de voos formatados ou lista vazia
+        """
+        try:
+            params = self._calendar_params(origin, destination, departure_date)
+            data = await self._get_month_json(
+                month_cache_key('calendar', origin, destination, departure_date),
+                self.calendar_prices_endpoint, params, 'calendário')
+            if data is None:
+                return []
+            return self._parse_calendar_data(data, origin, destination)
+        except Overloaded:
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao buscar preços de calendário (async): {str(e)}")
+            return []
+
+    async def _search_cheap_prices(self, origin, destination, departure_date, return_date=None):
+        """
+        Busca preços de voos usando a API de preços baratos
+
+        Args:
+            origin: código IATA do aeroporto de origem
+            destination: código IATA do aeroporto de destino
+            departure_date: data de partida no formato YYYY-MM-DD
+            return_date: data de retorno no formato YYYY-MM-DD (opcional)
+
+        Returns:
+            Lista de voos formatados ou lista vazia
+        """
+        try:
+            params = self._cheap_params(origin, destination, departure_date, return_date)
+            data = await self._get_json(self.cheap_prices_endpoint, params, 'preços baratos')
+            if data is None:
+                return []
+            return self._parse_cheap_data(data, origin, destination, return_date)
+        except Overloaded:
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao buscar preços baratos (async): {str(e)}")
+            return []
+
+    async def _search_month_matrix(self, origin, destination, departure_date):
+        """
+        Busca preços de voos usando a API de matriz de mês
+
+        Args:
+            origin: código IATA do aeroporto de origem
+            destination: código IATA do aeroporto de destino
+            departure_date: data de partida no formato YYYY-MM-DD
+
+        Returns:
+            Lista de voos formatados ou lista vazia
+        """
+        try:
+            params = self._matrix_params(origin, destination, departure_date)
+            data = await self._get_month_json(
+                month_cache_key('month_matrix', origin, destination, departure_date),
+                self.month_matrix_endpoint, params, 'matriz mês')
+            if data is None:
+                return []
+            return self._parse_matrix_data(data, origin, destination)
+        except Overloaded:
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao buscar matriz de mês (async): {str(e)}")
+            return []
+
+    async def get_nearby_airports(self, city_code, max_distance=100):
+        """
+        Busca aeroportos próximos a uma cidade/aeroporto
+
+        Args:
+            city_code: código IATA de cidade ou aeroporto
+            max_distance: distância máxima em km (padrão: 100)
+
+        Returns:
+            Lista de aeroportos próximos
+        """
+        try:
+            all_airports = await self._get_json(self.airports_endpoint, None, 'aeroportos')
+            if all_airports is None:
+                return []
+            return self._parse_nearby_airports(all_airports, city_code, max_distance)
+        except Exception as e:
+            logger.error(f"Erro ao buscar aeroportos próximos (async): {str(e)}")
+            return []
+
+    async def get_direct_flights(self, origin):
+        """
+        Busca destinos com voos diretos a partir de uma origem
+
+        Args:
+            origin: código IATA de aeroporto de origem
+
+        Returns:
+            Lista de destinos com voos diretos
+        """
+        try:
+            routes = await self._get_json(self.direct_flights_endpoint, None, 'rotas diretas')
+            if routes is None:
+                return []
+            return self._parse_direct_flights(routes, origin)
+        except Exception as e:
+            logger.error(f"Erro ao buscar voos diretos (async): {str(e)}")
+            return []
+
+
+# Instância global do cliente assíncrono (construída no primeiro uso)
+travelpayouts_async_api = lazy_service('travelpayouts_async_api', AsyncTravelPayoutsRestAPI)
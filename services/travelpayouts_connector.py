@@ -10,6 +10,9 @@ import requests
 import os
 from datetime import datetime, timedelta
 from services.travelpayouts_rest_api import travelpayouts_api
+from services.admission_control import Overloaded
+from services.service_registry import lazy_service
+from services.iata_tables import iata_tables
 
 # Configuração do logger
 logging.basicConfig(level=logging.INFO)
@@ -65,6 +68,8 @@ class TravelPayoutsConnector:
                     "data": []
                 }
 
+        except Overloaded:
+            raise
         except Exception as e:
             logger.error(f"Erro na busca de voos: {str(e)}")
             return {
@@ -88,15 +93,9 @@ class TravelPayoutsConnector:
             logger.warning(f"⭐ BUSCA REAL: Iniciando busca para sessão {session_id} via TravelPayouts REST API")
 
             # Validação dos parâmetros obrigatórios
-            required_params = ['origin', 'destination', 'departure_date']
-            for param in required_params:
-                if not travel_info.get(param):
-                    error_msg = f"Parâmetro obrigatório ausente: {param}"
-                    logger.error(error_msg)
-                    return {
-                        "error": error_msg,
-                        "data": []
-                    }
+            missing_error = self._check_required_params(travel_info)
+            if missing_error:
+                return missing_error
 
             # Extrair os parâmetros principais
             origin = travel_info.get('origin')
@@ -112,6 +111,10 @@ class TravelPayoutsConnector:
             # Buscar voos usando a API REST do TravelPayouts
             logger.warning(f"📡 Requisitando voos: {origin}→{destination}, partida: {departure_date}, retorno: {return_date}")
             
+            # Busca federada (vários provedores sob um prazo único), se habilitada
+            if os.environ.get('AVI_FEDERATED_CHAT', 'false').lower() == 'true':
+                return self._search_federated(travel_info, session_id)
+
             # Usar a nova API REST para buscar voos
             flight_results = self.travelpayouts_api.search_flights(
                 origin=origin,
@@ -126,33 +129,10 @@ class TravelPayoutsConnector:
             logger.warning(f"⏱️ Tempo de resposta da API: {elapsed_time:.2f} segundos")
             
             # Processar os resultados
-            if flight_results:
-                flight_count = len(flight_results)
-                logger.warning(f"✅ SUCESSO! {flight_count} voos encontrados para sessão {session_id}")
-                
-                # Formatar a resposta no mesmo formato que o cliente espera
-                formatted_response = {
-                    "data": flight_results,
-                    "session_id": session_id,
-                    "search_timestamp": datetime.utcnow().isoformat(),
-                    "meta": {
-                        "origin": origin,
-                        "destination": destination,
-                        "departure_date": departure_date,
-                        "return_date": return_date,
-                        "currency": "BRL",
-                        "source": "TravelPayouts"
-                    }
-                }
-                
-                return formatted_response
-            else:
-                logger.error(f"⚠️ API retornou 0 resultados para sessão {session_id}")
-                return {
-                    "error": "Nenhum voo encontrado para os critérios informados",
-                    "data": []
-                }
+            return self._format_specific_response(flight_results, travel_info, session_id)
                 
+        except Overloaded:
+            raise
         except Exception as e:
             logger.error(f"❌ Exceção ao buscar voos: {str(e)}")
             import traceback
@@ -162,6 +142,48 @@ class TravelPayoutsConnector:
                 "data": []
             }
 
+    def _search_federated(self, travel_info, session_id):
+        """
+        Busca voos em todos os provedores configurados para a busca federada
+
+        Args:
+            travel_info: Informações da viagem
+            session_id: ID da sessão
+
+        Returns:
+            dict: Resultados da busca (meta inclui provedores fora do prazo)
+        """
+        from services.federated_flight_search import federated_flight_search
+
+        origin = travel_info.get('origin')
+        destination = travel_info.get('destination')
+        departure_date = travel_info.get('departure_date')
+        return_date = travel_info.get('return_date')
+
+        federated = federated_flight_search.search(
+            origin=origin,
+            destination=destination,
+            departure_date=departure_date,
+            return_date=return_date,
+            adults=travel_info.get('adults', 1)
+        )
+        logger.warning(f"⏱️ Busca federada: {federated['meta']['elapsed_ms']}ms | fora do prazo: {federated['meta']['timed_out']}")
+
+        flight_results = federated['data']
+        if not flight_results:
+            # Nenhum provedor respondeu a tempo: manter o link de redirecionamento
+            flight_results = [self.travelpayouts_api._create_redirect_result(origin, destination, departure_date, return_date)]
+
+        response = self._format_specific_response(flight_results, travel_info, session_id)
+        if 'meta' in response:
+            response['meta'].update({
+                "source": "Federated",
+                "providers": federated['meta']['providers'],
+                "timed_out": federated['meta']['timed_out'],
+                "failed": federated['meta']['failed']
+            })
+        return response
+
     def _search_best_prices(self, travel_info, session_id):
         """
         Busca melhores preços para um período flexível usando a API REST do TravelPayouts
@@ -174,13 +196,26 @@ class TravelPayoutsConnector:
             dict: Resultados da busca
         """
         try:
-            # Obter o mês a partir da data de início do período (YYYY-MM)
-            date_parts = travel_info.get('date_range_start', '').split('-')
-            if len(date_parts) >= 2:
-                month = f"{date_parts[0]}-{date_parts[1]}"
+            # Varrer todos os meses do período (date_range_start a date_range_end)
+            from services.flexible_date_scanner import flexible_date_scanner, upstream_errors, InvalidDateRange
+            try:
+                scan = flexible_date_scanner.scan(
+                    origin=travel_info.get('origin'),
+                    destination=travel_info.get('destination'),
+                    date_range_start=travel_info.get('date_range_start'),
+                    date_range_end=travel_info.get('date_range_end'),
+                    min_stay=travel_info.get('min_stay'),
+                    max_stay=travel_info.get('max_stay')
+                )
+            except (InvalidDateRange,) + upstream_errors() as e:
+                # Apenas falhas do fornecedor (ou datas mal formadas) usam o mês inicial;
+                # defeitos seguem para o tratamento abaixo
+                logger.warning(f"Varredura flexível indisponível, usando apenas o mês inicial: {str(e)}")
             else:
-                # Se não tiver data específica, usar mês atual
-                month = datetime.now().strftime('%Y-%m')
+                return self._format_flexible_response(scan, travel_info, session_id)
+            
+            # Obter o mês a partir da data de início do período (YYYY-MM)
+            month = self._best_prices_month(travel_info)
             
             # Extrair informações importantes
             origin = travel_info.get('origin')
@@ -199,33 +234,224 @@ class TravelPayoutsConnector:
                 departure_date=month_start
             )
             
-            if best_prices:
-                # Formatar a resposta para o formato esperado
-                formatted_response = {
-                    "data": best_prices,
-                    "session_id": session_id,
-                    "search_timestamp": datetime.utcnow().isoformat(),
-                    "meta": {
-                        "origin": origin,
-                        "destination": destination,
-                        "month": month,
-                        "currency": "BRL",
-                        "source": "TravelPayouts"
-                    }
+            return self._format_best_prices_response(best_prices, origin, destination, month, session_id)
+            
+        except Overloaded:
+            raise
+        except Exception as e:
+            import traceback
+            logger.error(f"Erro ao buscar melhores preços: {str(e)}")
+            logger.error(traceback.format_exc())
+            return {
+                "error": f"Falha na busca de melhores preços: {str(e)}",
+                "data": []
+            }
+
+    def _check_required_params(self, travel_info):
+        """
+        Verifica os parâmetros obrigatórios da busca por data específica
+
+        Args:
+            travel_info: Informações da viagem
+
+        Returns:
+            dict: resposta de erro ou None se todos os parâmetros estiverem presentes
+        """
+        for param in ['origin', 'destination', 'departure_date']:
+            if not travel_info.get(param):
+                error_msg = f"Parâmetro obrigatório ausente: {param}"
+                logger.error(error_msg)
+                return {
+                    "error": error_msg,
+                    "data": []
                 }
-                
-                return formatted_response
-            else:
-                logger.error(f"⚠️ API retornou 0 resultados de melhores preços para sessão {session_id}")
+        return None
+
+    def _format_specific_response(self, flight_results, travel_info, session_id):
+        """
+        Monta a resposta da busca por data específica no formato esperado pelo cliente
+
+        Args:
+            flight_results: lista de voos retornada pela API
+            travel_info: Informações da viagem
+            session_id: ID da sessão
+
+        Returns:
+            dict: Resultados da busca ou erro
+        """
+        if flight_results:
+            logger.warning(f"✅ SUCESSO! {len(flight_results)} voos encontrados para sessão {session_id}")
+            return {
+                "data": flight_results,
+                "session_id": session_id,
+                "search_timestamp": datetime.utcnow().isoformat(),
+                "meta": {
+                    "origin": travel_info.get('origin'),
+                    "destination": travel_info.get('destination'),
+                    "origin_name": iata_tables.airport_display_name(travel_info.get('origin')),
+                    "destination_name": iata_tables.airport_display_name(travel_info.get('destination')),
+                    "departure_date": travel_info.get('departure_date'),
+                    "return_date": travel_info.get('return_date'),
+                    "currency": "BRL",
+                    "source": "TravelPayouts"
+                }
+            }
+
+        logger.error(f"⚠️ API retornou 0 resultados para sessão {session_id}")
+        return {
+            "error": "Nenhum voo encontrado para os critérios informados",
+            "data": []
+        }
+
+    def _best_prices_month(self, travel_info):
+        """
+        Obtém o mês (YYYY-MM) da busca de melhores preços
+
+        Args:
+            travel_info: Informações da viagem
+
+        Returns:
+            str: mês da data de início do período ou mês atual
+        """
+        date_parts = (travel_info.get('date_range_start') or '').split('-')
+        if len(date_parts) >= 2:
+            return f"{date_parts[0]}-{date_parts[1]}"
+        # Se não tiver data específica, usar mês atual
+        return datetime.now().strftime('%Y-%m')
+
+    def _format_best_prices_response(self, best_prices, origin, destination, month, session_id):
+        """
+        Monta a resposta da busca de melhores preços no formato esperado pelo cliente
+
+        Args:
+            best_prices: lista de voos retornada pela API
+            origin: código IATA de origem
+            destination: código IATA de destino
+            month: mês pesquisado (YYYY-MM)
+            session_id: ID da sessão
+
+        Returns:
+            dict: Resultados da busca ou erro
+        """
+        if best_prices:
+            return {
+                "data": best_prices,
+                "session_id": session_id,
+                "search_timestamp": datetime.utcnow().isoformat(),
+                "meta": {
+                    "origin": origin,
+                    "destination": destination,
+                    "origin_name": iata_tables.airport_display_name(origin),
+                    "destination_name": iata_tables.airport_display_name(destination),
+                    "month": month,
+                    "currency": "BRL",
+                    "source": "TravelPayouts"
+                }
+            }
+
+        logger.error(f"⚠️ API retornou 0 resultados de melhores preços para sessão {session_id}")
+        return {
+            "error": "Nenhum preço encontrado para os critérios informados",
+            "data": []
+        }
+
+    def _format_flexible_response(self, scan, travel_info, session_id):
+        """
+        Monta a resposta da varredura de datas flexíveis no formato da busca de
+        melhores preços, com as tabelas agregadas em meta.price_tables
+
+        Args:
+            scan: resultado de FlexibleDateScanner.scan
+            travel_info: Informações da viagem
+            session_id: ID da sessão
+
+        Returns:
+            dict: Resultados da busca ou erro
+        """
+        months = scan.get('months', [])
+        response = self._format_best_prices_response(
+            scan.get('flights', []),
+            travel_info.get('origin'),
+            travel_info.get('destination'),
+            months[0] if months else self._best_prices_month(travel_info),
+            session_id
+        )
+
+        if 'meta' in response:
+            response['meta'].update({
+                "months": months,
+                "failed_months": scan.get('failed_months', []),
+                "date_range_start": travel_info.get('date_range_start'),
+                "date_range_end": travel_info.get('date_range_end'),
+                "price_tables": scan.get('tables', {})
+            })
+
+        return response
+
+    async def search_flights_from_chat_async(self, travel_info, session_id):
+        """
+        Versão assíncrona de search_flights_from_chat, usando o cliente aiohttp.
+        Retorna exatamente o mesmo formato da versão síncrona.
+
+        Args:
+            travel_info: Dicionário com informações de viagem extraídas do chat
+            session_id: ID da sessão do chat para rastreamento
+
+        Returns:
+            dict: Resultados da busca ou erro
+        """
+        from services.travelpayouts_async_api import travelpayouts_async_api
+
+        try:
+            logger.info(f"Iniciando busca assíncrona de voos com session_id: {session_id}")
+
+            if not travel_info.get('origin') or not travel_info.get('destination'):
                 return {
-                    "error": "Nenhum preço encontrado para os critérios informados",
+                    "error": "Informações de origem ou destino não fornecidas",
                     "data": []
                 }
-            
+
+            origin = travel_info.get('origin')
+            destination = travel_info.get('destination')
+
+            if travel_info.get('date_range_start') and travel_info.get('date_range_end'):
+                from services.flexible_date_scanner import flexible_date_scanner
+                
+                scan = await flexible_date_scanner.scan_async(
+                    origin=origin,
+                    destination=destination,
+                    date_range_start=travel_info.get('date_range_start'),
+                    date_range_end=travel_info.get('date_range_end'),
+                    min_stay=travel_info.get('min_stay'),
+                    max_stay=travel_info.get('max_stay')
+                )
+                return self._format_flexible_response(scan, travel_info, session_id)
+
+            if travel_info.get('departure_date'):
+                missing_error = self._check_required_params(travel_info)
+                if missing_error:
+                    return missing_error
+
+                flight_results = await travelpayouts_async_api.search_flights(
+                    origin=origin,
+                    destination=destination,
+                    departure_date=travel_info.get('departure_date'),
+                    return_date=travel_info.get('return_date'),
+                    adults=travel_info.get('adults', 1)
+                )
+                return self._format_specific_response(flight_results, travel_info, session_id)
+
+            return {
+                "error": "Data de viagem não fornecida",
+                "data": []
+            }
+
+        except Overloaded:
+            raise
         except Exception as e:
-            logger.error(f"Erro ao buscar melhores preços: {str(e)}")
+            logger.error(f"Erro na busca assíncrona de voos: {str(e)}")
             return {
-                "error": f"Falha na busca de melhores preços: {str(e)}",
+                "error": f"Erro ao buscar voos: {str(e)}",
                 "data": []
             }
 
@@ -262,9 +488,12 @@ class TravelPayoutsConnector:
             destination = meta.get('destination', '???')
             departure_date = meta.get('departure_date', 'data especificada')
             currency = meta.get('currency', 'BRL')
+            # Nomes de exibição "Cidade (COD)" para o texto do chat
+            origin_name = meta.get('origin_name') or iata_tables.airport_display_name(origin)
+            destination_name = meta.get('destination_name') or iata_tables.airport_display_name(destination)
 
             # Mensagem para o chat informando sobre os resultados
-            message = f"Encontrei {flight_count} opções de voos para sua viagem de {origin} para {destination}. "
+            message = f"Encontrei {flight_count} opções de voos para sua viagem de {origin_name} para {destination_name}. "
             
             # Se estamos usando redirecionamento, mostrar uma mensagem diferente
             is_redirect = False
@@ -274,7 +503,7 @@ class TravelPayoutsConnector:
                     break
             
             if is_redirect:
-                message = f"Para sua viagem de {origin} para {destination} em {departure_date}, você pode ver todas as opções disponíveis clicando no botão abaixo:"
+                message = f"Para sua viagem de {origin_name} para {destination_name} em {departure_date}, você pode ver todas as opções disponíveis clicando no botão abaixo:"
                 return {
                     "message": message,
                     "show_flight_results": True,
@@ -356,4 +585,4 @@ class TravelPayoutsConnector:
             return None
 
 # Criar uma instância global do conector para ser usada em outras partes do código
-travelpayouts_connector = TravelPayoutsConnector()
\ No newline at end of file
+travelpayouts_connector = lazy_service('travelpayouts_connector', TravelPayoutsConnector)
\ No newline at end of file
@@ -9,6 +9,28 @@ Documentação TravelPayouts API:
 - https://support.travelpayouts.com/hc/en-us/articles/115000343268-Aviasales-API
 - https://support.travelpayouts.com/hc/en-us/articles/205065377-Travel-insights-API
 - https://support.travelpayouts.com/hc/en-us/articles/360000303531-Flight-data-API
+
+Resiliência (variáveis de ambiente):
+- TRAVELPAYOUTS_API_BASE_URL: endereço base da API (padrão: https://api.travelpayouts.com);
+  usado pelo teste de carga (loadtest_worker_models.py) para apontar para um stub local
+- TRAVELPAYOUTS_TIMEOUT: tempo máximo de cada requisição em segundos (padrão: 8)
+- TRAVELPAYOUTS_BREAKER_THRESHOLD: falhas consecutivas que abrem o circuito de um
+  endpoint; com o circuito aberto o endpoint é pulado na cascata (padrão: 3)
+- TRAVELPAYOUTS_BREAKER_RESET: segundos até uma nova tentativa no endpoint (padrão: 30)
+- TRAVELPAYOUTS_CACHE_TTL: segundos em que uma busca fica fresca no cache (padrão: 300)
+- TRAVELPAYOUTS_CACHE_STALE_TTL: segundos adicionais em que uma busca expirada ainda é
+  servida enquanto é atualizada em segundo plano (padrão: 3600)
+- TRAVELPAYOUTS_CACHE_MAX_ENTRIES: buscas mantidas no cache (padrão: 1000)
+- TRAVELPAYOUTS_MONTH_CACHE_TTL: segundos em que as respostas de calendário e matriz
+  de mês (por rota e mês) ficam frescas no cache (padrão: 1800)
+- TRAVELPAYOUTS_MONTH_CACHE_MAX_ENTRIES: respostas mensais mantidas no cache (padrão: 2000)
+
+As requisições respeitam o limite de chamadas simultâneas "travelpayouts"
+(services.admission_control); com o fornecedor saturado, Overloaded não é tratada
+como falha do endpoint e sobe até a rota (429).
+
+Cada busca executada alimenta a popularidade das rotas (services.route_popularity),
+usada pelo aquecedor de cache (services.cache_warmer).
 """
 
 import os
@@ -18,10 +40,56 @@ import requests
 import time
 from datetime import datetime, timedelta
 from urllib.parse import urlencode
+from services.service_registry import lazy_service
+from services.flight_offer_model import FlightOffer, FlightSegment
+from services.circuit_breaker import get_breaker, CircuitOpenError
+from services.search_cache import SearchCache
+from services.route_popularity import route_popularity
+from services.admission_control import Overloaded, upstream_limiter
 
 # Configurar logger
 logger = logging.getLogger(__name__)
 
+# Resultados de search_flights, compartilhados pelos clientes síncrono e assíncrono
+flight_search_cache = SearchCache(
+    'travelpayouts',
+    ttl=float(os.environ.get('TRAVELPAYOUTS_CACHE_TTL', '300')),
+    stale_ttl=float(os.environ.get('TRAVELPAYOUTS_CACHE_STALE_TTL', '3600')),
+    max_entries=int(os.environ.get('TRAVELPAYOUTS_CACHE_MAX_ENTRIES', '1000'))
+)
+
+
+# Respostas das APIs de calendário e matriz de mês, por rota e mês (aquecidas pelo cache_warmer)
+month_price_cache = SearchCache(
+    'travelpayouts-month',
+    ttl=float(os.environ.get('TRAVELPAYOUTS_MONTH_CACHE_TTL', '1800')),
+    stale_ttl=float(os.environ.get('TRAVELPAYOUTS_CACHE_STALE_TTL', '3600')),
+    max_entries=int(os.environ.get('TRAVELPAYOUTS_MONTH_CACHE_MAX_ENTRIES', '2000'))
+)
+
+# Tipos de resposta mensal guardados em month_price_cache
+MONTH_KINDS = ('calendar', 'month_matrix')
+
+
+def month_cache_key(kind, origin, destination, departure_date):
+    """Chave de cache de uma resposta mensal ("calendar" ou "month_matrix") pelo mês YYYY-MM"""
+    return (kind, origin.upper(), destination.upper(), departure_date[:7])
+
+
+def is_cacheable_month_data(data):
+    """Apenas respostas mensais com sucesso vão para o cache"""
+    return isinstance(data, dict) and bool(data.get("success")) and bool(data.get("data"))
+
+
+def search_cache_key(origin, destination, departure_date, return_date=None):
+    """Chave de cache de uma busca (o número de adultos não altera os preços da API)"""
+    return (origin.upper(), destination.upper(), departure_date, return_date or None)
+
+
+def is_cacheable_result(flights):
+    """Apenas buscas com voos reais vão para o cache (não o resultado de redirecionamento)"""
+    return bool(flights) and not all(flight.get("is_redirect") for flight in flights)
+
 class TravelPayoutsRestAPI:
     """
     Cliente para a API REST do TravelPayouts com métodos para buscar dados de voos
@@ -37,9 +105,10 @@ class TravelPayoutsRestAPI:
         self.marker = os.environ.get("TRAVELPAYOUTS_MARKER", "620701")
         
         # URLs base para diferentes APIs
-        self.data_api_base = "https://api.travelpayouts.com/data"
-        self.flights_api_base = "https://api.travelpayouts.com/v1"
-        self.aviasales_api_base = "https://api.travelpayouts.com/aviasales"
+        api_base_url = os.environ.get("TRAVELPAYOUTS_API_BASE_URL", "https://api.travelpayouts.com").rstrip("/")
+        self.data_api_base = f"{api_base_url}/data"
+        self.flights_api_base = f"{api_base_url}/v1"
+        self.aviasales_api_base = f"{api_base_url}/aviasales"
         
         # Endpoints específicos
         self.prices_latest_endpoint = f"{self.flights_api_base}/prices/latest"
@@ -49,14 +118,86 @@ class TravelPayoutsRestAPI:
         self.direct_flights_endpoint = f"{self.data_api_base}/routes.json"
         self.airports_endpoint = f"{self.data_api_base}/airports.json"
         self.airlines_endpoint = f"{self.data_api_base}/airlines.json"
+
+        # Timeout das requisições e circuit breaker por endpoint
+        self.request_timeout = float(os.environ.get('TRAVELPAYOUTS_TIMEOUT', '8'))
+        self.breaker_threshold = int(os.environ.get('TRAVELPAYOUTS_BREAKER_THRESHOLD', '3'))
+        self.breaker_reset = float(os.environ.get('TRAVELPAYOUTS_BREAKER_RESET', '30'))
+        self._endpoint_names = {
+            self.calendar_prices_endpoint: 'calendar',
+            self.cheap_prices_endpoint: 'cheap',
+            self.month_matrix_endpoint: 'month_matrix',
+            self.direct_flights_endpoint: 'routes',
+            self.airports_endpoint: 'airports',
+            self.airlines_endpoint: 'airlines'
+        }
         
         logger.info("TravelPayoutsRestAPI inicializado")
         logger.info(f"API Token configurado: {self.token[:3]}...{self.token[-4:]}")
         logger.info(f"Marker configurado: {self.marker}")
 
+    def _breaker(self, url):
+        """
+        Circuit breaker do endpoint (compartilhado pelos clientes síncrono e assíncrono)
+
+        Args:
+            url: URL do endpoint
+
+        Returns:
+            CircuitBreaker: circuito "travelpayouts:<endpoint>"
+        """
+        name = self._endpoint_names.get(url, url)
+        return get_breaker(
+            f"travelpayouts:{name}",
+            failure_threshold=self.breaker_threshold,
+            reset_timeout=self.breaker_reset
+        )
+
+    @staticmethod
+    def _is_upstream_failure(status_code):
+        """Respostas que indicam instabilidade do endpoint (e não erro nos parâmetros)"""
+        return status_code >= 500 or status_code == 429
+
+    def _get(self, url, params=None):
+        """
+        Executa um GET com timeout, protegido pelo circuito do endpoint
+
+        Args:
+            url: endpoint da API
+            params: parâmetros da requisição
+
+        Returns:
+            requests.Response: resposta da API
+
+        Raises:
+            CircuitOpenError: se o circuito do endpoint estiver aberto
+            Overloaded: se o limite de chamadas simultâneas ao TravelPayouts estiver esgotado
+            requests.RequestException: em caso de timeout ou erro de conexão
+        """
+        breaker = self._breaker(url)
+        if not breaker.allow():
+            raise CircuitOpenError(breaker.name, breaker.retry_after())
+
+        try:
+            with upstream_limiter('travelpayouts').slot():
+                response = requests.get(url, params=params, timeout=self.request_timeout)
+        except requests.RequestException:
+            breaker.record_failure()
+            raise
+
+        if self._is_upstream_failure(response.status_code):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
     def search_flights(self, origin, destination, departure_date, return_date=None, adults=1):
         """
         Busca voos usando a API REST TravelPayouts (preços de calendário + preços baratos)
+
+        Os resultados ficam em cache: buscas recentes são respondidas sem acessar a
+        API e, depois de expiradas, ainda são servidas enquanto uma atualização
+        roda em segundo plano.
         
         Args:
             origin: código IATA do aeroporto de origem
@@ -68,6 +209,29 @@ class TravelPayoutsRestAPI:
         Returns:
             Lista de ofertas de voos ou lista vazia se não encontrar resultados
         """
+        route_popularity.record(origin, destination)
+        flights = flight_search_cache.get_or_load(
+            search_cache_key(origin, destination, departure_date, return_date),
+            lambda: self._search_flights_uncached(origin, destination, departure_date, return_date),
+            cacheable=is_cacheable_result
+        )
+        # Cópia da lista: quem chama pode reordená-la sem alterar o cache
+        return list(flights)
+
+    def _search_flights_uncached(self, origin, destination, departure_date, return_date=None):
+        """
+        Cascata de endpoints da busca de voos (calendário → preços baratos → matriz
+        de mês → redirecionamento). Endpoints com o circuito aberto são pulados.
+
+        Args:
+            origin: código IATA do aeroporto de origem
+            destination: código IATA do aeroporto de destino
+            departure_date: data de partida no formato YYYY-MM-DD
+            return_date: data de retorno no formato YYYY-MM-DD (opcional)
+
+        Returns:
+            Lista de ofertas de voos ou resultado de redirecionamento
+        """
         logger.info(f"Buscando voos: {origin} → {destination} | Partida: {departure_date} | Retorno: {return_date}")
         
         # Experimentar várias APIs para encontrar a melhor resposta
@@ -96,7 +260,7 @@ class TravelPayoutsRestAPI:
 
     def _search_calendar_prices(self, origin, destination, departure_date):
         """
-        Busca preços de voos usando a API de calendário
+        Busca preços de voos usando a API de calendário (resposta do mês em cache)
         
         Args:
             origin: código IATA do aeroporto de origem
@@ -107,111 +271,78 @@ class TravelPayoutsRestAPI:
             Lista de voos formatados ou lista vazia
         """
         try:
-            # Extrair o mês da data de partida (YYYY-MM)
-            departure_month = "-".join(departure_date.split("-")[:2])
-            
-            # Parâmetros da API
-            params = {
-                "token": self.token,
-                "origin": origin.lower(),  # API requer códigos em minúsculo
-                "destination": destination.lower(),  # API requer códigos em minúsculo
-                "calendar_type": "departure_date",
-                "month": departure_month,
-                "currency": "BRL",
-                "show_to_affiliates": "true"
-            }
-            
-            # Fazer a requisição
-            start_time = time.time()
-            logger.info(f"Buscando voos de {origin} para {destination} no mês {departure_month}")
-            logger.info(f"URL: {self.calendar_prices_endpoint} com params: {params}")
-            
-            response = requests.get(self.calendar_prices_endpoint, params=params)
-            elapsed_time = time.time() - start_time
-            logger.info(f"Requisição API calendário: {elapsed_time:.2f}s | Status: {response.status_code}")
-            
-            if response.status_code != 200:
-                logger.error(f"Erro na API calendário: {response.status_code} - {response.text}")
+            data = month_price_cache.get_or_load(
+                month_cache_key('calendar', origin, destination, departure_date),
+                lambda: self._fetch_calendar_data(origin, destination, departure_date),
+                cacheable=is_cacheable_month_data
+            )
+            if data is None:
                 return []
+            return self._parse_calendar_data(data, origin, destination)
             
-            # Processar a resposta
-            try:
-                data = response.json()
-                logger.info(f"Resposta recebida com sucesso. Tipo: {type(data)}")
-                
-                # Tentar converter para JSON se for uma string
-                if isinstance(data, str):
-                    try:
-                        data = json.loads(data)
-                    except:
-                        logger.error(f"API calendário retornou string inválida: {data[:100]}")
-                        return []
-                
-                # Verificar estrutura da resposta
-                logger.info(f"Tipo de resposta: {type(data)}")
-            except Exception as json_error:
-                logger.error(f"Erro ao processar JSON da API calendário: {str(json_error)}")
-                return []
-            
-            if not data.get("success", False):
-                logger.error(f"API calendário retornou sucesso=false: {data.get('error', 'Erro desconhecido')}")
-                return []
-                
-            # Processar e formatar os resultados
-            flights = []
-            
-            # Em algumas respostas, data pode ser uma string ou um dicionário
-            if isinstance(data.get("data"), dict):
-                raw_data = data.get("data", {})
-                logger.info(f"Formatando resultados de calendário. Tipo resposta: {type(data)}")
-            else:
-                logger.error(f"Formato de dados inesperado na API calendário. Tipo: {type(data.get('data'))}")
-                raw_data = {}
-                
-            # Verificar se temos dados
-            if not raw_data:
-                logger.error("Nenhuma entrada de dados válida encontrada")
-                return []
-            
-            # Processar cada data no calendário
-            for date_str, prices in raw_data.items():
-                if not prices:
-                    continue
-                    
-                for flight_info in prices:
-                    # Verificar se tem preço e outras informações essenciais
-                    if not flight_info.get("price"):
-                        continue
-                    
-                    # Mapear os dados para um formato consistente
-                    flight = self._format_calendar_flight(
-                        flight_info=flight_info, 
-                        origin=origin, 
-                        destination=destination, 
-                        date=date_str
-                    )
-                    
-                    flights.append(flight)
-            
-            # Ordenar por preço (mais barato primeiro)
-            flights.sort(key=lambda f: float(f["price"]["total"]))
-            
-            logger.info(f"Resultados encontrados: {len(flights)} voos")
-            
-            # Se não encontrou resultados, tentar criando um resultado para redirecionamento
-            if len(flights) == 0:
-                logger.info(f"Tentando alternativa com API de preços baratos para {origin.lower()}-{destination.lower()}")
-                return []
-            
-            # Limitar a 20 resultados para não sobrecarregar
-            return flights[:20] if len(flights) > 20 else flights
-            
+        except CircuitOpenError as e:
+            logger.info(f"API calendário pulada: {str(e)}")
+            return []
+        except Overloaded:
+            raise
         except Exception as e:
             logger.error(f"Erro ao buscar preços de calendário: {str(e)}")
             import traceback
             logger.error(traceback.format_exc())
             return []
 
+    def _fetch_calendar_data(self, origin, destination, departure_date):
+        """
+        Consulta a API de calendário para o mês da data de partida
+        
+        Args:
+            origin: código IATA do aeroporto de origem
+            destination: código IATA do aeroporto de destino
+            departure_date: data de partida no formato YYYY-MM-DD
+            
+        Returns:
+            JSON decodificado da resposta ou None em caso de erro HTTP/formato
+            
+        Raises:
+            CircuitOpenError: se o circuito do endpoint estiver aberto
+        """
+        # Parâmetros da API
+        params = self._calendar_params(origin, destination, departure_date)
+        
+        # Fazer a requisição
+        start_time = time.time()
+        logger.info(f"Buscando voos de {origin} para {destination} no mês {params['month']}")
+        logger.info(f"URL: {self.calendar_prices_endpoint} com params: {params}")
+        
+        response = self._get(self.calendar_prices_endpoint, params=params)
+        elapsed_time = time.time() - start_time
+        logger.info(f"Requisição API calendário: {elapsed_time:.2f}s | Status: {response.status_code}")
+        
+        if response.status_code != 200:
+            logger.error(f"Erro na API calendário: {response.status_code} - {response.text}")
+            return None
+        
+        # Processar a resposta
+        try:
+            data = response.json()
+            logger.info(f"Resposta recebida com sucesso. Tipo: {type(data)}")
+            
+            # Tentar converter para JSON se for uma string
+            if isinstance(data, str):
+                try:
+                    data = json.loads(data)
+                except:
+                    logger.error(f"API calendário retornou string inválida: {data[:100]}")
+                    return None
+            
+            # Verificar estrutura da resposta
+            logger.info(f"Tipo de resposta: {type(data)}")
+        except Exception as json_error:
+            logger.error(f"Erro ao processar JSON da API calendário: {str(json_error)}")
+            return None
+        
+        return data
+
     def _search_cheap_prices(self, origin, destination, departure_date, return_date=None):
         """
         Busca preços de voos usando a API de preços baratos
@@ -227,21 +358,11 @@ class TravelPayoutsRestAPI:
         """
         try:
             # Parâmetros da API
-            params = {
-                "token": self.token,
-                "origin": origin,
-                "destination": destination,
-                "depart_date": departure_date,
-                "currency": "BRL",
-            }
-            
-            # Adicionar data de retorno se fornecida
-            if return_date:
-                params["return_date"] = return_date
+            params = self._cheap_params(origin, destination, departure_date, return_date)
             
             # Fazer a requisição
             start_time = time.time()
-            response = requests.get(self.cheap_prices_endpoint, params=params)
+            response = self._get(self.cheap_prices_endpoint, params=params)
             elapsed_time = time.time() - start_time
             logger.info(f"Requisição API preços baratos: {elapsed_time:.2f}s | Status: {response.status_code}")
             
@@ -267,47 +388,20 @@ class TravelPayoutsRestAPI:
                 logger.error(f"Erro ao processar JSON da API preços baratos: {str(json_error)}")
                 return []
                 
-            if not data.get("success", False):
-                logger.error(f"API preços baratos retornou sucesso=false: {data.get('error', 'Erro desconhecido')}")
-                return []
-                
-            # Processar e formatar os resultados
-            flights = []
-            raw_data = data.get("data", {}).get(destination, {})
-            
-            if not raw_data:
-                logger.warning(f"Nenhum resultado para {destination} em data.data")
-                return []
-            
-            for date_str, flight_info in raw_data.items():
-                # Verificar se tem preço e outras informações essenciais
-                if not flight_info.get("price"):
-                    continue
-                
-                # Mapear os dados para um formato consistente
-                flight = self._format_cheap_flight(
-                    flight_info=flight_info, 
-                    origin=origin, 
-                    destination=destination, 
-                    date=date_str,
-                    return_date=return_date
-                )
-                
-                flights.append(flight)
-            
-            # Ordenar por preço (mais barato primeiro)
-            flights.sort(key=lambda f: float(f["price"]["total"]))
-            
-            # Limitar a 20 resultados para não sobrecarregar
-            return flights[:20] if len(flights) > 20 else flights
+            return self._parse_cheap_data(data, origin, destination, return_date)
             
+        except CircuitOpenError as e:
+            logger.info(f"API preços baratos pulada: {str(e)}")
+            return []
+        except Overloaded:
+            raise
         except Exception as e:
             logger.error(f"Erro ao buscar preços baratos: {str(e)}")
             return []
 
     def _search_month_matrix(self, origin, destination, departure_date):
         """
-        Busca preços de voos usando a API de matriz de mês
+        Busca preços de voos usando a API de matriz de mês (resposta do mês em cache)
         
         Args:
             origin: código IATA do aeroporto de origem
@@ -318,67 +412,314 @@ class TravelPayoutsRestAPI:
             Lista de voos formatados ou lista vazia
         """
         try:
-            # Extrair o mês da data de partida (YYYY-MM)
-            departure_month = "-".join(departure_date.split("-")[:2])
+            data = month_price_cache.get_or_load(
+                month_cache_key('month_matrix', origin, destination, departure_date),
+                lambda: self._fetch_month_matrix_data(origin, destination, departure_date),
+                cacheable=is_cacheable_month_data
+            )
+            if data is None:
+                return []
+            return self._parse_matrix_data(data, origin, destination)
             
-            # Parâmetros da API
-            params = {
-                "token": self.token,
-                "origin": origin,
-                "destination": destination,
-                "month": departure_month,
-                "currency": "BRL",
-                "show_to_affiliates": "true"
-            }
+        except CircuitOpenError as e:
+            logger.info(f"API matriz mês pulada: {str(e)}")
+            return []
+        except Overloaded:
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao buscar matriz de mês: {str(e)}")
+            return []
+
+    def _fetch_month_matrix_data(self, origin, destination, departure_date):
+        """
+        Consulta a API de matriz de mês para o mês da data de partida
+        
+        Args:
+            origin: código IATA do aeroporto de origem
+            destination: código IATA do aeroporto de destino
+            departure_date: data de partida no formato YYYY-MM-DD
             
-            # Fazer a requisição
-            start_time = time.time()
-            response = requests.get(self.month_matrix_endpoint, params=params)
-            elapsed_time = time.time() - start_time
-            logger.info(f"Requisição API matriz mês: {elapsed_time:.2f}s | Status: {response.status_code}")
+        Returns:
+            JSON decodificado da resposta ou None em caso de erro HTTP
             
-            if response.status_code != 200:
-                logger.error(f"Erro na API matriz mês: {response.status_code} - {response.text}")
-                return []
+        Raises:
+            CircuitOpenError: se o circuito do endpoint estiver aberto
+        """
+        # Parâmetros da API
+        params = self._matrix_params(origin, destination, departure_date)
+        
+        # Fazer a requisição
+        start_time = time.time()
+        response = self._get(self.month_matrix_endpoint, params=params)
+        elapsed_time = time.time() - start_time
+        logger.info(f"Requisição API matriz mês: {elapsed_time:.2f}s | Status: {response.status_code}")
+        
+        if response.status_code != 200:
+            logger.error(f"Erro na API matriz mês: {response.status_code} - {response.text}")
+            return None
+        
+        # Processar a resposta
+        return response.json()
+
+    def warm_month(self, kind, origin, destination, month):
+        """
+        Consulta uma resposta mensal e grava-a no cache (usado pelo aquecedor de cache)
+        
+        Args:
+            kind: "calendar" ou "month_matrix"
+            origin: código IATA do aeroporto de origem
+            destination: código IATA do aeroporto de destino
+            month: mês no formato YYYY-MM
             
-            # Processar a resposta
-            data = response.json()
-            if not data.get("success", False):
-                logger.error(f"API matriz mês retornou sucesso=false: {data.get('error', 'Erro desconhecido')}")
-                return []
-                
-            # Processar e formatar os resultados
-            flights = []
-            raw_data = data.get("data", [])
+        Returns:
+            bool: True se a resposta foi gravada no cache
             
-            for flight_info in raw_data:
-                # Verificar se tem preço e outras informações essenciais
-                if not flight_info.get("value"):
-                    continue
+        Raises:
+            CircuitOpenError: se o circuito do endpoint estiver aberto
+        """
+        departure_date = f"{month}-01"
+        fetch = self._fetch_calendar_data if kind == 'calendar' else self._fetch_month_matrix_data
+        data = fetch(origin, destination, departure_date)
+        if not is_cacheable_month_data(data):
+            return False
+        month_price_cache.store(month_cache_key(kind, origin, destination, departure_date), data)
+        return True
+
+    def _calendar_params(self, origin, destination, departure_date):
+        """
+        Monta os parâmetros da API de calendário
+        
+        Args:
+            origin: código IATA do aeroporto de origem
+            destination: código IATA do aeroporto de destino
+            departure_date: data de partida no formato YYYY-MM-DD
+            
+        Returns:
+            dict: parâmetros da requisição
+        """
+        # Extrair o mês da data de partida (YYYY-MM)
+        departure_month = "-".join(departure_date.split("-")[:2])
+        
+        return {
+            "token": self.token,
+            "origin": origin.lower(),  # API requer códigos em minúsculo
+            "destination": destination.lower(),  # API requer códigos em minúsculo
+            "calendar_type": "departure_date",
+            "month": departure_month,
+            "currency": "BRL",
+            "show_to_affiliates": "true"
+        }
+
+    def _cheap_params(self, origin, destination, departure_date, return_date=None):
+        """
+        Monta os parâmetros da API de preços baratos
+        
+        Args:
+            origin: código IATA do aeroporto de origem
+            destination: código IATA do aeroporto de destino
+            departure_date: data de partida no formato YYYY-MM-DD
+            return_date: data de retorno no formato YYYY-MM-DD (opcional)
+            
+        Returns:
+            dict: parâmetros da requisição
+        """
+        params = {
+            "token": self.token,
+            "origin": origin,
+            "destination": destination,
+            "depart_date": departure_date,
+            "currency": "BRL",
+        }
+        
+        # Adicionar data de retorno se fornecida
+        if return_date:
+            params["return_date"] = return_date
+        
+        return params
+
+    def _matrix_params(self, origin, destination, departure_date):
+        """
+        Monta os parâmetros da API de matriz de mês
+        
+        Args:
+            origin: código IATA do aeroporto de origem
+            destination: código IATA do aeroporto de destino
+            departure_date: data de partida no formato YYYY-MM-DD
+            
+        Returns:
+            dict: parâmetros da requisição
+        """
+        # Extrair o mês da data de partida (YYYY-MM)
+        departure_month = "-".join(departure_date.split("-")[:2])
+        
+        return {
+            "token": self.token,
+            "origin": origin,
+            "destination": destination,
+            "month": departure_month,
+            "currency": "BRL",
+            "show_to_affiliates": "true"
+        }
+
+    def _parse_calendar_data(self, data, origin, destination):
+        """
+        Converte a resposta da API de calendário em voos formatados.
+        Compartilhado entre o cliente síncrono e o assíncrono.
+        
+        Args:
+            data: JSON decodificado da resposta
+            origin: código IATA do aeroporto de origem
+            destination: código IATA do aeroporto de destino
+            
+        Returns:
+            Lista de voos formatados ou lista vazia
+        """
+        if not data.get("success", False):
+            logger.error(f"API calendário retornou sucesso=false: {data.get('error', 'Erro desconhecido')}")
+            return []
+            
+        # Processar e formatar os resultados
+        flights = []
+        
+        # Em algumas respostas, data pode ser uma string ou um dicionário
+        if isinstance(data.get("data"), dict):
+            raw_data = data.get("data", {})
+            logger.info(f"Formatando resultados de calendário. Tipo resposta: {type(data)}")
+        else:
+            logger.error(f"Formato de dados inesperado na API calendário. Tipo: {type(data.get('data'))}")
+            raw_data = {}
+            
+        # Verificar se temos dados
+        if not raw_data:
+            logger.error("Nenhuma entrada de dados válida encontrada")
+            return []
+        
+        # Processar cada data no calendário
+        for date_str, prices in raw_data.items():
+            if not prices:
+                continue
                 
-                # Extrair data de partida do formato API (YYYY-MM-DD)
-                date_str = flight_info.get("depart_date")
-                if not date_str:
+            for flight_info in prices:
+                # Verificar se tem preço e outras informações essenciais
+                if not flight_info.get("price"):
                     continue
                 
                 # Mapear os dados para um formato consistente
-                flight = self._format_matrix_flight(
+                flight = self._format_calendar_flight(
                     flight_info=flight_info, 
                     origin=origin, 
-                    destination=destination
+                    destination=destination, 
+                    date=date_str
                 )
                 
                 flights.append(flight)
+        
+        # Ordenar por preço (mais barato primeiro)
+        flights.sort(key=lambda f: float(f.price_total))
+        
+        logger.info(f"Resultados encontrados: {len(flights)} voos")
+        
+        # Se não encontrou resultados, tentar criando um resultado para redirecionamento
+        if len(flights) == 0:
+            logger.info(f"Tentando alternativa com API de preços baratos para {origin.lower()}-{destination.lower()}")
+            return []
+        
+        # Limitar a 20 resultados para não sobrecarregar
+        return flights[:20] if len(flights) > 20 else flights
+
+    def _parse_cheap_data(self, data, origin, destination, return_date=None):
+        """
+        Converte a resposta da API de preços baratos em voos formatados.
+        Compartilhado entre o cliente síncrono e o assíncrono.
+        
+        Args:
+            data: JSON decodificado da resposta
+            origin: código IATA do aeroporto de origem
+            destination: código IATA do aeroporto de destino
+            return_date: data de retorno no formato YYYY-MM-DD (opcional)
             
-            # Ordenar por preço (mais barato primeiro)
-            flights.sort(key=lambda f: float(f["price"]["total"]))
+        Returns:
+            Lista de voos formatados ou lista vazia
+        """
+        if not data.get("success", False):
+            logger.error(f"API preços baratos retornou sucesso=false: {data.get('error', 'Erro desconhecido')}")
+            return []
             
-            # Limitar a 20 resultados para não sobrecarregar
-            return flights[:20] if len(flights) > 20 else flights
+        # Processar e formatar os resultados
+        flights = []
+        raw_data = data.get("data", {}).get(destination, {})
+        
+        if not raw_data:
+            logger.warning(f"Nenhum resultado para {destination} em data.data")
+            return []
+        
+        for date_str, flight_info in raw_data.items():
+            # Verificar se tem preço e outras informações essenciais
+            if not flight_info.get("price"):
+                continue
             
-        except Exception as e:
-            logger.error(f"Erro ao buscar matriz de mês: {str(e)}")
+            # Mapear os dados para um formato consistente
+            flight = self._format_cheap_flight(
+                flight_info=flight_info, 
+                origin=origin, 
+                destination=destination, 
+                date=date_str,
+                return_date=return_date
+            )
+            
+            flights.append(flight)
+        
+        # Ordenar por preço (mais barato primeiro)
+        flights.sort(key=lambda f: float(f.price_total))
+        
+        # Limitar a 20 resultados para não sobrecarregar
+        return flights[:20] if len(flights) > 20 else flights
+
+    def _parse_matrix_data(self, data, origin, destination):
+        """
+        Converte a resposta da API de matriz de mês em voos formatados.
+        Compartilhado entre o cliente síncrono e o assíncrono.
+        
+        Args:
+            data: JSON decodificado da resposta
+            origin: código IATA do aeroporto de origem
+            destination: código IATA do aeroporto de destino
+            
+        Returns:
+            Lista de voos formatados ou lista vazia
+        """
+        if not data.get("success", False):
+            logger.error(f"API matriz mês retornou sucesso=false: {data.get('error', 'Erro desconhecido')}")
             return []
+            
+        # Processar e formatar os resultados
+        flights = []
+        raw_data = data.get("data", [])
+        
+        for flight_info in raw_data:
+            # Verificar se tem preço e outras informações essenciais
+            if not flight_info.get("value"):
+                continue
+            
+            # Extrair data de partida do formato API (YYYY-MM-DD)
+            date_str = flight_info.get("depart_date")
+            if not date_str:
+                continue
+            
+            # Mapear os dados para um formato consistente
+            flight = self._format_matrix_flight(
+                flight_info=flight_info, 
+                origin=origin, 
+                destination=destination
+            )
+            
+            flights.append(flight)
+        
+        # Ordenar por preço (mais barato primeiro)
+        flights.sort(key=lambda f: float(f.price_total))
+        
+        # Limitar a 20 resultados para não sobrecarregar
+        return flights[:20] if len(flights) > 20 else flights
 
     def _format_calendar_flight(self, flight_info, origin, destination, date):
         """
@@ -406,61 +747,29 @@ class TravelPayoutsRestAPI:
             return_date=flight_info.get("return_date")
         )
         
-        # Construir segmento de ida
-        departure_segment = {
-            "departure": {
-                "iataCode": origin,
-                "at": f"{date}T10:00:00"  # Horário estimado
-            },
-            "arrival": {
-                "iataCode": destination,
-                "at": f"{date}T12:00:00"  # Horário estimado
-            },
-            "carrierCode": airline,
-            "number": flight_number,
-            "duration": "2:00"  # Duração estimada
-        }
-        
-        # Segmentos de itinerário (ida)
-        itineraries = [{
-            "segments": [departure_segment]
-        }]
-        
-        # Se tiver data de retorno, adicionar segmento de volta
+        # Trecho de ida (horários estimados)
+        segments = [FlightSegment(
+            origin, destination, f"{date}T10:00:00", f"{date}T12:00:00", airline, flight_number, "2:00"
+        )]
+
+        # Se tiver data de retorno, adicionar trecho de volta
+        return_segments = None
         if flight_info.get("return_date"):
             return_date = flight_info.get("return_date")
-            
-            return_segment = {
-                "departure": {
-                    "iataCode": destination,
-                    "at": f"{return_date}T16:00:00"  # Horário estimado
-                },
-                "arrival": {
-                    "iataCode": origin,
-                    "at": f"{return_date}T18:00:00"  # Horário estimado
-                },
-                "carrierCode": airline,
-                "number": flight_number,
-                "duration": "2:00"  # Duração estimada
-            }
-            
-            itineraries.append({
-                "segments": [return_segment]
-            })
-        
+            return_segments = [FlightSegment(
+                destination, origin, f"{return_date}T16:00:00", f"{return_date}T18:00:00", airline, flight_number, "2:00"
+            )]
+
         # Formato final do voo
-        return {
-            "id": f"TP{flight_info.get('price')}",
-            "itineraries": itineraries,
-            "price": {
-                "total": str(price),
-                "currency": "BRL"
-            },
-            "validatingAirlineCodes": [airline] if airline else ["TP"],
-            "source": "TravelPayouts",
-            "booking_url": booking_url,
-            "number_of_bookings": flight_info.get("number_of_changes", 0)
-        }
+        return FlightOffer(
+            id=f"TP{flight_info.get('price')}",
+            segments=segments,
+            return_segments=return_segments,
+            price=price,
+            validating_airline=airline or "TP",
+            booking_url=booking_url,
+            number_of_bookings=flight_info.get("number_of_changes", 0)
+        )
 
     def _format_cheap_flight(self, flight_info, origin, destination, date, return_date=None):
         """
@@ -511,26 +820,13 @@ class TravelPayoutsRestAPI:
                 arrival_hour = int(arrival_parts[0]) + 2
                 arrival_time = f"{arrival_hour:02d}:{arrival_parts[1]}"
         
-        departure_segment = {
-            "departure": {
-                "iataCode": origin,
-                "at": f"{departure_at}T{departure_time}:00"
-            },
-            "arrival": {
-                "iataCode": destination,
-                "at": f"{departure_at}T{arrival_time}:00"
-            },
-            "carrierCode": airline,
-            "number": flight_number,
-            "duration": "2:00"  # Duração estimada
-        }
-        
-        # Segmentos de itinerário (ida)
-        itineraries = [{
-            "segments": [departure_segment]
-        }]
-        
-        # Se tiver data de retorno, adicionar segmento de volta
+        segments = [FlightSegment(
+            origin, destination, f"{departure_at}T{departure_time}:00", f"{departure_at}T{arrival_time}:00",
+            airline, flight_number, "2:00"  # Duração estimada
+        )]
+
+        # Se tiver data de retorno, adicionar trecho de volta
+        return_segments = None
         if return_at:
             return_departure_time = "16:00"  # Horário estimado
             return_arrival_time = "18:00"    # Horário estimado
@@ -547,38 +843,22 @@ class TravelPayoutsRestAPI:
                     arrival_hour = int(arrival_parts[0]) + 2
                     return_arrival_time = f"{arrival_hour:02d}:{arrival_parts[1]}"
             
-            return_segment = {
-                "departure": {
-                    "iataCode": destination,
-                    "at": f"{return_at}T{return_departure_time}:00"
-                },
-                "arrival": {
-                    "iataCode": origin,
-                    "at": f"{return_at}T{return_arrival_time}:00"
-                },
-                "carrierCode": airline,
-                "number": flight_number,
-                "duration": "2:00"  # Duração estimada
-            }
-            
-            itineraries.append({
-                "segments": [return_segment]
-            })
-        
+            return_segments = [FlightSegment(
+                destination, origin, f"{return_at}T{return_departure_time}:00", f"{return_at}T{return_arrival_time}:00",
+                airline, flight_number, "2:00"  # Duração estimada
+            )]
+
         # Formato final do voo
-        return {
-            "id": f"TP{price}",
-            "itineraries": itineraries,
-            "price": {
-                "total": str(price),
-                "currency": "BRL"
-            },
-            "validatingAirlineCodes": [airline] if airline else ["TP"],
-            "source": "TravelPayouts",
-            "booking_url": booking_url,
-            "number_of_bookings": flight_info.get("number_of_changes", 0),
-            "transfers": flight_info.get("transfers", 0)
-        }
+        return FlightOffer(
+            id=f"TP{price}",
+            segments=segments,
+            return_segments=return_segments,
+            price=price,
+            validating_airline=airline or "TP",
+            booking_url=booking_url,
+            number_of_bookings=flight_info.get("number_of_changes", 0),
+            transfers=flight_info.get("transfers", 0)
+        )
 
     def _format_matrix_flight(self, flight_info, origin, destination):
         """
@@ -605,59 +885,27 @@ class TravelPayoutsRestAPI:
             return_date=return_date
         )
         
-        # Construir segmento de ida
-        departure_segment = {
-            "departure": {
-                "iataCode": origin,
-                "at": f"{departure_date}T10:00:00"  # Horário estimado
-            },
-            "arrival": {
-                "iataCode": destination,
-                "at": f"{departure_date}T12:00:00"  # Horário estimado
-            },
-            "carrierCode": "TP",
-            "number": "MATRIX",
-            "duration": "2:00"  # Duração estimada
-        }
-        
-        # Segmentos de itinerário (ida)
-        itineraries = [{
-            "segments": [departure_segment]
-        }]
-        
-        # Se tiver data de retorno, adicionar segmento de volta
+        # Trecho de ida (horários estimados)
+        segments = [FlightSegment(
+            origin, destination, f"{departure_date}T10:00:00", f"{departure_date}T12:00:00", "TP", "MATRIX", "2:00"
+        )]
+
+        # Se tiver data de retorno, adicionar trecho de volta
+        return_segments = None
         if return_date:
-            return_segment = {
-                "departure": {
-                    "iataCode": destination,
-                    "at": f"{return_date}T16:00:00"  # Horário estimado
-                },
-                "arrival": {
-                    "iataCode": origin,
-                    "at": f"{return_date}T18:00:00"  # Horário estimado
-                },
-                "carrierCode": "TP",
-                "number": "MATRIX",
-                "duration": "2:00"  # Duração estimada
-            }
-            
-            itineraries.append({
-                "segments": [return_segment]
-            })
-        
+            return_segments = [FlightSegment(
+                destination, origin, f"{return_date}T16:00:00", f"{return_date}T18:00:00", "TP", "MATRIX", "2:00"
+            )]
+
         # Formato final do voo
-        return {
-            "id": f"TP{price}",
-            "itineraries": itineraries,
-            "price": {
-                "total": str(price),
-                "currency": "BRL"
-            },
-            "validatingAirlineCodes": ["TP"],
-            "source": "TravelPayouts",
-            "booking_url": booking_url,
-            "is_direct": flight_info.get("direct", False)
-        }
+        return FlightOffer(
+            id=f"TP{price}",
+            segments=segments,
+            return_segments=return_segments,
+            price=price,
+            booking_url=booking_url,
+            is_direct=flight_info.get("direct", False)
+        )
 
     def _create_redirect_result(self, origin, destination, departure_date, return_date=None):
         """
@@ -681,32 +929,16 @@ class TravelPayoutsRestAPI:
         )
         
         # Retornar um resultado de redirecionamento
-        return {
-            "id": "TP_REDIRECT",
-            "itineraries": [{
-                "segments": [{
-                    "departure": {
-                        "iataCode": origin,
-                        "at": f"{departure_date}T10:00:00"
-                    },
-                    "arrival": {
-                        "iataCode": destination,
-                        "at": f"{departure_date}T12:00:00"
-                    },
-                    "carrierCode": "TP",
-                    "number": "DIR"
-                }]
-            }],
-            "price": {
-                "total": "0",  # Preço será mostrado no site de destino
-                "currency": "BRL"
-            },
-            "validatingAirlineCodes": ["TP"],
-            "source": "TravelPayouts",
-            "booking_url": redirect_url,
-            "is_redirect": True,
-            "label": "Ver todas as opções de voos"
-        }
+        return FlightOffer(
+            id="TP_REDIRECT",
+            segments=[FlightSegment(
+                origin, destination, f"{departure_date}T10:00:00", f"{departure_date}T12:00:00", "TP", "DIR"
+            )],
+            price="0",  # Preço será mostrado no site de destino
+            booking_url=redirect_url,
+            is_redirect=True,
+            label="Ver todas as opções de voos"
+        )
 
     def _create_booking_url(self, origin, destination, departure_date, return_date=None):
         """
@@ -755,62 +987,17 @@ class TravelPayoutsRestAPI:
         """
         try:
             # Obter dados de aeroportos da TravelPayouts
-            response = requests.get(self.airports_endpoint)
+            response = self._get(self.airports_endpoint)
             
             if response.status_code != 200:
                 logger.error(f"Erro ao buscar aeroportos: {response.status_code}")
                 return []
             
-            all_airports = response.json()
-            nearby = []
-            
-            # Encontrar o aeroporto de referência
-            reference_airport = None
-            for airport in all_airports:
-                if airport.get("code") == city_code:
-                    reference_airport = airport
-                    break
-            
-            if not reference_airport:
-                logger.error(f"Aeroporto de referência {city_code} não encontrado")
-                return []
-            
-            # Buscar aeroportos próximos
-            ref_lat = float(reference_airport.get("lat", 0))
-            ref_lon = float(reference_airport.get("lon", 0))
-            
-            for airport in all_airports:
-                # Pular aeroportos sem coordenadas
-                if not airport.get("lat") or not airport.get("lon"):
-                    continue
-                
-                # Pular o próprio aeroporto de referência
-                if airport.get("code") == city_code:
-                    continue
-                
-                try:
-                    # Calcular distância aproximada (cálculo simplificado)
-                    lat = float(airport.get("lat", 0))
-                    lon = float(airport.get("lon", 0))
-                    
-                    dlat = lat - ref_lat
-                    dlon = lon - ref_lon
-                    
-                    # Fórmula de distância simplificada (aproximação para curtas distâncias)
-                    distance = (dlat**2 + dlon**2)**0.5 * 111  # 1 grau ≈ 111 km
-                    
-                    if distance <= max_distance:
-                        airport["distance"] = int(distance)
-                        nearby.append(airport)
-                except Exception as e:
-                    logger.error(f"Erro ao calcular distância para {airport.get('code')}: {str(e)}")
-                    continue
-            
-            # Ordenar por distância
-            nearby.sort(key=lambda x: x.get("distance", 999))
-            
-            return nearby
+            return self._parse_nearby_airports(response.json(), city_code, max_distance)
             
+        except CircuitOpenError as e:
+            logger.info(f"Busca de aeroportos próximos pulada: {str(e)}")
+            return []
         except Exception as e:
             logger.error(f"Erro ao buscar aeroportos próximos: {str(e)}")
             return []
@@ -827,35 +1014,111 @@ class TravelPayoutsRestAPI:
         """
         try:
             # Obter dados de rotas diretas da TravelPayouts
-            response = requests.get(self.direct_flights_endpoint)
+            response = self._get(self.direct_flights_endpoint)
             
             if response.status_code != 200:
                 logger.error(f"Erro ao buscar rotas diretas: {response.status_code}")
                 return []
             
-            routes = response.json()
-            direct_destinations = []
-            
-            # Filtrar rotas a partir da origem especificada
-            for route in routes:
-                if route.get("origin") == origin and route.get("destination"):
-                    # Verificar se esse destino já está na lista
-                    destination = route.get("destination")
-                    if not any(dest["code"] == destination for dest in direct_destinations):
-                        direct_destinations.append({
-                            "code": destination,
-                            "airline": route.get("airline"),
-                            "flights_per_week": route.get("flights_per_week", 0)
-                        })
-            
-            # Ordenar por número de voos por semana (mais frequentes primeiro)
-            direct_destinations.sort(key=lambda x: x.get("flights_per_week", 0), reverse=True)
-            
-            return direct_destinations
+            return self._parse_direct_flights(response.json(), origin)
             
+        except CircuitOpenError as e:
+            logger.info(f"Busca de voos diretos pulada: {str(e)}")
+            return []
         except Exception as e:
             logger.error(f"Erro ao buscar voos diretos: {str(e)}")
             return []
 
+    def _parse_nearby_airports(self, all_airports, city_code, max_distance=100):
+        """
+        Filtra a lista de aeroportos da API pelos próximos à referência
+        
+        Args:
+            all_airports: lista de aeroportos retornada pela API de dados
+            city_code: código IATA de cidade ou aeroporto
+            max_distance: distância máxima em km
+            
+        Returns:
+            Lista de aeroportos próximos ordenada por distância
+        """
+        nearby = []
+        
+        # Encontrar o aeroporto de referência
+        reference_airport = None
+        for airport in all_airports:
+            if airport.get("code") == city_code:
+                reference_airport = airport
+                break
+        
+        if not reference_airport:
+            logger.error(f"Aeroporto de referência {city_code} não encontrado")
+            return []
+        
+        # Buscar aeroportos próximos
+        ref_lat = float(reference_airport.get("lat", 0))
+        ref_lon = float(reference_airport.get("lon", 0))
+        
+        for airport in all_airports:
+            # Pular aeroportos sem coordenadas
+            if not airport.get("lat") or not airport.get("lon"):
+                continue
+            
+            # Pular o próprio aeroporto de referência
+            if airport.get("code") == city_code:
+                continue
+            
+            try:
+                # Calcular distância aproximada (cálculo simplificado)
+                lat = float(airport.get("lat", 0))
+                lon = float(airport.get("lon", 0))
+                
+                dlat = lat - ref_lat
+                dlon = lon - ref_lon
+                
+                # Fórmula de distância simplificada (aproximação para curtas distâncias)
+                distance = (dlat**2 + dlon**2)**0.5 * 111  # 1 grau ≈ 111 km
+                
+                if distance <= max_distance:
+                    airport["distance"] = int(distance)
+                    nearby.append(airport)
+            except Exception as e:
+                logger.error(f"Erro ao calcular distância para {airport.get('code')}: {str(e)}")
+                continue
+        
+        # Ordenar por distância
+        nearby.sort(key=lambda x: x.get("distance", 999))
+        
+        return nearby
+
+    def _parse_direct_flights(self, routes, origin):
+        """
+        Filtra a lista de rotas da API pelos destinos diretos a partir da origem
+        
+        Args:
+            routes: lista de rotas retornada pela API de dados
+            origin: código IATA de aeroporto de origem
+            
+        Returns:
+            Lista de destinos com voos diretos
+        """
+        direct_destinations = []
+        
+        # Filtrar rotas a partir da origem especificada
+        for route in routes:
+            if route.get("origin") == origin and route.get("destination"):
+                # Verificar se esse destino já está na lista
+                destination = route.get("destination")
+                if not any(dest["code"] == destination for dest in direct_destinations):
+                    direct_destinations.append({
+                        "code": destination,
+                        "airline": route.get("airline"),
+                        "flights_per_week": route.get("flights_per_week", 0)
+                    })
+        
+        # Ordenar por número de voos por semana (mais frequentes primeiro)
+        direct_destinations.sort(key=lambda x: x.get("flights_per_week", 0), reverse=True)
+        
+        return direct_destinations
+
 # Instanciar o cliente da API REST
-travelpayouts_api = TravelPayoutsRestAPI()
\ No newline at end of file
+travelpayouts_api = lazy_service('travelpayouts_api', TravelPayoutsRestAPI)
\ No newline at end of file
@@ -15,6 +15,8 @@ import requests
 from datetime import datetime, timedelta
 from urllib.parse import urlencode
 import random
+from services.service_registry import lazy_service
+from services.flight_offer_model import FlightOffer, FlightSegment
 
 logger = logging.getLogger(__name__)
 
@@ -276,27 +278,11 @@ class TravelPayoutsService:
             arrival_time = "12:00" if len(origin) == 3 and len(destination) == 3 else "14:00"
             arrival_datetime = f"{departure_date}T{arrival_time}:00"
             
-            # Criar segmento de voo
-            segment = {
-                'departure': {
-                    'iataCode': origin,
-                    'at': departure_datetime
-                },
-                'arrival': {
-                    'iataCode': destination,
-                    'at': arrival_datetime
-                },
-                'carrierCode': airline,
-                'number': flight_number
-            }
-            
-            # Estrutura de itinerário (ida)
-            itinerary = {
-                'segments': [segment]
-            }
-            
+            # Criar trecho de voo
+            segment = FlightSegment(origin, destination, departure_datetime, arrival_datetime, airline, flight_number)
+
             # Se tiver data de retorno
-            return_itinerary = None
+            return_segments = None
             if flight_info.get('return_date'):
                 return_date = flight_info.get('return_date')
                 # Horários estimados para o retorno
@@ -304,36 +290,20 @@ class TravelPayoutsService:
                 return_departure_datetime = f"{return_date}T{return_departure_time}:00"
                 return_arrival_time = "17:00"
                 return_arrival_datetime = f"{return_date}T{return_arrival_time}:00"
-                
-                return_segment = {
-                    'departure': {
-                        'iataCode': destination,
-                        'at': return_departure_datetime
-                    },
-                    'arrival': {
-                        'iataCode': origin,
-                        'at': return_arrival_datetime
-                    },
-                    'carrierCode': airline,
-                    'number': flight_number
-                }
-                
-                return_itinerary = {
-                    'segments': [return_segment]
-                }
-            
+
+                return_segments = [FlightSegment(
+                    destination, origin, return_departure_datetime, return_arrival_datetime, airline, flight_number
+                )]
+
             # Montar objeto completo de voo no formato compatível com a aplicação
-            formatted_flight = {
-                'id': f"TP{flight_id_counter}",
-                'itineraries': [itinerary] if not return_itinerary else [itinerary, return_itinerary],
-                'price': {
-                    'total': str(price),
-                    'currency': 'BRL'
-                },
-                'validatingAirlineCodes': [airline],
-                'source': 'TravelPayouts'
-            }
-            
+            formatted_flight = FlightOffer(
+                id=f"TP{flight_id_counter}",
+                segments=[segment],
+                return_segments=return_segments,
+                price=price,
+                validating_airline=airline
+            )
+
             formatted_results.append(formatted_flight)
             flight_id_counter += 1
         
@@ -508,27 +478,11 @@ class TravelPayoutsService:
                 arrival_hour = str(int(hour_parts[0]) + 2).zfill(2)
                 arrival_at = f"{arrival_parts[0]}T{arrival_hour}:{hour_parts[1]}:{hour_parts[2]}"
             
-            # Criar segmento de voo (ida)
-            segment = {
-                'departure': {
-                    'iataCode': origin,
-                    'at': departure_at
-                },
-                'arrival': {
-                    'iataCode': destination,
-                    'at': arrival_at
-                },
-                'carrierCode': airline,
-                'number': flight_number.replace(airline, '')
-            }
-            
-            # Estrutura de itinerário (ida)
-            itinerary = {
-                'segments': [segment]
-            }
-            
+            # Criar trecho de voo (ida)
+            segment = FlightSegment(origin, destination, departure_at, arrival_at, airline, flight_number.replace(airline, ''))
+
             # Se tiver voo de retorno
-            return_itinerary = None
+            return_segments = None
             if return_at:
                 # Calcular hora de chegada do retorno (2 horas depois da partida do retorno)
                 try:
@@ -541,36 +495,20 @@ class TravelPayoutsService:
                     return_hour_parts = return_parts[1].split(':')
                     return_arrival_hour = str(int(return_hour_parts[0]) + 2).zfill(2)
                     return_arrival_at = f"{return_parts[0]}T{return_arrival_hour}:{return_hour_parts[1]}:{return_hour_parts[2]}"
-                
-                return_segment = {
-                    'departure': {
-                        'iataCode': destination,
-                        'at': return_at
-                    },
-                    'arrival': {
-                        'iataCode': origin,
-                        'at': return_arrival_at
-                    },
-                    'carrierCode': airline,
-                    'number': flight_number.replace(airline, '')
-                }
-                
-                return_itinerary = {
-                    'segments': [return_segment]
-                }
-            
+
+                return_segments = [FlightSegment(
+                    destination, origin, return_at, return_arrival_at, airline, flight_number.replace(airline, '')
+                )]
+
             # Montar objeto completo de voo
-            formatted_flight = {
-                'id': f"TP{flight_id_counter}",
-                'itineraries': [itinerary] if not return_itinerary else [itinerary, return_itinerary],
-                'price': {
-                    'total': str(price),
-                    'currency': 'BRL'
-                },
-                'validatingAirlineCodes': [airline],
-                'source': 'TravelPayouts'
-            }
-            
+            formatted_flight = FlightOffer(
+                id=f"TP{flight_id_counter}",
+                segments=[segment],
+                return_segments=return_segments,
+                price=price,
+                validating_airline=airline
+            )
+
             formatted_results.append(formatted_flight)
             flight_id_counter += 1
         
@@ -710,4 +648,8 @@ class TravelPayoutsService:
             
         except Exception as e:
             logger.error(f"Erro ao obter companhias aéreas: {str(e)}")
-            return []
\ No newline at end of file
+            return []
+
+
+# Instância global (construída no primeiro uso)
+travelpayouts_service = lazy_service('travelpayouts_service', TravelPayoutsService)
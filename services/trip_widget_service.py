@@ -8,7 +8,7 @@ import json
 import logging
 import asyncio
 from datetime import datetime
-from playwright.async_api import async_playwright
+from services.service_registry import lazy_service
 
 # Configuração de logging
 logger = logging.getLogger(__name__)
@@ -44,6 +44,9 @@ class TripWidgetService:
         logger.info(f"Iniciando busca de voos via widget Trip.com: {origin} → {destination}")
         
         try:
+            # Playwright é importado apenas quando uma busca é executada
+            from playwright.async_api import async_playwright
+
             async with async_playwright() as playwright:
                 # Inicializar o navegador
                 self.browser = await playwright.chromium.launch(headless=True)
@@ -232,4 +235,4 @@ class TripWidgetService:
         return formatted_flights
 
 # Instanciar serviço para exportação
-trip_widget_service = TripWidgetService()
\ No newline at end of file
+trip_widget_service = lazy_service('trip_widget_service', TripWidgetService)
\ No newline at end of file
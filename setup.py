@@ -4,21 +4,27 @@ import sys
 from sqlalchemy import inspect, text
 from app import app, db
 from models import User
+from services.db_schema import ensure_schema
 from werkzeug.security import generate_password_hash
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def setup_database():
+def setup_database(schema_only=False):
     """
     Configura o banco de dados inicial com as tabelas e dados necessários
+
+    Args:
+        schema_only: apenas criar/atualizar tabelas, colunas e índices (usado no deploy)
     """
     try:
-        # Criar todas as tabelas definidas nos modelos
+        # Criar todas as tabelas definidas nos modelos e atualizar as existentes
         with app.app_context():
-            db.create_all()
+            ensure_schema(db)
             logger.info("Tabelas criadas com sucesso.")
+            if schema_only:
+                return True
             
             # Verificar se existem usuários
             user_count = User.query.count()
@@ -46,7 +52,7 @@ def setup_database():
     return True
     
 if __name__ == "__main__":
-    if setup_database():
+    if setup_database(schema_only='--schema-only' in sys.argv[1:]):
         sys.exit(0)
     else:
         sys.exit(1)
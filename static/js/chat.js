@@ -167,6 +167,12 @@ document.addEventListener('DOMContentLoaded', function() {
         .then(data => {
             removeTypingIndicator();
 
+            if (data.error && data.retry_after) {
+                // Servidor sobrecarregado ou cota da sessão esgotada (429)
+                addMessage(`Estou recebendo muitas solicitações agora. Por favor, tente novamente em ${data.retry_after} segundo(s).`, false);
+                return;
+            }
+
             if (data.error) {
                 addMessage('Desculpe, tive um problema ao processar sua solicitação. Por favor, tente novamente.', false);
                 console.log("Error response:", data.error);
@@ -461,14 +461,23 @@ class FlightResultsPanel {
         console.log(`Buscando resultados de voos para a sessão ${sessionId}...`);
 
         // Chamar a API para obter os resultados de voo
-        fetch(`/api/flight_results/${sessionId}`)
+        // (503 com "pending": a busca antecipada ainda está em andamento; consultar de novo
+        // no intervalo de Retry-After, por até ~1 minuto)
+        const fetchResults = (attempts) => fetch(`/api/flight_results/${sessionId}`)
             .then(response => {
                 console.log("Resposta da API:", response.status, response.statusText);
+                if (response.status === 503 && attempts > 1) {
+                    const delay = (parseInt(response.headers.get('Retry-After'), 10) || 2) * 1000;
+                    return new Promise(resolve => setTimeout(resolve, delay))
+                        .then(() => fetchResults(attempts - 1));
+                }
                 if (!response.ok) {
                     throw new Error(`Erro de rede: ${response.status}`);
                 }
                 return response.json();
-            })
+            });
+
+        fetchResults(15)
             .then(data => {
                 console.log('Resultados obtidos:', data);
                 // Guardar no objeto compartilhado
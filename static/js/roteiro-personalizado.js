@@ -48,12 +48,25 @@ document.addEventListener('DOMContentLoaded', function() {
         startDate: null,
         endDate: null,
         travelers: 1,
+        version: null,
         days: []
     };
     
     // Dia ativo no momento
     let activeDayIndex = 0;
     
+    // Último estado confirmado pelo servidor (dias serializados), base das alterações incrementais
+    let savedSnapshot = null;
+    
+    // Salvamento automático: alterações próximas são agrupadas em uma única requisição
+    const SAVE_DEBOUNCE_MS = 800;
+    let saveTimer = null;
+    let saveInFlight = false;
+    let savePending = false;
+    
+    // Coordenadas já resolvidas pelo servidor (nome do local → resultado)
+    const geocodedLocations = {};
+    
     // ========================================
     // Inicialização
     // ========================================
@@ -434,6 +447,10 @@ document.addEventListener('DOMContentLoaded', function() {
         currentRoteiro.startDate = novoRoteiro.startDate || null;
         currentRoteiro.endDate = novoRoteiro.endDate || null;
         currentRoteiro.travelers = novoRoteiro.travelers || 1;
+        currentRoteiro.version = novoRoteiro.version || null;
+        
+        // Estado do servidor: dias criados localmente serão enviados no próximo salvamento
+        rememberSavedState(novoRoteiro);
         
         // Se as datas foram fornecidas
         if (currentRoteiro.startDate) {
@@ -451,6 +468,9 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Atualizar UI
         updateRoteiroUI();
+        
+        // Antecipar as coordenadas de todos os locais do roteiro para o mapa
+        prefetchLocations();
     }
     
     // Criar dias a partir das datas de início e fim
@@ -1013,13 +1033,12 @@ document.addEventListener('DOMContentLoaded', function() {
             attribution: '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
         }).addTo(map);
         
-        // Usar geocodificação para obter coordenadas
-        fetch(`https://nominatim.openstreetmap.org/search?format=json&q=${encodeURIComponent(location)}`)
-            .then(response => response.json())
-            .then(data => {
-                if (data && data.length > 0) {
-                    const lat = parseFloat(data[0].lat);
-                    const lon = parseFloat(data[0].lon);
+        // Coordenadas do cache do servidor (o navegador não consulta o provedor diretamente)
+        resolveLocation(location)
+            .then(result => {
+                if (result && result.status === 'found') {
+                    const lat = result.lat;
+                    const lon = result.lon;
                     
                     // Atualizar visão do mapa
                     map.setView([lat, lon], 13);
@@ -1046,6 +1065,54 @@ document.addEventListener('DOMContentLoaded', function() {
             });
     }
     
+    // Obter as coordenadas de um local (cache local ou servidor)
+    // Locais ainda na fila do servidor ("pending") são consultados de novo após retry_after
+    function resolveLocation(location, attempts = 5) {
+        if (geocodedLocations[location]) {
+            return Promise.resolve(geocodedLocations[location]);
+        }
+        
+        return fetch(`/api/roteiro/geocode?q=${encodeURIComponent(location)}`)
+            .then(response => response.json())
+            .then(data => {
+                const result = data.success ? data.locations[location] : null;
+                if (result && result.status === 'found') {
+                    geocodedLocations[location] = result;
+                }
+                if (result && result.status === 'pending' && attempts > 1) {
+                    const delay = Math.min(Math.max(result.retry_after || 1, 1), 10) * 1000;
+                    return new Promise(resolve => setTimeout(resolve, delay))
+                        .then(() => resolveLocation(location, attempts - 1));
+                }
+                return result;
+            });
+    }
+    
+    // Resolver de uma vez os locais de todos os blocos do roteiro
+    function prefetchLocations() {
+        if (!currentRoteiro.id) return;
+        
+        fetch('/api/roteiro/geocode', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ roteiro_id: currentRoteiro.id })
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) return;
+            Object.entries(data.locations).forEach(([location, result]) => {
+                if (result.status === 'found') {
+                    geocodedLocations[location] = result;
+                }
+            });
+        })
+        .catch(error => {
+            console.warn('Erro ao antecipar coordenadas do roteiro:', error);
+        });
+    }
+    
     // Enviar mensagem para o chat
     function sendMessage() {
         const message = userInput.value.trim();
@@ -1295,56 +1362,126 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
-    // Salvar roteiro no servidor
+    // Guardar o estado confirmado pelo servidor
+    function rememberSavedState(roteiro) {
+        savedSnapshot = {
+            destination: roteiro.destination || null,
+            startDate: roteiro.startDate || null,
+            endDate: roteiro.endDate || null,
+            days: (roteiro.days || []).map(day => JSON.stringify(day))
+        };
+    }
+    
+    // Montar as operações (JSON Patch) entre o estado salvo e o atual
+    function buildPatchOperations() {
+        const ops = [];
+        
+        ['destination', 'startDate', 'endDate'].forEach(field => {
+            const value = currentRoteiro[field] || null;
+            if (value !== savedSnapshot[field]) {
+                ops.push({ op: 'replace', path: `/${field}`, value: value });
+            }
+        });
+        
+        // Apenas os dias alterados são enviados
+        const days = currentRoteiro.days.map(day => JSON.stringify(day));
+        const saved = savedSnapshot.days;
+        for (let i = 0; i < Math.min(days.length, saved.length); i++) {
+            if (days[i] !== saved[i]) {
+                ops.push({ op: 'replace', path: `/days/${i}`, value: currentRoteiro.days[i] });
+            }
+        }
+        for (let i = saved.length; i < days.length; i++) {
+            ops.push({ op: 'add', path: '/days/-', value: currentRoteiro.days[i] });
+        }
+        for (let i = saved.length - 1; i >= days.length; i--) {
+            ops.push({ op: 'remove', path: `/days/${i}` });
+        }
+        
+        return ops;
+    }
+    
+    // Salvar roteiro no servidor (agendado; várias alterações seguidas geram um único envio)
     function updateRoteiroOnServer() {
+        // Salvar também em cookie (como fallback)
+        setCookie('roteiro_data', JSON.stringify(currentRoteiro));
+        
+        clearTimeout(saveTimer);
+        saveTimer = setTimeout(flushRoteiroChanges, SAVE_DEBOUNCE_MS);
+    }
+    
+    // Enviar as alterações pendentes
+    function flushRoteiroChanges() {
+        // Um envio por vez: as alterações feitas durante o envio seguem no próximo
+        if (saveInFlight) {
+            savePending = true;
+            return;
+        }
+        
         console.log('Salvando roteiro...');
         
-        // Se temos um ID, atualizar roteiro existente
-        if (currentRoteiro.id) {
-            fetch('/api/roteiro/atualizar', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify(currentRoteiro)
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.success) {
-                    console.log('Roteiro atualizado com sucesso');
-                } else {
-                    console.error('Erro ao atualizar roteiro:', data.error);
-                }
-            })
-            .catch(error => {
-                console.error('Erro ao atualizar roteiro:', error);
+        let request;
+        if (currentRoteiro.id && currentRoteiro.version && savedSnapshot) {
+            // Roteiro existente: enviar apenas as alterações
+            const ops = buildPatchOperations();
+            if (ops.length === 0) {
+                return;
+            }
+            request = sendRoteiroRequest('/api/roteiro/patch', {
+                id: currentRoteiro.id,
+                version: currentRoteiro.version,
+                ops: ops
             });
         } else {
-            // Senão, criar novo roteiro
-            fetch('/api/roteiro/salvar', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify(currentRoteiro)
-            })
-            .then(response => response.json())
-            .then(data => {
+            // Roteiro novo (ou sem versão): enviar o roteiro completo
+            request = sendRoteiroRequest(currentRoteiro.id ? '/api/roteiro/atualizar' : '/api/roteiro/salvar', currentRoteiro);
+        }
+        
+        // Estado enviado, que passa a ser a base se o servidor confirmar
+        const sent = JSON.parse(JSON.stringify(currentRoteiro));
+        saveInFlight = true;
+        
+        request
+            .then(({ status, data }) => {
                 if (data.success) {
                     console.log('Roteiro salvo com sucesso');
-                    // Atualizar ID
-                    currentRoteiro.id = data.roteiro_id;
+                    if (data.roteiro_id) {
+                        currentRoteiro.id = data.roteiro_id;
+                    }
+                    currentRoteiro.version = data.version || currentRoteiro.version;
+                    rememberSavedState(sent);
+                } else if (status === 409) {
+                    // Alterado em outra janela: carregar a versão atual em vez de sobrescrevê-la
+                    console.warn('Conflito de versão ao salvar roteiro:', data.message);
+                    addMessageToChat(data.message, false);
+                    savePending = false;
+                    loadRoteiro(currentRoteiro.id);
                 } else {
                     console.error('Erro ao salvar roteiro:', data.error);
                 }
             })
             .catch(error => {
                 console.error('Erro ao salvar roteiro:', error);
+            })
+            .finally(() => {
+                saveInFlight = false;
+                if (savePending) {
+                    savePending = false;
+                    flushRoteiroChanges();
+                }
             });
-        }
-        
-        // Salvar também em cookie (como fallback)
-        setCookie('roteiro_data', JSON.stringify(currentRoteiro));
+    }
+    
+    // Enviar uma requisição de salvamento e retornar status e corpo
+    function sendRoteiroRequest(url, body) {
+        return fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(body)
+        })
+        .then(response => response.json().then(data => ({ status: response.status, data: data })));
     }
     
     // ========================================
@@ -0,0 +1,42 @@
+"""
+Testes da separação entre o token do profiler e o token das rotas administrativas
+"""
+
+import pytest
+
+from services.admin_auth import admin_auth
+from services.request_profiler import request_profiler
+
+
+@pytest.fixture
+def tokens(monkeypatch):
+    monkeypatch.setattr(request_profiler, 'token', 'token-profiler')
+    monkeypatch.setattr(admin_auth, 'token', 'token-admin')
+
+
+@pytest.mark.parametrize('path', ['/admin/prompt-cache', '/admin/cache-warmer', '/admin/admission', '/admin/db'])
+def test_profiler_token_does_not_grant_admin_routes(client, tokens, path):
+    assert client.get(path, headers={'X-Avi-Profile': 'token-profiler'}).status_code == 403
+    assert client.get(path, headers={'X-Avi-Admin': 'token-profiler'}).status_code == 403
+    assert client.get(path).status_code == 403
+
+
+def test_profiler_token_cannot_trigger_cache_warmer(client, tokens):
+    assert client.post('/admin/cache-warmer', headers={'X-Avi-Profile': 'token-profiler'}).status_code == 403
+
+
+@pytest.mark.parametrize('path', ['/admin/admission', '/admin/db'])
+def test_admin_token_grants_admin_routes(client, tokens, path):
+    assert client.get(path, headers={'X-Avi-Admin': 'token-admin'}).status_code == 200
+
+
+def test_admin_token_does_not_grant_profiles(client, tokens):
+    assert client.get('/admin/profiles', headers={'X-Avi-Admin': 'token-admin'}).status_code == 403
+    assert client.get('/admin/profiles', headers={'X-Avi-Profile': 'token-admin'}).status_code == 403
+    assert client.get('/admin/profiles', headers={'X-Avi-Profile': 'token-profiler'}).status_code == 200
+
+
+def test_without_configured_token_nothing_is_authorized(monkeypatch):
+    monkeypatch.setattr(admin_auth, 'token', None)
+    assert not admin_auth.is_authorized(None)
+    assert not admin_auth.is_authorized('')
@@ -0,0 +1,71 @@
+"""
+Testes do controle de admissão: 429 com Retry-After, cotas por IP atrás do
+proxy (X-Forwarded-For) e Overloaded dos fornecedores nas rotas
+"""
+
+from collections import OrderedDict
+
+import pytest
+
+import routes_roteiro
+from services.admission_control import admission_control, Overloaded
+
+
+@pytest.fixture
+def one_per_minute(monkeypatch):
+    """Cota de 1 mensagem por minuto por IP, sem cota por sessão, com buckets vazios"""
+    monkeypatch.setattr(admission_control, 'enabled', True)
+    monkeypatch.setattr(admission_control, 'policies', {'chat': {'session': 0, 'ip': 1}})
+    monkeypatch.setattr(admission_control, '_buckets', OrderedDict())
+
+
+@pytest.fixture
+def limited_chat(app, monkeypatch, one_per_minute):
+    """Troca a view de /api/chat por uma resposta fixa, mantendo a admissão"""
+    monkeypatch.setitem(app.view_functions, 'chat', admission_control.limit('chat')(lambda: 'ok'))
+
+
+def _chat(client, ip):
+    return client.post('/api/chat', json={'message': 'oi'}, headers={'X-Forwarded-For': ip})
+
+
+def test_exhausted_bucket_returns_429_with_retry_after(client, limited_chat):
+    assert _chat(client, '203.0.113.1').status_code == 200
+
+    response = _chat(client, '203.0.113.1')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert response.get_json()['retry_after'] >= 1
+
+
+def test_ip_quota_uses_the_forwarded_client_address(client, limited_chat):
+    assert _chat(client, '203.0.113.1').status_code == 200
+    assert _chat(client, '203.0.113.1').status_code == 429
+
+    # Mesmo endereço do proxy (remote_addr), cliente diferente: cota própria
+    assert _chat(client, '203.0.113.2').status_code == 200
+
+
+def test_overloaded_upstream_in_roteiro_chat_returns_429(client, monkeypatch):
+    def refuse(message, roteiro_data):
+        raise Overloaded("Fornecedor 'openai' sobrecarregado (fila cheia)", retry_after=3)
+
+    monkeypatch.setattr(routes_roteiro, 'process_avi_message', refuse)
+
+    response = client.post('/api/roteiro/chat', json={'message': 'quero voos', 'roteiro_data': {}})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '3'
+
+
+def test_batch_search_raises_when_every_leg_is_refused():
+    from services.batch_flight_search import BatchFlightSearch
+
+    class RefusingApi:
+        def search_flights(self, origin, destination, departure_date):
+            raise Overloaded("Fornecedor 'travelpayouts' sobrecarregado (fila cheia)", retry_after=2)
+
+    with pytest.raises(Overloaded):
+        BatchFlightSearch(api=RefusingApi()).search([
+            {'origin': 'GRU', 'destination': 'LIS', 'departure_date': '2030-05-01'},
+            {'origin': 'LIS', 'destination': 'GRU', 'departure_date': '2030-05-10'}
+        ])
@@ -0,0 +1,50 @@
+"""
+Testes da varredura de datas do serviço Amadeus (SDK)
+"""
+
+import threading
+import time
+
+from services.amadeus_sdk_service import AmadeusSDKService
+from services.amadeus_token_manager import AmadeusTokenManager
+
+
+def _service(monkeypatch, hanging=()):
+    """Serviço sem credenciais, com a consulta por data substituída"""
+    monkeypatch.delenv('AMADEUS_API_KEY', raising=False)
+    monkeypatch.delenv('AMADEUS_API_SECRET', raising=False)
+    monkeypatch.setenv('AMADEUS_MAX_CONCURRENCY', '1')
+    service = AmadeusSDKService()
+    release = threading.Event()
+
+    def fetch(date, origin, destination, adults, currency, deadline):
+        if date in hanging:
+            release.wait(5)
+            return None
+        return {'date': date, 'price': 100.0}
+
+    monkeypatch.setattr(service, '_fetch_best_price_for_date', fetch)
+    return service, release
+
+
+def test_hung_dates_do_not_hold_threads_for_later_scans(monkeypatch):
+    service, release = _service(monkeypatch, hanging={'2030-01-01'})
+    try:
+        service.scan_deadline = 0.2
+        prices, missing = service._check_dates_concurrently(['2030-01-01'], 'GRU', 'LIS', 1, 'BRL')
+        assert prices == [] and missing == ['2030-01-01']
+
+        service.scan_deadline = 2
+        start = time.monotonic()
+        prices, missing = service._check_dates_concurrently(['2030-01-02'], 'GRU', 'LIS', 1, 'BRL')
+        assert [p['date'] for p in prices] == ['2030-01-02'] and missing == []
+        assert time.monotonic() - start < 1
+    finally:
+        release.set()
+
+
+def test_sdk_client_calls_have_a_timeout(monkeypatch):
+    monkeypatch.setenv('AMADEUS_SDK_TIMEOUT', '7')
+    monkeypatch.delenv('AMADEUS_TOKEN_CACHE_PATH', raising=False)
+    client = AmadeusTokenManager().get_client('chave', 'segredo')
+    assert client.http.keywords == {'timeout': 7.0}
@@ -0,0 +1,124 @@
+"""
+Testes do gerenciador de tokens OAuth da Amadeus (endpoint de token simulado)
+"""
+
+import os
+import stat
+import threading
+import time
+
+import pytest
+import requests
+
+from services.amadeus_token_manager import AmadeusTokenManager
+
+
+class TokenEndpoint:
+    """Substitui requests.post: conta as chamadas e emite tokens numerados"""
+
+    def __init__(self, expires_in=1799, delay=0):
+        self.expires_in = expires_in
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, url, data=None, headers=None, timeout=None):
+        with self._lock:
+            self.calls += 1
+            number = self.calls
+        time.sleep(self.delay)
+        return Response({'access_token': f"token-{number}", 'expires_in': self.expires_in})
+
+
+class Response:
+    status_code = 200
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.text = str(payload)
+
+    def json(self):
+        return self.payload
+
+
+@pytest.fixture
+def manager_factory(monkeypatch, tmp_path):
+    """Cria gerenciadores com o endpoint simulado; os timers são cancelados ao final"""
+    created = []
+
+    def factory(endpoint, cache_path=None, refresh_margin='300'):
+        monkeypatch.setattr(requests, 'post', endpoint)
+        monkeypatch.setenv('AMADEUS_TOKEN_REFRESH_MARGIN', refresh_margin)
+        if cache_path:
+            monkeypatch.setenv('AMADEUS_TOKEN_CACHE_PATH', str(cache_path))
+        else:
+            monkeypatch.delenv('AMADEUS_TOKEN_CACHE_PATH', raising=False)
+        manager = AmadeusTokenManager()
+        created.append(manager)
+        return manager
+
+    yield factory
+    for manager in created:
+        for timer in manager._timers.values():
+            timer.cancel()
+
+
+def test_concurrent_gets_share_a_single_fetch(manager_factory):
+    endpoint = TokenEndpoint(delay=0.2)
+    manager = manager_factory(endpoint)
+    tokens = []
+
+    def get():
+        tokens.append(manager.get_token('chave', 'segredo'))
+
+    threads = [threading.Thread(target=get) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert endpoint.calls == 1
+    assert tokens == ['token-1'] * 10
+
+
+def test_token_is_refreshed_in_background_before_expiry(manager_factory):
+    # Token de 400s com margem de 300s: a renovação é agendada para ~100s;
+    # consultado dentro da margem, o token atual é servido e a renovação disparada
+    endpoint = TokenEndpoint(expires_in=400)
+    manager = manager_factory(endpoint)
+    assert manager.get_token('chave', 'segredo') == 'token-1'
+
+    key = manager._credential_key('chave', 'segredo', 'https://test.api.amadeus.com/v1')
+    assert 90 <= manager._timers[key].interval <= 100
+
+    manager._entries[key]['expires_at'] = time.time() + 200
+    assert manager.get_token('chave', 'segredo') == 'token-1'
+    for _ in range(100):
+        if endpoint.calls == 2 and manager._entries[key]['token'] == 'token-2':
+            break
+        time.sleep(0.02)
+    assert manager.get_token('chave', 'segredo') == 'token-2'
+
+
+def test_tokens_are_persisted_with_0600_and_reloaded(manager_factory, tmp_path):
+    cache_path = tmp_path / 'tokens' / 'amadeus.json'
+    endpoint = TokenEndpoint()
+    first = manager_factory(endpoint, cache_path=cache_path)
+    assert first.get_token('chave', 'segredo') == 'token-1'
+
+    assert stat.S_IMODE(os.stat(cache_path).st_mode) == 0o600
+    assert 'segredo' not in cache_path.read_text()
+
+    # Novo processo (worker reiniciado): o token persistido é usado sem nova busca
+    second = manager_factory(endpoint, cache_path=cache_path)
+    assert second.get_token('chave', 'segredo') == 'token-1'
+    assert endpoint.calls == 1
+
+
+def test_expired_persisted_tokens_are_ignored(manager_factory, tmp_path):
+    cache_path = tmp_path / 'amadeus.json'
+    endpoint = TokenEndpoint(expires_in=5)
+    manager_factory(endpoint, cache_path=cache_path).get_token('chave', 'segredo')
+
+    reloaded = manager_factory(endpoint, cache_path=cache_path)
+    assert reloaded._entries == {}
@@ -0,0 +1,105 @@
+"""
+Testes da busca de voos em lote (services.batch_flight_search)
+"""
+
+import threading
+import time
+
+import pytest
+
+from services.batch_flight_search import BatchFlightSearch, InvalidBatchRequest
+
+
+def _offer(code, price, departure, arrival):
+    return {
+        'id': code,
+        'price': {'total': str(price), 'currency': 'BRL'},
+        'itineraries': [{'segments': [{
+            'carrierCode': 'G3', 'number': code,
+            'departure': {'iataCode': 'AAA', 'at': departure},
+            'arrival': {'iataCode': 'BBB', 'at': arrival},
+        }]}],
+    }
+
+
+class FakeApi:
+    """Cliente falso: ofertas fixas por trecho; trechos em `hanging` só respondem após `release`"""
+
+    def __init__(self, offers=None, hanging=()):
+        self.offers = offers or {}
+        self.hanging = set(hanging)
+        self.release = threading.Event()
+
+    def search_flights(self, origin, destination, departure_date):
+        if (origin, destination) in self.hanging:
+            self.release.wait(5)
+        return self.offers.get((origin, destination), [])
+
+
+def _leg(origin, destination, date='2026-11-10'):
+    return {'origin': origin, 'destination': destination, 'departure_date': date}
+
+
+def test_itinerary_is_the_cheapest_connecting_combination():
+    engine = BatchFlightSearch(api=FakeApi())
+    first = [
+        {'price_value': 100, 'arrival_at': '2026-11-10T20:00'},
+        {'price_value': 300, 'arrival_at': '2026-11-10T08:00'},
+    ]
+    second = [
+        {'price_value': 50, 'departure_at': '2026-11-10T10:00'},
+        {'price_value': 400, 'departure_at': '2026-11-11T10:00'},
+    ]
+
+    itinerary = engine.cheapest_itinerary([first, second])
+
+    # 100 + 50 não conecta (chega às 20h, parte às 10h); 300 + 50 = 350 < 100 + 400
+    assert itinerary['total'] == '350.00'
+    assert itinerary['offers'] == [first[1], second[0]]
+    assert itinerary['complete'] is True
+
+
+def test_missing_leg_is_reported():
+    engine = BatchFlightSearch(api=FakeApi())
+    itinerary = engine.cheapest_itinerary([[{'price_value': 10}], []])
+
+    assert itinerary['complete'] is False
+    assert itinerary['missing_legs'] == [1]
+    assert itinerary['total'] == '10.00'
+
+
+def test_repeated_legs_are_searched_once_and_results_keep_order():
+    api = FakeApi(offers={
+        ('GRU', 'REC'): [_offer('1', 500, '2026-11-10T08:00', '2026-11-10T11:00')],
+        ('REC', 'GRU'): [_offer('2', 450, '2026-11-10T15:00', '2026-11-10T18:00')],
+    })
+    engine = BatchFlightSearch(api=api)
+
+    result = engine.search([_leg('GRU', 'REC'), _leg('REC', 'GRU'), _leg('gru', 'rec')])
+
+    assert [leg['status'] for leg in result['legs']] == ['ok', 'ok', 'ok']
+    assert result['meta']['unique_legs'] == 2
+    assert result['itinerary']['total'] == '1450.00'
+
+
+def test_timed_out_legs_do_not_hold_slots_for_later_searches(monkeypatch):
+    monkeypatch.setenv('AVI_BATCH_MAX_CONCURRENCY', '1')
+    api = FakeApi(offers={('GRU', 'SSA'): [_offer('3', 300, '2026-11-10T08:00', '2026-11-10T10:00')]},
+                  hanging={('GRU', 'REC')})
+    engine = BatchFlightSearch(api=api)
+    try:
+        slow = engine.search([_leg('GRU', 'REC')], deadline=0.2)
+        assert slow['legs'][0]['status'] == 'timed_out'
+
+        start = time.monotonic()
+        fast = engine.search([_leg('GRU', 'SSA')], deadline=2)
+        assert fast['legs'][0]['status'] == 'ok'
+        assert time.monotonic() - start < 1
+    finally:
+        api.release.set()
+
+
+def test_invalid_date_is_rejected():
+    engine = BatchFlightSearch(api=FakeApi())
+    with pytest.raises(InvalidBatchRequest):
+        engine.search([_leg('GRU', 'REC', date='10/11/2026')])
@@ -0,0 +1,80 @@
+"""
+Testes da minificação de scripts e da verificação de sintaxe do build
+"""
+
+import shutil
+import subprocess
+
+import pytest
+
+import build_assets
+from build_assets import InvalidScript, check_scripts, minify_js
+
+node = shutil.which('node')
+requires_node = pytest.mark.skipif(node is None, reason='node não instalado')
+
+
+@pytest.mark.parametrize('source, expected', [
+    # Expressões regulares após "(", "=", "," e return
+    ("s.replace(/\\/+$/g, '')", "s.replace(/\\/+$/g,'')"),
+    ("if (/^\\d+$/.test(x)) {}", "if(/^\\d+$/.test(x)){}"),
+    ("var re = /[/]x/i, z = /a b/;", "var re=/[/]x/i,z=/a b/;"),
+    ("function f(s) {\n  return /a b/.test(s);\n}", "function f(s){\nreturn /a b/.test(s);\n}"),
+    # Divisão continua divisão
+    ("y = a / b / 2;", "y=a / b / 2;"),
+    # Template literals com ${} aninhados e chaves dentro de strings
+    ("var t = `a ${ b ? `c ${ d }` : '}' } e`;", "var t=`a ${b?`c ${d}`:'}'} e`;"),
+    ("var t = `${ {k: 1}.k } / ${ x } // não é comentário`;", "var t=`${{k:1}.k} / ${x} // não é comentário`;"),
+    # Comentários: /*! ... */ preservado, os demais removidos
+    ("/*! licença */\n/* normal */\nvar a = 1; // fim", "/*! licença */\nvar a=1;"),
+    # Operadores unários não se juntam ao binário
+    ("var a = b - -c + +d;", "var a=b - -c + +d;"),
+])
+def test_minify_js(source, expected):
+    assert minify_js(source) == expected + '\n'
+
+
+@pytest.mark.parametrize('source, expected', [
+    ("var a = b\n(function () {})()", "var a=b\n(function(){})()"),
+    ("var x = 1\nvar y = x\n++x", "var x=1\nvar y=x\n++x"),
+    ("function f() {\n  return\n  value\n}", "function f(){\nreturn\nvalue\n}"),
+    ("var a = 1 /* comentário\n em linhas */ var b = 2", "var a=1\nvar b=2"),
+])
+def test_minify_js_keeps_asi_line_breaks(source, expected):
+    # As quebras de linha mudam o significado do código: devem ser mantidas
+    assert minify_js(source) == expected + '\n'
+
+
+@requires_node
+def test_minified_snippets_are_valid_javascript(tmp_path):
+    source = (
+        "var r = '/a/'.replace(/\\//g, '|');\n"
+        "var t = `x ${ r ? `y ${ r.length / 2 }` : '' } z`;\n"
+        "function f(s) {\n  return /^a+$/.test(s) ? s.length / 2 : 0\n}\n"
+        "var n = f('aa')\n(function () {})\n"
+    )
+    path = tmp_path / 'snippet.js'
+    path.write_text(minify_js(source), encoding='utf-8')
+    assert subprocess.run([node, '--check', str(path)]).returncode == 0
+
+
+@requires_node
+def test_check_scripts_rejects_invalid_output(tmp_path):
+    (tmp_path / 'ok.js').write_text('var a = 1;\n', encoding='utf-8')
+    (tmp_path / 'broken.js').write_text('var a = ;\n', encoding='utf-8')
+
+    assert check_scripts(str(tmp_path), ['ok.js']) is True
+    with pytest.raises(InvalidScript, match='broken.js'):
+        check_scripts(str(tmp_path), ['ok.js', 'broken.js'])
+
+
+@requires_node
+def test_build_checks_every_generated_script(tmp_path):
+    manifest, _ = build_assets.build(str(tmp_path / 'dist'), compress=False)
+    assert any(name.endswith('.js') for name in manifest)
+
+
+def test_check_scripts_is_skipped_without_node(tmp_path, monkeypatch):
+    monkeypatch.setattr(build_assets.shutil, 'which', lambda name: None)
+    (tmp_path / 'broken.js').write_text('var a = ;\n', encoding='utf-8')
+    assert check_scripts(str(tmp_path), ['broken.js']) is False
@@ -0,0 +1,46 @@
+"""
+Testes da persistência write-behind dos turnos do chat
+"""
+
+from services.chat_persistence import ChatPersistence
+
+
+def _persistence(app):
+    persistence = ChatPersistence()
+    persistence.enabled = True
+    persistence.app = app
+    return persistence
+
+
+def test_anonymous_turns_have_no_owner(app):
+    from models import Conversation
+
+    persistence = _persistence(app)
+    persistence.record_turn('anon-session', 'quero voar para Recife', 'Para quando?')
+
+    assert persistence.flush() == 2
+    with app.app_context():
+        conversation = Conversation.query.filter_by(session_key='anon-session').one()
+        assert conversation.user_id is None
+        assert [m.is_user for m in conversation.messages] == [True, False]
+
+
+def test_authenticated_turns_belong_to_the_user(app, make_user):
+    from models import Conversation
+
+    user_id = make_user('persistencia@example.com')
+    persistence = _persistence(app)
+    persistence.record_turn('user-session', 'oi', 'Olá!', user_id=user_id)
+
+    assert persistence.flush() == 2
+    with app.app_context():
+        conversation = Conversation.query.filter_by(session_key='user-session').one()
+        assert conversation.user_id == user_id
+
+
+def test_anonymous_turns_can_be_disabled(app):
+    persistence = _persistence(app)
+    persistence.record_anonymous = False
+    persistence.record_turn('anon-disabled', 'oi', 'Olá!')
+
+    assert persistence.pending() == 0
@@ -0,0 +1,68 @@
+"""
+Testes da listagem paginada de conversas (/api/conversations)
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def logged_in(app, client, make_user):
+    """Usuário autenticado com três conversas, da mais antiga para a mais recente"""
+    from models import db, Conversation
+
+    user_id = make_user('conversas@example.com')
+    base = datetime(2026, 1, 1, 12, 0)
+    with app.app_context():
+        for index in range(3):
+            db.session.add(Conversation(
+                title=f"Conversa {index}", user_id=user_id,
+                created_at=base, last_updated=base + timedelta(hours=index)
+            ))
+        db.session.commit()
+
+    response = client.post('/login', json={'email': 'conversas@example.com', 'password': 'senha123'})
+    assert response.status_code == 200
+    return client
+
+
+def test_requires_login(client):
+    response = client.get('/api/conversations')
+    assert response.status_code in (302, 401)
+
+
+def test_limit_returns_one_page_with_cursor(logged_in):
+    response = logged_in.get('/api/conversations?limit=1')
+    assert response.status_code == 200
+    data = response.get_json()
+
+    assert [c['title'] for c in data['conversations']] == ['Conversa 2']
+    assert data['pagination']['has_more'] is True
+    assert data['pagination']['before']
+
+
+def test_before_cursor_walks_to_older_pages(logged_in):
+    titles = []
+    url = '/api/conversations?limit=2'
+    while url:
+        data = logged_in.get(url).get_json()
+        titles.extend(c['title'] for c in data['conversations'])
+        pagination = data['pagination']
+        url = f"/api/conversations?limit=2&before={pagination['before']}" if pagination['has_more'] else None
+
+    assert titles == ['Conversa 2', 'Conversa 1', 'Conversa 0']
+
+
+def test_after_cursor_returns_newer_conversations(logged_in):
+    oldest = logged_in.get('/api/conversations?limit=1&before=' + logged_in.get(
+        '/api/conversations?limit=2').get_json()['pagination']['before']).get_json()
+    assert [c['title'] for c in oldest['conversations']] == ['Conversa 0']
+
+    newer = logged_in.get(f"/api/conversations?after={oldest['pagination']['after']}").get_json()
+    assert [c['title'] for c in newer['conversations']] == ['Conversa 2', 'Conversa 1']
+
+
+def test_invalid_cursor_is_rejected(logged_in):
+    response = logged_in.get('/api/conversations?before=nao-e-um-cursor')
+    assert response.status_code == 400
@@ -0,0 +1,48 @@
+"""
+Testes da camada de resiliência do banco nas rotas
+"""
+
+import pytest
+
+from services.db_resilience import db_resilience
+from services.admin_auth import admin_auth
+
+
+@pytest.fixture
+def open_circuit():
+    """Abre o circuito do banco durante o teste"""
+    db_resilience.breaker.trip()
+    yield
+    db_resilience.breaker.record_success()
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(admin_auth, 'token', 'segredo')
+    return 'segredo'
+
+
+def test_health_exposes_only_the_status(client):
+    response = client.get('/health/db')
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'ok'}
+
+
+def test_health_reports_open_circuit(client, open_circuit):
+    response = client.get('/health/db')
+    assert response.status_code == 503
+    assert response.get_json() == {'status': 'unavailable'}
+
+
+def test_database_details_require_admin_token(client, admin_token):
+    assert client.get('/admin/db').status_code == 403
+
+    response = client.get('/admin/db', headers={'X-Avi-Admin': admin_token})
+    assert response.status_code == 200
+    assert {'circuit', 'pool', 'operations'} <= set(response.get_json())
+
+
+def test_reads_fail_fast_with_retry_after_when_circuit_is_open(client, open_circuit):
+    response = client.get('/api/conversations/1')
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) >= 1
@@ -0,0 +1,60 @@
+"""
+Testes da busca federada: prazo por busca e provedores travados
+"""
+
+import threading
+import time
+
+from services.federated_flight_search import FederatedFlightSearch, TripWidgetProvider
+
+
+class FakeProvider:
+    def __init__(self, name, release=None):
+        self.name = name
+        self.release = release
+
+    def search(self, query):
+        if self.release is not None:
+            self.release.wait(5)
+        return []
+
+
+def test_hung_provider_does_not_hold_threads_for_later_searches(monkeypatch):
+    monkeypatch.setenv('AVI_FEDERATED_MAX_WORKERS', '1')
+    release = threading.Event()
+    engine = FederatedFlightSearch(providers=[])
+    try:
+        engine.providers = [FakeProvider('lento', release)]
+        slow = engine.search('GRU', 'LIS', '2030-05-01', deadline=0.2)
+        assert slow['meta']['timed_out'] == ['lento']
+
+        engine.providers = [FakeProvider('rapido')]
+        start = time.monotonic()
+        fast = engine.search('GRU', 'LIS', '2030-05-01', deadline=2)
+        assert fast['meta']['timed_out'] == []
+        assert time.monotonic() - start < 1
+    finally:
+        release.set()
+
+
+def test_trip_widget_waits_at_most_the_search_deadline(monkeypatch):
+    from services.async_bridge import async_bridge
+    from services.trip_widget_service import trip_widget_service
+
+    calls = {}
+
+    def run(coro, timeout=None):
+        coro.close()
+        calls['timeout'] = timeout
+        return []
+
+    monkeypatch.setattr(async_bridge, 'run', run)
+    monkeypatch.setattr(trip_widget_service, 'search_flights', lambda **kwargs: _noop())
+
+    TripWidgetProvider().search({'origin': 'GRU', 'destination': 'LIS', 'departure_date': '2030-05-01',
+                                 'deadline': 8})
+    assert calls['timeout'] == 8
+
+
+async def _noop():
+    return []
@@ -0,0 +1,149 @@
+"""
+Testes da grade de preços da varredura de datas flexíveis
+"""
+
+from datetime import date
+
+import pytest
+
+from services.flexible_date_scanner import FlexibleDateScanner, InvalidDateRange, MonthUnavailable
+
+START = date(2030, 1, 30)  # quarta-feira
+END = date(2030, 2, 5)     # terça-feira da semana seguinte
+
+
+def _row(depart_date, return_date, price):
+    return {
+        'depart_date': depart_date,
+        'return_date': return_date,
+        'stay': FlexibleDateScanner._stay_length(depart_date, return_date),
+        'price': float(price),
+        'source': 'matrix',
+        'raw': {}
+    }
+
+
+ROWS = [
+    _row('2030-01-30', None, 500),
+    _row('2030-01-30', '2030-02-06', 800),
+    _row('2030-01-30', '2030-02-06', 900),
+    _row('2030-01-31', '2030-02-03', 450),
+    _row('2030-02-02', '2030-02-09', 700),
+    _row('2030-02-04', None, 300),
+    _row('2030-02-05', '2030-02-08', 650),
+    _row('2030-01-20', None, 100),          # antes do período
+    _row('2030-02-10', '2030-02-13', 50),   # depois do período
+]
+
+
+@pytest.fixture
+def scanner():
+    return FlexibleDateScanner(api=object())
+
+
+def test_rows_outside_the_period_are_dropped(scanner):
+    rows = scanner._filter_rows(ROWS, START, END)
+    assert [row['price'] for row in rows] == [500, 800, 900, 450, 700, 300, 650]
+
+
+def test_min_stay_drops_one_way_rows(scanner):
+    rows = scanner._filter_rows(ROWS, START, END, min_stay=3)
+    assert all(row['return_date'] for row in rows)
+    assert [row['stay'] for row in rows] == [7, 7, 3, 7, 3]
+
+    rows = scanner._filter_rows(ROWS, START, END, min_stay=3, max_stay=5)
+    assert [row['depart_date'] for row in rows] == ['2030-01-31', '2030-02-05']
+
+
+def test_cheapest_per_day_across_months(scanner):
+    tables, best_rows = scanner.aggregate(scanner._filter_rows(ROWS, START, END), START, END)
+
+    assert tables['cheapest_per_day'] == [
+        {'date': '2030-01-30', 'price': 500.0, 'stay_length': 0},
+        {'date': '2030-01-31', 'price': 450.0, 'stay_length': 3},
+        {'date': '2030-02-02', 'price': 700.0, 'stay_length': 7},
+        {'date': '2030-02-04', 'price': 300.0, 'stay_length': 0},
+        {'date': '2030-02-05', 'price': 650.0, 'stay_length': 3},
+    ]
+    assert [row['price'] for row in best_rows] == [500, 450, 700, 300, 650]
+
+
+def test_cheapest_per_week_starts_on_monday(scanner):
+    tables, _ = scanner.aggregate(scanner._filter_rows(ROWS, START, END), START, END)
+
+    assert tables['cheapest_per_week'] == [
+        {'week_start': '2030-01-28', 'date': '2030-01-31', 'price': 450.0},
+        {'week_start': '2030-02-04', 'date': '2030-02-04', 'price': 300.0},
+    ]
+
+
+def test_best_stay_length_uses_the_cheapest_fare_of_each_day(scanner):
+    tables, _ = scanner.aggregate(scanner._filter_rows(ROWS, START, END), START, END)
+
+    # A tarifa de 900 no mesmo dia e duração da de 800 não entra na média
+    assert tables['best_stay_length'] == [
+        {'stay_length': 0, 'price': 300.0, 'date': '2030-02-04', 'average_price': 400.0, 'days_with_price': 2},
+        {'stay_length': 3, 'price': 450.0, 'date': '2030-01-31', 'average_price': 550.0, 'days_with_price': 2},
+        {'stay_length': 7, 'price': 700.0, 'date': '2030-02-02', 'average_price': 750.0, 'days_with_price': 2},
+    ]
+
+
+def test_empty_rows_give_empty_tables(scanner):
+    tables, best_rows = scanner.aggregate([], START, END)
+    assert tables == {'cheapest_per_day': [], 'cheapest_per_week': [], 'best_stay_length': []}
+    assert best_rows == []
+
+
+def test_months_in_range_spans_the_year_boundary():
+    assert FlexibleDateScanner.months_in_range(date(2030, 11, 20), date(2031, 2, 1)) == \
+        ['2030-11', '2030-12', '2031-01', '2031-02']
+
+
+class FailingApi:
+    """Cliente em que todos os meses falham"""
+
+    def __init__(self, error):
+        self.error = error
+
+    async def _get_month_json(self, *args):
+        raise self.error
+
+    month_matrix_endpoint = calendar_prices_endpoint = ''
+
+    def _matrix_params(self, *args):
+        return {}
+
+    _calendar_params = _matrix_params
+
+
+@pytest.mark.parametrize('error', [MonthUnavailable('sem resposta'), ImportError("No module named 'aiohttp'")])
+def test_scan_raises_when_every_month_fails(error):
+    import asyncio
+
+    scanner = FlexibleDateScanner(api=FailingApi(error))
+    with pytest.raises(type(error)):
+        asyncio.run(scanner.scan_async('GRU', 'LIS', '2030-01-30', '2030-02-05'))
+
+
+def test_connector_falls_back_only_on_upstream_errors(monkeypatch):
+    from services.flexible_date_scanner import flexible_date_scanner
+    from services.travelpayouts_connector import TravelPayoutsConnector
+
+    connector = TravelPayoutsConnector()
+    monkeypatch.setattr(connector.travelpayouts_api, '_search_month_matrix', lambda **kwargs: [])
+    monkeypatch.setattr(connector, '_format_best_prices_response',
+                        lambda best_prices, origin, destination, month, session_id: {'fallback': month, 'data': []})
+    travel_info = {'origin': 'GRU', 'destination': 'LIS',
+                   'date_range_start': '2030-01-30', 'date_range_end': '2030-02-05'}
+
+    def fail(error):
+        def scan(**kwargs):
+            raise error
+        return scan
+
+    monkeypatch.setattr(flexible_date_scanner, 'scan', fail(TimeoutError()))
+    assert connector._search_best_prices(travel_info, 's1') == {'fallback': '2030-01', 'data': []}
+
+    monkeypatch.setattr(flexible_date_scanner, 'scan', fail(ImportError("No module named 'aiohttp'")))
+    result = connector._search_best_prices(travel_info, 's1')
+    assert 'fallback' not in result and 'aiohttp' in result['error']
@@ -0,0 +1,90 @@
+"""
+Testes da geocodificação com fila em segundo plano (services.geocoding_service)
+"""
+
+import time
+
+from services.geocoding_service import FOUND, NOT_FOUND, PENDING, GeocodingService
+
+
+class SlowProvider:
+    """Provedor com limite de taxa: lento e consultado apenas em segundo plano"""
+
+    name = 'slow'
+    background = True
+    min_interval = 0.05
+
+    def __init__(self, places, delay=0.3):
+        self.places = places
+        self.delay = delay
+        self.calls = []
+
+    def geocode(self, query):
+        self.calls.append((query, time.monotonic()))
+        time.sleep(self.delay)
+        coords = self.places.get(query)
+        return {'lat': coords[0], 'lon': coords[1], 'display_name': query} if coords else None
+
+
+class LocalProvider:
+    name = 'local'
+    background = False
+
+    def geocode(self, query):
+        return {'lat': 1.0, 'lon': 2.0, 'display_name': query}
+
+
+def _wait_for_queue(service, timeout=5):
+    deadline = time.monotonic() + timeout
+    while service.snapshot()['queue_size'] and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert service.snapshot()['queue_size'] == 0
+
+
+def test_misses_return_pending_without_waiting_for_the_provider(app):
+    provider = SlowProvider({'Olinda Centro': (-8.01, -34.85), 'Recife Antigo': (-8.06, -34.87)})
+    service = GeocodingService(provider=provider)
+
+    with app.app_context():
+        start = time.monotonic()
+        results = service.geocode_many(['Olinda Centro', 'Recife Antigo', 'Lugar Inexistente'])
+        elapsed = time.monotonic() - start
+
+    assert elapsed < provider.delay
+    assert {r['status'] for r in results.values()} == {PENDING}
+    assert all(r['retry_after'] > 0 for r in results.values())
+
+    _wait_for_queue(service)
+    with app.app_context():
+        results = service.geocode_many(['Olinda Centro', 'Recife Antigo', 'Lugar Inexistente'])
+
+    assert results['Olinda Centro']['status'] == FOUND
+    assert results['Olinda Centro']['lat'] == -8.01
+    assert results['Lugar Inexistente']['status'] == NOT_FOUND
+
+    # Uma consulta por lugar, espaçadas pelo intervalo mínimo do provedor
+    assert len(provider.calls) == 3
+    gaps = [b[1] - a[1] for a, b in zip(provider.calls, provider.calls[1:])]
+    assert all(gap >= provider.min_interval for gap in gaps)
+
+
+def test_repeated_misses_are_queued_once(app):
+    provider = SlowProvider({'Praia do Forte': (-12.57, -38.0)}, delay=0.1)
+    service = GeocodingService(provider=provider)
+
+    with app.app_context():
+        service.geocode_many(['Praia do Forte'])
+        service.geocode_many(['praia do forte', 'PRAIA DO FORTE!'])
+
+    _wait_for_queue(service)
+    assert len(provider.calls) == 1
+
+
+def test_local_providers_are_resolved_in_the_request(app):
+    service = GeocodingService(provider=LocalProvider())
+
+    with app.app_context():
+        result = service.geocode('Jericoacoara')
+
+    assert result['status'] == FOUND
+    assert result['source'] == 'local'
@@ -0,0 +1,73 @@
+"""
+Testes das tabelas IATA (services.iata_tables)
+"""
+
+import pickle
+
+from services.iata_tables import IataTables, build_tables
+
+
+def _tables(tmp_path, airports, cities=None):
+    path = tmp_path / 'iata.pickle'
+    with open(path, 'wb') as f:
+        pickle.dump(build_tables(airports, [{'code': 'ZZ', 'name': 'Zeta Air'}], cities=cities), f)
+    return IataTables(str(path))
+
+
+def test_generated_tables_are_used_when_present(tmp_path):
+    tables = _tables(tmp_path, [
+        {'code': 'XAA', 'name': 'Xa Intl', 'city_code': 'XAC', 'country_code': 'BR'},
+    ], cities=[{'code': 'XAC', 'name': 'Xa City', 'country_code': 'BR'}])
+
+    assert tables.source == 'generated'
+    assert tables.airport('xaa', locale='en')['city'] == 'Xa City'
+    assert tables.airline_name('ZZ', locale='en') == 'Zeta Air'
+
+
+def test_airport_without_city_falls_back_to_airport_name(tmp_path):
+    tables = _tables(tmp_path, [{'code': 'XBB', 'name': 'Xb Field', 'city_code': 'XBC'}])
+
+    airport = tables.airport('XBB', locale='en')
+    assert airport['name'] == 'Xb Field'
+    assert airport['city'] == 'Xb Field'
+
+
+def test_missing_file_uses_curated_tables(tmp_path):
+    tables = IataTables(str(tmp_path / 'ausente.pickle'))
+
+    assert tables.source == 'curated'
+    assert tables.airport('GRU')['city']
+
+
+def _offer(origin, destination, price='500.00'):
+    return {
+        'price': {'total': price, 'currency': 'BRL'},
+        'itineraries': [{'segments': [{
+            'departure': {'iataCode': origin, 'at': '2030-05-01T08:00:00'},
+            'arrival': {'iataCode': destination, 'at': '2030-05-01T09:00:00'}
+        }]}]
+    }
+
+
+def test_chat_formatters_use_city_names():
+    from services.chat_processor import ChatProcessor
+    from services.flight_data_provider import FlightDataProvider
+    from services.iata_tables import iata_tables
+    from services.travelpayouts_connector import TravelPayoutsConnector
+
+    gru, gig = iata_tables.airport_display_name('GRU'), iata_tables.airport_display_name('GIG')
+    assert gru != 'GRU' and gig != 'GIG'
+    expected = f"de {gru} para {gig}"
+
+    results = {'data': [_offer('GRU', 'GIG')], 'meta': {'origin': 'GRU', 'destination': 'GIG'}}
+    chat = TravelPayoutsConnector().format_flight_results_for_chat(results)
+    assert expected in chat['message']
+    # O botão de redirecionamento continua recebendo os códigos
+    assert (chat['origin'], chat['destination']) == ('GRU', 'GIG')
+
+    redirect = {'data': [{'is_redirect': True}], 'meta': {'origin': 'GRU', 'destination': 'GIG',
+                                                          'origin_name': 'Guarulhos (GRU)'}}
+    assert f"de Guarulhos (GRU) para {gig}" in TravelPayoutsConnector().format_flight_results_for_chat(redirect)['message']
+
+    assert expected in FlightDataProvider().format_flight_results_for_chat({'data': [_offer('GRU', 'GIG')]})['message']
+    assert expected in ChatProcessor().get_flight_search_intro('GRU', 'GIG')
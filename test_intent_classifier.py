@@ -0,0 +1,72 @@
+"""
+Testes do classificador de intenções (services.intent_classifier)
+"""
+
+import pytest
+
+from services.intent_classifier import intent_classifier, templated_reply
+
+# Confirmações aceitas pela verificação por substring que o classificador substituiu
+CONFIRMATIONS = [
+    'sim',
+    'Sim!',
+    'ok',
+    'confirmo',
+    'pode buscar',
+    'sim, pode buscar',
+    'sim, pode buscar os voos',
+    'confirmo, pode buscar o voo',
+    'ok, procure voos',
+    'pode buscar as passagens',
+    'sim pode buscar os hoteis',
+    'busque os voos',
+    'encontre as passagens mais baratas',
+    'isso mesmo, pode procurar',
+    'está correto',
+    'claro que sim',
+    'pode prosseguir',
+    'vamos lá',
+    'yes',
+    'com certeza',
+    'sim, obrigado',
+]
+
+NOT_CONFIRMATIONS = [
+    'não',
+    'não é isso',
+    'sim, mas muda a data para dia 20',
+    'quero mudar o destino',
+    'quanto custa a passagem?',
+    'qual hotel você recomenda?',
+    'oi',
+]
+
+
+@pytest.mark.parametrize('message', CONFIRMATIONS)
+def test_confirmations_are_accepted(message):
+    result = intent_classifier.classify(message)
+    assert intent_classifier.is_confirmation(result), result
+
+
+@pytest.mark.parametrize('message', NOT_CONFIRMATIONS)
+def test_other_messages_are_not_confirmations(message):
+    result = intent_classifier.classify(message)
+    assert not intent_classifier.is_confirmation(result), result
+
+
+@pytest.mark.parametrize('message, intent', [
+    ('oi', 'saudacao'),
+    ('Bom dia, Avi!', 'saudacao'),
+    ('muito obrigado', 'agradecimento'),
+    ('tchau', 'despedida'),
+    ('não', 'negacao'),
+    ('quero passagem para Lisboa', 'voos'),
+    ('onde ficar em Roma', 'hospedagem'),
+])
+def test_classify(message, intent):
+    assert intent_classifier.classify(message)['intent'] == intent
+
+
+def test_simple_intents_get_template_replies_only_when_confident():
+    assert templated_reply(intent_classifier.classify('oi'), step=0)
+    assert templated_reply(intent_classifier.classify('oi, quero ir para Paris em maio'), step=0) is None
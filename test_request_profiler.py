@@ -0,0 +1,29 @@
+"""
+Testes da autenticação do profiler de requisições
+"""
+
+import pytest
+
+from services.request_profiler import request_profiler
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(request_profiler, 'token', 'segredo')
+    return 'segredo'
+
+
+def test_token_is_accepted_only_in_the_header(client, admin_token):
+    assert client.get('/admin/profiles', headers={'X-Avi-Profile': admin_token}).status_code == 200
+    assert client.get(f'/admin/profiles?token={admin_token}').status_code == 403
+
+
+def test_wrong_or_missing_token_is_rejected(client, admin_token):
+    assert client.get('/admin/profiles', headers={'X-Avi-Profile': 'segredo-errado'}).status_code == 403
+    assert client.get('/admin/profiles').status_code == 403
+
+
+def test_without_configured_token_nothing_is_authorized(monkeypatch):
+    monkeypatch.setattr(request_profiler, 'token', None)
+    assert not request_profiler.is_authorized(None)
+    assert not request_profiler.is_authorized('')
@@ -0,0 +1,78 @@
+"""
+Testes das alterações versionadas do roteiro (/api/roteiro/patch)
+"""
+
+import pytest
+
+from routes_roteiro import roteiro_bp
+
+
+@pytest.fixture
+def roteiro(client, make_user):
+    """Roteiro salvo com dois dias, na versão inicial"""
+    user_id = make_user('roteiro@example.com')
+    response = client.post('/api/roteiro/salvar', json={
+        'user_id': user_id,
+        'destination': 'Recife',
+        'startDate': '2026-11-10',
+        'endDate': '2026-11-11',
+        'days': [
+            {'date': '2026-11-10', 'title': 'Chegada', 'blocks': []},
+            {'date': '2026-11-11', 'title': 'Praia', 'blocks': []},
+        ],
+    })
+    assert response.status_code == 200, response.get_json()
+    data = response.get_json()
+    return data['roteiro_id'], data['version']
+
+
+def test_roteiro_requests_do_not_run_schema_checks():
+    assert not roteiro_bp.before_request_funcs
+
+
+def test_patch_rewrites_only_changed_days(client, roteiro):
+    roteiro_id, version = roteiro
+    response = client.post('/api/roteiro/patch', json={
+        'id': roteiro_id,
+        'version': version,
+        'ops': [{'op': 'replace', 'path': '/days/1/title', 'value': 'Porto de Galinhas'}],
+    })
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['version'] == version + 1
+    assert data['changed_days'] == [1]
+
+
+def test_stale_version_returns_409_with_current_plan(client, roteiro):
+    roteiro_id, version = roteiro
+    first = client.post('/api/roteiro/patch', json={
+        'id': roteiro_id, 'version': version,
+        'ops': [{'op': 'replace', 'path': '/destination', 'value': 'Olinda'}],
+    })
+    assert first.status_code == 200
+
+    stale = client.post('/api/roteiro/patch', json={
+        'id': roteiro_id, 'version': version,
+        'ops': [{'op': 'replace', 'path': '/destination', 'value': 'Natal'}],
+    })
+
+    assert stale.status_code == 409
+    data = stale.get_json()
+    assert data['version'] == version + 1
+    assert data['roteiro']['destination'] == 'Olinda'
+
+
+def test_invalid_operation_is_rejected_without_changes(client, roteiro):
+    roteiro_id, version = roteiro
+    response = client.post('/api/roteiro/patch', json={
+        'id': roteiro_id, 'version': version,
+        'ops': [{'op': 'replace', 'path': '/days/9/title', 'value': 'x'}],
+    })
+    assert response.status_code == 400
+
+    retry = client.post('/api/roteiro/patch', json={
+        'id': roteiro_id, 'version': version,
+        'ops': [{'op': 'test', 'path': '/destination', 'value': 'Recife'}],
+    })
+    assert retry.status_code == 200
@@ -0,0 +1,42 @@
+"""
+Testes do modelo de leitura do roteiro (services.roteiro_view)
+"""
+
+import json
+from datetime import date
+
+from sqlalchemy import event
+
+from services.roteiro_view import load_plan
+
+
+def test_load_plan_loads_each_collection_without_a_cartesian_join(app, make_user):
+    from models import db, TravelPlan, TravelPlanDay, FlightBooking, Accommodation
+
+    user_id = make_user('roteiro-view@example.com')
+    with app.app_context():
+        plan = TravelPlan(title='Viagem para Salvador', user_id=user_id, destination='Salvador',
+                          start_date=date(2026, 11, 10), end_date=date(2026, 11, 12))
+        plan.days = [TravelPlanDay(position=i, data=json.dumps({'title': f'Dia {i}', 'blocks': []}))
+                     for i in range(3)]
+        plan.flights = [FlightBooking(airline='G3', flight_number=str(n)) for n in range(2)]
+        plan.accommodations = [Accommodation(name=f'Hotel {n}') for n in range(2)]
+        db.session.add(plan)
+        db.session.commit()
+        plan_id = plan.id
+        db.session.remove()
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            loaded = load_plan(plan_id)
+            counts = (len(loaded.days), len(loaded.flights), len(loaded.accommodations))
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+            db.session.remove()
+
+    assert counts == (3, 2, 2)
+    # Uma consulta do roteiro e uma por coleção, nenhuma com JOIN entre as coleções
+    assert len(statements) == 4
+    assert not any('JOIN' in statement.upper() for statement in statements)
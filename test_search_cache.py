@@ -0,0 +1,144 @@
+"""
+Testes do cache stale-while-revalidate e dos circuitos por endpoint do TravelPayouts
+"""
+
+import threading
+import time
+
+import pytest
+import requests
+
+from services.circuit_breaker import CircuitOpenError
+from services.search_cache import SearchCache, FRESH, STALE, MISS
+from services.travelpayouts_rest_api import (
+    TravelPayoutsRestAPI, flight_search_cache, month_price_cache, search_cache_key
+)
+
+
+def _age(cache, key, seconds):
+    """Envelhece a entrada do cache em alguns segundos"""
+    value, stored_at = cache._entries[key]
+    cache._entries[key] = (value, stored_at - seconds)
+
+
+def test_fresh_hit_does_not_call_the_loader():
+    cache = SearchCache('teste', ttl=60, stale_ttl=60)
+    cache.store('k', ['antigo'])
+
+    def loader():
+        raise AssertionError("loader não deveria ser chamado")
+
+    assert cache.get_or_load('k', loader) == ['antigo']
+    assert cache.stats['fresh'] == 1
+
+
+def test_stale_value_is_served_while_a_single_refresh_runs():
+    cache = SearchCache('teste', ttl=60, stale_ttl=600)
+    cache.store('k', ['antigo'])
+    _age(cache, 'k', 120)
+
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return ['novo']
+
+    assert cache.get_or_load('k', loader) == ['antigo']
+    assert started.wait(2)
+    # Atualização em andamento: mais consultas recebem o obsoleto sem nova atualização
+    assert cache.get_or_load('k', loader) == ['antigo']
+    assert cache.status('k') == STALE
+
+    release.set()
+    for _ in range(100):
+        if cache.status('k') == FRESH:
+            break
+        time.sleep(0.02)
+    assert cache.lookup('k') == (['novo'], FRESH)
+    assert calls == [1]
+
+
+def test_failed_refresh_keeps_the_stale_value():
+    cache = SearchCache('teste', ttl=60, stale_ttl=600)
+    cache.store('k', ['antigo'])
+    _age(cache, 'k', 120)
+
+    done = threading.Event()
+
+    def loader():
+        done.set()
+        raise requests.ConnectionError("fora do ar")
+
+    assert cache.get_or_load('k', loader) == ['antigo']
+    assert done.wait(2)
+    for _ in range(100):
+        if not cache._refreshing:
+            break
+        time.sleep(0.02)
+    assert cache.lookup('k') == (['antigo'], STALE)
+    assert cache.stats['refresh_failures'] == 1
+
+
+def test_expired_entry_is_a_miss():
+    cache = SearchCache('teste', ttl=60, stale_ttl=60)
+    cache.store('k', ['antigo'])
+    _age(cache, 'k', 200)
+    assert cache.lookup('k') == (None, MISS)
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Cliente REST sem rede, com caches e circuitos restaurados ao final"""
+    client = TravelPayoutsRestAPI()
+
+    def no_network(*args, **kwargs):
+        raise AssertionError("nenhuma requisição deveria ser feita")
+
+    monkeypatch.setattr(requests, 'get', no_network)
+    flight_search_cache.invalidate()
+    month_price_cache.invalidate()
+    breakers = [client._breaker(url) for url in (client.calendar_prices_endpoint,
+                                                 client.cheap_prices_endpoint,
+                                                 client.month_matrix_endpoint)]
+    yield client, breakers
+    for breaker in breakers:
+        breaker.record_success()
+    flight_search_cache.invalidate()
+    month_price_cache.invalidate()
+
+
+def test_miss_with_open_circuits_returns_redirect_without_calling_the_api(api):
+    client, breakers = api
+    for breaker in breakers:
+        breaker.trip()
+
+    flights = client.search_flights('GRU', 'LIS', '2030-05-01')
+
+    assert flights and all(flight.get('is_redirect') for flight in flights)
+    # Resultado de redirecionamento não vai para o cache
+    assert flight_search_cache.status(search_cache_key('GRU', 'LIS', '2030-05-01')) == MISS
+
+
+def test_open_circuit_rejects_the_endpoint(api):
+    client, breakers = api
+    breakers[0].trip()
+    with pytest.raises(CircuitOpenError):
+        client._get(client.calendar_prices_endpoint)
+
+
+def test_upstream_failures_open_the_endpoint_circuit(api, monkeypatch):
+    client, breakers = api
+
+    class Response:
+        status_code = 502
+
+    monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: Response())
+    for _ in range(client.breaker_threshold):
+        client._get(client.cheap_prices_endpoint)
+
+    assert breakers[1].is_open()
+    assert not breakers[0].is_open()
@@ -0,0 +1,101 @@
+"""
+Testes da busca antecipada do chat (services.search_prefetcher)
+"""
+
+from concurrent.futures import Future
+
+import pytest
+
+import services.search_prefetcher as prefetch_module
+from services.search_prefetcher import PENDING, SearchPrefetcher
+
+TRAVEL_INFO = {'origin': 'GRU', 'destination': 'REC', 'departure_date': '2026-11-10', 'adults': 1}
+
+
+class FakeBridge:
+    """Ponte assíncrona falsa: registra as buscas e devolve futuros controlados pelo teste"""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, coroutine):
+        self.futures.append(Future())
+        return self.futures[-1]
+
+
+class FakeConnector:
+    def search_flights_from_chat_async(self, travel_info, session_id):
+        return None
+
+
+@pytest.fixture
+def bridge(monkeypatch):
+    bridge = FakeBridge()
+    monkeypatch.setattr(prefetch_module, 'async_bridge', bridge)
+    monkeypatch.setattr(prefetch_module, 'travelpayouts_connector', FakeConnector())
+    return bridge
+
+
+@pytest.fixture
+def prefetcher(bridge):
+    prefetcher = SearchPrefetcher()
+    prefetcher.enabled = True
+    return prefetcher
+
+
+def test_default_wait_is_short(prefetcher):
+    assert prefetcher.wait_seconds <= 5
+
+
+def test_running_prefetch_is_pending_and_kept(prefetcher, bridge):
+    prefetcher.start('s1', TRAVEL_INFO)
+
+    assert prefetcher.take('s1', TRAVEL_INFO, timeout=0.01) is PENDING
+
+    # A busca continua registrada: a chamada seguinte aguarda o mesmo futuro
+    bridge.futures[0].set_result({'data': [{'id': 1}]})
+    assert prefetcher.take('s1', TRAVEL_INFO, timeout=0.01) == {'data': [{'id': 1}]}
+    assert len(bridge.futures) == 1
+
+
+def test_restarting_with_same_parameters_reuses_the_search(prefetcher, bridge):
+    prefetcher.start('s1', TRAVEL_INFO)
+    prefetcher.start('s1', dict(TRAVEL_INFO))
+
+    assert len(bridge.futures) == 1
+
+
+def test_changed_parameters_discard_the_prefetch(prefetcher, bridge):
+    prefetcher.start('s1', TRAVEL_INFO)
+
+    assert prefetcher.take('s1', dict(TRAVEL_INFO, destination='SSA'), timeout=0.01) is None
+    assert bridge.futures[0].cancelled()
+
+
+def test_failed_prefetch_falls_back_to_normal_search(prefetcher, bridge):
+    prefetcher.start('s1', TRAVEL_INFO)
+    bridge.futures[0].set_result({'error': 'falha', 'data': []})
+
+    assert prefetcher.take('s1', TRAVEL_INFO, timeout=0.01) is None
+
+
+def test_flight_results_route_waits_briefly_and_asks_to_poll(client, monkeypatch):
+    import app as app_module
+    import app_routes
+
+    calls = {}
+
+    def take(session_id, travel_info, timeout=None):
+        calls['timeout'] = timeout
+        return PENDING
+
+    monkeypatch.setitem(app_module.conversation_store, 's-pending', {'travel_info': dict(TRAVEL_INFO)})
+    monkeypatch.setattr(app_routes.search_prefetcher, 'take', take)
+
+    response = client.get('/api/flight_results/s-pending')
+
+    assert response.status_code == 503
+    assert response.get_json()['pending'] is True
+    assert response.headers['Retry-After'] == '2'
+    # A espera ocupa o worker síncrono: deve ser curta
+    assert calls['timeout'] <= 2